@@ -0,0 +1,360 @@
+"""Append-only, disk-backed journal of outbound IoT Hub messages.
+
+Store-and-forward for ``TelemetrySender``: payloads are appended to the
+journal before anything touches the network and only leave it once IoT
+Hub has acknowledged them, so a lost link (or a module restart) delays
+messages instead of losing them.  Delivery is at-least-once — a crash
+between a send and its acknowledgement replays that message.
+
+Each priority class has its own directory of segment files; readers
+always drain higher priorities (lower numbers) first, so processing
+summaries overtake everything else after an outage::
+
+    {root}/
+      p0/00000001.log  00000002.log  cursor.json
+      p1/...
+
+Record layout (little-endian)::
+
+    uint32 length | uint32 crc32 | float64 queued_at | route '\\n' body
+
+A complete record whose CRC does not match is logged, counted as
+discarded and skipped; a short record (torn tail) ends its segment.
+``cursor.json`` holds the acknowledged position per class and is
+replaced atomically.  Segments wholly behind the cursor are deleted;
+when the journal outgrows its size cap, the oldest segments of the
+lowest priority are dropped first.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("oceanstream")
+
+# Priority classes (lower drains first)
+PRIORITY_SUMMARY = 0    # processing results, job outcomes
+PRIORITY_NORMAL = 1     # everything not classified
+PRIORITIES = (PRIORITY_SUMMARY, PRIORITY_NORMAL)
+
+_HEADER = struct.Struct("<IId")
+
+_SEGMENT_BYTES = 4 * 1024 * 1024
+
+
+@dataclass
+class JournalEntry:
+    """One journaled message, as returned by ``MessageJournal.read``."""
+
+    priority: int
+    segment: int
+    offset: int
+    end: int
+    route: str
+    body: bytes
+    queued_at: float
+    corrupt: bool = False
+
+    @property
+    def entry_id(self) -> str:
+        """Stable id, reused as the message id on every (re)send."""
+        return f"{self.priority}-{self.segment}-{self.offset}"
+
+
+class _Lane:
+    """Segments, cursor and read position of one priority class."""
+
+    def __init__(self, root: Path, priority: int):
+        self.priority = priority
+        self.dir = root / f"p{priority}"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.cursor: Tuple[int, int] = self._load_cursor()
+        self.read_pos: Tuple[int, int] = self.cursor
+        self.in_flight: List[JournalEntry] = []
+        self.acked: set = set()
+        segments = self.segments()
+        # Always write to a fresh segment so a torn tail from a crash
+        # is never appended to
+        self.write_segment = (segments[-1] + 1) if segments else 1
+        self.write_handle = None
+        self.write_size = 0
+        self.pending = self._count_pending()
+
+    def segments(self) -> List[int]:
+        return sorted(int(p.stem) for p in self.dir.glob("*.log") if p.stem.isdigit())
+
+    def path(self, segment: int) -> Path:
+        return self.dir / f"{segment:08d}.log"
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        try:
+            data = json.loads((self.dir / "cursor.json").read_text())
+            return int(data["segment"]), int(data["offset"])
+        except (OSError, ValueError, KeyError):
+            return 0, 0
+
+    def save_cursor(self) -> None:
+        tmp = self.dir / "cursor.json.tmp"
+        tmp.write_text(json.dumps({"segment": self.cursor[0], "offset": self.cursor[1]}))
+        os.replace(tmp, self.dir / "cursor.json")
+
+    def _count_pending(self) -> int:
+        n = 0
+        pos = self.cursor
+        while True:
+            entries, pos = self.scan(pos, max_items=10_000, max_bytes=None, headers_only=True)
+            if not entries:
+                return n
+            n += len(entries)
+
+    def scan(
+        self,
+        pos: Tuple[int, int],
+        *,
+        max_items: int,
+        max_bytes: Optional[int],
+        headers_only: bool = False,
+    ) -> Tuple[List[JournalEntry], Tuple[int, int]]:
+        """Read records from *pos*; return them and the position after."""
+        out: List[JournalEntry] = []
+        total = 0
+        segment, offset = pos
+        for seg in self.segments():
+            if seg < segment:
+                continue
+            if seg > segment:
+                segment, offset = seg, 0
+            try:
+                with open(self.path(seg), "rb") as f:
+                    f.seek(offset)
+                    while len(out) < max_items:
+                        header = f.read(_HEADER.size)
+                        if len(header) < _HEADER.size:
+                            break
+                        length, crc, queued_at = _HEADER.unpack(header)
+                        if headers_only:
+                            f.seek(length, os.SEEK_CUR)
+                            payload = b""
+                        else:
+                            payload = f.read(length)
+                            if len(payload) < length:
+                                logger.warning("Journal %s: torn record at %d — skipping rest of segment", self.path(seg), offset)
+                                break
+                        end = offset + _HEADER.size + length
+                        if headers_only and end > os.fstat(f.fileno()).st_size:
+                            break
+                        if not headers_only and zlib.crc32(payload) != crc:
+                            logger.warning("Journal %s: corrupt record at %d — discarding it", self.path(seg), offset)
+                            out.append(JournalEntry(self.priority, seg, offset, end, "", b"", queued_at, corrupt=True))
+                            offset = end
+                            continue
+                        route, _, body = payload.partition(b"\n")
+                        out.append(JournalEntry(self.priority, seg, offset, end, route.decode(), body, queued_at))
+                        total += length
+                        offset = end
+                        if max_bytes is not None and total >= max_bytes:
+                            return out, (segment, offset)
+            except FileNotFoundError:
+                continue
+            if len(out) >= max_items:
+                break
+        return out, (segment, offset)
+
+    def advance(self) -> bool:
+        """Move the cursor over the acknowledged prefix of in-flight entries."""
+        advanced = False
+        while self.in_flight and (self.in_flight[0].segment, self.in_flight[0].offset) in self.acked:
+            head = self.in_flight.pop(0)
+            self.acked.discard((head.segment, head.offset))
+            self.cursor = (head.segment, head.end)
+            self.pending = max(self.pending - 1, 0)
+            advanced = True
+        if advanced:
+            self.save_cursor()
+        return advanced
+
+    def close_writer(self) -> None:
+        if self.write_handle is not None:
+            self.write_handle.close()
+            self.write_handle = None
+
+
+class MessageJournal:
+    """Persistent at-least-once message journal with priority classes.
+
+    Parameters
+    ----------
+    root : Path
+        Directory for the journal (created if missing).
+    max_bytes : int
+        Size cap across all classes; beyond it the oldest segments of
+        the lowest priority are discarded.
+    segment_bytes : int
+        Size at which the write segment of a class is rolled over.
+    fsync : bool
+        ``fsync`` every append (durable across power loss, slower).
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        max_bytes: int = 512 * 1024 * 1024,
+        segment_bytes: int = _SEGMENT_BYTES,
+        fsync: bool = False,
+    ):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.segment_bytes = int(segment_bytes)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._lanes = {p: _Lane(self.root, p) for p in PRIORITIES}
+        self.discarded = 0
+        pending = self.pending()
+        if any(pending.values()):
+            logger.info("Message journal %s: %s messages pending replay", self.root, pending)
+
+    def append(
+        self,
+        route: str,
+        body: bytes,
+        priority: int = PRIORITY_NORMAL,
+        queued_at: Optional[float] = None,
+    ) -> None:
+        """Append a message for *route*.  Disk-only, never waits on the network."""
+        lane = self._lanes.get(priority, self._lanes[PRIORITY_NORMAL])
+        payload = route.encode() + b"\n" + body
+        record = _HEADER.pack(len(payload), zlib.crc32(payload), queued_at or time.time()) + payload
+        rolled = False
+        with self._lock:
+            if lane.write_handle is None or lane.write_size >= self.segment_bytes:
+                rolled = True
+                if lane.write_handle is not None:
+                    lane.close_writer()
+                    lane.write_segment += 1
+                lane.write_handle = open(lane.path(lane.write_segment), "ab")
+                lane.write_size = lane.write_handle.tell()
+            lane.write_handle.write(record)
+            lane.write_handle.flush()
+            if self.fsync:
+                os.fsync(lane.write_handle.fileno())
+            lane.write_size += len(record)
+            lane.pending += 1
+        # The size cap is checked whenever a segment is sealed
+        if rolled and self.size_bytes() > self.max_bytes:
+            self._enforce_cap()
+
+    def read(self, max_items: int = 1000, max_bytes: int = 4 * 1024 * 1024) -> List[JournalEntry]:
+        """Next unacknowledged, not-yet-read entries, highest priority first.
+
+        Corrupt records met on the way are acknowledged as discarded, so
+        they never hold the cursor back.
+        """
+        out: List[JournalEntry] = []
+        corrupt = 0
+        with self._lock:
+            for p in PRIORITIES:
+                lane = self._lanes[p]
+                if len(out) >= max_items or max_bytes <= 0:
+                    break
+                entries, lane.read_pos = lane.scan(
+                    lane.read_pos, max_items=max_items - len(out), max_bytes=max_bytes,
+                )
+                lane.in_flight.extend(entries)
+                bad = [e for e in entries if e.corrupt]
+                if bad:
+                    lane.acked.update((e.segment, e.offset) for e in bad)
+                    lane.advance()
+                    corrupt += len(bad)
+                    entries = [e for e in entries if not e.corrupt]
+                max_bytes -= sum(len(e.body) for e in entries)
+                out.extend(entries)
+            self.discarded += corrupt
+        if corrupt:
+            self.compact()
+        return out
+
+    def ack(self, entries: List[JournalEntry]) -> None:
+        """Mark entries delivered; advance cursors over the acked prefix."""
+        with self._lock:
+            for e in entries:
+                self._lanes[e.priority].acked.add((e.segment, e.offset))
+            for lane in self._lanes.values():
+                lane.advance()
+        self.compact()
+
+    def rewind(self) -> None:
+        """Forget in-flight reads so unacknowledged entries are read again."""
+        with self._lock:
+            for lane in self._lanes.values():
+                lane.in_flight.clear()
+                lane.acked.clear()
+                lane.read_pos = lane.cursor
+
+    def compact(self) -> int:
+        """Delete segments wholly behind each class's cursor."""
+        removed = 0
+        with self._lock:
+            for lane in self._lanes.values():
+                for seg in lane.segments():
+                    if seg > lane.cursor[0] or seg == lane.write_segment:
+                        break
+                    path = lane.path(seg)
+                    if seg == lane.cursor[0] and lane.cursor[1] < path.stat().st_size:
+                        break
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+    def pending(self) -> Dict[str, int]:
+        """Unacknowledged messages per priority class."""
+        with self._lock:
+            return {f"p{p}": lane.pending for p, lane in self._lanes.items()}
+
+    def size_bytes(self) -> int:
+        total = 0
+        for lane in self._lanes.values():
+            for seg in lane.segments():
+                try:
+                    total += lane.path(seg).stat().st_size
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            for lane in self._lanes.values():
+                lane.close_writer()
+
+    def _enforce_cap(self) -> None:
+        """Drop the oldest sealed segments, lowest priority first."""
+        for p in reversed(PRIORITIES):
+            lane = self._lanes[p]
+            for seg in lane.segments():
+                if self.size_bytes() <= self.max_bytes:
+                    return
+                if seg == lane.write_segment:
+                    break
+                with self._lock:
+                    records, _ = lane.scan((seg, 0), max_items=10_000_000, max_bytes=None, headers_only=True)
+                    # Only records not yet acknowledged are actually lost
+                    lost = sum(1 for e in records if e.segment == seg and (e.segment, e.offset) >= lane.cursor)
+                    lane.path(seg).unlink(missing_ok=True)
+                    if lane.cursor[0] <= seg:
+                        lane.cursor = (seg + 1, 0)
+                        lane.save_cursor()
+                    if lane.read_pos[0] <= seg:
+                        lane.read_pos = (seg + 1, 0)
+                    lane.in_flight = [e for e in lane.in_flight if e.segment != seg]
+                    lane.pending = max(lane.pending - lost, 0)
+                    self.discarded += lost
+                logger.warning("Message journal over %d MB — discarded %s (p%d)", self.max_bytes // (1024 * 1024), lane.path(seg).name, p)
@@ -89,7 +89,7 @@ def serialize_for_json(obj):
 
 
 def send_to_hub(client: IoTHubModuleClient, data: Dict[str, Any] = None, properties=None,
-                output_name: str = 'output1') -> None:
+                output_name: str = 'output1', priority: int = None) -> None:
     """
     Send data to Azure IoT Hub using IoT Edge messages.
 
@@ -100,11 +100,29 @@ def send_to_hub(client: IoTHubModuleClient, data: Dict[str, Any] = None, propert
         The data to send to Azure IoT Hub.
     - output_name: str
         The output route name defined in the IoT Edge deployment manifest.
+    - priority: int
+        Delivery class when messages are journaled
+        (``azure_handler.journal.PRIORITY_*``; default ``PRIORITY_NORMAL``).
+
+    If a ``TelemetrySender`` is running for ``client`` (see
+    ``azure_handler.telemetry_sender``), output messages are queued for
+    background delivery and this call returns immediately.
     """
+    if not properties:
+        from azure_handler.journal import PRIORITY_NORMAL
+        from azure_handler.telemetry_sender import get_telemetry_sender
+
+        sender = get_telemetry_sender(client)
+        if sender is not None:
+            sender.submit(data or {}, output_name, PRIORITY_NORMAL if priority is None else priority)
+            return
+
     try:
         if properties:
+            from azure_handler.reported_properties import report_properties
+
             properties = serialize_for_json(properties)
-            client.patch_twin_reported_properties(properties)
+            report_properties(client, properties)
         else:
             if data is None:
                 data = {}
@@ -0,0 +1,190 @@
+"""Debounced, coalesced module twin reported-property updates.
+
+Every processing batch and every desired-property patch used to write
+the twin straight away, which with small realtime batches adds up to a
+steady stream of twin writes that IoT Hub throttles.  The aggregator
+merges patches in memory and writes them from its own thread:
+
+- at most every ``interval`` seconds for routine changes (counters,
+  timings), and
+- ``debounce`` seconds after a *material* change — a new key, a changed
+  non-numeric value, or a numeric value that moved by more than
+  ``threshold`` (relative) since it was last reported.
+
+``update`` only takes a lock and merges a dict, so it is safe to call
+from the IoT SDK callback thread.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from azure.iot.device import IoTHubModuleClient
+    from config import EdgeConfig
+
+logger = logging.getLogger("oceanstream")
+
+_AGGREGATORS: Dict[int, "ReportedPropertiesAggregator"] = {}
+_AGGREGATORS_LOCK = threading.Lock()
+
+
+def _merge(target: Dict[str, Any], patch: Dict[str, Any]) -> None:
+    """Deep-merge *patch* into *target* (twin patch semantics)."""
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def _is_material(old: Any, new: Any, threshold: float) -> bool:
+    if isinstance(new, dict):
+        if not isinstance(old, dict):
+            return True
+        return any(k not in old or _is_material(old[k], v, threshold) for k, v in new.items())
+    numeric = (int, float)
+    if isinstance(new, numeric) and isinstance(old, numeric) and not isinstance(new, bool) and not isinstance(old, bool):
+        if old == new:
+            return False
+        scale = max(abs(old), abs(new))
+        return abs(new - old) > threshold * scale
+    return old != new
+
+
+class ReportedPropertiesAggregator:
+    """Coalesces reported-property patches and writes them on a schedule.
+
+    Parameters
+    ----------
+    client : IoTHubModuleClient
+        Connected module client.
+    interval : float
+        Seconds between routine writes.
+    debounce : float
+        Delay before writing after a material change, so bursts coalesce.
+    threshold : float
+        Relative change of a numeric value that counts as material.
+    """
+
+    def __init__(
+        self,
+        client: "IoTHubModuleClient",
+        *,
+        interval: float = 60.0,
+        debounce: float = 2.0,
+        threshold: float = 0.5,
+    ):
+        self.client = client
+        self.interval = float(interval)
+        self.debounce = float(debounce)
+        self.threshold = float(threshold)
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Any] = {}
+        self._reported: Dict[str, Any] = {}
+        self._material = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.patches = 0
+
+    def start(self) -> "ReportedPropertiesAggregator":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="twin-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write anything pending and stop."""
+        self._stop.set()
+        self._material.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def update(self, patch: Dict[str, Any]) -> None:
+        """Merge a reported-properties patch.  Never blocks on I/O."""
+        if not patch:
+            return
+        with self._lock:
+            _merge(self._pending, patch)
+            self.patches += 1
+            material = _is_material(self._reported, patch, self.threshold)
+        if material:
+            self._material.set()
+
+    def flush(self) -> bool:
+        """Write pending properties now.  Returns ``False`` if the write failed."""
+        with self._lock:
+            if not self._pending:
+                return True
+            patch, self._pending = self._pending, {}
+        try:
+            self.client.patch_twin_reported_properties(patch)
+        except Exception as e:
+            logger.error("Failed to update reported properties: %s", e)
+            with self._lock:
+                # Keep newer values that arrived meanwhile
+                merged = patch
+                _merge(merged, self._pending)
+                self._pending = merged
+            return False
+        with self._lock:
+            _merge(self._reported, patch)
+            self.writes += 1
+        logger.debug("Reported properties written: %s", list(patch.keys()))
+        return True
+
+    def _run(self) -> None:
+        next_write = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            timeout = max(next_write - time.monotonic(), 0.0)
+            if self._material.wait(timeout):
+                self._material.clear()
+                # Let a burst of patches settle into one write
+                self._stop.wait(self.debounce)
+            self.flush()
+            next_write = time.monotonic() + self.interval
+        self.flush()
+
+
+def start_reported_properties(client: "IoTHubModuleClient", config: "EdgeConfig") -> ReportedPropertiesAggregator:
+    """Start (once) the reported-properties aggregator for *client*."""
+    with _AGGREGATORS_LOCK:
+        aggregator = _AGGREGATORS.get(id(client))
+        if aggregator is None:
+            aggregator = ReportedPropertiesAggregator(
+                client,
+                interval=config.twin_report_interval_seconds,
+                debounce=config.twin_report_debounce_seconds,
+                threshold=config.twin_report_change_threshold,
+            )
+            _AGGREGATORS[id(client)] = aggregator
+    logger.info(
+        "Twin reporter started (interval=%.0fs, debounce=%.1fs)",
+        config.twin_report_interval_seconds, config.twin_report_debounce_seconds,
+    )
+    return aggregator.start()
+
+
+def stop_reported_properties(client: "IoTHubModuleClient", timeout: float = 5.0) -> None:
+    """Flush and stop the aggregator registered for *client*."""
+    with _AGGREGATORS_LOCK:
+        aggregator = _AGGREGATORS.pop(id(client), None)
+    if aggregator is not None:
+        aggregator.stop(timeout)
+
+
+def report_properties(client: "IoTHubModuleClient", patch: Dict[str, Any]) -> None:
+    """Report twin properties through the aggregator, or directly if none runs."""
+    aggregator = _AGGREGATORS.get(id(client))
+    if aggregator is not None:
+        aggregator.update(patch)
+    else:
+        client.patch_twin_reported_properties(patch)
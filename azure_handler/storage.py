@@ -16,12 +16,15 @@ import shutil
 import tempfile
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 import xarray as xr
 
 logger = logging.getLogger("oceanstream")
 
+# Zarr v2/v3 metadata documents (everything else in a store is chunk data)
+_ZARR_METADATA = {"zarr.json", ".zarray", ".zattrs", ".zgroup", ".zmetadata"}
+
 
 class StorageBackend(ABC):
     """Protocol for edge data storage."""
@@ -38,10 +41,30 @@ class StorageBackend(ABC):
     def load_zarr(self, path: str, **kwargs) -> xr.Dataset:
         """Load a Zarr store as an xarray Dataset."""
 
+    @abstractmethod
+    def create_zarr(self, template: xr.Dataset, path: str, chunks: Dict[str, int]) -> None:
+        """Create a Zarr store shaped like *template* for ``write_zarr_region``.
+
+        Data variables are chunked by *chunks*; regions written later
+        should align with these chunks so concurrent writers never touch
+        the same chunk.
+        """
+
+    @abstractmethod
+    def write_zarr_region(self, dataset: xr.Dataset, path: str, region: Dict[str, slice]) -> None:
+        """Write *dataset* into *region* of a store made by ``create_zarr``.
+
+        Variables without a region dimension are not written.
+        """
+
     @abstractmethod
     def save_file(self, data: bytes, path: str) -> str:
         """Save raw bytes to a file path. Returns the resolved path."""
 
+    @abstractmethod
+    def load_file(self, path: str) -> bytes:
+        """Read a file saved with ``save_file``.  Raises ``FileNotFoundError``."""
+
     @abstractmethod
     def exists(self, path: str) -> bool:
         """Check if a path exists in the store."""
@@ -59,6 +82,42 @@ class StorageBackend(ABC):
         handles persistence directly.
         """
 
+    @abstractmethod
+    def load_echodata(self, path: str):
+        """Open an EchoData store saved with ``save_echodata``."""
+
+
+def _write_zarr_template(template: xr.Dataset, target: str, chunks: Dict[str, int]) -> None:
+    """Write *template*'s metadata and coordinates; region data is left to writers.
+
+    With dask the chunked data variables are only declared
+    (``compute=False``); without it the template values are written and
+    later overwritten region by region.
+    """
+    template = template.copy()
+    for name, var in template.variables.items():
+        var.encoding.clear()
+        if name in template.data_vars:
+            var.encoding["chunks"] = tuple(chunks.get(d, n) for d, n in zip(var.dims, var.shape))
+    try:
+        import dask.array  # noqa: F401
+    except ImportError:
+        template.to_zarr(target, mode="w")
+        return
+    for name in template.data_vars:
+        if set(template[name].dims) & set(chunks):
+            template[name] = template[name].chunk({d: c for d, c in chunks.items() if d in template[name].dims})
+    template.to_zarr(target, mode="w", compute=False)
+
+
+def _region_dataset(dataset: xr.Dataset, region: Dict[str, slice]) -> xr.Dataset:
+    """*dataset* without the variables a region write cannot take."""
+    out = dataset[[v for v in dataset.data_vars if set(region) & set(dataset[v].dims)]]
+    out = out.drop_vars([v for v in out.variables if not set(region) & set(out[v].dims)])
+    for var in out.variables.values():
+        var.encoding.clear()
+    return out
+
 
 class LocalStorage(StorageBackend):
     """Direct filesystem storage."""
@@ -80,6 +139,10 @@ class LocalStorage(StorageBackend):
         logger.info("Saved EchoData to %s", full)
         return str(full)
 
+    def load_echodata(self, path: str):
+        from echopype import open_converted
+        return open_converted(str(self.base_path / path))
+
     def save_zarr(self, dataset: xr.Dataset, path: str, mode: str = "w") -> str:
         full = self._resolve(path)
         for var in dataset.data_vars:
@@ -113,11 +176,23 @@ class LocalStorage(StorageBackend):
         full = self.base_path / path
         return xr.open_zarr(str(full), **kwargs)
 
+    def create_zarr(self, template: xr.Dataset, path: str, chunks: Dict[str, int]) -> None:
+        full = self._resolve(path)
+        if full.exists():
+            shutil.rmtree(full)
+        _write_zarr_template(template, str(full), chunks)
+
+    def write_zarr_region(self, dataset: xr.Dataset, path: str, region: Dict[str, slice]) -> None:
+        _region_dataset(dataset, region).to_zarr(str(self.base_path / path), mode="r+", region=region)
+
     def save_file(self, data: bytes, path: str) -> str:
         full = self._resolve(path)
         full.write_bytes(data)
         return str(full)
 
+    def load_file(self, path: str) -> bytes:
+        return (self.base_path / path).read_bytes()
+
     def exists(self, path: str) -> bool:
         return (self.base_path / path).exists()
 
@@ -211,25 +286,61 @@ class AzureBlobEdgeStorage(StorageBackend):
         self._download_dir(container, prefix, local_path)
         return xr.open_zarr(local_path, **kwargs)
 
-    def _upload_dir(self, container: str, prefix: str, local_path: str) -> None:
-        """Upload all files in a local directory to blob storage."""
+    def create_zarr(self, template: xr.Dataset, path: str, chunks: Dict[str, int]) -> None:
+        container = path.split("/")[0]
+        prefix = "/".join(path.split("/")[1:])
+        self._ensure_container(container)
+        with tempfile.TemporaryDirectory() as tmp:
+            local_path = os.path.join(tmp, "store.zarr")
+            _write_zarr_template(template, local_path, chunks)
+            self._upload_dir(container, prefix, local_path)
+
+    def write_zarr_region(self, dataset: xr.Dataset, path: str, region: Dict[str, slice]) -> None:
+        container = path.split("/")[0]
+        prefix = "/".join(path.split("/")[1:])
+        dataset = _region_dataset(dataset, region)
+        written = set(dataset.data_vars)
+
+        def _is_chunk(rel: str) -> bool:
+            parts = rel.split("/")
+            return len(parts) > 1 and parts[0] in written and parts[-1] not in _ZARR_METADATA
+
+        with tempfile.TemporaryDirectory() as tmp:
+            local_path = os.path.join(tmp, "store.zarr")
+            # Metadata and coordinates only; only this region's chunks go back
+            self._download_dir(container, prefix, local_path, skip=_is_chunk)
+            dataset.to_zarr(local_path, mode="r+", region=region)
+            self._upload_dir(container, prefix, local_path, only=_is_chunk)
+
+    def __getstate__(self):
+        # Shard worker processes get their own blob client
+        state = self.__dict__.copy()
+        state["_client"] = None
+        return state
+
+    def _upload_dir(self, container: str, prefix: str, local_path: str, only=None) -> None:
+        """Upload all files in a local directory (or those *only* selects) to blob storage."""
         cc = self.client.get_container_client(container)
         for root, _dirs, files in os.walk(local_path):
             for fname in files:
                 fpath = os.path.join(root, fname)
                 rel = os.path.relpath(fpath, local_path)
+                if only is not None and not only(rel.replace(os.sep, "/")):
+                    continue
                 blob_name = f"{prefix}/{rel}" if prefix else rel
                 bc = cc.get_blob_client(blob_name)
                 with open(fpath, "rb") as f:
                     bc.upload_blob(f, overwrite=True)
 
-    def _download_dir(self, container: str, prefix: str, local_path: str) -> None:
-        """Download all blobs under a prefix to a local directory."""
+    def _download_dir(self, container: str, prefix: str, local_path: str, skip=None) -> None:
+        """Download all blobs under a prefix (except those *skip* selects) to a local directory."""
         cc = self.client.get_container_client(container)
         blob_prefix = prefix.rstrip("/") + "/"
         os.makedirs(local_path, exist_ok=True)
         for blob in cc.list_blobs(name_starts_with=blob_prefix):
             rel = blob.name[len(blob_prefix):]
+            if skip is not None and skip(rel):
+                continue
             dest = os.path.join(local_path, rel)
             os.makedirs(os.path.dirname(dest), exist_ok=True)
             bc = cc.get_blob_client(blob.name)
@@ -247,6 +358,15 @@ class AzureBlobEdgeStorage(StorageBackend):
         logger.info("Saved EchoData to blob: %s", path)
         return path
 
+    def load_echodata(self, path: str):
+        from echopype import open_converted
+        container = path.split("/")[0]
+        prefix = "/".join(path.split("/")[1:])
+        tmp = tempfile.mkdtemp()
+        local_path = os.path.join(tmp, "echodata.zarr")
+        self._download_dir(container, prefix, local_path)
+        return open_converted(local_path)
+
     def save_file(self, data: bytes, path: str) -> str:
         container = path.split("/")[0]
         self._ensure_container(container)
@@ -256,6 +376,17 @@ class AzureBlobEdgeStorage(StorageBackend):
         logger.info("Uploaded file to blob: %s", path)
         return path
 
+    def load_file(self, path: str) -> bytes:
+        container = path.split("/")[0]
+        blob_path = "/".join(path.split("/")[1:])
+        bc = self.client.get_blob_client(container=container, blob=blob_path)
+        try:
+            return bc.download_blob().readall()
+        except Exception as e:
+            if type(e).__name__ == "ResourceNotFoundError":
+                raise FileNotFoundError(path) from e
+            raise
+
     def exists(self, path: str) -> bool:
         parts = path.split("/")
         container = parts[0]
@@ -318,3 +449,32 @@ def create_storage(backend: str = "azure-blob-edge", **kwargs) -> StorageBackend
         return LocalStorage(base_path)
     else:
         return LocalStorage(base_path)
+
+
+def storage_spec(storage: StorageBackend) -> Dict[str, str]:
+    """Picklable description of *storage* for ``storage_from_spec``.
+
+    Handed to processes on other hosts (dask workers) instead of the
+    backend object, which may hold a live SDK client.
+    """
+    if isinstance(storage, AzureBlobEdgeStorage):
+        return {"backend": "azure-blob-edge", "connection_string": storage.connection_string}
+    if isinstance(storage, LocalStorage):
+        return {"backend": "local", "base_path": str(storage.base_path)}
+    raise TypeError(f"No storage spec for {type(storage).__name__}")
+
+
+_FROM_SPEC: Dict[tuple, StorageBackend] = {}
+
+
+def storage_from_spec(spec: Dict[str, str]) -> StorageBackend:
+    """The backend described by *spec*, created once per process."""
+    key = tuple(sorted(spec.items()))
+    storage = _FROM_SPEC.get(key)
+    if storage is None:
+        if spec["backend"] == "azure-blob-edge":
+            storage = AzureBlobEdgeStorage(connection_string=spec["connection_string"])
+        else:
+            storage = LocalStorage(spec["base_path"])
+        storage = _FROM_SPEC.setdefault(key, storage)
+    return storage
@@ -0,0 +1,503 @@
+"""Background, batched sender for IoT Hub output messages.
+
+``send_to_hub`` used to make one blocking ``send_message_to_output``
+round trip per call, from inside the processing paths.  Once a
+``TelemetrySender`` is started for a client, ``send_to_hub`` only
+enqueues the payload and returns; a worker thread drains the queue and
+sends with retry and backoff.
+
+By default every payload is still sent as its own message with the
+unchanged JSON body (``contentType: application/json``,
+``contentEncoding: utf-8``), so existing consumers and body-based IoT
+Hub routes keep working.  Two opt-in settings change the wire format:
+
+- ``batch`` (``telemetry_batch_enabled``) coalesces payloads per output
+  route into batches that fit IoT Hub's message-size limit; the body is
+  ``[ {payload 1}, {payload 2}, ... ]`` with custom properties
+  ``batch: "true"`` and ``batch_size: "<n>"``.
+- ``compress`` (``telemetry_compress``) gzips the body
+  (``contentEncoding: gzip``).
+
+With a ``MessageJournal`` (``azure_handler.journal``) the sender works
+store-and-forward: payloads are appended to the on-disk journal instead
+of the in-memory queue, acknowledged only after IoT Hub accepted them,
+and replayed (highest priority first, rate-limited) once the link is
+back.  Nothing is dropped while the link is down.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
+
+from azure_handler.journal import PRIORITY_NORMAL, JournalEntry, MessageJournal
+
+if TYPE_CHECKING:
+    from azure.iot.device import IoTHubModuleClient
+    from config import EdgeConfig
+
+logger = logging.getLogger("oceanstream")
+
+# IoT Hub device-to-cloud limit is 256 KB including properties/headers
+MAX_MESSAGE_BYTES = 250 * 1024
+
+# Upper bound on the backoff between send retries
+_MAX_BACKOFF_SECONDS = 60.0
+
+# Latency samples kept for the metrics window
+_LATENCY_WINDOW = 512
+
+# Payloads taken off the queue per worker cycle
+_MAX_DRAIN = 1000
+
+# JSON telemetry typically gzips 5-10x; raw bytes packed per batch
+# before compression is attempted
+_GZIP_PACK_FACTOR = 8
+
+_SENDERS: Dict[int, "TelemetrySender"] = {}
+_SENDERS_LOCK = threading.Lock()
+
+
+class TelemetrySender:
+    """Bounded-queue, batching IoT Hub sender running on its own thread.
+
+    Parameters
+    ----------
+    client : IoTHubModuleClient
+        Connected module client.
+    queue_size : int
+        Maximum queued payloads.  When full, new payloads are dropped
+        (and counted) rather than blocking the caller.
+    flush_seconds : float
+        How long the worker waits for more payloads to join a batch
+        (batching only).
+    max_message_bytes : int
+        Size limit of one sent message body.
+    batch : bool
+        Coalesce payloads into JSON-array batches (one message per
+        payload otherwise).
+    compress : bool
+        Gzip message bodies.
+    max_retries : int
+        Send attempts per batch before it is given up.
+    backoff_seconds : float
+        Initial retry delay; doubled after each failed attempt.
+    journal : MessageJournal, optional
+        Persist payloads on disk until acknowledged (store-and-forward).
+    replay_rate : float
+        Maximum messages sent per second (0 = no limit), so replaying a
+        post-outage backlog doesn't saturate the uplink.
+    """
+
+    def __init__(
+        self,
+        client: "IoTHubModuleClient",
+        *,
+        queue_size: int = 1000,
+        flush_seconds: float = 2.0,
+        max_message_bytes: int = MAX_MESSAGE_BYTES,
+        batch: bool = False,
+        compress: bool = False,
+        max_retries: int = 5,
+        backoff_seconds: float = 1.0,
+        journal: Optional[MessageJournal] = None,
+        replay_rate: float = 0.0,
+    ):
+        self.client = client
+        self.flush_seconds = float(flush_seconds)
+        self.max_message_bytes = int(max_message_bytes)
+        self.batch = batch
+        self.compress = compress
+        self.max_retries = max(1, int(max_retries))
+        self.backoff_seconds = float(backoff_seconds)
+        self.journal = journal
+        self.replay_rate = float(replay_rate)
+        self._wake = threading.Event()
+        self._last_send = 0.0
+
+        self._queue: "queue.Queue[Tuple[str, bytes, float, int]]" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._counters = {
+            "enqueued": 0,
+            "dropped": 0,
+            "sent_payloads": 0,
+            "sent_messages": 0,
+            "failed_payloads": 0,
+            "retries": 0,
+            "bytes_raw": 0,
+            "bytes_sent": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> "TelemetrySender":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-sender", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Send what is queued (within *timeout*) and stop the worker."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.journal is not None:
+            self.journal.close()
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        data: Dict[str, Any],
+        output_name: str = "output1",
+        priority: int = PRIORITY_NORMAL,
+    ) -> bool:
+        """Queue a payload for *output_name*.  Never waits on the network.
+
+        Returns ``False`` if the payload was dropped because the queue
+        is full or it cannot fit in a single message.  *priority* only
+        orders delivery when a journal is used.
+        """
+        from azure_handler.message_handler import default_serializer
+
+        body = json.dumps(data, default=default_serializer).encode("utf-8")
+        if len(body) > self.max_message_bytes and not self.compress:
+            logger.error("Payload for '%s' is %d bytes — over the message limit, dropped", output_name, len(body))
+            self._count("dropped")
+            return False
+        if self.journal is not None:
+            try:
+                self.journal.append(output_name, body, priority)
+                self._count("enqueued")
+                self._wake.set()
+                return True
+            except OSError as e:
+                logger.error("Message journal append failed (%s) — using the in-memory queue", e)
+        try:
+            self._queue.put_nowait((output_name, body, time.monotonic(), priority))
+        except queue.Full:
+            self._count("dropped")
+            dropped = self._counters["dropped"]
+            if dropped == 1 or dropped % 100 == 0:
+                logger.warning("Telemetry queue full (%d) — %d payloads dropped so far", self._queue.maxsize, dropped)
+            return False
+        self._count("enqueued")
+        self._wake.set()
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, counters and send latency (enqueue → acknowledged)."""
+        with self._lock:
+            out: Dict[str, Any] = dict(self._counters)
+            latencies = sorted(self._latencies)
+        out["queue_depth"] = self._queue.qsize()
+        out["queue_size"] = self._queue.maxsize
+        if self.journal is not None:
+            out["journal_pending"] = self.journal.pending()
+            out["journal_discarded"] = self.journal.discarded
+            out["queue_depth"] += sum(out["journal_pending"].values())
+        if latencies:
+            out["latency_ms_mean"] = round(1000 * sum(latencies) / len(latencies), 1)
+            out["latency_ms_p95"] = round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1)
+            out["latency_ms_max"] = round(1000 * latencies[-1], 1)
+        if out["bytes_raw"]:
+            out["compression_ratio"] = round(out["bytes_sent"] / out["bytes_raw"], 3)
+        return out
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[key] += n
+
+    def _run(self) -> None:
+        if self.journal is not None:
+            self._run_journal()
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+
+            # Collect whatever else arrives within the flush window
+            items = [first]
+            deadline = time.monotonic() + (self.flush_seconds if self.batch and not self._stop.is_set() else 0.0)
+            while len(items) < _MAX_DRAIN:
+                try:
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        items.append(self._queue.get(timeout=remaining))
+                    else:
+                        items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._send_queued(items)
+
+    def _send_queued(self, items: List[Tuple[str, bytes, float, int]]) -> None:
+        """Send in-memory queue items grouped by route (given up after retries)."""
+        routes: Dict[str, List[Tuple[bytes, float]]] = {}
+        for route, body, queued_at, _ in items:
+            routes.setdefault(route, []).append((body, queued_at))
+        for route, entries in routes.items():
+            for batch in self._pack(entries):
+                self._send_batch(route, batch)
+
+    def _journal_queued(self) -> None:
+        """Move payloads that fell back to the in-memory queue into the journal.
+
+        ``submit`` queues in memory when a journal append fails; those
+        are re-appended here, and sent directly if the journal still
+        refuses them, instead of waiting for shutdown.
+        """
+        direct = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            route, body, _, priority = item
+            try:
+                self.journal.append(route, body, priority)
+            except OSError:
+                direct.append(item)
+        if direct:
+            logger.warning("Message journal unavailable — sending %d payloads without it", len(direct))
+            self._send_queued(direct)
+
+    def _run_journal(self) -> None:
+        """Store-and-forward loop: read → send → acknowledge."""
+        backoff = self.backoff_seconds
+        while True:
+            self._journal_queued()
+            if not any(self.journal.pending().values()):
+                if self._stop.is_set():
+                    return
+                if self._wake.wait(0.5) and self.batch and not self._stop.is_set():
+                    # Let more payloads join the batch
+                    self._stop.wait(self.flush_seconds)
+                self._wake.clear()
+                continue
+
+            discarded = self.journal.discarded
+            entries = self.journal.read(max_items=_MAX_DRAIN, max_bytes=self.max_message_bytes * _GZIP_PACK_FACTOR)
+            if not entries:
+                if self.journal.discarded > discarded:
+                    # Only corrupt records were read; they are skipped now
+                    continue
+                # Pending records already in flight
+                self.journal.rewind()
+                if self._stop.wait(1.0):
+                    return
+                continue
+
+            if self._send_entries(entries):
+                backoff = self.backoff_seconds
+                continue
+
+            # Link down: keep everything journaled and try again later
+            self.journal.rewind()
+            if self._stop.is_set():
+                logger.info("Stopping with %s journaled messages undelivered", self.journal.pending())
+                return
+            logger.warning("IoT Hub unreachable — %s messages journaled, retrying in %.0fs", self.journal.pending(), backoff)
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, _MAX_BACKOFF_SECONDS)
+
+    def _send_entries(self, entries: List[JournalEntry]) -> bool:
+        """Send journal entries grouped by route; ack each delivered batch."""
+        routes: Dict[str, List[JournalEntry]] = {}
+        for entry in entries:
+            routes.setdefault(entry.route, []).append(entry)
+        now = time.time()
+        for route, group in routes.items():
+            batch = [(e.body, time.monotonic() - (now - e.queued_at)) for e in group]
+            offset = 0
+            for packed in self._pack(batch):
+                part = group[offset:offset + len(packed)]
+                offset += len(packed)
+                if not self._send_batch(route, packed, message_id=part[0].entry_id, give_up=False):
+                    return False
+                self.journal.ack(part)
+        return True
+
+    def _throttle(self) -> None:
+        if self.replay_rate <= 0:
+            return
+        wait = self._last_send + 1.0 / self.replay_rate - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_send = time.monotonic()
+
+    def _pack(self, entries: List[Tuple[bytes, float]]) -> List[List[Tuple[bytes, float]]]:
+        """Split entries into batches whose encoded body fits the limit."""
+        if not self.batch:
+            return [[entry] for entry in entries]
+        # Uncompressed, the JSON array size is exact.  Compressed, allow a
+        # larger raw batch; _encode halves it if the gzip body is too big.
+        limit = self.max_message_bytes * (_GZIP_PACK_FACTOR if self.compress else 1)
+        batches: List[List[Tuple[bytes, float]]] = []
+        current: List[Tuple[bytes, float]] = []
+        size = 2
+        for entry in entries:
+            grow = len(entry[0]) + 1
+            if current and size + grow > limit:
+                batches.append(current)
+                current, size = [], 2
+            current.append(entry)
+            size += grow
+        if current:
+            batches.append(current)
+        return batches
+
+    def _encode(self, bodies: List[bytes]) -> List[Tuple[bytes, int, int]]:
+        """Encode bodies as one or more ``(message_body, count, raw_bytes)``.
+
+        Halves the batch until each compressed body fits.  Without
+        batching the single body is sent as is.
+        """
+        raw = b"[" + b",".join(bodies) + b"]" if self.batch else bodies[0]
+        data = gzip.compress(raw, compresslevel=6) if self.compress else raw
+        if len(data) <= self.max_message_bytes or len(bodies) == 1:
+            return [(data, len(bodies), len(raw))]
+        mid = len(bodies) // 2
+        return self._encode(bodies[:mid]) + self._encode(bodies[mid:])
+
+    def _send_batch(
+        self,
+        route: str,
+        batch: List[Tuple[bytes, float]],
+        *,
+        message_id: Optional[str] = None,
+        give_up: bool = True,
+    ) -> bool:
+        """Encode and send a batch.
+
+        With *give_up*, batches that still fail after retries are counted
+        and dropped; otherwise ``False`` is returned at the first failure
+        so the caller can keep them.
+        """
+        offset = 0
+        for i, (data, count, raw_len) in enumerate(self._encode([body for body, _ in batch])):
+            part = batch[offset:offset + count]
+            offset += count
+            if len(data) > self.max_message_bytes:
+                logger.error("Payload for '%s' is %d bytes after encoding — over the message limit, dropped", route, len(data))
+                self._count("failed_payloads", count)
+                continue
+            msg_id = f"{message_id}-{i}" if message_id else None
+            self._throttle()
+            if self._send_with_retry(route, data, count, msg_id):
+                now = time.monotonic()
+                with self._lock:
+                    self._counters["sent_payloads"] += count
+                    self._counters["sent_messages"] += 1
+                    self._counters["bytes_raw"] += raw_len
+                    self._counters["bytes_sent"] += len(data)
+                    self._latencies.extend(now - queued_at for _, queued_at in part)
+            elif give_up:
+                self._count("failed_payloads", count)
+            else:
+                return False
+        return True
+
+    def _send_with_retry(self, route: str, data: bytes, count: int, message_id: Optional[str] = None) -> bool:
+        delay = self.backoff_seconds
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.client.send_message_to_output(self._message(data, count, message_id), route)
+                logger.debug("Sent batch of %d payloads (%d bytes) on '%s'", count, len(data), route)
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error("Failed to send %d payloads on '%s' after %d attempts: %s", count, route, attempt, e)
+                    return False
+                self._count("retries")
+                logger.warning("Send on '%s' failed (%s) — retry %d in %.1fs", route, e, attempt, delay)
+                # Shorter waits once shutdown has been requested
+                time.sleep(min(delay, 1.0) if self._stop.is_set() else delay)
+                delay = min(delay * 2, _MAX_BACKOFF_SECONDS)
+        return False
+
+    def _message(self, data: bytes, count: int, message_id: Optional[str] = None):
+        from azure.iot.device import Message
+
+        message = Message(data)
+        # Journaled batches keep their id across replays so consumers can
+        # de-duplicate at-least-once deliveries
+        message.message_id = message_id or str(uuid.uuid4())
+        message.content_type = "application/json"
+        message.content_encoding = "gzip" if self.compress else "utf-8"
+        if self.batch:
+            message.custom_properties["batch"] = "true"
+            message.custom_properties["batch_size"] = str(count)
+        return message
+
+
+def start_telemetry_sender(client: "IoTHubModuleClient", config: "EdgeConfig") -> Optional[TelemetrySender]:
+    """Start (once) the background sender for *client*.
+
+    While it runs, ``send_to_hub`` queues output messages for this client
+    instead of sending them inline.  Batching and gzip follow
+    ``telemetry_batch_enabled`` / ``telemetry_compress`` (both off by
+    default: one unchanged JSON message per payload).
+    """
+    with _SENDERS_LOCK:
+        sender = _SENDERS.get(id(client))
+        if sender is None:
+            journal = None
+            if config.telemetry_journal_enabled:
+                from pathlib import Path
+                root = config.telemetry_journal_path or str(Path(config.output_base_path) / ".journal")
+                journal = MessageJournal(Path(root), max_bytes=config.telemetry_journal_max_mb * 1024 * 1024)
+            sender = TelemetrySender(
+                client,
+                queue_size=config.telemetry_queue_size,
+                flush_seconds=config.telemetry_flush_seconds,
+                batch=config.telemetry_batch_enabled,
+                compress=config.telemetry_compress,
+                max_retries=config.telemetry_max_retries,
+                journal=journal,
+                replay_rate=config.telemetry_replay_rate,
+            )
+            _SENDERS[id(client)] = sender
+    logger.info(
+        "Telemetry sender started (queue=%d, flush=%.1fs, batch=%s, gzip=%s, journal=%s)",
+        config.telemetry_queue_size, config.telemetry_flush_seconds, config.telemetry_batch_enabled,
+        config.telemetry_compress, config.telemetry_journal_enabled,
+    )
+    return sender.start()
+
+
+def get_telemetry_sender(client: "IoTHubModuleClient") -> Optional[TelemetrySender]:
+    """The running sender registered for *client*, if any."""
+    return _SENDERS.get(id(client))
+
+
+def stop_telemetry_sender(client: "IoTHubModuleClient", timeout: float = 10.0) -> None:
+    """Flush and stop the sender registered for *client*."""
+    with _SENDERS_LOCK:
+        sender = _SENDERS.pop(id(client), None)
+    if sender is not None:
+        sender.stop(timeout)
@@ -67,6 +67,10 @@ _TWIN_KEY_MAP: dict[str, str] = {"Log_Level": "log_level"}
 _BOOL_FIELDS: set[str] = {
     "use_gpu", "denoise_enabled", "mvbs_enabled", "nasc_enabled",
     "plot_echogram", "seabed_enabled", "denoise_use_frequency_specific",
+    "daily_echogram_enabled", "echogram_tiles_enabled",
+    "telemetry_batch_enabled", "telemetry_compress", "telemetry_journal_enabled",
+    "acoustic_summary_enabled", "file_trigger_merge_enabled", "tail_follow_enabled",
+    "manifest_enabled",
 }
 
 # Fields whose values need int()
@@ -76,15 +80,31 @@ _INT_FIELDS: set[str] = {
     "transient_n", "transient_n_pings",
     "impulse_num_lags",
     "attenuation_side_pings",
+    "echogram_workers", "echogram_tile_zoom_levels",
+    "shard_workers", "shard_min_pings", "shard_halo_pings",
+    "dask_workers", "dask_retries",
+    "track_buffer_fixes",
+    "telemetry_queue_size", "telemetry_max_retries", "telemetry_journal_max_mb",
+    "acoustic_summary_bits",
+    "file_trigger_max_concurrency", "file_trigger_merge_max_files",
+    "job_workers", "job_memory_budget_mb", "job_memory_overhead_mb",
 }
 
 # Fields whose values need float()
 _FLOAT_FIELDS: set[str] = {
-    "depth_offset", "seabed_max_range",
+    "depth_offset", "seabed_max_range", "seabed_track_window",
     "background_snr_threshold", "background_noise_max",
     "transient_a", "transient_exclude_above", "transient_depth_bin", "transient_threshold_db",
     "impulse_threshold_db", "impulse_vertical_bin",
     "attenuation_threshold", "attenuation_upper_limit", "attenuation_lower_limit",
+    "daily_echogram_column_seconds", "daily_echogram_depth_bin", "daily_echogram_max_depth",
+    "track_epsilon_nmi", "nasc_carry_max_gap",
+    "telemetry_flush_seconds", "telemetry_replay_rate",
+    "twin_report_interval_seconds", "twin_report_debounce_seconds", "twin_report_change_threshold",
+    "acoustic_summary_time_bin", "acoustic_summary_depth_bin", "acoustic_summary_max_depth",
+    "file_trigger_debounce_seconds", "file_trigger_max_wait_seconds", "file_trigger_merge_max_mb",
+    "job_memory_factor",
+    "tail_follow_poll_seconds", "tail_follow_idle_seconds",
 }
 
 
@@ -125,10 +145,25 @@ class EdgeConfig:
     nasc_enabled: bool = False
     plot_echogram: bool = True
 
+    # --- Echograms ---
+    echogram_reducer: str = "mean"             # Linear-domain pixel reducer: "mean" or "max"
+    echogram_workers: int = 1                  # Render processes (1 = in-process, 0 = one per CPU core)
+
+    # --- Rolling daily echogram composite ---
+    daily_echogram_enabled: bool = True
+    daily_echogram_column_seconds: float = 10.0  # Time span of one raster column
+    daily_echogram_depth_bin: float = 1.0        # Metres per raster row
+    daily_echogram_max_depth: float = 500.0      # Depth of the bottom raster row
+
+    # --- Echogram tile pyramid (built from the daily composite) ---
+    echogram_tiles_enabled: bool = False
+    echogram_tile_zoom_levels: int = 5
+
     # --- Denoise ---
     denoise_methods: str = "background,transient,impulse,attenuation"
     denoise_use_frequency_specific: bool = False
     denoise_pulse_length: str = ""
+    denoise_cpu_kernels: str = ""             # Methods on the Numba CPU kernels, e.g. "background,transient" (needs numba; "" = oceanstream only)
 
     # --- Denoise: background noise (De Robertis & Higginbottom 2007) ---
     background_num_side_pings: int = 25
@@ -161,14 +196,83 @@ class EdgeConfig:
     seabed_enabled: bool = False
     seabed_method: str = "ariza"
     seabed_max_range: float = 1000.0
+    seabed_engine: str = "oceanstream"         # "oceanstream" (method above) or "native" (maxSv bottom tracking)
+    seabed_track_window: float = 20.0          # Native engine: metres searched around the previous ping's bottom
+
+    # --- Intra-file sharding (denoise + seabed over ping ranges) ---
+    shard_workers: int = 1                     # Processes per large file (1 = unsharded, 0 = one per CPU core)
+    shard_min_pings: int = 20000               # Files with fewer pings are not sharded
+    shard_halo_pings: int = 0                  # Overlap on each shard side (0 = from the denoise/seabed windows)
 
     # --- MVBS bins ---
     mvbs_range_bin: str = "0.5"
     mvbs_ping_time_bin: str = "10s"
+    mvbs_engine: str = "oceanstream"           # "oceanstream" or "native" (vectorized, cached bins)
 
     # --- NASC bins ---
     nasc_range_bin: str = "10"
     nasc_dist_bin: str = "0.5"
+    nasc_engine: str = "oceanstream"           # "oceanstream" or "native" (vectorized, stored-track distance)
+    nasc_carry_max_gap: float = 300.0          # Realtime, native engine: seconds between batches that still continue a distance bin (0 = no carry)
+
+    # --- Compact acoustic summary (low-bandwidth uplink) ---
+    acoustic_summary_enabled: bool = False     # Opt-in: encode and send the summary per segment
+    acoustic_summary_time_bin: float = 60.0    # Seconds per summary column
+    acoustic_summary_depth_bin: float = 5.0    # Metres per summary row
+    acoustic_summary_max_depth: float = 500.0
+    acoustic_summary_bits: int = 8             # MVBS quantization: 8 or 16
+
+    # --- Realtime GPS track (simplified, stored per day) ---
+    track_epsilon_nmi: float = 0.005           # Max cross-track error of dropped fixes (~9 m)
+    track_buffer_fixes: int = 256              # Fixes buffered before vertices are finalized
+
+    # --- Telemetry sender (background; batching and gzip opt-in) ---
+    telemetry_batch_enabled: bool = False      # Opt-in: JSON-array batches per route (consumers must unwrap)
+    telemetry_queue_size: int = 1000           # Queued payloads before new ones are dropped
+    telemetry_flush_seconds: float = 2.0       # Wait for more payloads to join a batch
+    telemetry_compress: bool = False           # Opt-in: gzip message bodies (contentEncoding=gzip)
+    telemetry_max_retries: int = 5
+    telemetry_journal_enabled: bool = True     # Store-and-forward on disk until acknowledged
+    telemetry_journal_path: str = ""           # Default: {output_base_path}/.journal
+    telemetry_journal_max_mb: int = 512        # Beyond this, oldest normal-priority messages are discarded
+    telemetry_replay_rate: float = 2.0         # Max messages/s (0 = unlimited)
+
+    # --- Twin reported properties (coalesced) ---
+    twin_report_interval_seconds: float = 60.0  # Routine write interval
+    twin_report_debounce_seconds: float = 2.0   # Delay after a material change
+    twin_report_change_threshold: float = 0.5   # Relative numeric change that is material
+
+    # --- File trigger (rawfileadded) scheduling ---
+    file_trigger_debounce_seconds: float = 5.0   # Quiet period before a burst is dispatched
+    file_trigger_max_wait_seconds: float = 60.0  # Dispatch a file after this long regardless
+    file_trigger_max_concurrency: int = 2        # Pipelines running at once
+    file_trigger_merge_enabled: bool = False     # Process consecutive small files as one batch
+    file_trigger_merge_max_mb: float = 20.0      # Files up to this size may be merged
+    file_trigger_merge_max_files: int = 8        # Files per merged batch
+
+    # --- Tail-following raw ingest (files still being written) ---
+    tail_follow_enabled: bool = False            # Follow the file the EK80 is recording
+    tail_follow_dir: str = ""                    # Directory the EK80 records into
+    tail_follow_pattern: str = "*.raw"
+    tail_follow_poll_seconds: float = 1.0        # Interval between reads of the growing file
+    tail_follow_idle_seconds: float = 120.0      # A file unchanged this long is treated as closed
+
+    # --- Execution backend (file pipeline) ---
+    execution_backend: str = "local"             # "local" or "dask" (per-stage tasks on a dask cluster)
+    dask_scheduler_address: str = ""             # e.g. tcp://10.0.0.5:8786 ("" = LocalCluster on this host)
+    dask_workers: int = 0                        # LocalCluster worker processes (0 = one per CPU core)
+    dask_retries: int = 2                        # Retries of a failed stage task
+
+    # --- Resume manifest (per-file stage completion) ---
+    manifest_enabled: bool = True                # Skip / resume files already processed
+    manifest_path: str = ""                      # Default: {output_base_path}/.manifest.sqlite
+
+    # --- On-demand job store ---
+    job_store_path: str = ""                   # Default: {output_base_path}/.jobs.sqlite
+    job_workers: int = 3                       # Max concurrently running jobs
+    job_memory_budget_mb: int = 0              # Sum of job estimates allowed at once (0 = 60% of RAM)
+    job_memory_factor: float = 6.0             # Sv-sized arrays alive at a job's peak
+    job_memory_overhead_mb: int = 400          # Fixed per-job memory (libraries, buffers)
 
     # --- Storage ---
     storage_backend: Literal["azure-blob-edge", "minio", "local"] = "azure-blob-edge"
@@ -236,9 +340,18 @@ class EdgeConfig:
             mvbs_enabled=_parse_bool(_get("mvbs_enabled", True)),
             nasc_enabled=_parse_bool(_get("nasc_enabled", False), default=False),
             plot_echogram=_parse_bool(_get("plot_echogram", True)),
+            echogram_reducer=str(_get("echogram_reducer", "mean")),
+            echogram_workers=int(_get("echogram_workers", 1)),
+            daily_echogram_enabled=_parse_bool(_get("daily_echogram_enabled", True)),
+            daily_echogram_column_seconds=float(_get("daily_echogram_column_seconds", 10.0)),
+            daily_echogram_depth_bin=float(_get("daily_echogram_depth_bin", 1.0)),
+            daily_echogram_max_depth=float(_get("daily_echogram_max_depth", 500.0)),
+            echogram_tiles_enabled=_parse_bool(_get("echogram_tiles_enabled", False), default=False),
+            echogram_tile_zoom_levels=int(_get("echogram_tile_zoom_levels", 5)),
             denoise_methods=str(_get("denoise_methods", "background,transient,impulse,attenuation")),
             denoise_use_frequency_specific=_parse_bool(_get("denoise_use_frequency_specific", False), default=False),
             denoise_pulse_length=str(_get("denoise_pulse_length", "")),
+            denoise_cpu_kernels=str(_get("denoise_cpu_kernels", "")),
             background_num_side_pings=int(_get("background_num_side_pings", 25)),
             background_range_window=int(_get("background_range_window", 20)),
             background_ping_window=int(_get("background_ping_window", 50)),
@@ -261,10 +374,59 @@ class EdgeConfig:
             seabed_enabled=_parse_bool(_get("seabed_enabled", False), default=False),
             seabed_method=str(_get("seabed_method", "ariza")),
             seabed_max_range=float(_get("seabed_max_range", 1000.0)),
+            seabed_engine=str(_get("seabed_engine", "oceanstream")),
+            seabed_track_window=float(_get("seabed_track_window", 20.0)),
+            shard_workers=int(_get("shard_workers", 1)),
+            shard_min_pings=int(_get("shard_min_pings", 20000)),
+            shard_halo_pings=int(_get("shard_halo_pings", 0)),
             mvbs_range_bin=str(_get("mvbs_range_bin", "0.5")),
             mvbs_ping_time_bin=str(_get("mvbs_ping_time_bin", "10s")),
+            mvbs_engine=str(_get("mvbs_engine", "oceanstream")),
             nasc_range_bin=str(_get("nasc_range_bin", "10")),
             nasc_dist_bin=str(_get("nasc_dist_bin", "0.5")),
+            nasc_engine=str(_get("nasc_engine", "oceanstream")),
+            nasc_carry_max_gap=float(_get("nasc_carry_max_gap", 300.0)),
+            acoustic_summary_enabled=_parse_bool(_get("acoustic_summary_enabled", False)),
+            acoustic_summary_time_bin=float(_get("acoustic_summary_time_bin", 60.0)),
+            acoustic_summary_depth_bin=float(_get("acoustic_summary_depth_bin", 5.0)),
+            acoustic_summary_max_depth=float(_get("acoustic_summary_max_depth", 500.0)),
+            acoustic_summary_bits=int(_get("acoustic_summary_bits", 8)),
+            track_epsilon_nmi=float(_get("track_epsilon_nmi", 0.005)),
+            track_buffer_fixes=int(_get("track_buffer_fixes", 256)),
+            telemetry_batch_enabled=_parse_bool(_get("telemetry_batch_enabled", False), default=False),
+            telemetry_queue_size=int(_get("telemetry_queue_size", 1000)),
+            telemetry_flush_seconds=float(_get("telemetry_flush_seconds", 2.0)),
+            telemetry_compress=_parse_bool(_get("telemetry_compress", False), default=False),
+            telemetry_max_retries=int(_get("telemetry_max_retries", 5)),
+            telemetry_journal_enabled=_parse_bool(_get("telemetry_journal_enabled", True)),
+            telemetry_journal_path=os.getenv("TELEMETRY_JOURNAL_PATH", _get("telemetry_journal_path", "")),
+            telemetry_journal_max_mb=int(_get("telemetry_journal_max_mb", 512)),
+            telemetry_replay_rate=float(_get("telemetry_replay_rate", 2.0)),
+            twin_report_interval_seconds=float(_get("twin_report_interval_seconds", 60.0)),
+            twin_report_debounce_seconds=float(_get("twin_report_debounce_seconds", 2.0)),
+            twin_report_change_threshold=float(_get("twin_report_change_threshold", 0.5)),
+            file_trigger_debounce_seconds=float(_get("file_trigger_debounce_seconds", 5.0)),
+            file_trigger_max_wait_seconds=float(_get("file_trigger_max_wait_seconds", 60.0)),
+            file_trigger_max_concurrency=int(_get("file_trigger_max_concurrency", 2)),
+            file_trigger_merge_enabled=_parse_bool(_get("file_trigger_merge_enabled", False)),
+            file_trigger_merge_max_mb=float(_get("file_trigger_merge_max_mb", 20.0)),
+            file_trigger_merge_max_files=int(_get("file_trigger_merge_max_files", 8)),
+            tail_follow_enabled=_parse_bool(_get("tail_follow_enabled", False)),
+            tail_follow_dir=os.getenv("TAIL_FOLLOW_DIR", _get("tail_follow_dir", "")),
+            tail_follow_pattern=_get("tail_follow_pattern", "*.raw"),
+            tail_follow_poll_seconds=float(_get("tail_follow_poll_seconds", 1.0)),
+            tail_follow_idle_seconds=float(_get("tail_follow_idle_seconds", 120.0)),
+            execution_backend=_get("execution_backend", "local"),
+            dask_scheduler_address=os.getenv("DASK_SCHEDULER_ADDRESS", _get("dask_scheduler_address", "")),
+            dask_workers=int(_get("dask_workers", 0)),
+            dask_retries=int(_get("dask_retries", 2)),
+            manifest_enabled=_parse_bool(_get("manifest_enabled", True)),
+            manifest_path=os.getenv("MANIFEST_PATH", _get("manifest_path", "")),
+            job_store_path=os.getenv("JOB_STORE_PATH", _get("job_store_path", "")),
+            job_workers=int(_get("job_workers", 3)),
+            job_memory_budget_mb=int(_get("job_memory_budget_mb", 0)),
+            job_memory_factor=float(_get("job_memory_factor", 6.0)),
+            job_memory_overhead_mb=int(_get("job_memory_overhead_mb", 400)),
             storage_backend=os.getenv("STORAGE_BACKEND", _get("storage_backend", "azure-blob-edge")),
             output_base_path=os.getenv("OUTPUT_BASE_PATH", "/app/processed"),
             converted_container=os.getenv("CONVERTED_CONTAINER_NAME", "converted"),
@@ -373,8 +535,17 @@ class EdgeConfig:
             "nasc_enabled": _parse_bool(os.getenv("NASC_ENABLED", "false"), default=False),
             "seabed_enabled": _parse_bool(os.getenv("SEABED_ENABLED", "false"), default=False),
             "plot_echogram": _parse_bool(os.getenv("PLOT_ECHOGRAM", "true")),
+            "echogram_reducer": os.getenv("ECHOGRAM_REDUCER", "mean"),
+            "echogram_workers": int(os.getenv("ECHOGRAM_WORKERS", "1")),
+            "daily_echogram_enabled": _parse_bool(os.getenv("DAILY_ECHOGRAM_ENABLED", "true")),
+            "daily_echogram_column_seconds": float(os.getenv("DAILY_ECHOGRAM_COLUMN_SECONDS", "10.0")),
+            "daily_echogram_depth_bin": float(os.getenv("DAILY_ECHOGRAM_DEPTH_BIN", "1.0")),
+            "daily_echogram_max_depth": float(os.getenv("DAILY_ECHOGRAM_MAX_DEPTH", "500.0")),
+            "echogram_tiles_enabled": _parse_bool(os.getenv("ECHOGRAM_TILES_ENABLED", "false"), default=False),
+            "echogram_tile_zoom_levels": int(os.getenv("ECHOGRAM_TILE_ZOOM_LEVELS", "5")),
             "denoise_methods": os.getenv("DENOISE_METHODS", "background,transient,impulse,attenuation"),
             "denoise_pulse_length": os.getenv("DENOISE_PULSE_LENGTH", ""),
+            "denoise_cpu_kernels": os.getenv("DENOISE_CPU_KERNELS", ""),
             "background_num_side_pings": int(os.getenv("BACKGROUND_NUM_SIDE_PINGS", "25")),
             "background_range_window": int(os.getenv("BACKGROUND_RANGE_WINDOW", "20")),
             "background_ping_window": int(os.getenv("BACKGROUND_PING_WINDOW", "50")),
@@ -396,10 +567,31 @@ class EdgeConfig:
             "attenuation_side_pings": int(os.getenv("ATTENUATION_SIDE_PINGS", "15")),
             "seabed_method": os.getenv("SEABED_METHOD", "ariza"),
             "seabed_max_range": float(os.getenv("SEABED_MAX_RANGE", "1000.0")),
+            "seabed_engine": os.getenv("SEABED_ENGINE", "oceanstream"),
+            "seabed_track_window": float(os.getenv("SEABED_TRACK_WINDOW", "20.0")),
+            "shard_workers": int(os.getenv("SHARD_WORKERS", "1")),
+            "shard_min_pings": int(os.getenv("SHARD_MIN_PINGS", "20000")),
+            "shard_halo_pings": int(os.getenv("SHARD_HALO_PINGS", "0")),
             "mvbs_range_bin": os.getenv("MVBS_RANGE_BIN", "0.5"),
             "mvbs_ping_time_bin": os.getenv("MVBS_PING_TIME_BIN", "10s"),
+            "mvbs_engine": os.getenv("MVBS_ENGINE", "oceanstream"),
             "nasc_range_bin": os.getenv("NASC_RANGE_BIN", "10"),
             "nasc_dist_bin": os.getenv("NASC_DIST_BIN", "0.5"),
+            "nasc_engine": os.getenv("NASC_ENGINE", "oceanstream"),
+            "nasc_carry_max_gap": float(os.getenv("NASC_CARRY_MAX_GAP", "300.0")),
+            "acoustic_summary_enabled": _parse_bool(os.getenv("ACOUSTIC_SUMMARY_ENABLED", "false")),
+            "acoustic_summary_time_bin": float(os.getenv("ACOUSTIC_SUMMARY_TIME_BIN", "60.0")),
+            "acoustic_summary_depth_bin": float(os.getenv("ACOUSTIC_SUMMARY_DEPTH_BIN", "5.0")),
+            "acoustic_summary_max_depth": float(os.getenv("ACOUSTIC_SUMMARY_MAX_DEPTH", "500.0")),
+            "acoustic_summary_bits": int(os.getenv("ACOUSTIC_SUMMARY_BITS", "8")),
+            "track_epsilon_nmi": float(os.getenv("TRACK_EPSILON_NMI", "0.005")),
+            "track_buffer_fixes": int(os.getenv("TRACK_BUFFER_FIXES", "256")),
+            "execution_backend": os.getenv("EXECUTION_BACKEND", "local"),
+            "dask_scheduler_address": os.getenv("DASK_SCHEDULER_ADDRESS", ""),
+            "dask_workers": int(os.getenv("DASK_WORKERS", "0")),
+            "dask_retries": int(os.getenv("DASK_RETRIES", "2")),
+            "manifest_enabled": _parse_bool(os.getenv("MANIFEST_ENABLED", "true")),
+            "manifest_path": os.getenv("MANIFEST_PATH", ""),
             "converted_container": os.getenv("CONVERTED_CONTAINER_NAME", "converted"),
             "echogram_container": os.getenv("ECHOGRAM_CONTAINER_NAME", "echograms"),
             "processed_container": os.getenv("PROCESSED_CONTAINER_NAME", "processed"),
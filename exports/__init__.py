@@ -1,9 +1,12 @@
 # Imports that don't require Azure SDK
 from .plot import plot_sv_data, plot_individual_channel_simplified
 from .metadata import create_instrument_metadata
-from .location import extract_location_data, select_location_points, create_location_message
+from .location import (
+    extract_location_data, select_location_points, create_location_message, haversine_nmi, rdp_mask,
+)
 from .pdf import generate_processing_report
 from .echograms import generate_echograms
+from .daily_echogram import DailyEchogram, update_daily_echogram
 from .report_md import generate_md_report
 
 
@@ -25,10 +28,14 @@ __all__ = [
     "extract_location_data",
     "select_location_points",
     "create_location_message",
+    "haversine_nmi",
+    "rdp_mask",
     "send_to_iot_hub",
     "plot_and_upload_echograms",
     "generate_processing_report",
     "generate_echograms",
+    "DailyEchogram",
+    "update_daily_echogram",
     "generate_md_report",
     "send_processing_telemetry",
 ]
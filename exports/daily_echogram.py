@@ -0,0 +1,313 @@
+"""Rolling "today so far" echogram composite per channel.
+
+Each processing batch appends its pings to a per-day, per-channel raster
+kept on local disk as a memory-mapped ``uint8`` array (rows = depth
+bins, columns = fixed time bins since midnight UTC).  The raster is
+published as fixed-width PNG *strips*; after each batch only the strips
+whose columns changed are re-encoded and uploaded, so the cost per batch
+is constant regardless of how much of the day has been recorded.
+
+Layout (under the campaign's echogram folder)::
+
+    {campaign}/echograms/{day}/daily/
+        38kHz.npy            # uint8 raster (local working copy)
+        38kHz_000.png        # strip 0 (00:00 → 01:00 at 10 s columns)
+        38kHz_001.png
+        index.json           # grid + strip manifest for viewers
+
+Rasters are shared by the realtime threads and, in standalone mode, by
+separate worker processes; every raster access holds the day's lock file
+(``.lock``) as well as a thread lock.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from exports.echograms import _extract_depth, _freq_label
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread lock only
+    fcntl = None
+
+if TYPE_CHECKING:
+    from azure_handler.storage import StorageBackend
+    from config import EdgeConfig
+
+logger = logging.getLogger("oceanstream")
+
+# Columns per published PNG strip
+_STRIP_COLUMNS = 360
+
+# Sv colour scale — matches the per-segment echograms
+_SV_MIN = -80.0
+_SV_MAX = -30.0
+
+# Realtime batches run on up to two threads; serialise raster updates
+_LOCK = threading.Lock()
+
+
+@contextmanager
+def _raster_lock(root: Path) -> Iterator[None]:
+    """Hold the rasters under *root* against other threads and processes."""
+    with _LOCK:
+        if fcntl is None:
+            yield
+            return
+        root.mkdir(parents=True, exist_ok=True)
+        with open(root / ".lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _quantize(sv_db: np.ndarray) -> np.ndarray:
+    """Map Sv (dB) to ``1..255``; ``0`` is reserved for "no data"."""
+    scaled = (np.clip(sv_db, _SV_MIN, _SV_MAX) - _SV_MIN) / (_SV_MAX - _SV_MIN)
+    return (1 + np.rint(scaled * 254)).astype(np.uint8)
+
+
+def _colour_lut() -> np.ndarray:
+    """RGBA lookup table for quantized values (index 0 is transparent)."""
+    import matplotlib
+
+    cmap = matplotlib.colormaps["ocean_r"]
+    lut = (cmap(np.linspace(0.0, 1.0, 255)) * 255).astype(np.uint8)
+    return np.vstack([np.zeros((1, 4), dtype=np.uint8), lut])
+
+
+class DailyEchogram:
+    """Per-day, per-channel memory-mapped echogram raster.
+
+    Parameters
+    ----------
+    root : Path
+        Local directory holding the day's rasters.
+    day : date
+        Calendar day (UTC) covered by the raster.
+    column_seconds : float
+        Width of one raster column in seconds.
+    depth_bin : float
+        Height of one raster row in metres.
+    max_depth : float
+        Depth (metres) of the bottom raster row.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        day: date,
+        *,
+        column_seconds: float = 10.0,
+        depth_bin: float = 1.0,
+        max_depth: float = 500.0,
+    ):
+        self.root = Path(root)
+        self.day = day
+        self.column_seconds = float(column_seconds)
+        self.depth_bin = float(depth_bin)
+        self.max_depth = float(max_depth)
+        self.n_cols = int(np.ceil(86400.0 / self.column_seconds))
+        self.n_rows = int(np.ceil(self.max_depth / self.depth_bin))
+        self._midnight = np.datetime64(day.isoformat(), "ns")
+
+    def _raster(self, label: str) -> np.ndarray:
+        """Open (or create) the memory-mapped raster for a channel."""
+        path = self.root / f"{label}.npy"
+        shape = (self.n_rows, self.n_cols)
+        if path.exists():
+            raster = np.load(path, mmap_mode="r+")
+            if raster.shape == shape:
+                return raster
+            logger.warning("Daily raster %s has shape %s, expected %s — recreating", path, raster.shape, shape)
+        self.root.mkdir(parents=True, exist_ok=True)
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape)
+
+    def update(self, ds: xr.Dataset) -> Dict[str, Tuple[int, int]]:
+        """Append a batch's pings to the rasters of every channel.
+
+        Pings are averaged in the linear domain per ``(depth, time)``
+        cell, and the batch's columns are overwritten, so reprocessed
+        pings replace earlier values.  The first and last column may be
+        shared with a neighbouring batch; there only cells with new data
+        are replaced.
+
+        Returns
+        -------
+        dict
+            Channel label → ``(first, stop)`` span of raster columns
+            that changed.
+        """
+        changed: Dict[str, Tuple[int, int]] = {}
+        if "Sv" not in ds or "ping_time" not in ds.dims:
+            return changed
+
+        times = ds["ping_time"].values.astype("datetime64[ns]")
+        offsets = (times - self._midnight) / np.timedelta64(1, "s")
+        cols = np.floor(offsets / self.column_seconds).astype(np.int64)
+        in_day = (cols >= 0) & (cols < self.n_cols)
+        if not in_day.any():
+            return changed
+
+        channels = ds["channel"].values if "channel" in ds.dims else [None]
+        for ch in channels:
+            sv = ds["Sv"].sel(channel=ch) if ch is not None else ds["Sv"]
+            data = sv.transpose("ping_time", ...).values
+            if data.ndim != 2:
+                continue
+            depth = _extract_depth(ds, ch, n_range=data.shape[1])
+            if depth is None:
+                continue
+            data = data[in_day, : len(depth)]
+            ping_cols = cols[in_day]
+
+            rows = np.floor(depth / self.depth_bin).astype(np.int64)
+            row_ok = (depth >= 0) & (rows < self.n_rows)
+            if not row_ok.any():
+                continue
+            data = data[:, row_ok]
+            rows = rows[row_ok]
+
+            c0 = int(ping_cols.min())
+            width = int(ping_cols.max()) - c0 + 1
+            cell = (ping_cols - c0)[:, None] * self.n_rows + rows[None, :]
+            with np.errstate(invalid="ignore", over="ignore", divide="ignore"):
+                linear = np.power(10.0, data.astype(np.float64) / 10.0)
+                valid = np.isfinite(linear)
+                sums = np.bincount(cell[valid], weights=linear[valid], minlength=width * self.n_rows)
+                counts = np.bincount(cell[valid], minlength=width * self.n_rows)
+                mean_db = 10.0 * np.log10(sums / np.maximum(counts, 1))
+            block = np.where(counts > 0, _quantize(mean_db), 0).astype(np.uint8)
+            block = block.reshape(width, self.n_rows).T
+
+            label = _freq_label(ds, ch) if ch is not None else "all"
+            with _raster_lock(self.root):
+                raster = self._raster(label)
+                region = raster[:, c0:c0 + width]
+                edges = [0, width - 1]
+                region[:, 1:-1] = block[:, 1:-1]
+                region[:, edges] = np.where(block[:, edges] > 0, block[:, edges], region[:, edges])
+                raster.flush()
+                del raster
+
+            changed[label] = (c0, c0 + width)
+
+        return changed
+
+    def encode_strip(self, label: str, strip: int) -> bytes:
+        """Encode one ``_STRIP_COLUMNS``-wide strip of a channel as PNG."""
+        import matplotlib.image as mimage
+
+        with _raster_lock(self.root):
+            raster = self._raster(label)
+            block = np.array(raster[:, strip * _STRIP_COLUMNS:(strip + 1) * _STRIP_COLUMNS])
+            del raster
+        buf = io.BytesIO()
+        mimage.imsave(buf, _colour_lut()[block], format="png")
+        return buf.getvalue()
+
+    def render(self, label: str) -> bytes:
+        """Encode the full day raster for a channel as a single PNG.
+
+        Cost grows with the day's extent — intended for on-demand use
+        (reports, end-of-day), not per batch.
+        """
+        import matplotlib.image as mimage
+
+        with _raster_lock(self.root):
+            raster = self._raster(label)
+            filled = np.flatnonzero(raster.any(axis=0))
+            block = np.array(raster[:, : filled[-1] + 1]) if filled.size else np.zeros((self.n_rows, 1), np.uint8)
+            del raster
+        buf = io.BytesIO()
+        mimage.imsave(buf, _colour_lut()[block], format="png")
+        return buf.getvalue()
+
+    def index(self) -> Dict[str, Any]:
+        """Grid description and strip manifest for viewers."""
+        channels: Dict[str, List[int]] = {}
+        with _raster_lock(self.root):
+            for path in sorted(self.root.glob("*.npy")):
+                raster = np.load(path, mmap_mode="r")
+                filled = np.flatnonzero(raster.any(axis=0))
+                channels[path.stem] = sorted({int(c) // _STRIP_COLUMNS for c in filled})
+                del raster
+        return {
+            "day": self.day.isoformat(),
+            "column_seconds": self.column_seconds,
+            "depth_bin_m": self.depth_bin,
+            "max_depth_m": self.max_depth,
+            "strip_columns": _STRIP_COLUMNS,
+            "sv_range_db": [_SV_MIN, _SV_MAX],
+            "channels": channels,
+        }
+
+
+def daily_raster_root(config: "EdgeConfig", day: date) -> Path:
+    """Local directory holding the day's rasters for the campaign."""
+    return Path(config.output_base_path) / _daily_prefix(config, day)
+
+
+def _daily_prefix(config: "EdgeConfig", day: date) -> str:
+    return f"{config.campaign_container}/{config.echogram_container}/{day.isoformat()}/daily"
+
+
+def update_daily_echogram(
+    ds: xr.Dataset,
+    config: "EdgeConfig",
+    storage: "StorageBackend",
+    day: Optional[date] = None,
+) -> List[str]:
+    """Append a batch to the daily composite and publish changed strips.
+
+    Without *day*, a batch spanning midnight updates every day it covers.
+    Returns the storage paths of the strips (and manifest) written.
+    """
+    if day is None:
+        days = np.unique(ds["ping_time"].values.astype("datetime64[D]"))
+        return [
+            path for day64 in days
+            for path in update_daily_echogram(ds, config, storage, pd.Timestamp(day64).date())
+        ]
+
+    prefix = _daily_prefix(config, day)
+    composite = DailyEchogram(
+        daily_raster_root(config, day),
+        day,
+        column_seconds=config.daily_echogram_column_seconds,
+        depth_bin=config.daily_echogram_depth_bin,
+        max_depth=config.daily_echogram_max_depth,
+    )
+
+    spans = composite.update(ds)
+    saved: List[str] = []
+    for label, (first, stop) in spans.items():
+        for strip in range(first // _STRIP_COLUMNS, (stop - 1) // _STRIP_COLUMNS + 1):
+            path = f"{prefix}/{label}_{strip:03d}.png"
+            storage.save_file(composite.encode_strip(label, strip), path)
+            saved.append(path)
+
+    if saved:
+        index_path = f"{prefix}/index.json"
+        storage.save_file(json.dumps(composite.index(), indent=2).encode("utf-8"), index_path)
+        saved.append(index_path)
+        logger.info("Daily echogram %s: updated %d strips", day, len(saved) - 1)
+
+    if spans and config.echogram_tiles_enabled:
+        from exports.tiles import update_echogram_tiles
+        saved.extend(update_echogram_tiles(composite, spans, config, storage))
+    return saved
@@ -1,20 +1,23 @@
 """Generate echogram PNG images for edge visualization.
 
 Produces echograms for Sv, denoised Sv, MVBS, and NASC products.
-Uses matplotlib with Agg backend (no display needed on edge device).
+Rendering uses matplotlib's object-oriented ``Figure`` API with the Agg
+canvas (no pyplot global state, no display needed on edge device), so
+individual echograms can be rendered in parallel worker processes.
 """
 
 from __future__ import annotations
 
+import io
 import logging
-import tempfile
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import date
-from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
 
@@ -23,6 +26,39 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("oceanstream")
 
+# Echogram canvas: 14×6 in at 120 dpi → ~1680×720 px
+_FIGSIZE = (14, 6)
+_DPI = 120
+
+# Linear-domain reducers available for pixel-aware decimation
+_REDUCERS = ("mean", "max")
+
+# Shared render pool — created lazily and reused across batches so the
+# (spawned) worker start-up cost is paid once per process lifetime.
+_RENDER_POOL: Optional[ProcessPoolExecutor] = None
+_RENDER_POOL_LOCK = threading.Lock()
+
+
+@dataclass
+class _EchogramJob:
+    """Everything a worker needs to render one echogram, except the data.
+
+    The 2D ``(ping_time, range)`` array travels separately — through
+    shared memory when rendering in the process pool.
+    """
+
+    filename: str
+    title: str
+    vmin: float
+    vmax: float
+    colorbar_label: str
+    ping_times: Optional[np.ndarray] = None
+    depth: Optional[np.ndarray] = None
+    x_index_label: str = "Ping"
+    y_index_label: str = "Range sample"
+    decimate: bool = True
+    reducer: str = "mean"
+
 
 def generate_echograms(
     ds_sv: xr.Dataset,
@@ -35,50 +71,47 @@ def generate_echograms(
 ) -> List[Dict[str, Any]]:
     """Generate echogram PNGs for all available products.
 
-    Renders to a temporary directory and returns a list of dicts with
-    ``filename`` and ``data`` (PNG bytes) so the caller can persist them
-    through the appropriate storage backend (local or blob).
+    Per-channel, per-product echograms are rendered in-process, or in
+    parallel over a process pool with ``config.echogram_workers`` > 1
+    (``0`` = one per CPU core).
+    Returns a list of dicts with ``filename`` and ``data`` (PNG bytes)
+    so the caller can persist them through the appropriate storage
+    backend (local or blob).
 
     Returns
     -------
     list of dict
         Each dict has ``{"filename": str, "data": bytes}``.
     """
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_path = Path(tmpdir)
-        files: List[Dict[str, Any]] = []
+    jobs: List[Tuple[_EchogramJob, np.ndarray]] = []
+
+    # Source Sv echograms (per channel)
+    try:
+        jobs.extend(_sv_echogram_jobs(ds_sv, prefix="sv", reducer=config.echogram_reducer))
+    except Exception as e:
+        logger.error("Source Sv echogram failed: %s", e)
 
-        # Source Sv echograms (per channel)
+    # Denoised echograms
+    if ds_denoised is not None:
         try:
-            sv_files = _plot_sv_echograms(ds_sv, tmp_path, prefix="sv")
-            for fp in sv_files:
-                files.append({"filename": Path(fp).name, "data": Path(fp).read_bytes()})
+            jobs.extend(_sv_echogram_jobs(
+                ds_denoised, prefix="denoised", reducer=config.echogram_reducer,
+            ))
         except Exception as e:
-            logger.error("Source Sv echogram failed: %s", e)
-
-        # Denoised echograms
-        if ds_denoised is not None:
-            try:
-                dn_files = _plot_sv_echograms(ds_denoised, tmp_path, prefix="denoised")
-                for fp in dn_files:
-                    files.append({"filename": Path(fp).name, "data": Path(fp).read_bytes()})
-            except Exception as e:
-                logger.error("Denoised echogram failed: %s", e)
-
-        # MVBS echogram
-        if ds_mvbs is not None and "Sv" in ds_mvbs:
-            try:
-                mvbs_file = _plot_gridded_echogram(ds_mvbs, tmp_path, "mvbs")
-                if mvbs_file:
-                    files.append({"filename": Path(mvbs_file).name, "data": Path(mvbs_file).read_bytes()})
-            except Exception as e:
-                logger.error("MVBS echogram failed: %s", e)
-
-        logger.info("Generated %d echogram images", len(files))
-        return files
+            logger.error("Denoised echogram failed: %s", e)
 
+    # MVBS echogram
+    if ds_mvbs is not None and "Sv" in ds_mvbs:
+        try:
+            job = _gridded_echogram_job(ds_mvbs, "mvbs")
+            if job is not None:
+                jobs.append(job)
+        except Exception as e:
+            logger.error("MVBS echogram failed: %s", e)
 
-import re
+    files = _render_jobs(jobs, workers=config.echogram_workers)
+    logger.info("Generated %d echogram images", len(files))
+    return files
 
 
 def _extract_depth(ds: xr.Dataset, channel, *, n_range: int) -> Optional[np.ndarray]:
@@ -133,16 +166,79 @@ def _freq_label(ds: xr.Dataset, channel) -> str:
     return ch_str.replace(" ", "_").replace("/", "_")[:30]
 
 
-def _plot_sv_echograms(
+def _raster_shape() -> tuple[int, int]:
+    """Return the ``(columns, rows)`` pixel budget of the echogram canvas."""
+    return int(_FIGSIZE[0] * _DPI), int(_FIGSIZE[1] * _DPI)
+
+
+def _bin_starts(n: int, n_bins: int) -> np.ndarray:
+    """Start indices of *n_bins* near-equal contiguous bins over *n* items."""
+    return np.unique(np.linspace(0, n, n_bins + 1).astype(np.int64)[:-1])
+
+
+def _reduce_to_raster(
+    data: np.ndarray,
+    max_cols: int,
+    max_rows: int,
+    *,
+    reducer: str = "mean",
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bin a 2D ``(ping, sample)`` Sv array down to at most the output raster.
+
+    Pings and samples are grouped into contiguous bins and reduced in the
+    linear domain (``max`` or ``mean``), then converted back to dB.  Axes
+    that already fit the raster are left untouched.
+
+    Returns
+    -------
+    tuple
+        ``(reduced, col_idx, row_idx)`` where the index arrays give the
+        representative (centre) ping and sample of each output bin, so
+        callers can pick matching time/depth axis values.
+    """
+    if reducer not in _REDUCERS:
+        logger.warning("Unknown echogram reducer %r — using 'mean'", reducer)
+        reducer = "mean"
+
+    n_ping, n_range = data.shape
+    if n_ping <= max_cols and n_range <= max_rows:
+        return data, np.arange(n_ping), np.arange(n_range)
+
+    col_starts = _bin_starts(n_ping, max_cols)
+    row_starts = _bin_starts(n_range, max_rows)
+
+    with np.errstate(invalid="ignore", over="ignore", divide="ignore"):
+        linear = np.power(10.0, np.asarray(data, dtype=np.float64) / 10.0)
+        if reducer == "max":
+            # fmax ignores NaN; all-NaN bins stay NaN
+            reduced = np.fmax.reduceat(linear, col_starts, axis=0)
+            reduced = np.fmax.reduceat(reduced, row_starts, axis=1)
+        else:
+            valid = np.isfinite(linear)
+            sums = np.add.reduceat(np.where(valid, linear, 0.0), col_starts, axis=0)
+            sums = np.add.reduceat(sums, row_starts, axis=1)
+            counts = np.add.reduceat(valid.astype(np.int64), col_starts, axis=0)
+            counts = np.add.reduceat(counts, row_starts, axis=1)
+            reduced = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        reduced = 10.0 * np.log10(reduced)
+
+    col_ends = np.append(col_starts[1:], n_ping)
+    row_ends = np.append(row_starts[1:], n_range)
+    col_idx = (col_starts + col_ends - 1) // 2
+    row_idx = (row_starts + row_ends - 1) // 2
+    return reduced, col_idx, row_idx
+
+
+def _sv_echogram_jobs(
     ds: xr.Dataset,
-    output_dir: Path,
     prefix: str = "sv",
-) -> List[str]:
-    """Plot Sv echogram per channel with real time/depth axes."""
-    files = []
+    reducer: str = "mean",
+) -> List[Tuple[_EchogramJob, np.ndarray]]:
+    """Build one Sv echogram job per channel with real time/depth axes."""
+    jobs: List[Tuple[_EchogramJob, np.ndarray]] = []
 
     if "Sv" not in ds:
-        return files
+        return jobs
 
     channels = ds["channel"].values if "channel" in ds.dims else [None]
 
@@ -168,58 +264,35 @@ def _plot_sv_echograms(
                 pass
 
         depth_vals = _extract_depth(ds, ch, n_range=data.shape[1])
-
-        fig, ax = plt.subplots(figsize=(14, 6))
-
-        if ping_times is not None and depth_vals is not None:
-            import matplotlib.dates as mdates
+        if depth_vals is not None:
             # Trim data to match depth array (trailing NaNs were stripped)
-            plot_data = data[:, : len(depth_vals)]
-            time_num = mdates.date2num(ping_times.astype("datetime64[ms]").astype("O"))
-            im = ax.pcolormesh(
-                time_num, depth_vals, plot_data.T,
-                vmin=-80, vmax=-30, cmap="ocean_r", shading="auto",
-            )
-            ax.xaxis_date()
-            ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
-            fig.autofmt_xdate()
-            ax.set_xlabel("Time (UTC)")
-            ax.set_ylabel("Depth (m)")
-        elif depth_vals is not None:
-            plot_data = data[:, : len(depth_vals)]
-            im = ax.pcolormesh(
-                np.arange(plot_data.shape[0]), depth_vals, plot_data.T,
-                vmin=-80, vmax=-30, cmap="ocean_r", shading="auto",
-            )
-            ax.set_xlabel("Ping")
-            ax.set_ylabel("Depth (m)")
+            data = data[:, : len(depth_vals)]
         else:
-            im = ax.pcolormesh(
-                np.arange(data.shape[0]), np.arange(data.shape[1]), data.T,
-                vmin=-80, vmax=-30, cmap="ocean_r", shading="auto",
-            )
-            ax.set_xlabel("Ping")
-            ax.set_ylabel("Range sample")
+            # Without depth the echogram falls back to ping/sample indices
+            ping_times = None
 
-        ax.set_title(f"{prefix.replace('_', ' ').title()} — {freq_lbl}")
-        ax.invert_yaxis()
-        plt.colorbar(im, ax=ax, label="Sv (dB re 1 m⁻¹)")
+        jobs.append((
+            _EchogramJob(
+                filename=f"{prefix}_{freq_lbl}.png",
+                title=f"{prefix.replace('_', ' ').title()} — {freq_lbl}",
+                vmin=-80,
+                vmax=-30,
+                colorbar_label="Sv (dB re 1 m⁻¹)",
+                ping_times=ping_times,
+                depth=depth_vals,
+                reducer=reducer,
+            ),
+            data,
+        ))
 
-        filename = f"{prefix}_{freq_lbl}.png"
-        filepath = output_dir / filename
-        fig.savefig(filepath, dpi=120, bbox_inches="tight")
-        plt.close(fig)
-        files.append(str(filepath))
+    return jobs
 
-    return files
 
-
-def _plot_gridded_echogram(
+def _gridded_echogram_job(
     ds: xr.Dataset,
-    output_dir: Path,
     product: str,
-) -> Optional[str]:
-    """Plot a gridded (MVBS/NASC) echogram with real axes where available."""
+) -> Optional[Tuple[_EchogramJob, np.ndarray]]:
+    """Build a gridded (MVBS/NASC) echogram job with real axes where available."""
     var_name = "Sv" if "Sv" in ds else "NASC" if "NASC" in ds else None
     if var_name is None:
         return None
@@ -236,59 +309,174 @@ def _plot_gridded_echogram(
     if data.ndim != 2:
         return None
 
-    fig, ax = plt.subplots(figsize=(14, 6))
-    vmin, vmax = (-80, -30) if var_name == "Sv" else (0, np.nanpercentile(data, 95))
+    vmin, vmax = (-80, -30) if var_name == "Sv" else (0, float(np.nanpercentile(data, 95)))
 
     # Try real time axis
     ping_times = None
     if "ping_time" in ds.coords:
-        try:
-            import matplotlib.dates as mdates
-            ping_times = ds["ping_time"].values
-            time_num = mdates.date2num(ping_times.astype("datetime64[ms]").astype("O"))
-        except Exception:
-            ping_times = None
+        ping_times = ds["ping_time"].values
+
+    depth_vals = _extract_depth(ds, ch, n_range=data.shape[1]) if ping_times is not None else None
+    if depth_vals is not None:
+        data = data[:, : len(depth_vals)]
 
-    depth_vals = _extract_depth(ds, ch, n_range=data.shape[1])
+    title = product.upper()
+    if freq_lbl:
+        title += f" — {freq_lbl}"
 
-    if ping_times is not None and depth_vals is not None:
-        plot_data = data[:, : len(depth_vals)]
-        im = ax.pcolormesh(
-            time_num, depth_vals, plot_data.T,
-            vmin=vmin, vmax=vmax, cmap="ocean_r", shading="auto",
+    return (
+        _EchogramJob(
+            filename=f"{product}.png",
+            title=title,
+            vmin=vmin,
+            vmax=vmax,
+            colorbar_label=f"{var_name} (dB)" if var_name == "Sv" else var_name,
+            ping_times=ping_times,
+            depth=depth_vals,
+            x_index_label="Time bin",
+            y_index_label="Range bin",
+            # Only dB-valued grids can be reduced in the linear domain
+            decimate=var_name == "Sv",
+        ),
+        data,
+    )
+
+
+def _render_echogram(job: _EchogramJob, data: np.ndarray) -> bytes:
+    """Render a single echogram to PNG bytes using the ``Figure`` API."""
+    import matplotlib.dates as mdates
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    if job.decimate:
+        max_cols, max_rows = _raster_shape()
+        data, col_idx, row_idx = _reduce_to_raster(
+            data, max_cols, max_rows, reducer=job.reducer,
         )
-        ax.xaxis_date()
-        ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
-        fig.autofmt_xdate()
-        ax.set_xlabel("Time (UTC)")
-        ax.set_ylabel("Depth (m)")
-    elif ping_times is not None:
-        im = ax.pcolormesh(
-            time_num, np.arange(data.shape[1]), data.T,
-            vmin=vmin, vmax=vmax, cmap="ocean_r", shading="auto",
+    else:
+        col_idx, row_idx = np.arange(data.shape[0]), np.arange(data.shape[1])
+
+    fig = Figure(figsize=_FIGSIZE)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    if job.ping_times is not None:
+        x_vals = mdates.date2num(
+            job.ping_times[col_idx].astype("datetime64[ms]").astype("O")
         )
+    else:
+        x_vals = col_idx
+    y_vals = job.depth[row_idx] if job.depth is not None else row_idx
+
+    im = ax.pcolormesh(
+        x_vals, y_vals, data.T,
+        vmin=job.vmin, vmax=job.vmax, cmap="ocean_r", shading="auto",
+    )
+    if job.ping_times is not None:
         ax.xaxis_date()
         ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
         fig.autofmt_xdate()
         ax.set_xlabel("Time (UTC)")
-        ax.set_ylabel("Range bin")
     else:
-        im = ax.pcolormesh(
-            np.arange(data.shape[0]), np.arange(data.shape[1]), data.T,
-            vmin=vmin, vmax=vmax, cmap="ocean_r", shading="auto",
-        )
-        ax.set_xlabel("Time bin")
-        ax.set_ylabel("Range bin")
+        ax.set_xlabel(job.x_index_label)
+    ax.set_ylabel("Depth (m)" if job.depth is not None else job.y_index_label)
 
-    title = product.upper()
-    if freq_lbl:
-        title += f" — {freq_lbl}"
-    ax.set_title(title)
+    ax.set_title(job.title)
     ax.invert_yaxis()
-    plt.colorbar(im, ax=ax, label=f"{var_name} (dB)" if var_name == "Sv" else var_name)
+    fig.colorbar(im, ax=ax, label=job.colorbar_label)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=_DPI, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def _render_from_shared(
+    job: _EchogramJob,
+    shm_name: str,
+    shape: Tuple[int, ...],
+    dtype: str,
+) -> bytes:
+    """Process-pool entry point: attach to shared memory and render."""
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # Copy out so no view outlives the mapping (close() would fail)
+        data = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+    return _render_echogram(job, data)
+
+
+def _render_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared render pool, creating it with *workers* processes.
+
+    The pool is sized once (from the configured worker count) and never
+    replaced: concurrent batches share it.  Uses the ``spawn`` start
+    method: the pipeline runs in threads, and forking a multi-threaded
+    process is unsafe.
+    """
+    global _RENDER_POOL
+    import multiprocessing
+
+    with _RENDER_POOL_LOCK:
+        if _RENDER_POOL is None:
+            _RENDER_POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _RENDER_POOL
+
+
+def _render_jobs(
+    jobs: List[Tuple[_EchogramJob, np.ndarray]],
+    *,
+    workers: int = 1,
+) -> List[Dict[str, Any]]:
+    """Render echogram jobs, fanning out over a process pool when useful.
+
+    *workers* ``<= 0`` means one process per CPU core.  Per-channel
+    arrays are handed to workers through ``multiprocessing.shared_memory``
+    rather than pickled through the pool's pipe.  Output order matches
+    *jobs*; a failed job is logged and omitted.
+    """
+    if not jobs:
+        return []
+
+    n_workers = workers if workers > 0 else (os.cpu_count() or 1)
+
+    if n_workers <= 1:
+        files = []
+        for job, data in jobs:
+            try:
+                files.append({"filename": job.filename, "data": _render_echogram(job, data)})
+            except Exception as e:
+                logger.error("Echogram %s failed: %s", job.filename, e)
+        return files
 
-    filename = f"{product}.png"
-    filepath = output_dir / filename
-    fig.savefig(filepath, dpi=120, bbox_inches="tight")
-    plt.close(fig)
-    return str(filepath)
+    from multiprocessing import shared_memory
+
+    segments: List[shared_memory.SharedMemory] = []
+    try:
+        pool = _render_pool(n_workers)
+        futures = []
+        for job, data in jobs:
+            arr = np.ascontiguousarray(data, dtype=np.float32)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            segments.append(shm)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            futures.append(pool.submit(
+                _render_from_shared, job, shm.name, arr.shape, arr.dtype.str,
+            ))
+
+        files = []
+        for (job, _data), fut in zip(jobs, futures):
+            try:
+                files.append({"filename": job.filename, "data": fut.result()})
+            except Exception as e:
+                logger.error("Echogram %s failed: %s", job.filename, e)
+        return files
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
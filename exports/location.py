@@ -3,17 +3,40 @@ import logging
 import pandas as pd
 import numpy as np
 import xarray as xr
-from haversine import haversine
 from scipy.signal import savgol_filter
 
 
 logger = logging.getLogger('oceanstream')
 
 
+# Mean Earth radius (IUGG) in nautical miles — same as the ``haversine`` package
+_EARTH_RADIUS_NMI = 6371.0088 / 1.852
+
+
+def haversine_nmi(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Vectorized great-circle distance in nautical miles.
+
+    Parameters:
+    - lat1, lon1, lat2, lon2: array-like
+        Coordinates in decimal degrees; broadcast against each other.
+
+    Returns:
+    - np.ndarray: Distances in nautical miles.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    return 2.0 * _EARTH_RADIUS_NMI * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
 def extract_location_data(data: xr.Dataset, epsilon=0.00001, min_distance=0.01) -> pd.DataFrame:
     """
     Extract location data (GPS coordinates) from the processed hydroacoustic dataset.
 
+    Distances, speeds and thinning are computed with NumPy over whole
+    arrays; thinned points keep their original row index.
+
     Parameters:
     - data: xr.Dataset
         The dataset to extract location data from.
@@ -48,73 +71,174 @@ def extract_location_data(data: xr.Dataset, epsilon=0.00001, min_distance=0.01)
         df["lon"] = savgol_filter(df["lon"], window_size, poly_order)
 
     # Calculate distance and speed
-    df["distance"] = [
-        haversine(
-            (df["lat"].iloc[i - 1], df["lon"].iloc[i - 1]),
-            (df["lat"].iloc[i], df["lon"].iloc[i]),
-            unit="nmi",
-        )
-        if i > 0 else 0 for i in range(len(df))
-    ]
-    df["time_interval"] = df["dt"] - df["dt"].shift()
-    df["knt"] = (df["distance"] / df["time_interval"].dt.total_seconds()) * 3600
+    lat = df["lat"].to_numpy()
+    lon = df["lon"].to_numpy()
+    distance = np.zeros(len(df))
+    distance[1:] = haversine_nmi(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    interval_s = df["dt"].diff().dt.total_seconds().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["knt"] = distance / interval_s * 3600
     df = df[["lat", "lon", "dt", "knt"]]
 
     # Remove unrealistic speed values
     df = df[df["knt"] < 100]
+    if df.empty:
+        return pd.DataFrame(columns=["lat", "lon", "dt", "knt"])
 
     # Apply Ramer-Douglas-Peucker algorithm for thinning coordinates
-    points = df[["lat", "lon"]].values
-    thinned_points = ramer_douglas_peucker(points, epsilon)
-    thinned_df = pd.DataFrame(thinned_points, columns=["lat", "lon"])
-    thinned_df["dt"] = thinned_df.apply(
-        lambda row: df.loc[(df["lat"] == row["lat"]) & (df["lon"] == row["lon"]), "dt"].values[0], axis=1)
-    thinned_df["knt"] = thinned_df.apply(
-        lambda row: df.loc[(df["lat"] == row["lat"]) & (df["lon"] == row["lon"]), "knt"].values[0], axis=1)
+    keep = rdp_mask(df[["lat", "lon"]].to_numpy(), epsilon)
+    thinned_df = df[keep]
 
     # Further thin by minimum distance
-    final_points = [thinned_df.iloc[0]]
-    for i in range(1, len(thinned_df)):
-        if haversine((final_points[-1]["lat"], final_points[-1]["lon"]),
-                     (thinned_df.iloc[i]["lat"], thinned_df.iloc[i]["lon"]), unit="nmi") >= min_distance:
-            final_points.append(thinned_df.iloc[i])
+    selected = _min_distance_indices(
+        thinned_df["lat"].to_numpy(), thinned_df["lon"].to_numpy(), min_distance,
+    )
+    return thinned_df.iloc[selected]
 
-    final_df = pd.DataFrame(final_points)
-    return final_df
+
+def _min_distance_indices(lat: np.ndarray, lon: np.ndarray, min_distance: float) -> np.ndarray:
+    """
+    Greedily select points at least *min_distance* (nmi) from the previously selected one.
+
+    The great-circle distance between two points never exceeds the
+    along-track distance between them, so candidates closer than
+    *min_distance* along the track are skipped with a binary search
+    and only the remaining ones are checked.
+    """
+    n = len(lat)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    along = np.zeros(n)
+    along[1:] = np.cumsum(haversine_nmi(lat[:-1], lon[:-1], lat[1:], lon[1:]))
+
+    selected = [0]
+    last = 0
+    while True:
+        start = max(int(np.searchsorted(along, along[last] + min_distance)), last + 1)
+        # Check candidates in growing windows; the first one usually qualifies
+        window = 16
+        while start < n:
+            stop = min(n, start + window)
+            chord = haversine_nmi(lat[last], lon[last], lat[start:stop], lon[start:stop])
+            hits = np.flatnonzero(chord >= min_distance)
+            if hits.size:
+                break
+            start, window = stop, window * 2
+        if start >= n:
+            break
+        last = start + int(hits[0])
+        selected.append(last)
+    return np.asarray(selected, dtype=np.int64)
+
+
+def rdp_mask(points, epsilon: float, *, distance: str = "euclidean") -> np.ndarray:
+    """
+    Iterative Ramer-Douglas-Peucker simplification returning a keep-mask.
+
+    Uses an explicit stack instead of recursion (no recursion limit on
+    long tracks) and computes the distances of all points of a segment
+    in one vectorized call.
+
+    Parameters:
+    - points: array-like, shape (n, 2)
+        Polyline vertices.  ``(x, y)`` in metric units for
+        ``distance="euclidean"``; ``(lat, lon)`` in decimal degrees for
+        ``distance="great_circle"``.
+    - epsilon: float
+        Tolerance, in the units of *points* (euclidean) or nautical
+        miles (great_circle).
+    - distance: str
+        ``"euclidean"`` (planar point-to-segment distance) or
+        ``"great_circle"`` (cross-track distance to the arc, on a sphere).
+
+    Returns:
+    - np.ndarray: Boolean mask of length n; first and last points are always kept.
+    """
+    pts = np.asarray(points, dtype=np.float64)
+    n = len(pts)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3:
+        return keep
+
+    if distance == "euclidean":
+        coords = pts
+        segment_distances = _segment_distances
+    elif distance == "great_circle":
+        coords = _unit_vectors(pts[:, 0], pts[:, 1])
+        segment_distances = _arc_distances
+    else:
+        raise ValueError(f"unknown distance {distance!r}; expected 'euclidean' or 'great_circle'")
+
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dist = segment_distances(coords[first + 1:last], coords[first], coords[last])
+        index = int(np.argmax(dist))
+        if dist[index] > epsilon:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((split, last))
+            stack.append((first, split))
+    return keep
+
+
+def _segment_distances(points: np.ndarray, line_start: np.ndarray, line_end: np.ndarray) -> np.ndarray:
+    """Planar distances from *points* to the segment ``line_start → line_end``."""
+    # Near-coincident endpoints (``np.allclose``) count as a point, as in the recursive version
+    if np.allclose(line_start, line_end):
+        return np.linalg.norm(points - line_start, axis=1)
+    line_vec = line_end - line_start
+    line_len_sq = float(np.dot(line_vec, line_vec))
+    t = np.clip((points - line_start) @ line_vec / line_len_sq, 0.0, 1.0)
+    nearest = line_start + t[:, None] * line_vec
+    return np.linalg.norm(points - nearest, axis=1)
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    """Convert decimal-degree coordinates to unit vectors on the sphere, shape (n, 3)."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def _arc_distances(points: np.ndarray, arc_start: np.ndarray, arc_end: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distances (nmi) from unit vectors *points* to the arc ``arc_start → arc_end``.
+
+    Points whose projection falls inside the arc get the cross-track
+    distance; others get the distance to the nearer arc endpoint.
+    """
+    def _angle(vectors, v):
+        return np.arctan2(np.linalg.norm(np.cross(vectors, v), axis=1), vectors @ v)
+
+    to_start = _angle(points, arc_start)
+    normal = np.cross(arc_start, arc_end)
+    norm = np.linalg.norm(normal)
+    if norm == 0.0:
+        return _EARTH_RADIUS_NMI * to_start
+    normal = normal / norm
+
+    across = points @ normal
+    projected = points - across[:, None] * normal
+    inside = (np.cross(arc_start, projected) @ normal >= 0) & (np.cross(projected, arc_end) @ normal >= 0)
+    endpoint = np.minimum(to_start, _angle(points, arc_end))
+    return _EARTH_RADIUS_NMI * np.where(inside, np.abs(np.arcsin(np.clip(across, -1.0, 1.0))), endpoint)
 
 
 def ramer_douglas_peucker(points, epsilon):
-    if len(points) < 3:
-        return points
-
-    def get_perpendicular_distance(point, line_start, line_end):
-        if np.allclose(line_start, line_end):
-            return np.linalg.norm(point - line_start)
-
-        line_vec = line_end - line_start
-        point_vec = point - line_start
-        line_len = np.linalg.norm(line_vec)
-        line_unitvec = line_vec / line_len
-        point_vec_scaled = point_vec / line_len
-        t = np.dot(line_unitvec, point_vec_scaled)
-        t = np.clip(t, 0, 1)
-        nearest = line_start + t * line_vec
-        return np.linalg.norm(point - nearest)
-
-    max_distance = 0
-    index = 0
-    for i in range(1, len(points) - 1):
-        distance = get_perpendicular_distance(points[i], points[0], points[-1])
-        if distance > max_distance:
-            index = i
-            max_distance = distance
-
-    if max_distance > epsilon:
-        left_points = ramer_douglas_peucker(points[:index + 1], epsilon)
-        right_points = ramer_douglas_peucker(points[index:], epsilon)
-        return np.vstack((left_points[:-1], right_points))
-
-    return np.vstack((points[0], points[-1]))
+    """
+    Thin a polyline with the Ramer-Douglas-Peucker algorithm.
+
+    Returns the kept points (not their indices); see ``rdp_mask``.
+    """
+    points = np.asarray(points)
+    return points[rdp_mask(points, epsilon)]
 
 
 def select_location_points(location_data: pd.DataFrame, num_points: int) -> pd.DataFrame:
@@ -303,6 +303,8 @@ def generate_segment_report(
         w(f"- **Latitude**: [{lat[0]:.4f}, {lat[1]:.4f}]")
     if lon:
         w(f"- **Longitude**: [{lon[0]:.4f}, {lon[1]:.4f}]")
+    if metadata.get("track_vertices"):
+        w(f"- **Track**: {metadata['track_vertices']} vertices, {metadata['track_distance_nmi']:.2f} nmi")
     sv_mean = metadata.get("sv_mean_db") or result.get("sv_mean_db")
     if sv_mean is not None:
         w(f"- **Mean Sv**: {sv_mean} dB")
@@ -315,6 +317,7 @@ def generate_segment_report(
         "sv": ("sv.zarr", True),
         "sv_denoised": ("sv_denoised.zarr", config.denoise_enabled),
         "sv_seabed": ("sv_seabed.zarr", config.seabed_enabled),
+        "seabed_line": ("seabed_line.zarr", config.seabed_enabled),
         "mvbs": ("mvbs.zarr", config.mvbs_enabled),
         "nasc": ("nasc.zarr", config.nasc_enabled),
     }
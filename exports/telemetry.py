@@ -19,9 +19,12 @@ def send_processing_telemetry(
 ) -> None:
     """Send processing result telemetry via IoT Hub output message.
 
-    Also patches module twin reported properties with processing stats.
+    Also reports processing stats as module twin reported properties
+    (coalesced by ``azure_handler.reported_properties`` when running).
     """
+    from azure_handler.journal import PRIORITY_SUMMARY
     from azure_handler.message_handler import send_to_hub
+    from azure_handler.reported_properties import report_properties
 
     # Augment result with context
     payload = {
@@ -33,7 +36,7 @@ def send_processing_telemetry(
     }
 
     # Send as output message
-    send_to_hub(client, data=payload, output_name="output1")
+    send_to_hub(client, data=payload, output_name="output1", priority=PRIORITY_SUMMARY)
 
     # Update reported twin properties with latest processing stats
     try:
@@ -44,6 +47,6 @@ def send_processing_telemetry(
             "processing_mode": config.processing_mode,
             "gpu_enabled": config.use_gpu,
         }
-        client.patch_twin_reported_properties(reported)
+        report_properties(client, reported)
     except Exception as e:
         logger.error("Failed to update reported properties: %s", e)
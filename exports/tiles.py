@@ -0,0 +1,159 @@
+"""XYZ tile pyramid for echograms (time × depth).
+
+Tiles are cut from the per-day ``uint8`` rasters maintained by
+``exports.daily_echogram`` and addressed on a continuous time axis, so a
+viewer on the ship's LAN can pan across days without the device
+re-rendering anything.  After each batch only the tiles overlapping the
+raster columns that changed are re-encoded and saved; all other tiles
+are left untouched in storage.
+
+Addressing (``z`` grows with detail, ``max_zoom`` is native resolution)::
+
+    x = global_column // (TILE_SIZE * 2 ** (max_zoom - z))
+    y = raster_row    // (TILE_SIZE * 2 ** (max_zoom - z))
+
+where ``global_column`` counts raster columns since 1970-01-01 UTC.
+Zoomed-out levels keep the strongest value of each pixel block.
+
+Layout::
+
+    {campaign}/echograms/tiles/
+        tiles.json                  # grid description for viewers
+        {channel}/{z}/{x}/{y}.png
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
+
+from exports.daily_echogram import _colour_lut, _raster_lock, daily_raster_root
+
+if TYPE_CHECKING:
+    from azure_handler.storage import StorageBackend
+    from config import EdgeConfig
+    from exports.daily_echogram import DailyEchogram
+
+logger = logging.getLogger("oceanstream")
+
+TILE_SIZE = 256
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _read_columns(
+    composite: "DailyEchogram",
+    config: "EdgeConfig",
+    label: str,
+    g0: int,
+    g1: int,
+    r0: int,
+    r1: int,
+) -> np.ndarray:
+    """Read global columns ``[g0, g1)`` and rows ``[r0, r1)`` across day rasters.
+
+    Missing days and out-of-range rows read as ``0`` (no data).
+    """
+    n_cols = composite.n_cols
+    out = np.zeros((r1 - r0, g1 - g0), dtype=np.uint8)
+    rows_stop = min(r1, composite.n_rows)
+    if rows_stop <= r0:
+        return out
+
+    for day_idx in range(g0 // n_cols, (g1 - 1) // n_cols + 1):
+        day = _EPOCH + timedelta(days=day_idx)
+        path = daily_raster_root(config, day) / f"{label}.npy"
+        if not path.exists():
+            continue
+        lo = max(g0, day_idx * n_cols)
+        hi = min(g1, (day_idx + 1) * n_cols)
+        with _raster_lock(path.parent):
+            raster = np.load(path, mmap_mode="r")
+            if raster.shape != (composite.n_rows, n_cols):
+                continue
+            out[: rows_stop - r0, lo - g0:hi - g0] = raster[
+                r0:rows_stop, lo - day_idx * n_cols:hi - day_idx * n_cols
+            ]
+            del raster
+    return out
+
+
+def _encode_tile(block: np.ndarray, factor: int) -> bytes:
+    """Downsample a ``(TILE*factor)²`` block by block-max and encode as PNG."""
+    import matplotlib.image as mimage
+
+    if factor > 1:
+        block = block.reshape(TILE_SIZE, factor, TILE_SIZE, factor).max(axis=(1, 3))
+    buf = io.BytesIO()
+    mimage.imsave(buf, _colour_lut()[block], format="png")
+    return buf.getvalue()
+
+
+def tiles_metadata(composite: "DailyEchogram", max_zoom: int) -> Dict[str, object]:
+    """Grid description a viewer needs to map tiles to time and depth."""
+    return {
+        "tile_size": TILE_SIZE,
+        "min_zoom": 0,
+        "max_zoom": max_zoom,
+        "epoch": _EPOCH.isoformat(),
+        "column_seconds": composite.column_seconds,
+        "depth_bin_m": composite.depth_bin,
+        "max_depth_m": composite.max_depth,
+        "downsample": "max",
+    }
+
+
+def update_echogram_tiles(
+    composite: "DailyEchogram",
+    spans: Dict[str, Tuple[int, int]],
+    config: "EdgeConfig",
+    storage: "StorageBackend",
+) -> List[str]:
+    """Re-encode the tiles touched by changed raster columns.
+
+    Parameters
+    ----------
+    composite
+        Daily composite that was just updated.
+    spans
+        Channel label → ``(first, stop)`` changed column span within the
+        composite's day (as returned by ``DailyEchogram.update``).
+
+    Returns
+    -------
+    list of str
+        Storage paths of the tiles written.
+    """
+    max_zoom = max(0, config.echogram_tile_zoom_levels - 1)
+    prefix = f"{config.campaign_container}/{config.echogram_container}/tiles"
+    day_offset = (composite.day - _EPOCH).days * composite.n_cols
+
+    saved: List[str] = []
+    for label, (first, stop) in spans.items():
+        g_first, g_stop = day_offset + first, day_offset + stop
+        for z in range(max_zoom, -1, -1):
+            factor = 2 ** (max_zoom - z)
+            span = TILE_SIZE * factor
+            n_y = -(-composite.n_rows // span)
+            for x in range(g_first // span, (g_stop - 1) // span + 1):
+                for y in range(n_y):
+                    block = _read_columns(
+                        composite, config, label,
+                        x * span, (x + 1) * span, y * span, (y + 1) * span,
+                    )
+                    if not block.any():
+                        continue
+                    path = f"{prefix}/{label}/{z}/{x}/{y}.png"
+                    storage.save_file(_encode_tile(block, factor), path)
+                    saved.append(path)
+
+    if saved:
+        meta = json.dumps(tiles_metadata(composite, max_zoom), indent=2).encode("utf-8")
+        storage.save_file(meta, f"{prefix}/tiles.json")
+        logger.info("Echogram tiles: rewrote %d tiles", len(saved))
+    return saved
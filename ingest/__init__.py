@@ -1,9 +1,9 @@
 from .realtime import RealtimeIngestion
-from .file_trigger import handle_raw_file_added
+from .file_trigger import FileTriggerScheduler
 from .on_demand import handle_c2d_command
 
 __all__ = [
     "RealtimeIngestion",
-    "handle_raw_file_added",
+    "FileTriggerScheduler",
     "handle_c2d_command",
 ]
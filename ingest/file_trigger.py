@@ -2,14 +2,35 @@
 
 Handles ``rawfileadded`` input messages from the filenotifier module
 and runs the full processing pipeline on each raw file.
+
+``FileTriggerScheduler`` sits between the messages and the pipeline:
+
+- **debounce** — files are dispatched once the event stream has been
+  quiet for ``file_trigger_debounce_seconds`` (or a file has waited
+  ``file_trigger_max_wait_seconds``), and only once their size stopped
+  changing, so files still being written are not picked up early;
+- **dedup** — repeated events for a queued or running file, or for an
+  unchanged file already processed, are dropped;
+- **bounded concurrency** — at most ``file_trigger_max_concurrency``
+  pipelines run at once, in worker threads;
+- **merging** — consecutive small files with the same channel setup
+  (from the raw header index) are processed as one batch
+  (``process_raw_file_batch``) while products keep the per-file layout;
+- **resume** — with ``manifest_enabled``, files whose stages the run
+  manifest records as complete are skipped, and interrupted ones
+  resume from their last saved stage (``process.manifest``).
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 if TYPE_CHECKING:
     from azure.iot.device import IoTHubModuleClient
@@ -18,54 +39,229 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("oceanstream")
 
+# Processed-file signatures remembered for de-duplication
+_RECENT_FILES = 1000
+
+
+def _channel_key(path: str):
+    """Channel configuration from the raw header index (``None`` if unreadable)."""
+    try:
+        from process.raw_index import raw_file_info
+        return raw_file_info(path).channel_key
+    except Exception:
+        return None
+
+
+def _channel_keys(paths: List[str]) -> Dict[str, Any]:
+    """``_channel_key`` of each path (blocking raw I/O — run in a thread)."""
+    return {path: _channel_key(path) for path in paths}
+
 
-async def handle_raw_file_added(
-    message_data: Dict[str, Any],
-    config: "EdgeConfig",
-    segment_store: "SegmentStore",
-    client: "IoTHubModuleClient",
-) -> Dict[str, Any]:
-    """Process a raw file triggered by an IoT Edge message.
+class FileTriggerScheduler:
+    """Debounces, de-duplicates and batches ``rawfileadded`` events.
+
+    ``submit`` is called on the event loop for every message; ``run``
+    dispatches ready files until cancelled.
 
     Parameters
     ----------
-    message_data
-        Decoded JSON from the ``rawfileadded`` input message.
-        Expected keys: ``event``, ``file_added_path``.
-    config
-        Current edge configuration.
-    segment_store
-        Segment-based Zarr store manager.
-    client
-        IoT Hub module client for sending results.
-
-    Returns
-    -------
-    dict
-        Processing result summary.
+    config : EdgeConfig
+        ``file_trigger_*`` settings.
+    segment_store : SegmentStore
+        Passed to the pipeline.
+    client : IoTHubModuleClient
+        Passed to the pipeline.
     """
-    from process.pipeline import process_raw_file_pipeline
 
-    event = message_data.get("event")
-    file_path = message_data.get("file_added_path", "")
+    def __init__(
+        self,
+        config: "EdgeConfig",
+        segment_store: "SegmentStore",
+        client: Optional["IoTHubModuleClient"],
+    ):
+        self.config = config
+        self.segment_store = segment_store
+        self.client = client
+        self._pending: Dict[str, Tuple[float, int]] = {}     # path -> (first event, last size)
+        self._in_flight: set = set()
+        self._recent: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._last_event = 0.0
+        self._wake = asyncio.Event()
+        workers = max(1, config.file_trigger_max_concurrency)
+        self._slots = asyncio.Semaphore(workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="filetrigger")
+        self._tasks: set = set()
+        self.files_processed = 0
+        self.batches = 0
+        self.duplicates = 0
+        self._manifest = None
+        if config.manifest_enabled:
+            from process.manifest import RunManifest
+            self._manifest = RunManifest.from_config(config)
+
+    def submit(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a ``rawfileadded`` event.  Never blocks."""
+        event = message_data.get("event")
+        file_path = message_data.get("file_added_path", "")
+        if event != "fileadd":
+            logger.info("Ignoring non-fileadd event: %s", event)
+            return {"status": "skipped", "reason": f"event={event}"}
+        # Only raw files: the raw header index (.rawindex.json / .tmp)
+        # lives next to them and would otherwise trigger itself
+        if not str(file_path).lower().endswith(".raw"):
+            logger.debug("Ignoring non-raw file event: %s", file_path)
+            return {"status": "skipped", "reason": f"not a .raw file: {file_path}"}
+        try:
+            stat = os.stat(file_path)
+        except (OSError, TypeError, ValueError):
+            logger.error("Raw file not found: %s", file_path)
+            return {"status": "error", "reason": f"file not found: {file_path}"}
+
+        self._last_event = time.monotonic()
+        if file_path in self._in_flight or self._recent.get(file_path) == (stat.st_size, stat.st_mtime):
+            self.duplicates += 1
+            logger.debug("Duplicate rawfileadded event for %s", file_path)
+            return {"status": "duplicate", "file": file_path}
+        first, _ = self._pending.get(file_path, (self._last_event, -1))
+        self._pending[file_path] = (first, stat.st_size)
+        self._wake.set()
+        return {"status": "queued", "file": file_path}
+
+    async def run(self) -> None:
+        """Dispatch ready files until cancelled."""
+        debounce = self.config.file_trigger_debounce_seconds
+        try:
+            while True:
+                self._wake.clear()
+                ready = self._ready_files()
+                for batch in await self._batches(ready):
+                    await self._slots.acquire()
+                    for path in batch:
+                        self._pending.pop(path, None)
+                        self._in_flight.add(path)
+                    task = asyncio.create_task(self._process(batch))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                timeout = debounce if self._pending else None
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def stop(self) -> None:
+        """Wait for running batches (pending files are dropped)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._manifest is not None:
+            self._manifest.close()
+
+    def _ready_files(self) -> List[str]:
+        """Pending files whose events have settled and size is stable."""
+        now = time.monotonic()
+        quiet = now - self._last_event >= self.config.file_trigger_debounce_seconds
+        ready = []
+        for path, (first, size) in list(self._pending.items()):
+            if not quiet and now - first < self.config.file_trigger_max_wait_seconds:
+                continue
+            try:
+                current = os.path.getsize(path)
+            except OSError:
+                logger.warning("Raw file disappeared before processing: %s", path)
+                self._pending.pop(path, None)
+                continue
+            if current != size:
+                # Still being written: check again after the next debounce
+                self._pending[path] = (first, current)
+                continue
+            ready.append(path)
+        return sorted(ready)
+
+    async def _batches(self, paths: List[str]) -> List[List[str]]:
+        """Group consecutive small files with the same channel setup;
+        large files go alone."""
+        cfg = self.config
+        limit = cfg.file_trigger_merge_max_mb * 1024 * 1024
+        smalls = [p for p in paths if cfg.file_trigger_merge_enabled and self._pending[p][1] <= limit]
+        # Header indexing reads the raw files: keep it off the event loop
+        keys = await asyncio.to_thread(_channel_keys, smalls) if smalls else {}
+        batches: List[List[str]] = []
+        run: List[str] = []
+        run_key = None
+        for path in paths:
+            small = path in keys
+            key = keys.get(path)
+            if small and len(run) < cfg.file_trigger_merge_max_files and (not run or key == run_key):
+                run.append(path)
+                run_key = key
+                continue
+            if run:
+                batches.append(run)
+                run = []
+            if small:
+                run.append(path)
+                run_key = key
+            else:
+                batches.append([path])
+        if run:
+            batches.append(run)
+        return batches
 
-    if event != "fileadd":
-        logger.info("Ignoring non-fileadd event: %s", event)
-        return {"status": "skipped", "reason": f"event={event}"}
+    async def _process(self, batch: List[str]) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._process_sync, batch)
+            self.batches += 1
+            self.files_processed += len(batch)
+        except Exception as e:
+            logger.error("Processing %s failed: %s", batch, e, exc_info=True)
+        finally:
+            for path in batch:
+                self._in_flight.discard(path)
+                try:
+                    stat = os.stat(path)
+                    self._recent[path] = (stat.st_size, stat.st_mtime)
+                    self._recent.move_to_end(path)
+                except OSError:
+                    pass
+            while len(self._recent) > _RECENT_FILES:
+                self._recent.popitem(last=False)
+            self._slots.release()
+            self._wake.set()
 
-    if not file_path or not Path(file_path).exists():
-        logger.error("Raw file not found: %s", file_path)
-        return {"status": "error", "reason": f"file not found: {file_path}"}
+    def _process_sync(self, batch: List[str]) -> None:
+        """Worker thread: run the pipeline on its own event loop."""
+        from process.manifest import PROCESS
+        from process.pipeline import process_raw_file_batch, process_raw_file_pipeline
 
-    logger.info("Processing raw file: %s", file_path)
-    result = await process_raw_file_pipeline(
-        file_path=file_path,
-        config=config,
-        segment_store=segment_store,
-        client=client,
-    )
+        entries = {}
+        if self._manifest is not None and self.config.manifest_enabled:
+            entries = {path: self._manifest.entry(path, self.config) for path in batch}
+        if len(batch) == 1:
+            logger.info("Processing raw file: %s", batch[0])
+            asyncio.run(process_raw_file_pipeline(
+                batch[0], self.config, self.segment_store, self.client, entry=entries.get(batch[0]),
+            ))
+            return
 
-    return result
+        # Complete or resumable files leave the merged batch
+        fresh = [path for path in batch if path not in entries or entries[path].plan == PROCESS]
+        for path in batch:
+            if path not in fresh:
+                asyncio.run(process_raw_file_pipeline(
+                    path, self.config, self.segment_store, self.client, entry=entries[path],
+                ))
+        # Merged batches run in-process; the dask backend takes files one by one
+        if len(fresh) > 1 and self.config.execution_backend != "dask":
+            logger.info("Processing %d raw files as one batch: %s … %s", len(fresh), fresh[0], fresh[-1])
+            asyncio.run(process_raw_file_batch(fresh, self.config, self.segment_store, self.client, entries=entries))
+            return
+        for path in fresh:
+            logger.info("Processing raw file: %s", path)
+            asyncio.run(process_raw_file_pipeline(
+                path, self.config, self.segment_store, self.client, entry=entries.get(path),
+            ))
 
 
 def parse_input_message(message) -> Dict[str, Any]:
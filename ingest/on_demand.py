@@ -2,34 +2,50 @@
 
 Supports commands:
 - ``process_raw_files``: process specific raw files
-- ``process_day``: reprocess all data for a given date
+- ``process_day``: reprocess a date's stored Sv segments for the given
+  ``stages`` (segments already up to date for the current config are
+  skipped unless ``options.force``)
 - ``get_status``: return current processing state
+- ``get_job``: progress and outcome of a job (or a command's job group)
+- ``cancel_job``: cancel a queued or running job / job group
 - ``set_config``: update processing parameters at runtime
+
+Long-running work goes through the persistent ``JobStore``
+(``ingest.job_store``): jobs survive a module restart, are executed by
+priority (``"priority": "high" | "normal" | "low"`` in the command) and
+raw files already queued or processed are skipped unless
+``options.force`` is set.
 """
 
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
+import uuid
 from datetime import date
-from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from ingest.job_store import CANCELLED, DONE, FAILED, PRIORITIES, JobCancelled, file_fingerprint
 
 if TYPE_CHECKING:
     from azure.iot.device import IoTHubModuleClient
     from config import EdgeConfig
+    from ingest.job_store import JobStore
+    from process.manifest import RunManifest
     from process.segment_store import SegmentStore
 
 logger = logging.getLogger("oceanstream")
 
+# Seconds the worker sleeps when the job store is empty
+_IDLE_POLL_SECONDS = 2.0
+
 
 async def handle_c2d_command(
     message_data: Dict[str, Any],
     config: "EdgeConfig",
     segment_store: "SegmentStore",
     client: "IoTHubModuleClient",
-    job_queue: asyncio.Queue,
+    job_store: "JobStore",
 ) -> Dict[str, Any]:
     """Dispatch a C2D command message.
 
@@ -43,8 +59,10 @@ async def handle_c2d_command(
         Segment-based Zarr store manager.
     client
         IoT Hub module client.
-    job_queue
-        Async queue for long-running jobs to prevent concurrent heavy ops.
+    job_store
+        Persistent job queue for long-running work, drained by the
+        memory-aware worker pool (``ingest.worker_pool``): jobs run
+        concurrently while their estimated memory fits the budget.
 
     Returns
     -------
@@ -54,11 +72,15 @@ async def handle_c2d_command(
     command = message_data.get("command", "")
 
     if command == "process_raw_files":
-        return await _cmd_process_raw_files(message_data, config, segment_store, client, job_queue)
+        return await _cmd_process_raw_files(message_data, config, segment_store, client, job_store)
     elif command == "process_day":
-        return await _cmd_process_day(message_data, config, segment_store, client, job_queue)
+        return await _cmd_process_day(message_data, config, segment_store, client, job_store)
     elif command == "get_status":
-        return _cmd_get_status(config, segment_store, job_queue)
+        return _cmd_get_status(config, segment_store, job_store, client)
+    elif command == "get_job":
+        return _cmd_get_job(message_data, job_store)
+    elif command == "cancel_job":
+        return _cmd_cancel_job(message_data, job_store)
     elif command == "set_config":
         return _cmd_set_config(message_data, config)
     else:
@@ -71,7 +93,7 @@ async def _cmd_process_raw_files(
     config: "EdgeConfig",
     segment_store: "SegmentStore",
     client: "IoTHubModuleClient",
-    job_queue: asyncio.Queue,
+    job_store: "JobStore",
 ) -> Dict[str, Any]:
     """Queue processing of specific raw files."""
     paths = data.get("paths", [])
@@ -79,21 +101,43 @@ async def _cmd_process_raw_files(
 
     if not paths:
         return {"status": "error", "reason": "no paths specified"}
+    priority = data.get("priority", "normal")
+    if priority not in PRIORITIES:
+        return {"status": "error", "reason": f"invalid priority: {priority}"}
 
-    import uuid
     job_id = str(uuid.uuid4())[:8]
 
-    # Queue each file as a job
+    # Queue each file as a job, skipping files already queued or processed
+    queued, duplicates = 0, []
     for path in paths:
-        await job_queue.put({
-            "type": "process_raw",
-            "job_id": job_id,
-            "file_path": path,
-            "options": options,
-        })
-
-    logger.info("Queued %d raw files for processing (job=%s)", len(paths), job_id)
-    return {"status": "accepted", "job_id": job_id, "files_queued": len(paths)}
+        try:
+            dedup_key = "raw:" + await asyncio.to_thread(file_fingerprint, path)
+        except OSError:
+            # Missing/unreadable now — let the job report the error
+            dedup_key = None
+        submitted = job_store.submit(
+            "process_raw",
+            {"file_path": path, "options": options},
+            group_id=job_id,
+            priority=priority,
+            dedup_key=dedup_key,
+            force=bool(options.get("force")),
+        )
+        if submitted is None:
+            duplicates.append(path)
+        else:
+            queued += 1
+
+    logger.info(
+        "Queued %d raw files for processing (job=%s, priority=%s, duplicates=%d)",
+        queued, job_id, priority, len(duplicates),
+    )
+    return {
+        "status": "accepted",
+        "job_id": job_id,
+        "files_queued": queued,
+        "duplicates_skipped": duplicates,
+    }
 
 
 async def _cmd_process_day(
@@ -101,39 +145,49 @@ async def _cmd_process_day(
     config: "EdgeConfig",
     segment_store: "SegmentStore",
     client: "IoTHubModuleClient",
-    job_queue: asyncio.Queue,
+    job_store: "JobStore",
 ) -> Dict[str, Any]:
-    """Queue reprocessing of a day's data."""
+    """Queue reprocessing of a day's data from its stored Sv segments."""
+    from process.reprocess import STAGES
+
     date_str = data.get("date", "")
     stages = data.get("stages", ["denoise", "mvbs", "nasc", "echograms"])
+    options = data.get("options", {})
+    priority = data.get("priority", "low")
 
     try:
         target_date = date.fromisoformat(date_str)
     except (ValueError, TypeError):
         return {"status": "error", "reason": f"invalid date: {date_str}"}
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        return {"status": "error", "reason": f"unknown stages: {unknown} (valid: {list(STAGES)})"}
+    if priority not in PRIORITIES:
+        return {"status": "error", "reason": f"invalid priority: {priority}"}
 
     segments = segment_store.list_segments(target_date)
     if not segments:
         return {"status": "error", "reason": f"no segments for {date_str}"}
 
-    import uuid
     job_id = str(uuid.uuid4())[:8]
 
-    await job_queue.put({
-        "type": "process_day",
-        "job_id": job_id,
-        "date": target_date,
-        "stages": stages,
-    })
+    # Expanded into one reprocess_segment job per segment by the worker
+    job_store.submit(
+        "process_day",
+        {"date": target_date.isoformat(), "stages": stages, "options": options},
+        group_id=job_id,
+        priority=priority,
+    )
 
     logger.info("Queued day reprocessing for %s (job=%s, stages=%s)", date_str, job_id, stages)
-    return {"status": "accepted", "job_id": job_id, "date": date_str}
+    return {"status": "accepted", "job_id": job_id, "date": date_str, "segments": len(segments)}
 
 
 def _cmd_get_status(
     config: "EdgeConfig",
     segment_store: "SegmentStore",
-    job_queue: asyncio.Queue,
+    job_store: "JobStore",
+    client: "IoTHubModuleClient" = None,
 ) -> Dict[str, Any]:
     """Return current processing status."""
     import psutil
@@ -157,6 +211,11 @@ def _cmd_get_status(
 
     days = segment_store.list_days()
 
+    from azure_handler.telemetry_sender import get_telemetry_sender
+    from ingest.worker_pool import get_worker_pool
+    sender = get_telemetry_sender(client)
+    pool = get_worker_pool(job_store)
+
     return {
         "status": "ok",
         "processing_mode": config.processing_mode,
@@ -166,13 +225,35 @@ def _cmd_get_status(
         "system_memory_used_mb": mem.used // (1024 * 1024),
         "system_memory_total_mb": mem.total // (1024 * 1024),
         "system_memory_percent": mem.percent,
-        "jobs_pending": job_queue.qsize(),
+        "jobs_pending": job_store.pending(),
+        "jobs": job_store.stats(),
+        "workers": pool.metrics() if pool else None,
         "days_with_data": [d.isoformat() for d in days],
         "sonar_model": config.sonar_model,
         "storage_backend": config.storage_backend,
+        "telemetry": sender.metrics() if sender else None,
     }
 
 
+def _cmd_get_job(data: Dict[str, Any], job_store: "JobStore") -> Dict[str, Any]:
+    """Return one job, or a command's job group, by id."""
+    job_id = data.get("job_id", "")
+    job = job_store.get(job_id) if job_id else None
+    if job is None:
+        return {"status": "error", "reason": f"unknown job: {job_id}"}
+    return {"status": "ok", "job": job}
+
+
+def _cmd_cancel_job(data: Dict[str, Any], job_store: "JobStore") -> Dict[str, Any]:
+    """Cancel a job or job group (running jobs stop at the next stage)."""
+    job_id = data.get("job_id", "")
+    if not job_id:
+        return {"status": "error", "reason": "no job_id specified"}
+    n = job_store.cancel(job_id)
+    logger.info("Cancel requested for job %s (%d jobs affected)", job_id, n)
+    return {"status": "ok", "job_id": job_id, "jobs_cancelled": n}
+
+
 def _cmd_set_config(
     data: Dict[str, Any],
     config: "EdgeConfig",
@@ -188,50 +269,182 @@ def _cmd_set_config(
 
 
 async def job_worker(
-    job_queue: asyncio.Queue,
+    job_store: "JobStore",
     config: "EdgeConfig",
     segment_store: "SegmentStore",
     client: "IoTHubModuleClient",
 ) -> None:
-    """Background worker that processes jobs from the queue sequentially.
+    """Background worker pool that processes jobs from the store.
+
+    Jobs are taken highest priority first and run concurrently only
+    while their estimated memory fits the budget (``job_memory_budget_mb``)
+    — small raw files run side by side, a large one runs alone on the
+    Jetson's limited 16 GB.  Jobs interrupted by a restart were
+    re-queued by the store; with ``manifest_enabled`` their raw files
+    resume from the last stage the run manifest records.
+    """
+    from ingest.worker_pool import create_worker_pool
+
+    manifest = None
+    if config.manifest_enabled:
+        from process.manifest import RunManifest
+        manifest = RunManifest.from_config(config)
+
+    def run_job(job: Dict[str, Any]) -> None:
+        # Worker thread: give the async pipeline its own event loop
+        asyncio.run(_run_job(job, config, segment_store, client, job_store, manifest))
+
+    pool = create_worker_pool(job_store, config, run_job, poll_seconds=_IDLE_POLL_SECONDS)
+    try:
+        await pool.run()
+    finally:
+        if manifest is not None:
+            manifest.close()
 
-    This ensures only one heavy processing job runs at a time on the
-    Jetson's limited 16 GB memory.
+
+async def _run_job(
+    job: Dict[str, Any],
+    config: "EdgeConfig",
+    segment_store: "SegmentStore",
+    client: "IoTHubModuleClient",
+    job_store: "JobStore",
+    manifest: Optional["RunManifest"] = None,
+) -> None:
+    """Execute one claimed job and record its outcome in the store.
+
+    With a *manifest*, a raw file skips or resumes the stages recorded
+    there (``options.force`` re-runs them all), as on the file trigger.
     """
+    from azure_handler.journal import PRIORITY_SUMMARY
     from azure_handler.message_handler import send_to_hub
     from process.pipeline import process_raw_file_pipeline
 
-    while True:
-        job = await job_queue.get()
-        try:
-            job_type = job.get("type")
-            job_id = job.get("job_id", "?")
-
-            if job_type == "process_raw":
-                file_path = job["file_path"]
-                logger.info("Job %s: processing raw file %s", job_id, file_path)
-                result = await process_raw_file_pipeline(
-                    file_path=file_path,
-                    config=config,
-                    segment_store=segment_store,
-                    client=client,
-                )
-                result["job_id"] = job_id
-                send_to_hub(client, data=result, output_name="output1")
-
-            elif job_type == "process_day":
-                target_date = job["date"]
-                stages = job["stages"]
-                logger.info("Job %s: reprocessing %s stages=%s", job_id, target_date, stages)
-                # Segment-based: reprocessing individual segments is a future feature
-                result = {"status": "not_implemented", "reason": "segment-based reprocessing pending"}
-                result["job_id"] = job_id
-                send_to_hub(client, data=result, output_name="output1")
-
-            else:
-                logger.warning("Unknown job type: %s", job_type)
-
-        except Exception as e:
-            logger.error("Job %s failed: %s", job.get("job_id", "?"), e, exc_info=True)
-        finally:
-            job_queue.task_done()
+    job_id = job["group_id"]
+    payload = job["payload"]
+
+    def progress(fraction: float, stage: str) -> None:
+        job_store.checkpoint(job["id"], fraction, stage)
+
+    try:
+        job_type = job["type"]
+
+        if job_type == "process_raw":
+            file_path = payload["file_path"]
+            logger.info("Job %s: processing raw file %s", job_id, file_path)
+            entry = None
+            if manifest is not None and config.manifest_enabled:
+                force = ["all"] if payload.get("options", {}).get("force") else []
+                entry = manifest.entry(file_path, config, force)
+            result = await process_raw_file_pipeline(
+                file_path=file_path,
+                config=config,
+                segment_store=segment_store,
+                client=client,
+                progress=progress,
+                entry=entry,
+            )
+            result["job_id"] = job_id
+            job_store.finish(job["id"], DONE, result=_job_result(result))
+            send_to_hub(client, data=result, output_name="output1", priority=PRIORITY_SUMMARY)
+
+        elif job_type == "process_day":
+            result = _expand_process_day(job, config, segment_store, job_store)
+            job_store.finish(job["id"], DONE, result=result)
+            send_to_hub(client, data=result, output_name="output1", priority=PRIORITY_SUMMARY)
+
+        elif job_type == "reprocess_segment":
+            from process.reprocess import reprocess_segment
+            result = await reprocess_segment(
+                date.fromisoformat(payload["date"]),
+                payload["segment"],
+                payload["stages"],
+                config,
+                segment_store,
+                force=bool(payload.get("options", {}).get("force")),
+                progress=progress,
+            )
+            result["job_id"] = job_id
+            job_store.finish(job["id"], DONE, result=result)
+            send_to_hub(client, data=result, output_name="output1", priority=PRIORITY_SUMMARY)
+
+        else:
+            logger.warning("Unknown job type: %s", job_type)
+            job_store.finish(job["id"], FAILED, error=f"unknown job type: {job_type}")
+
+    except JobCancelled:
+        logger.info("Job %s: %s cancelled", job_id, job["id"])
+        job_store.finish(job["id"], CANCELLED)
+    except Exception as e:
+        logger.error("Job %s failed: %s", job_id, e, exc_info=True)
+        job_store.finish(job["id"], FAILED, error=str(e))
+
+
+def _expand_process_day(
+    job: Dict[str, Any],
+    config: "EdgeConfig",
+    segment_store: "SegmentStore",
+    job_store: "JobStore",
+) -> Dict[str, Any]:
+    """Queue one ``reprocess_segment`` job per stale segment of the day.
+
+    Segment jobs join the day's job group, so ``get_job`` / ``cancel_job``
+    on the command's ``job_id`` cover them, and run in parallel within
+    the worker pool's memory budget.  A segment whose job for the same
+    stages is still queued or running is not queued again.
+    """
+    from process.reprocess import (
+        load_segment_metadata, segment_prefix, segment_sv_nbytes, stale_stages,
+    )
+
+    payload = job["payload"]
+    target_date = date.fromisoformat(payload["date"])
+    stages = payload["stages"]
+    force = bool(payload.get("options", {}).get("force"))
+    priority = {v: k for k, v in PRIORITIES.items()}.get(job["priority"], "low")
+
+    queued, up_to_date, duplicates = 0, 0, 0
+    for segment in segment_store.list_segments(target_date):
+        if not force:
+            metadata = load_segment_metadata(segment_store.storage, segment_prefix(config, target_date, segment))
+            if not stale_stages(metadata, config, stages):
+                up_to_date += 1
+                continue
+        # Only queued/running jobs block (force=True): whether a finished
+        # segment needs another run is decided by stale_stages above
+        job_id = job_store.submit(
+            "reprocess_segment",
+            {
+                "date": target_date.isoformat(),
+                "segment": segment,
+                "stages": stages,
+                "options": payload.get("options", {}),
+                "sv_nbytes": segment_sv_nbytes(segment_store.storage, config, target_date, segment) or 0,
+            },
+            group_id=job["group_id"],
+            priority=priority,
+            dedup_key=f"segment:{target_date.isoformat()}/{segment}:{','.join(sorted(stages))}",
+            force=True,
+        )
+        if job_id is None:
+            duplicates += 1
+        else:
+            queued += 1
+
+    logger.info(
+        "Job %s: %s — %d segments queued, %d up to date, %d already queued",
+        job["group_id"], target_date, queued, up_to_date, duplicates,
+    )
+    return {
+        "status": "ok",
+        "job_id": job["group_id"],
+        "date": target_date.isoformat(),
+        "stages": stages,
+        "segments_queued": queued,
+        "segments_up_to_date": up_to_date,
+        "segments_already_queued": duplicates,
+    }
+
+
+def _job_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The small, scalar part of a pipeline result kept in the job store."""
+    return {k: v for k, v in result.items() if isinstance(v, (str, int, float, bool)) or v is None}
@@ -46,20 +46,33 @@ class RealtimeIngestion:
     on_batch : callable
         Async callback invoked with ``(EchoData, config)`` when a batch
         buffer is full.
+    on_flush : callable, optional
+        Called with ``config`` in a worker thread once a stream's last
+        batch is processed (end of a session, channel change, shutdown),
+        e.g. to save the open NASC distance bin.
     """
 
     def __init__(
         self,
         config: "EdgeConfig",
         on_batch: Callable,
+        on_flush: Optional[Callable] = None,
     ):
         self.config = config
         self.on_batch = on_batch
+        self.on_flush = on_flush
         self._running = False
         self._task: Optional[asyncio.Task] = None
         self._batch_sem = asyncio.Semaphore(_MAX_CONCURRENT_BATCHES)
         self._batch_tasks: set[asyncio.Task] = set()
 
+        from process.track_store import StreamingTrackSimplifier, TrackStore
+        self._track = StreamingTrackSimplifier(
+            epsilon_nmi=config.track_epsilon_nmi,
+            max_buffer=config.track_buffer_fixes,
+        )
+        self._track_store = TrackStore.from_config(config)
+
     async def start(self) -> None:
         """Start the real-time ingestion loop."""
         if self._running:
@@ -68,13 +81,16 @@ class RealtimeIngestion:
         self._running = True
         self._task = asyncio.create_task(self._run())
         logger.info(
-            "Realtime ingestion started (service=%s, buffer=%d pings / %ds, min_pings=%d)",
-            self.config.ek80_service_url,
+            "%s started (%s, buffer=%d pings / %ds, min_pings=%d)",
+            type(self).__name__, self._source(),
             self.config.realtime_buffer_pings,
             self.config.realtime_buffer_seconds,
             self.config.realtime_min_pings,
         )
 
+    def _source(self) -> str:
+        return f"service={self.config.ek80_service_url}"
+
     async def stop(self) -> None:
         """Gracefully stop the ingestion loop and drain pending batches."""
         self._running = False
@@ -89,6 +105,8 @@ class RealtimeIngestion:
             logger.info("Waiting for %d in-flight batch tasks…", len(self._batch_tasks))
             await asyncio.gather(*self._batch_tasks, return_exceptions=True)
             self._batch_tasks.clear()
+        self._store_track(self._track.flush())
+        await self._flush_stream()
         logger.info("Realtime ingestion stopped")
 
     async def _run(self) -> None:
@@ -159,9 +177,7 @@ class RealtimeIngestion:
         ws_url += "/ws/sample-data"
 
         logger.info("Connecting to WebSocket: %s", ws_url)
-        buffer_timeout = self.config.realtime_buffer_seconds
-        batch_start = asyncio.get_event_loop().time()
-        nav_poll_time = batch_start
+        nav_poll_time = asyncio.get_event_loop().time()
 
         async with websockets.connect(ws_url, ping_interval=None, ping_timeout=None) as ws:
             logger.info("WebSocket connected to ek80-service")
@@ -224,50 +240,90 @@ class RealtimeIngestion:
                             longitude=lon,
                             heading=heading,
                         )
+                        if nav.get("latitude") and nav.get("longitude"):
+                            self._store_track(self._track.add(
+                                datetime.now(timezone.utc), lat, lon,
+                            ))
                     except Exception:
                         pass
 
-                # Check dual trigger: ping count OR time elapsed
-                ping_count = len(accumulator)
-                duration = accumulator.duration_seconds
-                min_pings = self.config.realtime_min_pings
-                ping_trigger = ping_count >= self.config.realtime_buffer_pings
-                time_trigger = duration >= buffer_timeout
-
-                if (ping_trigger or time_trigger) and ping_count >= min_pings:
-                    trigger = "ping-count" if ping_trigger else "time"
-                    logger.info(
-                        "Buffer ready (%s): %d pings, %.1fs — dispatching background batch",
-                        trigger, ping_count, duration,
-                    )
-                    try:
-                        # Run CPU-intensive conversion in executor to avoid
-                        # blocking the event loop (which must respond to WS
-                        # keepalive pings).
-                        loop = asyncio.get_running_loop()
-                        echodata = await loop.run_in_executor(
-                            None, accumulator.to_echodata,
-                        )
-                    except Exception as e:
-                        logger.error("Failed to convert buffer to EchoData: %s", e, exc_info=True)
-                        accumulator.clear()
-                        batch_start = asyncio.get_event_loop().time()
-                        continue
+                await self._dispatch_if_ready(accumulator)
 
-                    accumulator.clear()
-                    batch_start = asyncio.get_event_loop().time()
+            # Flush remaining data
+            await self._flush_remaining(accumulator)
 
-                    # Dispatch processing as a background task
-                    await self._dispatch_batch(echodata)
+    async def _dispatch_if_ready(self, accumulator: Any) -> None:
+        """Convert and dispatch the buffer once a batch trigger fires.
 
-            # Flush remaining data
-            if len(accumulator) >= self.config.realtime_min_pings:
-                logger.info("Flushing %d remaining pings", len(accumulator))
-                try:
-                    echodata = accumulator.to_echodata()
-                    await self._dispatch_batch(echodata)
-                except Exception as e:
-                    logger.error("Final batch failed: %s", e, exc_info=True)
+        Dual trigger: ping count OR time elapsed, with a minimum ping
+        count for any batch.
+        """
+        ping_count = len(accumulator)
+        duration = accumulator.duration_seconds
+        min_pings = self.config.realtime_min_pings
+        ping_trigger = ping_count >= self.config.realtime_buffer_pings
+        time_trigger = duration >= self.config.realtime_buffer_seconds
+
+        if not ((ping_trigger or time_trigger) and ping_count >= min_pings):
+            return
+        trigger = "ping-count" if ping_trigger else "time"
+        logger.info(
+            "Buffer ready (%s): %d pings, %.1fs — dispatching background batch",
+            trigger, ping_count, duration,
+        )
+        try:
+            # Run CPU-intensive conversion in executor to avoid
+            # blocking the event loop (which must respond to WS
+            # keepalive pings).
+            loop = asyncio.get_running_loop()
+            echodata = await loop.run_in_executor(None, accumulator.to_echodata)
+        except Exception as e:
+            logger.error("Failed to convert buffer to EchoData: %s", e, exc_info=True)
+            accumulator.clear()
+            return
+
+        accumulator.clear()
+
+        # Close the track at the batch edge so the pipeline
+        # finds this batch's positions in the track file
+        self._store_track(self._track.flush())
+
+        # Dispatch processing as a background task
+        await self._dispatch_batch(echodata)
+
+    async def _flush_remaining(self, accumulator: Any) -> None:
+        """Dispatch what is left in the buffer at the end of a session."""
+        if len(accumulator) >= self.config.realtime_min_pings:
+            logger.info("Flushing %d remaining pings", len(accumulator))
+            try:
+                echodata = accumulator.to_echodata()
+                accumulator.clear()
+                self._store_track(self._track.flush())
+                await self._dispatch_batch(echodata)
+            except Exception as e:
+                logger.error("Final batch failed: %s", e, exc_info=True)
+        await self._flush_stream()
+
+    async def _flush_stream(self) -> None:
+        """Run ``on_flush`` once the batches in flight are processed."""
+        if self.on_flush is None:
+            return
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(_BATCH_EXECUTOR, self.on_flush, self.config)
+        except Exception as e:
+            logger.error("Stream flush failed: %s", e, exc_info=True)
+
+    def _store_track(self, vertices: list) -> None:
+        """Append finalized track vertices to the day's track file."""
+        if not vertices:
+            return
+        try:
+            self._track_store.append(vertices)
+        except OSError as e:
+            logger.warning("Failed to append %d track vertices: %s", len(vertices), e)
 
     async def _dispatch_batch(self, echodata: Any) -> None:
         """Run ``on_batch`` in a background thread, bounded by semaphore."""
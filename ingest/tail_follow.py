@@ -0,0 +1,498 @@
+"""Tail-following ingest for raw files still being written.
+
+The file trigger only sees a ``.raw`` file once the EK80 closes it,
+which can be an hour after its first ping.  ``RawTailIngestion`` follows
+the file the EK80 is currently recording instead:
+
+- the newest file in ``tail_follow_dir`` is memory-mapped and re-mapped
+  as it grows; complete datagrams are parsed as they land (a datagram
+  still being written is left for the next poll);
+- configuration (``XML0`` / ``CON0``), ping (``RAW3`` / ``RAW0``) and
+  NMEA (``NME0``) datagrams are fed to the same ``PingAccumulator``,
+  batch triggers and pipeline callback as ``RealtimeIngestion``;
+- when a newer file appears and the current one has stopped growing,
+  the rest of the current file is read and the follower moves on.
+
+The ``rawfileadded`` handler calls ``claim`` for each closed file: a
+file with pings ingested here is skipped by the file trigger; any other
+file then belongs to the trigger, and the follower neither opens it nor
+adds its pings, so no file is processed twice.  Only power/angle samples
+can be accumulated; files with complex (FM / un-reduced CW) samples are
+left to the file trigger.
+
+Sound absorption is derived as echopype does for EK80 data: Francois &
+Garrison (1982) from the ``Environment`` datagram's temperature,
+salinity, depth and acidity at its indicative sound speed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ingest.realtime import RealtimeIngestion
+from process.raw_index import _CON0_COUNT_OFFSET, _RAW0, _RAW3, _nmea_position, iter_datagrams
+
+if TYPE_CHECKING:
+    from config import EdgeConfig
+
+logger = logging.getLogger("oceanstream")
+
+_FILETIME_EPOCH = datetime(1601, 1, 1, tzinfo=timezone.utc)
+
+# CON0 per-transceiver record (EK60)
+_CON0_TRANSCEIVER = struct.Struct("<128sl5f10f5f8s5f8s5f8s16s28s")
+
+# Datagrams decoded between event-loop yields while catching up
+_YIELD_EVERY = 2000
+
+# Names of followed / claimed files remembered for ``claim``
+_FOLLOWED_FILES = 1000
+
+# echopype calc_absorption argument ← EK80 Environment attribute
+_ENVIRONMENT_KEYS = (
+    ("temperature", "Temperature"),
+    ("salinity", "Salinity"),
+    ("pressure", "Depth"),
+    ("pH", "Acidity"),
+)
+
+
+def _filetime(ft: int) -> datetime:
+    return _FILETIME_EPOCH + timedelta(microseconds=ft // 10)
+
+
+def _floats(value: Optional[str]) -> List[float]:
+    """``"0.000256;0.000512"`` → ``[0.000256, 0.000512]``."""
+    out = []
+    for part in (value or "").replace(",", ";").split(";"):
+        try:
+            out.append(float(part))
+        except ValueError:
+            continue
+    return out
+
+
+def _table_value(values: List[float], pulses: List[float], pulse: float, default: float) -> float:
+    """Entry of a per-pulse-duration table for *pulse* (nearest match)."""
+    if not values:
+        return default
+    if len(values) != len(pulses) or not pulses:
+        return values[0]
+    i = int(np.argmin(np.abs(np.asarray(pulses) - pulse)))
+    return values[i]
+
+
+class _RawTail:
+    """Incremental datagram reader over a growing raw file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = 0
+        self.last_growth = time.monotonic()
+        self._file = open(path, "rb")
+        self._mm: Optional[mmap.mmap] = None
+
+    def read(self) -> List[Tuple[bytes, int, bytes]]:
+        """Complete datagrams appended since the last call."""
+        size = os.fstat(self._file.fileno()).st_size
+        if self._mm is None or size > len(self._mm):
+            if size <= self.offset:
+                return []
+            # mmap length is fixed: re-map to see the new bytes
+            if self._mm is not None:
+                self._mm.close()
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.last_growth = time.monotonic()
+        out = []
+        for dgram, ft, body, end in iter_datagrams(self._mm, self.offset):
+            out.append((dgram, ft, self._mm[body:end - 4]))
+            self.offset = end
+        return out
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+class RawTailIngestion(RealtimeIngestion):
+    """Realtime-style ingestion from the raw file the EK80 is writing.
+
+    Parameters
+    ----------
+    config : EdgeConfig
+        Edge processing configuration (``tail_follow_*`` fields and the
+        ``realtime_*`` batch triggers).
+    on_batch : callable
+        Async callback invoked with ``(EchoData, config)`` per batch.
+    on_flush : callable, optional
+        Called with ``config`` once a stream's last batch is processed.
+    """
+
+    def __init__(self, config: "EdgeConfig", on_batch: Callable, on_flush: Optional[Callable] = None):
+        super().__init__(config, on_batch=on_batch, on_flush=on_flush)
+        self._tail: Optional[_RawTail] = None
+        self._accumulator: Any = None
+        self._followed: "OrderedDict[str, bool]" = OrderedDict()
+        # Files left to the file trigger; guarded with _followed by _claim_lock
+        self._claimed: "OrderedDict[str, None]" = OrderedDict()
+        self._claim_lock = threading.Lock()
+        # Channel state decoded from the configuration datagrams
+        self._channels: Dict[str, Dict[str, Any]] = {}
+        self._params: Dict[str, Dict[str, float]] = {}
+        self._con0_ids: Dict[int, str] = {}
+        self._registered: set = set()
+        self._sound_speed = 1500.0
+        self._environment: Dict[str, float] = {}
+        self._absorption: Dict[float, float] = {}
+        self._unsupported: set = set()
+
+    def _source(self) -> str:
+        return f"tail={self.config.tail_follow_dir}/{self.config.tail_follow_pattern}"
+
+    def claim(self, path: str) -> bool:
+        """Settle who ingests the closed file *path* (called from any thread).
+
+        Returns ``True`` if the follower ingested pings of it (the file
+        trigger skips it); otherwise the file belongs to the file
+        trigger from now on and the follower leaves it alone.
+        """
+        name = Path(path).name
+        with self._claim_lock:
+            if self._followed.get(name, False):
+                return True
+            self._claimed[name] = None
+            while len(self._claimed) > _FOLLOWED_FILES:
+                self._claimed.popitem(last=False)
+            return False
+
+    # --- File selection ---
+
+    def _candidates(self) -> List[Path]:
+        directory = Path(self.config.tail_follow_dir)
+        try:
+            return sorted(directory.glob(self.config.tail_follow_pattern))
+        except OSError:
+            return []
+
+    def _next_file(self) -> Optional[Path]:
+        """File to follow next.
+
+        After a file, the next one in name order (EK80 names carry the
+        start time).  At start-up only a file modified within
+        ``tail_follow_idle_seconds`` is followed — closed files belong
+        to the file trigger.
+        """
+        files = self._candidates()
+        if not files:
+            return None
+        with self._claim_lock:
+            last = next(reversed(self._followed)) if self._followed else None
+            claimed = set(self._claimed)
+        if last is not None:
+            later = [f for f in files if f.name > last and f.name not in claimed]
+            return later[0] if later else None
+        newest = max(files, key=lambda f: f.stat().st_mtime)
+        if newest.name in claimed:
+            return None
+        if time.time() - newest.stat().st_mtime <= self.config.tail_follow_idle_seconds:
+            return newest
+        return None
+
+    def _file_closed(self, tail: _RawTail) -> bool:
+        """The current file stopped growing and a newer one exists (or it
+        has been idle for ``tail_follow_idle_seconds``)."""
+        idle = time.monotonic() - tail.last_growth
+        if idle < self.config.tail_follow_poll_seconds:
+            return False
+        if any(f.name > tail.path.name for f in self._candidates()):
+            return True
+        return idle >= self.config.tail_follow_idle_seconds
+
+    def _open(self, path: Path) -> None:
+        logger.info("Tail-following %s", path)
+        self._tail = _RawTail(path)
+        with self._claim_lock:
+            self._followed[path.name] = False
+            while len(self._followed) > _FOLLOWED_FILES:
+                self._followed.popitem(last=False)
+
+    def _close_tail(self) -> None:
+        if self._tail is None:
+            return
+        logger.info(
+            "Finished following %s (%d bytes, pings ingested: %s)",
+            self._tail.path.name, self._tail.offset, self._followed.get(self._tail.path.name),
+        )
+        self._tail.close()
+        self._tail = None
+
+    # --- Session ---
+
+    async def _run_session(self) -> None:
+        """Follow files until stopped; survives session retries."""
+        poll = self.config.tail_follow_poll_seconds
+        try:
+            while self._running:
+                if self._tail is None:
+                    path = self._next_file()
+                    if path is None:
+                        await asyncio.sleep(poll)
+                        continue
+                    self._open(path)
+
+                datagrams = await asyncio.to_thread(self._tail.read)
+                if datagrams:
+                    await self._ingest(datagrams)
+                elif self._file_closed(self._tail):
+                    self._close_tail()
+                    continue
+                await asyncio.sleep(poll)
+        except asyncio.CancelledError:
+            if self._accumulator is not None:
+                await self._flush_remaining(self._accumulator)
+            self._close_tail()
+            raise
+
+    async def _ingest(self, datagrams: List[Tuple[bytes, int, bytes]]) -> None:
+        for i, (dgram, ft, body) in enumerate(datagrams):
+            try:
+                if dgram in (b"XML0", b"CON0"):
+                    channels = self._on_xml(body) if dgram == b"XML0" else self._on_con0(body)
+                    if channels:
+                        await self._set_channels(channels)
+                elif self._decode(dgram, ft, body):
+                    await self._dispatch_if_ready(self._accumulator)
+            except (struct.error, ValueError) as e:
+                logger.debug("Skipping malformed %s datagram: %s", dgram, e)
+            if i % _YIELD_EVERY == _YIELD_EVERY - 1:
+                await asyncio.sleep(0)
+
+    # --- Datagram decoding ---
+
+    def _decode(self, dgram: bytes, ft: int, body: bytes) -> bool:
+        """Apply a ping or NMEA datagram; returns ``True`` if a ping was added."""
+        if dgram == b"RAW3":
+            return self._on_raw3(ft, body)
+        if dgram == b"RAW0":
+            return self._on_raw0(ft, body)
+        if dgram == b"NME0":
+            self._on_nmea(ft, body)
+        return False
+
+    def _on_xml(self, body: bytes) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Apply an EK80 XML datagram; returns the channels of a Configuration."""
+        text = body.split(b"\0", 1)[0].decode("utf-8", "replace")
+        try:
+            root = ET.fromstring(text)
+        except ET.ParseError:
+            return None
+        if root.tag == "Configuration":
+            channels = {}
+            for channel in root.iter("Channel"):
+                cid = channel.get("ChannelID")
+                if not cid:
+                    continue
+                transducer = channel.find("Transducer")
+                t = transducer.attrib if transducer is not None else {}
+                channels[cid] = {
+                    "frequency": _floats(t.get("Frequency"))[:1] or [0.0],
+                    "pulse_durations": _floats(channel.get("PulseDuration")),
+                    "gains": _floats(t.get("Gain")),
+                    "sa_corrections": _floats(t.get("SaCorrection")),
+                    "equivalent_beam_angle": (_floats(t.get("EquivalentBeamAngle")) or [-20.7])[0],
+                    "beam_width_alongship": (_floats(t.get("BeamWidthAlongship")) or [7.0])[0],
+                    "beam_width_athwartship": (_floats(t.get("BeamWidthAthwartship")) or [7.0])[0],
+                    "transceiver_type": t.get("TransducerName") or "WBT",
+                }
+            return channels
+        elif root.tag == "Environment":
+            speed = _floats(root.get("SoundSpeed"))
+            if speed:
+                self._sound_speed = speed[0]
+            self._environment = {}
+            for _, key in _ENVIRONMENT_KEYS:
+                values = _floats(root.get(key))
+                if values:
+                    self._environment[key] = values[0]
+            self._absorption = {}
+        elif root.tag == "Parameter":
+            for channel in root.iter("Channel"):
+                cid = channel.get("ChannelID")
+                if not cid:
+                    continue
+                params = {}
+                for key in ("Frequency", "PulseDuration", "SampleInterval", "TransmitPower"):
+                    values = _floats(channel.get(key))
+                    if values:
+                        params[key] = values[0]
+                self._params[cid] = params
+        return None
+
+    def _on_con0(self, body: bytes) -> Dict[str, Dict[str, Any]]:
+        """Channels of an EK60 configuration datagram."""
+        (count,) = struct.unpack_from("<l", body, _CON0_COUNT_OFFSET)
+        base = _CON0_COUNT_OFFSET + 4
+        channels = {}
+        self._con0_ids = {}
+        for i in range(max(count, 0)):
+            rec = base + i * _CON0_TRANSCEIVER.size
+            if rec + _CON0_TRANSCEIVER.size > len(body):
+                break
+            v = _CON0_TRANSCEIVER.unpack_from(body, rec)
+            cid = v[0].split(b"\0", 1)[0].decode("ascii", "replace").strip()
+            self._con0_ids[i + 1] = cid
+            channels[cid] = {
+                "frequency": [v[2]],
+                "pulse_durations": list(v[17:22]),
+                "gains": list(v[23:28]),
+                "sa_corrections": list(v[29:34]),
+                "equivalent_beam_angle": v[4],
+                "beam_width_alongship": v[5],
+                "beam_width_athwartship": v[6],
+                "transceiver_type": "GPT",
+            }
+        return channels
+
+    async def _set_channels(self, channels: Dict[str, Dict[str, Any]]) -> None:
+        """Adopt a file's channel configuration.
+
+        The same channel set (the next file of a recording) keeps the
+        current buffer; a different one flushes it and starts a new
+        accumulator, since the two setups cannot share a batch.
+        """
+        changed = set(channels) != set(self._channels)
+        self._channels = channels
+        if self._accumulator is not None and not changed:
+            return
+        if self._accumulator is not None:
+            logger.info("Channel configuration changed — starting a new batch")
+            await self._flush_remaining(self._accumulator)
+        from echopype.convert.from_ping_data import PingAccumulator
+        self._accumulator = PingAccumulator(sonar_model=self.config.sonar_model)
+        self._registered = set()
+
+    def _register(self, cid: str, pulse: float, sample_interval: float, frequency: float) -> None:
+        from echopype.convert.from_ping_data import ChannelConfig
+
+        ch = self._channels.get(cid, {})
+        pulses = ch.get("pulse_durations", [])
+        self._accumulator.register_channel(ChannelConfig(
+            channel_id=cid,
+            frequency=frequency or ch.get("frequency", [200000.0])[0],
+            pulse_duration=pulse,
+            sample_interval=sample_interval,
+            gain=_table_value(ch.get("gains", []), pulses, pulse, 25.0),
+            sa_correction=_table_value(ch.get("sa_corrections", []), pulses, pulse, 0.0),
+            equivalent_beam_angle=ch.get("equivalent_beam_angle", -20.7),
+            beam_width_alongship=ch.get("beam_width_alongship", 7.0),
+            beam_width_athwartship=ch.get("beam_width_athwartship", 7.0),
+            transceiver_type=ch.get("transceiver_type", "WBT"),
+        ))
+        self._registered.add(cid)
+
+    def _absorption_at(self, frequency: float) -> float:
+        """Sea water absorption (dB/m) at *frequency* from the Environment datagram.
+
+        Values the datagram lacks take ``calc_absorption``'s defaults.
+        """
+        if frequency not in self._absorption:
+            from echopype.utils.uwa import calc_absorption
+
+            env = {arg: self._environment[key] for arg, key in _ENVIRONMENT_KEYS if key in self._environment}
+            self._absorption[frequency] = float(calc_absorption(
+                frequency, sound_speed=self._sound_speed, formula_source="FG", **env,
+            ))
+        return self._absorption[frequency]
+
+    def _add_ping(
+        self, ft: int, cid: str, power: np.ndarray, *, transmit_power: float, pulse: float,
+        sample_interval: float, frequency: float, sound_speed: float, absorption: float,
+    ) -> bool:
+        if self._accumulator is None:
+            return False
+        if self._tail is not None:
+            with self._claim_lock:
+                # The file trigger owns the file: leave all its pings to it
+                if self._tail.path.name in self._claimed:
+                    return False
+                self._followed[self._tail.path.name] = True
+        if cid not in self._registered:
+            self._register(cid, pulse, sample_interval, frequency)
+        self._accumulator.add_ping(
+            timestamp=_filetime(ft),
+            channel_id=cid,
+            power_samples=power,
+            transmit_power=transmit_power,
+            pulse_duration=pulse,
+            sample_interval=sample_interval,
+            frequency=frequency,
+            sound_speed=sound_speed,
+            absorption=absorption,
+        )
+        return True
+
+    def _on_raw3(self, ft: int, body: bytes) -> bool:
+        cid, datatype, _, _, count = _RAW3.unpack_from(body, 0)
+        cid = cid.split(b"\0", 1)[0].decode("ascii", "replace").strip()
+        if not datatype & 0b1:
+            if cid not in self._unsupported:
+                self._unsupported.add(cid)
+                logger.warning(
+                    "%s: complex samples cannot be tail-followed — left to the file trigger", cid,
+                )
+            return False
+        power = np.frombuffer(body, dtype="<i2", count=count, offset=_RAW3.size)
+        params = self._params.get(cid, {})
+        ch = self._channels.get(cid, {})
+        frequency = params.get("Frequency") or ch.get("frequency", [200000.0])[0]
+        return self._add_ping(
+            ft, cid, power,
+            transmit_power=params.get("TransmitPower", 100.0),
+            pulse=params.get("PulseDuration", 0.001024),
+            sample_interval=params.get("SampleInterval", 0.000016),
+            frequency=frequency,
+            sound_speed=self._sound_speed,
+            absorption=self._absorption_at(frequency),
+        )
+
+    def _on_raw0(self, ft: int, body: bytes) -> bool:
+        vals = _RAW0.unpack_from(body, 0)
+        channel, mode, count = vals[0], vals[1], vals[-1]
+        if not mode & 1:
+            return False
+        cid = self._con0_ids.get(channel, f"channel{channel}")
+        power = np.frombuffer(body, dtype="<i2", count=count, offset=_RAW0.size)
+        return self._add_ping(
+            ft, cid, power,
+            transmit_power=vals[4],
+            pulse=vals[5],
+            sample_interval=vals[7],
+            frequency=vals[3],
+            sound_speed=vals[8],
+            absorption=vals[9],
+        )
+
+    def _on_nmea(self, ft: int, body: bytes) -> None:
+        fix = _nmea_position(body.split(b"\0", 1)[0].decode("ascii", "replace"))
+        if fix is None or not (fix[0] or fix[1]):
+            return
+        timestamp = _filetime(ft)
+        if self._accumulator is not None:
+            self._accumulator.add_navigation(
+                timestamp=timestamp, latitude=fix[0], longitude=fix[1], heading=0,
+            )
+        self._store_track(self._track.add(timestamp, fix[0], fix[1]))
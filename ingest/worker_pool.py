@@ -0,0 +1,263 @@
+"""Memory-aware pool of on-demand job workers.
+
+``job_worker`` used to run one job at a time because a large raw file
+can take several GB of the Jetson's 16 GB.  Most backlog files are
+small, though, and running those one by one leaves the device idle.
+The pool runs jobs concurrently under *admission control*:
+
+- each job's peak memory is estimated up front (``estimate_job_memory``)
+  from the sample count and format in the raw file's datagram headers;
+- a job is admitted only while the sum of running estimates stays under
+  the budget *and* the system still has that much memory available;
+- a job that does not fit waits for running jobs to finish (re-checking
+  available memory and cancellation every poll) — nothing is admitted
+  past it, so a large file is never starved by small ones — and when
+  nothing else is running it is admitted alone even if it exceeds the
+  budget.
+
+Jobs run in a thread pool (as realtime batches do) so the event loop
+stays responsive.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from ingest.job_store import CANCELLED
+
+if TYPE_CHECKING:
+    from config import EdgeConfig
+    from ingest.job_store import JobStore
+
+logger = logging.getLogger("oceanstream")
+
+_MB = 1024 * 1024
+
+# Fraction of total RAM used as budget when none is configured
+_AUTO_BUDGET_FRACTION = 0.6
+
+# Memory kept free for the rest of the system when checking availability
+_RESERVE_BYTES = 1024 * _MB
+
+# Fallback when a file's sample format cannot be determined
+# (EK60 power + angle: 2 + 2 bytes in the file, float64 Sv in memory)
+_DEFAULT_RAW_BYTES_PER_SAMPLE = 4
+_DEFAULT_MEM_BYTES_PER_SAMPLE = 8
+
+_POOLS: Dict[int, "JobWorkerPool"] = {}
+
+
+def estimate_job_memory(job: Dict[str, Any], config: "EdgeConfig") -> int:
+    """Projected peak memory of a job, in bytes.
+
+    ``overhead + factor × n_samples × bytes_per_sample_in_memory``, with
+    ``n_samples`` and the sample format read from the file's datagram
+    headers (``process.raw_index``); if the file cannot be indexed,
+    ``n_samples`` is derived from its size.  Segment reprocessing uses
+    the stored Sv size instead.  ``job_memory_factor`` is the number of
+    Sv-sized arrays alive at the pipeline's peak (EchoData, Sv, denoised
+    Sv, masks, …).
+    """
+    overhead = config.job_memory_overhead_mb * _MB
+    payload = job.get("payload", {})
+    if job.get("type") == "reprocess_segment":
+        # Stored Sv is already float64: the factor applies to it directly
+        return int(overhead + config.job_memory_factor * payload.get("sv_nbytes", 0))
+    path = payload.get("file_path")
+    if job.get("type") != "process_raw" or not path:
+        return overhead
+    try:
+        from process.raw_index import raw_file_info
+        info = raw_file_info(path)
+        if info.total_samples and info.mem_bytes_per_sample:
+            return int(overhead + config.job_memory_factor * info.total_samples * info.mem_bytes_per_sample)
+    except Exception as e:
+        logger.debug("Raw index unavailable for %s: %s", path, e)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return overhead
+    n_samples = size / _DEFAULT_RAW_BYTES_PER_SAMPLE
+    return int(overhead + config.job_memory_factor * n_samples * _DEFAULT_MEM_BYTES_PER_SAMPLE)
+
+
+def _available_bytes() -> Optional[int]:
+    try:
+        import psutil
+        return int(psutil.virtual_memory().available)
+    except Exception:
+        return None
+
+
+def memory_budget(config: "EdgeConfig") -> int:
+    """Configured job memory budget, or a share of total RAM if unset."""
+    if config.job_memory_budget_mb > 0:
+        return config.job_memory_budget_mb * _MB
+    try:
+        import psutil
+        return int(psutil.virtual_memory().total * _AUTO_BUDGET_FRACTION)
+    except Exception:
+        return 8 * 1024 * _MB
+
+
+class JobWorkerPool:
+    """Runs jobs from a ``JobStore`` concurrently within a memory budget.
+
+    Parameters
+    ----------
+    job_store : JobStore
+        Source of jobs.
+    run_job : callable
+        Blocking ``run_job(job)`` executed in a worker thread; it records
+        the job's outcome in the store itself.
+    max_workers : int
+        Upper bound on concurrently running jobs.
+    budget_bytes : int
+        Sum of job estimates allowed to run at once.
+    estimate : callable
+        ``estimate(job) -> bytes``.
+    poll_seconds : float
+        Sleep between polls while the store is empty.
+    """
+
+    def __init__(
+        self,
+        job_store: "JobStore",
+        run_job: Callable[[Dict[str, Any]], None],
+        *,
+        max_workers: int,
+        budget_bytes: int,
+        estimate: Callable[[Dict[str, Any]], int],
+        poll_seconds: float = 2.0,
+        available: Callable[[], Optional[int]] = _available_bytes,
+    ):
+        self.job_store = job_store
+        self.run_job = run_job
+        self.max_workers = max(1, int(max_workers))
+        self.budget_bytes = int(budget_bytes)
+        self.estimate = estimate
+        self.poll_seconds = poll_seconds
+        self._available = available
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._running: Dict[str, int] = {}
+        self._tasks: set = set()
+        self._done = asyncio.Event()
+        self._held: Optional[Dict[str, Any]] = None
+        self.completed = 0
+        self.peak_concurrency = 0
+
+    @property
+    def reserved_bytes(self) -> int:
+        return sum(self._running.values())
+
+    def _admits(self, need: int) -> bool:
+        if not self._running:
+            return True
+        if len(self._running) >= self.max_workers:
+            return False
+        if self.reserved_bytes + need > self.budget_bytes:
+            return False
+        available = self._available()
+        return available is None or need <= available - _RESERVE_BYTES
+
+    async def run(self, *, until_idle: bool = False) -> None:
+        """Dispatch jobs until cancelled (or, with *until_idle*, until the
+        store is empty and nothing is running)."""
+        try:
+            while True:
+                job = self._held or self.job_store.claim()
+                self._held = None
+                if job is None:
+                    if until_idle and not self._running:
+                        return
+                    await self._wait(None if until_idle else self.poll_seconds)
+                    continue
+                need = job.get("memory_estimate")
+                if need is None:
+                    need = await asyncio.to_thread(self.estimate, job)
+                    job["memory_estimate"] = need
+                if not self._admits(need):
+                    if self.job_store.cancel_requested(job["id"]):
+                        logger.info("Job %s cancelled while waiting for memory", job["id"])
+                        self.job_store.finish(job["id"], CANCELLED)
+                        continue
+                    # Hold the job (it keeps its place) until memory frees up;
+                    # re-check memory and cancellation every poll
+                    self._held = job
+                    await self._wait(self.poll_seconds)
+                    continue
+                self._start(job, need)
+        finally:
+            # A held or running job stays "running" in the store and is
+            # re-queued when the store is next opened
+            if not until_idle:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, job: Dict[str, Any], need: int) -> None:
+        self._running[job["id"]] = need
+        self.peak_concurrency = max(self.peak_concurrency, len(self._running))
+        logger.info(
+            "Job %s started (est. %d MB, %d running, %d/%d MB reserved)",
+            job["id"], need // _MB, len(self._running), self.reserved_bytes // _MB, self.budget_bytes // _MB,
+        )
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(loop.run_in_executor(self._executor, self.run_job, job))
+        self._tasks.add(task)
+        task.add_done_callback(lambda t, job_id=job["id"]: self._finished(t, job_id))
+
+    def _finished(self, task: "asyncio.Future", job_id: str) -> None:
+        self._tasks.discard(task)
+        self._running.pop(job_id, None)
+        self.completed += 1
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Job %s worker error: %s", job_id, task.exception())
+        self._done.set()
+
+    async def _wait(self, timeout: Optional[float]) -> None:
+        """Wait for a running job to finish (or *timeout*)."""
+        self._done.clear()
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "running": len(self._running),
+            "reserved_mb": self.reserved_bytes // _MB,
+            "budget_mb": self.budget_bytes // _MB,
+            "waiting_for_memory": self._held["id"] if self._held else None,
+            "completed": self.completed,
+            "peak_concurrency": self.peak_concurrency,
+        }
+
+
+def create_worker_pool(
+    job_store: "JobStore",
+    config: "EdgeConfig",
+    run_job: Callable[[Dict[str, Any]], None],
+    *,
+    poll_seconds: float = 2.0,
+) -> JobWorkerPool:
+    """Build (and register for ``get_worker_pool``) a pool from *config*."""
+    pool = JobWorkerPool(
+        job_store,
+        run_job,
+        max_workers=config.job_workers,
+        budget_bytes=memory_budget(config),
+        estimate=lambda job: estimate_job_memory(job, config),
+        poll_seconds=poll_seconds,
+    )
+    _POOLS[id(job_store)] = pool
+    logger.info("Job worker pool: %d workers, %d MB budget", pool.max_workers, pool.budget_bytes // _MB)
+    return pool
+
+
+def get_worker_pool(job_store: "JobStore") -> Optional[JobWorkerPool]:
+    """The pool draining *job_store*, if one was created."""
+    return _POOLS.get(id(job_store))
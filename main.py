@@ -8,6 +8,10 @@ Dual-mode processing:
   module and processes raw files through the same pipeline.
 - **both**: Both modes run concurrently.
 
+With ``tail_follow_enabled``, the raw file the EK80 is still writing is
+followed and batched like realtime data; its ``rawfileadded`` event is
+then ignored.
+
 On-demand C2D commands are always available for manual triggers and
 status queries.
 
@@ -47,12 +51,18 @@ for _noisy in ("azure", "adlfs", "distributed", "dask", "fsspec", "zarr", "urlli
 async def async_main() -> None:
     """Async entry point — sets up IoT Hub client, config, and mode dispatcher."""
     from azure_handler import create_client, create_storage
+    from azure_handler.reported_properties import (
+        report_properties, start_reported_properties, stop_reported_properties,
+    )
+    from azure_handler.telemetry_sender import start_telemetry_sender, stop_telemetry_sender
     from config import EdgeConfig
-    from ingest.file_trigger import handle_raw_file_added, parse_input_message
+    from ingest.file_trigger import FileTriggerScheduler, parse_input_message
+    from ingest.job_store import JobStore
     from ingest.on_demand import handle_c2d_command, job_worker
     from ingest.realtime import RealtimeIngestion
+    from ingest.tail_follow import RawTailIngestion
     from process.segment_store import SegmentStore
-    from process.pipeline import process_echodata
+    from process.pipeline import flush_realtime_nasc, process_echodata
 
     # --- IoT Hub client ---
     client = create_client()
@@ -65,6 +75,10 @@ async def async_main() -> None:
     logging.getLogger("oceanstream").setLevel(getattr(logging, config.log_level.upper(), logging.INFO))
     logger.info("Config loaded: mode=%s, sonar=%s, gpu=%s", config.processing_mode, config.sonar_model, config.use_gpu)
 
+    # --- Batched background telemetry + coalesced twin reporting ---
+    start_telemetry_sender(client, config)
+    start_reported_properties(client, config)
+
     # Log GPU status
     try:
         from echopype.utils.gpu import has_cuda
@@ -87,40 +101,59 @@ async def async_main() -> None:
         config.storage_backend, config.campaign_container,
     )
 
-    # --- Job queue for on-demand processing ---
-    job_queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+    # --- Persistent job store for on-demand processing ---
+    # Jobs interrupted by a restart are re-queued when the store opens.
+    job_store = JobStore.from_config(config)
 
     # Capture the running loop for thread-safe callback scheduling.
     # Azure IoT SDK callbacks run on SDK worker threads, not the asyncio
     # event loop thread — we must use call_soon_threadsafe.
     loop = asyncio.get_running_loop()
 
+    # --- rawfileadded scheduling ---
+    file_scheduler = FileTriggerScheduler(config, segment_store, client)
+
     # --- Twin update handler ---
+    # Runs on the SDK callback thread: the echo back to reported
+    # properties is only merged here and written by the aggregator.
     def on_twin_update(patch):
         nonlocal config
         logger.info("Twin patch received: %s", list(patch.keys()))
         config.update_from_twin(patch)
         try:
-            client.patch_twin_reported_properties(patch)
+            report_properties(client, patch)
         except Exception as e:
             logger.error("Failed to report twin: %s", e)
 
     client.on_twin_desired_properties_patch_received = on_twin_update
 
+    async def on_batch(echodata, cfg):
+        await process_echodata(echodata, cfg, segment_store, client)
+
+    # End of a stream: save the NASC distance bin still held open
+    def on_flush(cfg):
+        flush_realtime_nasc(cfg, segment_store)
+
+    # --- Tail-following of raw files still being written ---
+    tail: RawTailIngestion | None = None
+    if config.tail_follow_enabled and config.tail_follow_dir:
+        tail = RawTailIngestion(config, on_batch=on_batch, on_flush=on_flush)
+
     # --- File trigger handler (rawfileadded input) ---
     def on_message(message):
         if message.input_name == "rawfileadded":
             data = parse_input_message(message)
-            if data.get("event") == "fileadd":
-                loop.call_soon_threadsafe(
-                    loop.create_task,
-                    handle_raw_file_added(data, config, segment_store, client),
-                )
+            if data.get("event") != "fileadd":
+                return
+            if tail is not None and tail.claim(data.get("file_added_path", "")):
+                logger.info("Skipping %s — already ingested by tail-follow", data.get("file_added_path"))
+                return
+            loop.call_soon_threadsafe(file_scheduler.submit, data)
         elif message.input_name == "c2d":
             data = parse_input_message(message)
             loop.call_soon_threadsafe(
                 loop.create_task,
-                handle_c2d_command(data, config, segment_store, client, job_queue),
+                handle_c2d_command(data, config, segment_store, client, job_store),
             )
 
     client.on_message_received = on_message
@@ -128,17 +161,19 @@ async def async_main() -> None:
     # --- Start background tasks ---
     tasks = []
 
+    # File trigger scheduler (debounced, bounded, merging small files)
+    tasks.append(asyncio.create_task(file_scheduler.run()))
+
     # Job worker (always active)
-    tasks.append(asyncio.create_task(job_worker(job_queue, config, segment_store, client)))
+    tasks.append(asyncio.create_task(job_worker(job_store, config, segment_store, client)))
 
     # Real-time ingestion (if enabled)
     realtime: RealtimeIngestion | None = None
     if config.processing_mode in ("realtime", "both"):
-        async def on_batch(echodata, cfg):
-            await process_echodata(echodata, cfg, segment_store, client)
-
-        realtime = RealtimeIngestion(config, on_batch=on_batch)
+        realtime = RealtimeIngestion(config, on_batch=on_batch, on_flush=on_flush)
         await realtime.start()
+    if tail is not None:
+        await tail.start()
 
     logger.info("Module started — mode=%s, waiting for events...", config.processing_mode)
 
@@ -158,6 +193,9 @@ async def async_main() -> None:
     logger.info("Shutting down...")
     if realtime:
         await realtime.stop()
+    if tail:
+        await tail.stop()
+    await file_scheduler.stop()
 
     for task in tasks:
         task.cancel()
@@ -165,7 +203,14 @@ async def async_main() -> None:
             await task
         except asyncio.CancelledError:
             pass
-
+    # A job cancelled mid-run stays "running" and is resumed next start
+    job_store.close()
+    if config.execution_backend == "dask":
+        from process.dask_backend import close_dask_client
+        close_dask_client()
+
+    stop_reported_properties(client)
+    stop_telemetry_sender(client)
     client.shutdown()
     logger.info("Module stopped")
 
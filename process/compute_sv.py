@@ -24,6 +24,7 @@ def compute_sv(
     encode_mode: str = "power",
     use_gpu: bool = True,
     depth_offset: float = 0.0,
+    drop_empty_pings: bool = True,
 ) -> xr.Dataset:
     """Compute Sv from EchoData with optional GPU acceleration.
 
@@ -40,6 +41,9 @@ def compute_sv(
         ``"auto"``).
     depth_offset
         Transducer depth offset in metres.
+    drop_empty_pings
+        Drop pings whose Sv is all NaN.  Merged batches keep them so
+        each file's pings stay at their offsets in the combined data.
 
     Returns
     -------
@@ -92,6 +96,7 @@ def compute_sv(
         logger.debug("Split-beam angle not available: %s", e)
 
     # Drop all-NaN pings
-    ds_sv = ds_sv.dropna(dim="ping_time", how="all", subset=["Sv"])
+    if drop_empty_pings:
+        ds_sv = ds_sv.dropna(dim="ping_time", how="all", subset=["Sv"])
 
     return ds_sv
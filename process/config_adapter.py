@@ -11,14 +11,18 @@ from oceanstream.echodata.config import DenoiseConfig, MVBSConfig, NASCConfig
 
 
 def to_denoise_config(cfg: "EdgeConfig") -> DenoiseConfig:
-    """Convert edge config denoise fields to a ``DenoiseConfig``."""
+    """Convert edge config denoise fields to a ``DenoiseConfig``.
+
+    The methods to run on the Numba CPU kernels ride along as a
+    ``cpu_kernels`` attribute (``DenoiseConfig`` has no such field).
+    """
     methods = [m.strip() for m in cfg.denoise_methods.split(",") if m.strip()]
     ping_lags = [int(x.strip()) for x in cfg.impulse_ping_lags.split(",") if x.strip()]
 
     noise_max = cfg.background_noise_max if cfg.background_noise_max > -999.0 else None
     pulse_length = cfg.denoise_pulse_length if cfg.denoise_pulse_length else None
 
-    return DenoiseConfig(
+    config = DenoiseConfig(
         methods=methods,
         use_frequency_specific=cfg.denoise_use_frequency_specific,
         pulse_length=pulse_length,
@@ -46,6 +50,8 @@ def to_denoise_config(cfg: "EdgeConfig") -> DenoiseConfig:
         attenuation_lower_limit=cfg.attenuation_lower_limit,
         attenuation_side_pings=cfg.attenuation_side_pings,
     )
+    config.cpu_kernels = tuple(m.strip() for m in cfg.denoise_cpu_kernels.split(",") if m.strip())
+    return config
 
 
 def to_mvbs_config(cfg: "EdgeConfig") -> MVBSConfig:
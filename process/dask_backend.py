@@ -0,0 +1,219 @@
+"""Dask-distributed execution backend for the file pipeline.
+
+With ``execution_backend = "dask"``, ``process_raw_file_pipeline`` does
+not run a file in-process: it submits one task per stage to a dask
+cluster — a ``LocalCluster`` on this host, or the scheduler at
+``dask_scheduler_address`` for shore-side reprocessing across machines —
+and awaits the last one::
+
+    sv (convert + Sv) ─ denoise ─ seabed ─ mvbs ─ nasc ─ acoustic_summary ─ echograms ─ finish
+
+Tasks exchange only small dicts.  Each stage reads its inputs from and
+writes its outputs to the storage backend (through
+``reprocess_products``, the same code that re-runs stages of stored
+segments), so a worker only touches the stores of the stage it runs and
+arrays never travel through the scheduler.  Stages are idempotent —
+outputs are overwritten — so a failed or lost task is simply retried
+(``dask_retries``).
+
+Stages of one file run in order (each rewrites the file's
+``metadata.json``); files run concurrently.  Workers must see the raw
+files and, for local storage, the output directory at the same paths.
+Tasks carry a storage *spec* (``azure_handler.storage.storage_spec``)
+and rebuild the backend on the worker, never a live SDK client.
+
+The parent awaits the stages one by one, reporting ``progress`` between
+them (a cancellation raised there cancels the remaining tasks), and
+publishes the file's result — telemetry, acoustic summary message —
+as the in-process pipeline does.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+if TYPE_CHECKING:
+    from azure_handler.storage import StorageBackend
+    from config import EdgeConfig
+
+logger = logging.getLogger("oceanstream")
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+# Stage result entries passed on to the file result
+_CARRIED_KEYS = (
+    "nasc", "echogram_files", "daily_echogram_files", "acoustic_summary_path", "acoustic_summary_bytes",
+)
+
+
+def get_dask_client(config: "EdgeConfig"):
+    """Return the shared dask client, connecting (or starting a LocalCluster) once."""
+    global _CLIENT
+    from dask.distributed import Client, LocalCluster
+
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            if config.dask_scheduler_address:
+                _CLIENT = Client(config.dask_scheduler_address)
+                logger.info("Dask backend: scheduler %s", config.dask_scheduler_address)
+            else:
+                workers = config.dask_workers or os.cpu_count() or 1
+                _CLIENT = Client(LocalCluster(n_workers=workers, threads_per_worker=1))
+                logger.info("Dask backend: LocalCluster with %d workers", workers)
+        return _CLIENT
+
+
+def close_dask_client() -> None:
+    """Close the shared client (and its LocalCluster, if it started one)."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is not None:
+            cluster = _CLIENT.cluster
+            _CLIENT.close()
+            if cluster is not None:
+                cluster.close()
+            _CLIENT = None
+
+
+async def run_file_on_dask(
+    file_path: str,
+    config: "EdgeConfig",
+    storage: "StorageBackend",
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> Dict[str, Any]:
+    """Submit *file_path*'s stage tasks and await the file's result.
+
+    *progress* is called as ``progress(fraction, stage)`` before each
+    stage's result is awaited; an exception it raises cancels the
+    file's remaining tasks and propagates.
+    """
+    from azure_handler.storage import storage_spec
+    from process.reprocess import STAGES, enabled_stages
+
+    # The synchronous client runs its own loop thread; create it off this loop
+    client = await asyncio.to_thread(get_dask_client, config)
+    stem = Path(file_path).stem
+    token = f"{stem}-{time.time_ns()}"
+    enabled = enabled_stages(config)
+    spec = storage_spec(storage)
+
+    future = client.submit(
+        _sv_task, file_path, config, spec,
+        key=f"sv-{token}", retries=config.dask_retries, pure=False,
+    )
+    chain = [("sv", future)]
+    for stage in STAGES:
+        if enabled[stage]:
+            future = client.submit(
+                _stage_task, future, stage, config, spec,
+                key=f"{stage}-{token}", retries=config.dask_retries, pure=False,
+            )
+            chain.append((stage, future))
+    future = client.submit(
+        _finish_task, future, spec,
+        key=f"finish-{token}", retries=config.dask_retries, pure=False,
+    )
+    chain.append(("finish", future))
+
+    try:
+        for i, (stage, stage_future) in enumerate(chain):
+            if progress is not None:
+                progress(i / len(chain), stage)
+            result = await asyncio.to_thread(stage_future.result)
+    except BaseException:
+        await asyncio.to_thread(client.cancel, [f for _, f in chain])
+        raise
+    return result
+
+
+def _sv_task(file_path: str, config: "EdgeConfig", spec: Dict[str, str]) -> Dict[str, Any]:
+    """Convert the raw file, compute Sv and save ``sv.zarr``."""
+    from azure_handler.storage import storage_from_spec
+    from process.compute_sv import compute_sv
+    from process.pipeline import _convert_and_store, _stored_sv_summary
+    from process.segment_store import SegmentStore
+
+    start = time.time()
+    storage = storage_from_spec(spec)
+    stem = Path(file_path).stem
+    segment_store = SegmentStore(
+        storage, container=config.campaign_container, processed_subfolder=config.processed_container,
+    )
+    echodata, echodata_path = _convert_and_store(file_path, config, segment_store)
+    ds_sv = compute_sv(
+        echodata,
+        waveform_mode=config.waveform_mode,
+        encode_mode=config.encode_mode,
+        use_gpu=config.use_gpu,
+        depth_offset=config.depth_offset,
+    )
+    del echodata
+    if ds_sv.sizes.get("ping_time", 0) == 0:
+        return {"status": "skipped", "reason": "no valid pings", "source_file": Path(file_path).name}
+
+    prefix = f"{config.campaign_container}/{config.processed_container}/{stem}"
+    storage.save_zarr(ds_sv, f"{prefix}/sv.zarr")
+    return {
+        "status": "ok",
+        "source_file": Path(file_path).name,
+        "echodata_path": echodata_path,
+        "prefix": prefix,
+        "echogram_prefix": f"{config.campaign_container}/{config.echogram_container}/{stem}",
+        "summary": _stored_sv_summary(storage, prefix, stem),
+        "stages_run": [],
+        "started": start,
+    }
+
+
+def _stage_task(
+    upstream: Dict[str, Any],
+    stage: str,
+    config: "EdgeConfig",
+    spec: Dict[str, str],
+) -> Dict[str, Any]:
+    """Run one post-Sv stage from the file's stored products."""
+    from azure_handler.storage import storage_from_spec
+    from process.reprocess import reprocess_products
+
+    if upstream["status"] != "ok":
+        return upstream
+    result = asyncio.run(reprocess_products(
+        upstream["prefix"], upstream["echogram_prefix"], date.fromisoformat(upstream["summary"]["day"]),
+        [stage], config, storage_from_spec(spec), force=True, cascade=False,
+    ))
+    out = dict(upstream)
+    out["stages_run"] = upstream["stages_run"] + result["stages_run"]
+    for key in _CARRIED_KEYS:
+        if key in result:
+            out[key] = result[key]
+    return out
+
+
+def _finish_task(upstream: Dict[str, Any], spec: Dict[str, str]) -> Dict[str, Any]:
+    """Assemble the file result (as ``process_raw_file_pipeline`` returns it)."""
+    from azure_handler.storage import storage_from_spec
+    from process.pipeline import _complete_stored_result
+
+    if upstream["status"] != "ok":
+        return upstream
+    result: Dict[str, Any] = {"stages_run": upstream["stages_run"]}
+    for stage in upstream["stages_run"]:
+        result[stage] = "ok"
+    for key in _CARRIED_KEYS:
+        if key in upstream:
+            result[key] = upstream[key]
+    _complete_stored_result(storage_from_spec(spec), upstream["prefix"], upstream["summary"], result)
+    result.update(
+        source_file=upstream["source_file"],
+        echodata_path=upstream["echodata_path"],
+        total_time_ms=int((time.time() - upstream["started"]) * 1000),
+    )
+    return result
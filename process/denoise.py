@@ -3,6 +3,13 @@
 Wraps ``oceanstream.echodata.denoise.apply_denoising`` which supports
 four methods: background, transient, impulse, and attenuation signal
 removal — all configurable via ``DenoiseConfig``.
+
+Methods listed in the config's ``cpu_kernels`` (set by
+``to_denoise_config`` from ``denoise_cpu_kernels``) build their masks
+with the Numba kernels of ``process.denoise_kernels`` instead; the rest
+of the pipeline — per-channel (frequency-specific) parameters, OR-ed
+stage masks, the ``noise_mask`` variable — is unchanged.  Without numba
+every method uses oceanstream.
 """
 
 from __future__ import annotations
@@ -10,6 +17,7 @@ from __future__ import annotations
 import logging
 from typing import TYPE_CHECKING, Optional
 
+import numpy as np
 import xarray as xr
 
 if TYPE_CHECKING:
@@ -17,6 +25,8 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("oceanstream")
 
+_DEFAULT_METHODS = ["background", "transient", "impulse", "attenuation"]
+
 
 def denoise(
     ds_sv: xr.Dataset,
@@ -38,16 +48,92 @@ def denoise(
     xr.Dataset
         Denoised Sv dataset.
     """
-    from oceanstream.echodata.denoise import apply_denoising
+    from process.denoise_kernels import HAVE_NUMBA
 
     methods = config.methods if config else None
-    logger.info("Denoising (methods=%s)", methods or "default")
+    kernels = set(getattr(config, "cpu_kernels", ()) or ()).intersection(methods or _DEFAULT_METHODS)
+    if kernels and not HAVE_NUMBA:
+        logger.debug("numba not installed — denoising without CPU kernels")
+        kernels = set()
+    logger.info("Denoising (methods=%s, cpu_kernels=%s)", methods or "default", sorted(kernels) or "none")
 
-    ds_denoised = apply_denoising(
-        ds_sv,
-        methods=methods,
-        config=config,
-    )
+    if kernels:
+        ds_denoised = _denoise_with_kernels(ds_sv, methods or list(_DEFAULT_METHODS), config, kernels)
+    else:
+        from oceanstream.echodata.denoise import apply_denoising
+        ds_denoised = apply_denoising(
+            ds_sv,
+            methods=methods,
+            config=config,
+        )
 
     logger.info("Denoising complete")
     return ds_denoised
+
+
+def _denoise_with_kernels(
+    ds_sv: xr.Dataset,
+    methods: list,
+    config: Optional["DenoiseConfig"],
+    kernels: set,
+) -> xr.Dataset:
+    """``apply_denoising`` with the *kernels* methods on the CPU kernels."""
+    from oceanstream.echodata.denoise import (
+        attenuation_mask, background_noise_mask, impulse_noise_mask, transient_noise_mask,
+    )
+    from process.denoise_kernels import KERNELS
+
+    if config is None:
+        from oceanstream.echodata.config import DenoiseConfig
+        config = DenoiseConfig()
+    reference = {
+        "background": background_noise_mask,
+        "transient": transient_noise_mask,
+        "impulse": impulse_noise_mask,
+        "attenuation": attenuation_mask,
+    }
+
+    sv = ds_sv["Sv"].transpose("channel", "ping_time", ...)
+    mask = np.zeros(sv.shape, dtype=bool)
+    missing = np.isnan(sv.values)
+
+    for ch in range(sv.sizes["channel"]):
+        ch_ds = ds_sv.isel(channel=ch)
+        frequency_hz = None
+        if "frequency_nominal" in ch_ds.coords:
+            frequency_hz = float(ch_ds["frequency_nominal"].values)
+
+        for method in methods:
+            if method not in reference:
+                logger.warning("Unknown method %s, skipping", method)
+                continue
+            if config.use_frequency_specific and frequency_hz is not None:
+                params = config.get_params_for_frequency(frequency_hz, method)
+            else:
+                params = getattr(config, f"to_{method}_params")()
+            try:
+                stage = KERNELS[method](ch_ds, params) if method in kernels else None
+                if stage is None:
+                    stage = reference[method](ch_ds, params)
+                    if isinstance(stage, (tuple, list)):
+                        stage = stage[0]
+                    if stage is None:
+                        continue
+                    ref = sv.isel(channel=ch)
+                    stage = stage.broadcast_like(ref).transpose(*ref.dims).values.astype(bool)
+                # Only mask where data is valid
+                mask[ch] |= stage & ~missing[ch]
+            except Exception as e:
+                logger.warning("Error computing %s mask for channel %d: %s", method, ch, e)
+
+    logger.info("Combined mask: %.1f%% flagged as noise", float(mask.mean()) * 100)
+    noise_mask = xr.DataArray(
+        mask, dims=sv.dims, coords={d: sv[d] for d in sv.dims if d in sv.coords}, name="combined_mask",
+    ).transpose(*ds_sv["Sv"].dims)
+
+    denoised = ds_sv.copy()
+    denoised["Sv"] = ds_sv["Sv"].where(~noise_mask)
+    denoised["noise_mask"] = noise_mask
+    denoised.attrs["denoising_methods"] = methods
+    denoised.attrs["denoising_applied"] = True
+    return denoised
@@ -0,0 +1,410 @@
+"""Numba CPU kernels for the four denoise masks.
+
+``apply_denoising`` builds each method's mask with xarray rolling,
+coarsen and interp calls, which dominate the denoise time on the CPU.
+The kernels here compute the same masks in compiled loops over the
+``(ping_time, range_sample)`` array of one channel:
+
+- ``background`` — TVG-flattened block means, per-ping-block noise floor
+  and SNR test over one power array (De Robertis & Higginbottom, 2007).
+- ``transient`` — running ping median per sample over a sorted window
+  buffer.
+- ``impulse`` — dB means over vertical bins and the lag tests in one
+  pass.
+- ``attenuation`` — band mean per ping and a running median of it.
+
+Each ``*_mask(ds, params)`` takes the same single-channel dataset and
+parameter dict as the oceanstream function of that method — with the
+same defaults and the same lookup of the range variable — and returns a
+bool array (``True`` = noise), or ``None`` for parameters or layouts it
+does not cover (e.g. ``range_window="auto"``); the caller then uses the
+oceanstream function.  Masks match up to floating-point summation order
+(``test/test_denoise_kernels.py``; ``test/bench_denoise_kernels.py``
+times them).
+
+Numba is optional and the kernels are opt-in (``denoise_cpu_kernels``):
+without numba ``HAVE_NUMBA`` is false and denoising keeps the
+oceanstream path.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import xarray as xr
+
+try:
+    import numba
+except ImportError:  # optional
+    numba = None
+
+logger = logging.getLogger("oceanstream")
+
+HAVE_NUMBA = numba is not None
+
+
+def _njit(func: Callable) -> Callable:
+    """Compile *func* (cached, GIL released) when numba is available."""
+    if numba is None:
+        return func
+    return numba.njit(cache=True, nogil=True)(func)
+
+
+# --- Shared kernels ---
+
+@_njit
+def _rolling_median(x, window, min_periods, out):
+    """Centred running median of *x* ignoring NaN (as xarray ``rolling().median()``).
+
+    The window of index ``i`` is ``[i - window // 2, i + window - 1 - window // 2]``
+    clipped to the array; fewer than *min_periods* finite values give NaN.
+    """
+    n = x.shape[0]
+    half = window // 2
+    buf = np.empty(window)
+    k = 0
+    lo_prev = 0
+    hi_prev = -1
+    for i in range(n):
+        lo = max(0, i - half)
+        hi = min(n - 1, i + window - 1 - half)
+        for t in range(hi_prev + 1, hi + 1):
+            v = x[t]
+            if v == v:
+                j = k
+                while j > 0 and buf[j - 1] > v:
+                    buf[j] = buf[j - 1]
+                    j -= 1
+                buf[j] = v
+                k += 1
+        for t in range(lo_prev, lo):
+            v = x[t]
+            if v == v:
+                j = 0
+                while buf[j] != v:
+                    j += 1
+                for s in range(j, k - 1):
+                    buf[s] = buf[s + 1]
+                k -= 1
+        lo_prev = lo
+        hi_prev = hi
+        if k > 0 and k >= min_periods:
+            if k % 2 == 1:
+                out[i] = buf[k // 2]
+            else:
+                out[i] = (buf[k // 2 - 1] + buf[k // 2]) / 2.0
+        else:
+            out[i] = np.nan
+
+
+def _nearest_index(x: np.ndarray, x_new: np.ndarray, *, clip: bool) -> np.ndarray:
+    """Index of the nearest *x* for each *x_new* (as scipy ``interp1d(kind="nearest")``).
+
+    Ties go to the lower neighbour.  Without *clip*, points outside
+    ``[x[0], x[-1]]`` get ``-1``.
+    """
+    mids = (x[1:] + x[:-1]) / 2.0
+    idx = np.clip(np.searchsorted(mids, x_new, side="left"), 0, len(x) - 1)
+    if not clip:
+        idx[(x_new < x[0]) | (x_new > x[-1])] = -1
+    return idx
+
+
+def _range_dim(ds: xr.Dataset) -> str:
+    """Vertical dimension (background / attenuation lookup)."""
+    for dim in ("range_sample", "depth", "echo_range"):
+        if dim in ds.dims:
+            return dim
+    return [d for d in ds["Sv"].dims if d not in ("channel", "ping_time")][0]
+
+
+def _meters(ds: xr.Dataset, order) -> Optional[xr.DataArray]:
+    """First of *order* (``(name, "data"|"coord")`` pairs) present in *ds*."""
+    for name, kind in order:
+        if (ds.data_vars if kind == "data" else ds.coords).get(name) is not None:
+            return ds[name]
+    return None
+
+
+def _grid(ds: xr.Dataset, values: xr.DataArray) -> np.ndarray:
+    """*values* broadcast to the ``(ping_time, range)`` layout of ``Sv``."""
+    sv = ds["Sv"]
+    return np.ascontiguousarray(values.broadcast_like(sv).transpose(*sv.dims).values, dtype=np.float64)
+
+
+def _sv(ds: xr.Dataset) -> Optional[np.ndarray]:
+    sv = ds["Sv"]
+    if sv.ndim != 2 or sv.dims[0] != "ping_time":
+        return None
+    return np.ascontiguousarray(sv.values, dtype=np.float64)
+
+
+def _db(value: Any) -> float:
+    if isinstance(value, str):
+        return float(value.replace("dB", "").strip())
+    return float(value)
+
+
+# --- Background noise (De Robertis & Higginbottom, 2007) ---
+
+@_njit
+def _background_kernel(sv, rng, alpha, ping_window, range_window, noise_max, snr_threshold, ping_block):
+    n, m = sv.shape
+    n_pb = (n + ping_window - 1) // ping_window
+    n_rb = (m + range_window - 1) // range_window
+
+    # TVG-flattened linear power (NaN where Sv or range is invalid)
+    power = np.empty((n, m))
+    for i in range(n):
+        for j in range(m):
+            r = rng[i, j]
+            if r > 0:
+                power[i, j] = 10.0 ** ((sv[i, j] - (20.0 * np.log10(r) + 2.0 * alpha * r)) / 10.0)
+            else:
+                power[i, j] = np.nan
+
+    # Noise floor per ping block: quietest block mean over range
+    noise_lin = np.empty(n_pb)
+    for pb in range(n_pb):
+        best = np.nan
+        for rb in range(n_rb):
+            total = 0.0
+            count = 0
+            for i in range(pb * ping_window, min(n, (pb + 1) * ping_window)):
+                for j in range(rb * range_window, min(m, (rb + 1) * range_window)):
+                    p = power[i, j]
+                    if p == p:
+                        total += p
+                        count += 1
+            if count > 0:
+                mean = total / count
+                if mean > 0:
+                    db = 10.0 * np.log10(mean)
+                    if not (db >= best):
+                        best = db
+        if not (best < noise_max):
+            best = noise_max
+        noise_lin[pb] = 10.0 ** (best / 10.0)
+
+    # SNR test (samples without Sv are never flagged)
+    mask = np.zeros((n, m), dtype=np.bool_)
+    for i in range(n):
+        noise = noise_lin[ping_block[i]]
+        noise_db = 10.0 * np.log10(noise if noise > 0 else 1e-30)
+        for j in range(m):
+            if sv[i, j] != sv[i, j]:
+                continue
+            excess = power[i, j] - noise
+            if not (excess > 0):
+                mask[i, j] = True
+            elif 10.0 * np.log10(excess) - noise_db < snr_threshold:
+                mask[i, j] = True
+    return mask
+
+
+def background_mask(ds: xr.Dataset, params: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Kernel version of ``background_noise_mask``."""
+    sv = _sv(ds)
+    range_window = params.get("range_window", 20)
+    ping_window = params.get("ping_window", 50)
+    if sv is None or isinstance(range_window, str) or "range_coord" in params:
+        return None
+    values = _meters(ds, [("echo_range", "data"), ("echo_range", "coord"), ("depth", "coord"), ("depth", "data")])
+    if values is None:
+        return None
+    n_blocks = math.ceil(sv.shape[0] / ping_window)
+    if n_blocks < 2:
+        return None
+    anchors = ping_window * np.arange(n_blocks, dtype=np.float64)
+    ping_block = _nearest_index(anchors, np.arange(sv.shape[0], dtype=np.float64), clip=True)
+    return _background_kernel(
+        sv, _grid(ds, values),
+        float(params.get("sound_absorption", 0.001)), int(ping_window), int(range_window),
+        _db(params.get("background_noise_max", "-125.0dB")), _db(params.get("SNR_threshold", "3.0dB")),
+        ping_block,
+    )
+
+
+# --- Transient noise (Fielding et al.) ---
+
+@_njit
+def _transient_kernel(sv_t, rng_t, exclude_above, n_pings, threshold):
+    """*sv_t*/*rng_t* are ``(range, ping)``; returns the mask in the same layout."""
+    m, n = sv_t.shape
+    mask = np.zeros((m, n), dtype=np.bool_)
+    col = np.empty(n)
+    med = np.empty(n)
+    for j in range(m):
+        any_deep = False
+        for i in range(n):
+            if rng_t[j, i] > exclude_above:
+                col[i] = sv_t[j, i]
+                any_deep = True
+            else:
+                col[i] = np.nan
+        if not any_deep:
+            continue
+        _rolling_median(col, n_pings, n_pings // 2, med)
+        for i in range(n):
+            if col[i] - med[i] > threshold:
+                mask[j, i] = True
+    return mask
+
+
+def _vertical_coord(ds: xr.Dataset):
+    """``(name, values)`` of the vertical coordinate (transient / impulse lookup)."""
+    if "depth" in ds.dims or "depth" in ds.coords:
+        name = "depth"
+    elif "echo_range" in ds.dims or "echo_range" in ds.coords:
+        name = "echo_range"
+    elif "range_sample" in ds.dims:
+        name = "range_sample"
+    else:
+        name = "echo_range"
+    if name in ds.coords:
+        return name, ds[name]
+    if "echo_range" in ds.coords:
+        return "echo_range", ds["echo_range"]
+    return name, None
+
+
+def transient_mask(ds: xr.Dataset, params: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Kernel version of ``transient_noise_mask``."""
+    sv = _sv(ds)
+    n_pings = int(params.get("n_pings", 20))
+    exclude_above = float(params.get("exclude_above", 250.0))
+    _, values = _vertical_coord(ds)
+    if sv is None or values is None or n_pings < 2:
+        return None
+    if math.ceil((float(values.max()) - exclude_above) / float(params.get("depth_bin", 5.0))) <= 0:
+        return np.zeros(sv.shape, dtype=bool)
+    rng = _grid(ds, values)
+    mask_t = _transient_kernel(
+        np.ascontiguousarray(sv.T), np.ascontiguousarray(rng.T),
+        exclude_above, n_pings, float(params.get("thr_dB", 6.0)),
+    )
+    return np.ascontiguousarray(mask_t.T)
+
+
+# --- Impulse noise (multi-lag) ---
+
+@_njit
+def _impulse_kernel(sv, bin_size, lags, threshold):
+    """Lag tests on *bin_size*-sample dB means; rows before the largest lag stay False."""
+    n, m = sv.shape
+    nb = m // bin_size
+    binned = np.empty((n, nb))
+    for i in range(n):
+        for b in range(nb):
+            total = 0.0
+            count = 0
+            for j in range(b * bin_size, (b + 1) * bin_size):
+                v = sv[i, j]
+                if v == v:
+                    total += v
+                    count += 1
+            binned[i, b] = total / count if count > 0 else np.nan
+
+    max_lag = 0
+    for lag in lags:
+        max_lag = max(max_lag, lag)
+    mask = np.zeros((n, nb), dtype=np.bool_)
+    work = np.empty(max_lag + 1)
+    for i in range(max_lag, n):
+        for b in range(nb):
+            for lag in lags:
+                if not (binned[i - lag, b] - binned[i, b] > threshold):
+                    continue
+                # lag-th order forward difference, as repeated first differences
+                for t in range(lag + 1):
+                    work[t] = binned[i - lag + t, b]
+                for order in range(lag):
+                    for t in range(lag, order, -1):
+                        work[t] = work[t] - work[t - 1]
+                if work[lag] > threshold:
+                    mask[i, b] = True
+                    break
+    return mask
+
+
+def impulse_mask(ds: xr.Dataset, params: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Kernel version of ``impulse_noise_mask``."""
+    sv = _sv(ds)
+    name, values = _vertical_coord(ds)
+    lags = [int(lag) for lag in params.get("ping_lags", [1])]
+    if sv is None or values is None or ds["Sv"].dims != ("ping_time", name) or not lags or min(lags) < 1:
+        return None
+    if max(lags) >= sv.shape[0]:
+        return None
+    vertical_bin = params.get("vertical_bin_size", 2.0)
+    if isinstance(vertical_bin, str):
+        vertical_bin = float(vertical_bin.replace("m", ""))
+
+    coord = values.values.astype(np.float64)
+    steps = np.diff(coord)
+    dz = float(np.nanmedian(steps)) if len(steps) > 0 else 0.1
+    bin_size = max(1, int(vertical_bin / abs(dz)))
+    binned = _impulse_kernel(sv, bin_size, np.array(lags, dtype=np.int64), float(params.get("threshold_db", 10.0)))
+    if bin_size == 1:
+        return binned
+
+    # Back to sample resolution: nearest bin centre, nothing outside the bins
+    nb = binned.shape[1]
+    if nb < 2:
+        return None
+    centres = np.nanmean(coord[: nb * bin_size].reshape(nb, bin_size), axis=1)
+    cols = _nearest_index(centres, coord, clip=False)
+    mask = np.zeros(sv.shape, dtype=bool)
+    inside = cols >= 0
+    mask[:, inside] = binned[:, cols[inside]]
+    return mask
+
+
+# --- Attenuated signal ---
+
+@_njit
+def _attenuation_kernel(sv, rng, upper, lower, side_pings, threshold):
+    n, m = sv.shape
+    band_mean = np.empty(n)
+    for i in range(n):
+        total = 0.0
+        count = 0
+        for j in range(m):
+            r = rng[i, j]
+            v = sv[i, j]
+            if r >= upper and r <= lower and v == v:
+                total += v
+                count += 1
+        band_mean[i] = total / count if count > 0 else np.nan
+    median = np.empty(n)
+    _rolling_median(band_mean, 2 * side_pings + 1, side_pings, median)
+    flagged = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        flagged[i] = median[i] - band_mean[i] > threshold
+    return flagged
+
+
+def attenuation_mask(ds: xr.Dataset, params: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Kernel version of ``attenuation_mask`` (whole pings are flagged)."""
+    sv = _sv(ds)
+    side_pings = int(params.get("num_side_pings", 15))
+    values = _meters(ds, [("echo_range", "data"), ("echo_range", "coord"), ("depth", "data"), ("depth", "coord")])
+    if sv is None or values is None or side_pings < 1 or _range_dim(ds) != ds["Sv"].dims[1]:
+        return None
+    flagged = _attenuation_kernel(
+        sv, _grid(ds, values),
+        float(params.get("upper_limit_sl", 180.0)), float(params.get("lower_limit_sl", 280.0)),
+        side_pings, float(params.get("threshold", 5.0)),
+    )
+    return np.repeat(flagged[:, None], sv.shape[1], axis=1)
+
+
+KERNELS: Dict[str, Callable[[xr.Dataset, Dict[str, Any]], Optional[np.ndarray]]] = {
+    "background": background_mask,
+    "transient": transient_mask,
+    "impulse": impulse_mask,
+    "attenuation": attenuation_mask,
+}
@@ -0,0 +1,252 @@
+"""Resume manifest for file-based runs.
+
+Records, per raw file, which pipeline stages have persisted their
+output, keyed by the file's content fingerprint and a per-stage config
+fingerprint.  A rerun (standalone after an interruption, or a repeated
+``rawfileadded`` event) then:
+
+- skips files whose required stages are all complete — the stored
+  result is reused for the report;
+- resumes files whose Sv was saved from ``sv.zarr`` (only the missing
+  stages run, through ``reprocess_products``);
+- re-opens the stored EchoData instead of converting again when only
+  conversion finished;
+- processes everything else from the raw file.
+
+A stage's fingerprint chains the file fingerprint with
+``stage_fingerprints(config)``, so a changed file or changed parameters
+invalidate the stage and everything downstream.  ``force`` stages are
+treated as incomplete, again with their downstream stages.
+
+The manifest is a small SQLite database next to the output (like the
+job store): each update is one transaction, so a crash never leaves it
+half-written, and standalone worker processes can update it
+concurrently.
+
+Stage order::
+
+    convert ─ sv ─ denoise ─ seabed ─┬─ mvbs ─── echograms ─┐
+                                     ├─ nasc                ├─ metadata
+                                     └─ acoustic_summary ───┘
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from process.reprocess import STAGES, _STAGE_INPUTS, enabled_stages, stage_fingerprints
+
+if TYPE_CHECKING:
+    from config import EdgeConfig
+
+logger = logging.getLogger("oceanstream")
+
+MANIFEST_STAGES = ("convert", "sv") + STAGES + ("metadata",)
+
+# Plans returned by ``RunManifest.plan``
+COMPLETE = "complete"      # nothing to do
+RESUME = "resume"          # re-run post-Sv stages from sv.zarr
+PROCESS = "process"        # full pipeline (possibly from stored EchoData)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    key               TEXT PRIMARY KEY,
+    file_fingerprint  TEXT NOT NULL,
+    stages            TEXT NOT NULL,
+    result            TEXT,
+    updated_at        REAL NOT NULL
+);
+"""
+
+
+def _inputs(stage: str) -> Tuple[str, ...]:
+    if stage == "convert":
+        return ()
+    if stage == "sv":
+        return ("convert",)
+    if stage == "metadata":
+        return ("sv",) + STAGES
+    return _STAGE_INPUTS[stage]
+
+
+def manifest_fingerprints(config: "EdgeConfig", file_fp: str) -> Dict[str, str]:
+    """Fingerprint of every manifest stage for one file under *config*."""
+    base = stage_fingerprints(config)
+    out = {"convert": hashlib.sha1(f"{file_fp}:{config.sonar_model}".encode()).hexdigest()[:16]}
+    for stage in ("sv",) + STAGES:
+        out[stage] = hashlib.sha1(f"{out['convert']}:{base[stage]}".encode()).hexdigest()[:16]
+    out["metadata"] = hashlib.sha1(json.dumps(out, sort_keys=True).encode()).hexdigest()[:16]
+    return out
+
+
+def required_stages(config: "EdgeConfig") -> List[str]:
+    """Stages a file needs under *config* (disabled stages are not required).
+
+    ``convert`` is not required: the stored EchoData only spares a
+    re-conversion when Sv itself is missing.
+    """
+    enabled = enabled_stages(config)
+    return ["sv"] + [s for s in STAGES if enabled[s]] + ["metadata"]
+
+
+def expand_force(stages: Iterable[str]) -> Set[str]:
+    """*stages* plus everything downstream of them (``"all"`` = every stage).
+
+    Raises ``ValueError`` for unknown stage names.
+    """
+    stages = set(stages)
+    if "all" in stages:
+        return set(MANIFEST_STAGES)
+    unknown = stages - set(MANIFEST_STAGES)
+    if unknown:
+        raise ValueError(f"unknown stages: {sorted(unknown)} (valid: {', '.join(MANIFEST_STAGES)})")
+    forced = set(stages)
+    changed = True
+    while changed:
+        changed = False
+        for stage in MANIFEST_STAGES:
+            if stage not in forced and forced.intersection(_inputs(stage)):
+                forced.add(stage)
+                changed = True
+    return forced
+
+
+def manifest_key(config: "EdgeConfig", file_path: str) -> str:
+    """Manifest key of a raw file: campaign container and file stem."""
+    return f"{config.campaign_container}/{Path(file_path).stem}"
+
+
+class RunManifest:
+    """SQLite-backed per-file stage completion record.
+
+    Parameters
+    ----------
+    path : Path
+        Database file (created if missing).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Worker processes share the file: wait on their transactions
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: "EdgeConfig") -> "RunManifest":
+        path = config.manifest_path or os.path.join(config.output_base_path, ".manifest.sqlite")
+        return cls(Path(path))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _row(self, key: str) -> Optional[sqlite3.Row]:
+        return self._db.execute("SELECT * FROM files WHERE key = ?", (key,)).fetchone()
+
+    def completed(self, key: str, file_fp: str, config: "EdgeConfig") -> Set[str]:
+        """Stages of *key* recorded with the current file and config."""
+        with self._lock:
+            row = self._row(key)
+        if row is None or row["file_fingerprint"] != file_fp:
+            return set()
+        stored = json.loads(row["stages"])
+        current = manifest_fingerprints(config, file_fp)
+        return {s for s, fp in stored.items() if current.get(s) == fp}
+
+    def plan(
+        self, key: str, file_fp: str, config: "EdgeConfig", force: Iterable[str] = (),
+    ) -> Tuple[str, List[str], Set[str]]:
+        """``(plan, pending stages, completed stages)`` for one file."""
+        required = required_stages(config)
+        done = self.completed(key, file_fp, config) - expand_force(force)
+        # A stage recorded after a failed upstream stage ran on the wrong input
+        done -= expand_force(s for s in required if s not in done)
+        pending = [s for s in required if s not in done]
+        if not pending:
+            return COMPLETE, pending, done
+        if "sv" in done:
+            return RESUME, pending, done
+        return PROCESS, pending, done
+
+    def record(self, key: str, file_fp: str, stage: str, config: "EdgeConfig") -> None:
+        """Mark *stage* of *key* complete (resetting the entry if the file changed)."""
+        fp = manifest_fingerprints(config, file_fp)[stage]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._row(key)
+                stages = {}
+                if row is not None and row["file_fingerprint"] == file_fp:
+                    stages = json.loads(row["stages"])
+                stages[stage] = fp
+                self._db.execute(
+                    "INSERT INTO files (key, file_fingerprint, stages, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET file_fingerprint = excluded.file_fingerprint, "
+                    "stages = excluded.stages, updated_at = excluded.updated_at, "
+                    "result = CASE WHEN files.file_fingerprint = excluded.file_fingerprint "
+                    "THEN files.result ELSE NULL END",
+                    (key, file_fp, json.dumps(stages), time.time()),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def save_result(self, key: str, result: Dict[str, Any]) -> None:
+        """Store the pipeline result of *key* (reused when the file is skipped)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE files SET result = ?, updated_at = ? WHERE key = ?",
+                (json.dumps(result, default=str), time.time(), key),
+            )
+
+    def result(self, key: str, file_fp: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Stored result of *key* (``None`` if missing or for another *file_fp*)."""
+        with self._lock:
+            row = self._row(key)
+        if row is None or not row["result"]:
+            return None
+        if file_fp is not None and row["file_fingerprint"] != file_fp:
+            return None
+        return json.loads(row["result"])
+
+    def entry(self, file_path: str, config: "EdgeConfig", force: Iterable[str] = ()) -> "ManifestEntry":
+        """Plan *file_path* under *config* and return its entry."""
+        from ingest.job_store import file_fingerprint
+        return ManifestEntry(self, manifest_key(config, file_path), file_fingerprint(file_path), config, force)
+
+
+class ManifestEntry:
+    """One file's manifest plan; ``record`` is the pipeline's ``on_stage``."""
+
+    def __init__(
+        self, manifest: RunManifest, key: str, file_fp: str, config: "EdgeConfig", force: Iterable[str] = (),
+    ):
+        self.manifest = manifest
+        self.key = key
+        self.file_fp = file_fp
+        self.config = config
+        self.plan, self.pending, self.done = manifest.plan(key, file_fp, config, force)
+
+    def record(self, stage: str) -> None:
+        self.manifest.record(self.key, self.file_fp, stage, self.config)
+        self.done.add(stage)
+
+    def save_result(self, result: Dict[str, Any]) -> None:
+        self.manifest.save_result(self.key, result)
+
+    @property
+    def stored_result(self) -> Optional[Dict[str, Any]]:
+        return self.manifest.result(self.key, self.file_fp)
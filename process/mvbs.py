@@ -1,22 +1,63 @@
 """Compute Mean Volume Backscattering Strength (MVBS) for edge processing.
 
-Uses oceanstream's xarray-2026-safe ``compute_mvbs`` wrapper.
+Two engines produce the same Dataset (``Sv`` on ``channel × ping_time ×
+echo_range`` bins labelled by their left edge, plus ``frequency_nominal``
+and per-bin positions when present):
+
+- ``native`` — vectorized NumPy.  Range-bin boundaries of a
+  channel's sample geometry are computed once and cached across batches;
+  Sv is converted to the linear domain once and summed with
+  ``np.add.reduceat`` over range bins, then over ping-time bins.
+- ``oceanstream`` (default) — oceanstream's xarray-2026-safe ``compute_mvbs``
+  wrapper (xarray groupby).
+
+Bins follow echopype's ``compute_MVBS``: range bins ``[k·bin, (k+1)·bin)``
+from 0 up to the deepest ``echo_range``, ping-time bins aligned to the
+first ping's midnight, means taken in the linear domain over the finite
+samples (empty cells are NaN).  Variable and coordinate attributes,
+position means (when both ``latitude`` and ``longitude`` exist) and the
+``water_level`` pass-through match it too; ``test/test_mvbs.py`` checks
+the engines against each other.
 """
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
 
+import numpy as np
+import pandas as pd
 import xarray as xr
 
 logger = logging.getLogger("oceanstream")
 
+_DAY_NS = 86_400 * 10**9
+
+# echopype's cell_methods labels per Timedelta resolution
+_TIME_UNITS = {
+    "d": ("D", "day"),
+    "h": ("h", "hour"),
+    "min": ("m", "minute"),
+    "s": ("s", "second"),
+    "ms": ("ms", "millisecond"),
+}
+
+# Range-bin layout per (bin size, sample geometry) — realtime batches of
+# one channel setup share it
+_RANGE_BINS_CACHE: "OrderedDict[tuple, Optional[_RangeBins]]" = OrderedDict()
+_RANGE_BINS_CACHE_SIZE = 64
+_RANGE_BINS_LOCK = threading.Lock()
+
 
 def compute_mvbs(
     ds_sv: xr.Dataset,
     *,
     range_bin: str = "0.5m",
     ping_time_bin: str = "10s",
+    engine: str = "oceanstream",
 ) -> xr.Dataset:
     """Compute MVBS from an Sv dataset.
 
@@ -28,21 +69,191 @@ def compute_mvbs(
         Range bin size (e.g. ``"0.5m"``, ``"1m"``).
     ping_time_bin
         Time bin size (e.g. ``"10s"``, ``"20s"``).
+    engine
+        ``"native"`` or ``"oceanstream"``.  The native engine falls back
+        to oceanstream for datasets without ``echo_range``.
 
     Returns
     -------
     xr.Dataset
         MVBS dataset.
     """
-    from oceanstream.echodata.compute import compute_mvbs as os_compute_mvbs
+    logger.info("Computing MVBS (range_bin=%s, ping_time_bin=%s, engine=%s)", range_bin, ping_time_bin, engine)
+
+    if engine == "native" and "echo_range" in ds_sv and "Sv" in ds_sv:
+        ds_mvbs = _native_mvbs(ds_sv, float(str(range_bin).rstrip("m")), ping_time_bin)
+    else:
+        from oceanstream.echodata.compute import compute_mvbs as os_compute_mvbs
+        ds_mvbs = os_compute_mvbs(
+            ds_sv,
+            range_bin=range_bin,
+            ping_time_bin=ping_time_bin,
+        )
+
+    logger.info("MVBS complete: %s", dict(ds_mvbs.sizes))
+    return ds_mvbs
+
+
+class _RangeBins:
+    """Where a channel's range samples fall in the range bins.
+
+    ``keep`` selects samples inside the bins; ``bins`` are the occupied
+    bin indices and ``starts`` the first kept sample of each (samples
+    are in range order, so every bin is one contiguous run).
+    """
+
+    __slots__ = ("keep", "bins", "starts")
+
+    def __init__(self, keep: np.ndarray, bins: np.ndarray, starts: np.ndarray):
+        self.keep = keep
+        self.bins = bins
+        self.starts = starts
+
+
+def _range_bins(echo_range: np.ndarray, edges: np.ndarray, range_bin: float) -> Optional[_RangeBins]:
+    """Cached range-bin layout of one sample geometry (``None`` if not monotonic)."""
+    key = (range_bin, len(edges), hashlib.sha1(np.ascontiguousarray(echo_range).tobytes()).hexdigest())
+    with _RANGE_BINS_LOCK:
+        if key in _RANGE_BINS_CACHE:
+            _RANGE_BINS_CACHE.move_to_end(key)
+            return _RANGE_BINS_CACHE[key]
 
-    logger.info("Computing MVBS (range_bin=%s, ping_time_bin=%s)", range_bin, ping_time_bin)
+    idx = _bin_index(echo_range, edges)
+    keep = idx >= 0
+    kept = idx[keep]
+    layout = None
+    if kept.size and np.all(np.diff(kept) >= 0):
+        bins, starts = np.unique(kept, return_index=True)
+        layout = _RangeBins(keep, bins, starts)
 
-    ds_mvbs = os_compute_mvbs(
-        ds_sv,
-        range_bin=range_bin,
-        ping_time_bin=ping_time_bin,
+    with _RANGE_BINS_LOCK:
+        _RANGE_BINS_CACHE[key] = layout
+        while len(_RANGE_BINS_CACHE) > _RANGE_BINS_CACHE_SIZE:
+            _RANGE_BINS_CACHE.popitem(last=False)
+    return layout
+
+
+def _bin_index(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Left-closed bin of each value in *edges* (``-1`` outside or NaN)."""
+    idx = np.searchsorted(edges, values, side="right") - 1
+    idx[~np.isfinite(values) | (idx >= len(edges) - 1)] = -1
+    return idx
+
+
+def _ping_bins(times: np.ndarray, ping_time_bin: str) -> Tuple[np.ndarray, np.ndarray]:
+    """``(bin index per ping, bin left edges)`` aligned to the first ping's midnight."""
+    step = pd.Timedelta(ping_time_bin).value
+    t_ns = times.astype("datetime64[ns]").astype(np.int64)
+    origin = (t_ns.min() // _DAY_NS) * _DAY_NS
+    cols = (t_ns - origin) // step
+    first = cols.min()
+    cols = cols - first
+    edges = origin + (first + np.arange(int(cols.max()) + 1)) * step
+    return cols, edges.astype("datetime64[ns]")
+
+
+def _channel_sums(
+    linear: np.ndarray,
+    echo_range: np.ndarray,
+    cols: np.ndarray,
+    n_time: int,
+    edges: np.ndarray,
+    range_bin: float,
+    pings_sorted: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Linear ``(sum, count)`` grids ``(n_time, n_range)`` of one channel."""
+    n_range = len(edges) - 1
+    sums = np.zeros((n_time, n_range))
+    counts = np.zeros((n_time, n_range), dtype=np.int64)
+    valid = np.isfinite(linear)
+
+    layout = None
+    if pings_sorted and linear.shape[0] and np.array_equal(echo_range, echo_range[:1].repeat(len(echo_range), 0), equal_nan=True):
+        layout = _range_bins(echo_range[0], edges, range_bin)
+
+    if layout is not None:
+        # Range bins, then ping-time bins, as contiguous runs
+        data = np.where(valid, linear, 0.0)[:, layout.keep]
+        n = valid[:, layout.keep].astype(np.int64)
+        data = np.add.reduceat(data, layout.starts, axis=1)
+        n = np.add.reduceat(n, layout.starts, axis=1)
+        rows, row_starts = np.unique(cols, return_index=True)
+        sums[np.ix_(rows, layout.bins)] = np.add.reduceat(data, row_starts, axis=0)
+        counts[np.ix_(rows, layout.bins)] = np.add.reduceat(n, row_starts, axis=0)
+        return sums, counts
+
+    # Ping-varying geometry or unsorted pings: one bincount over all cells
+    idx = _bin_index(echo_range, edges)
+    ok = valid & (idx >= 0)
+    cell = (cols[:, None] * n_range + idx)[ok]
+    sums += np.bincount(cell, weights=linear[ok], minlength=n_time * n_range).reshape(n_time, n_range)
+    counts += np.bincount(cell, minlength=n_time * n_range).reshape(n_time, n_range)
+    return sums, counts
+
+
+def _time_interval(ping_time_bin: str) -> str:
+    """*ping_time_bin* as echopype writes it in ``cell_methods`` (``"10 second"``)."""
+    td = pd.Timedelta(ping_time_bin)
+    unit, label = _TIME_UNITS.get(td.resolution_string.lower(), ("ns", "nanosecond"))
+    return f"{int(td / np.timedelta64(1, unit))} {label}"
+
+
+def _native_mvbs(ds_sv: xr.Dataset, range_bin: float, ping_time_bin: str) -> xr.Dataset:
+    """Vectorized MVBS (see module docstring)."""
+    sv = ds_sv["Sv"].transpose("channel", "ping_time", ...)
+    echo_range = ds_sv["echo_range"].broadcast_like(sv).transpose(*sv.dims).values
+    times = ds_sv["ping_time"].values
+
+    cols, ping_edges = _ping_bins(times, ping_time_bin)
+    n_time = len(ping_edges)
+    range_edges = np.arange(0, float(np.nanmax(echo_range)) + range_bin, range_bin)
+    n_range = len(range_edges) - 1
+    pings_sorted = bool(np.all(np.diff(cols) >= 0))
+
+    mvbs = np.full((sv.sizes["channel"], n_time, n_range), np.nan)
+    sv_values = sv.values
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        for c in range(sv.sizes["channel"]):
+            linear = np.power(10.0, sv_values[c].astype(np.float64) / 10.0)
+            sums, counts = _channel_sums(
+                linear, echo_range[c], cols, n_time, range_edges, range_bin, pings_sorted,
+            )
+            mvbs[c] = np.where(counts > 0, 10.0 * np.log10(sums / np.maximum(counts, 1)), np.nan)
+
+    ds_mvbs = xr.Dataset(
+        {"Sv": (("channel", "ping_time", "echo_range"), mvbs)},
+        coords={
+            "channel": sv["channel"].values,
+            "ping_time": ping_edges,
+            "echo_range": range_edges[:-1],
+        },
     )
+    ds_mvbs["ping_time"].attrs = {"long_name": "Ping time", "standard_name": "time", "axis": "T"}
+    ds_mvbs["echo_range"].attrs = {"long_name": "Range distance", "units": "m"}
+    ds_mvbs["Sv"].attrs = {
+        "long_name": "Mean volume backscattering strength (MVBS, mean Sv re 1 m-1)",
+        "units": "dB",
+        "cell_methods": (
+            f"ping_time: mean (interval: {_time_interval(ping_time_bin)} comment: ping_time is the interval start) "
+            f"echo_range: mean (interval: {range_bin} meter comment: echo_range is the interval start)"
+        ),
+        "binning_mode": "physical units",
+        "range_meter_interval": f"{range_bin}m",
+        "ping_time_interval": ping_time_bin,
+    }
+    ds_mvbs.attrs["processing_function"] = "process.mvbs.compute_mvbs"
 
-    logger.info("MVBS complete: %s", dict(ds_mvbs.sizes))
+    # Mean position per ping-time bin
+    if all(var in ds_sv and ds_sv[var].dims == ("ping_time",) for var in ("latitude", "longitude")):
+        for var in ("latitude", "longitude"):
+            vals = ds_sv[var].values.astype(np.float64)
+            ok = np.isfinite(vals)
+            n = np.bincount(cols[ok], minlength=n_time)
+            total = np.bincount(cols[ok], weights=vals[ok], minlength=n_time)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ds_mvbs[var] = ("ping_time", np.where(n > 0, total / np.maximum(n, 1), np.nan), ds_sv[var].attrs)
+    if "water_level" in ds_sv.data_vars:
+        ds_mvbs["water_level"] = ds_sv["water_level"]
+    if "frequency_nominal" in ds_sv:
+        ds_mvbs["frequency_nominal"] = ds_sv["frequency_nominal"]
     return ds_mvbs
@@ -1,54 +1,452 @@
 """Compute Nautical Area Scattering Coefficient (NASC) for edge processing.
 
-Uses oceanstream's ``compute_nasc`` which adds ``NASC_log`` automatically.
+Two engines:
+
+- ``native`` — vectorized NumPy.  Cumulative along-track
+  distance is computed once per batch: a haversine cumsum over the
+  valid per-ping fixes or, when the batch has none, over the stored
+  (simplified) track's vertices, interpolated at the ping times.  Pings
+  and samples are then assigned to distance and depth bins and sv is
+  integrated in one pass per channel (reusing MVBS's cached range-bin
+  layout)::
+
+      NASC = 4π · 1852² · mean(sv) · (summed sample thickness / pings)
+
+- ``oceanstream`` (default) — oceanstream's ``compute_nasc`` (echopype).
+
+Both integrate a cell the same way; they differ in the distance model.
+echopype sums geodesic steps to the next fix, so distance across pings
+without a fix is lost, and labels a bin with its mean ping time.  The
+native engine interpolates distance between fixes on a sphere and labels
+a bin with its first ping time (``test/test_nasc.py``).
+
+Realtime streams pass a ``NascCarry``: the last (still open) distance
+bin of a batch is then held back and merged into the next batch's first
+bin instead of being cut at every segment edge.  Distance keeps
+counting along the stream; a gap longer than ``nasc_carry_max_gap``
+closes the open bin, which is then saved with the next segment on its
+own.  When a stream ends, ``flush_carry`` closes the open bin so it can
+be saved by itself.
 """
 
 from __future__ import annotations
 
 import logging
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
+import numpy as np
+import pandas as pd
 import xarray as xr
 
+if TYPE_CHECKING:
+    from config import EdgeConfig
+
 logger = logging.getLogger("oceanstream")
 
+# NASC = 4π · 1852² · sA, with sA the area backscattering coefficient
+_NASC_FACTOR = 4.0 * np.pi * 1852.0 ** 2
+
+# Open-bin carries of realtime streams, per campaign
+_CARRIES: Dict[str, "NascCarry"] = {}
+_CARRIES_LOCK = threading.Lock()
+
 
 def compute_nasc(
     ds_sv: xr.Dataset,
     *,
     range_bin: str = "10m",
     dist_bin: str = "0.5nmi",
+    engine: str = "oceanstream",
+    track: Optional[pd.DataFrame] = None,
+    carry: Optional["NascCarry"] = None,
 ) -> xr.Dataset:
     """Compute NASC from an Sv dataset.
 
     Parameters
     ----------
     ds_sv
-        Sv or denoised Sv dataset.  Must have ``latitude`` and ``longitude``
-        variables (from ``add_location`` or GPS interpolation).
+        Sv or denoised Sv dataset.  Needs ``latitude`` and ``longitude``
+        variables (from ``add_location`` or GPS interpolation) or a
+        *track* covering its pings.
     range_bin
         Range bin size (e.g. ``"10m"``).
     dist_bin
         Distance bin size in nautical miles (e.g. ``"0.5nmi"``).
+    engine
+        ``"native"`` or ``"oceanstream"``.
+    track
+        Stored GPS track (``lat, lon, dt``) used when the pings carry no
+        valid positions.
+    carry
+        Open-bin state of a realtime stream (native engine only).
 
     Returns
     -------
     xr.Dataset
-        NASC dataset with ``NASC_log`` variable.
+        NASC dataset with ``NASC_log`` variable (empty without positions).
+    """
+    logger.info("Computing NASC (range_bin=%s, dist_bin=%s, engine=%s)", range_bin, dist_bin, engine)
+
+    if engine == "native" and "Sv" in ds_sv:
+        ds_nasc = _native_nasc(
+            ds_sv, float(str(range_bin).rstrip("m")), float(str(dist_bin).rstrip("nmi")), track, carry,
+        )
+        if ds_nasc is None:
+            logger.warning("NASC requires latitude/longitude — skipping")
+            return xr.Dataset()
+        if ds_nasc.sizes["distance"] == 0:
+            logger.info("NASC: batch within the open distance bin — carried to the next batch")
+            return xr.Dataset()
+    else:
+        from oceanstream.echodata.compute import compute_nasc as os_compute_nasc
+        from process.track_store import with_track_position
+
+        ds_sv = with_track_position(ds_sv, track)
+        # Without any valid position there is nothing to bin (not an error)
+        if "latitude" not in ds_sv or "longitude" not in ds_sv or not _valid_position(
+            ds_sv["latitude"].values, ds_sv["longitude"].values,
+        ).any():
+            logger.warning("NASC requires latitude/longitude — skipping")
+            return xr.Dataset()
+        ds_nasc = os_compute_nasc(
+            ds_sv,
+            range_bin=range_bin,
+            dist_bin=dist_bin,
+        )
+
+    logger.info("NASC complete: %s", dict(ds_nasc.sizes))
+    return ds_nasc
+
+
+@dataclass
+class _OpenBin:
+    """Partial sums of the last distance bin of a realtime batch."""
+
+    channels: Tuple
+    range_bin: float
+    dist_bin: float
+    index: int                 # distance-bin index along the stream
+    sums: np.ndarray           # (channel, depth) linear sv sum
+    counts: np.ndarray         # (channel, depth) valid samples
+    thickness: np.ndarray      # (channel, depth) summed sample thickness
+    pings: int
+    first_time: np.datetime64
+    lat_sum: float
+    lon_sum: float
+    n_pos: int
+    distance: float            # cumulative distance (nmi) at the last ping
+    last_time: np.datetime64
+    last_lat: float
+    last_lon: float
+    range_var: str = "depth"
+    frequency_nominal: Optional[xr.DataArray] = None
+
+
+class NascCarry:
+    """Open distance bin of a realtime stream, carried into its next batch.
+
+    Parameters
+    ----------
+    max_gap : float
+        Seconds between consecutive batches beyond which the open bin is
+        closed instead of merged.
     """
-    from oceanstream.echodata.compute import compute_nasc as os_compute_nasc
 
-    # Ensure location variables exist
-    if "latitude" not in ds_sv or "longitude" not in ds_sv:
-        logger.warning("NASC requires latitude/longitude — skipping")
+    def __init__(self, max_gap: float = 300.0):
+        self.max_gap = float(max_gap)
+        self.lock = threading.Lock()
+        self.open: Optional[_OpenBin] = None
+
+
+def realtime_carry(config: "EdgeConfig") -> Optional[NascCarry]:
+    """The campaign's realtime carry (``None`` when carrying is disabled)."""
+    if config.nasc_carry_max_gap <= 0:
+        return None
+    with _CARRIES_LOCK:
+        carry = _CARRIES.get(config.campaign_container)
+        if carry is None:
+            carry = _CARRIES[config.campaign_container] = NascCarry(config.nasc_carry_max_gap)
+        carry.max_gap = float(config.nasc_carry_max_gap)
+        return carry
+
+
+def flush_carry(carry: Optional[NascCarry]) -> xr.Dataset:
+    """Close *carry*'s open distance bin and return it as a one-bin NASC dataset.
+
+    Called when a stream ends, so the bin held back for the next batch
+    is not lost; ``attrs["last_ping_time"]`` is the bin's last ping.
+    Empty without an open bin.
+    """
+    if carry is None:
+        return xr.Dataset()
+    with carry.lock:
+        b, carry.open = carry.open, None
+    if b is None:
         return xr.Dataset()
+    range_edges = np.arange(b.sums.shape[1] + 1) * b.range_bin
+    ds_nasc = _nasc_dataset(
+        b.channels, b.sums[:, None], b.counts[:, None], b.thickness[:, None], np.array([b.pings]),
+        np.array([b.lat_sum]), np.array([b.lon_sum]), np.array([b.n_pos]),
+        np.array([b.first_time], dtype="datetime64[ns]"), np.array([b.index]),
+        range_edges, b.range_bin, b.dist_bin, b.range_var, b.frequency_nominal,
+    )
+    ds_nasc.attrs["last_ping_time"] = pd.Timestamp(b.last_time).isoformat()
+    return ds_nasc
 
-    logger.info("Computing NASC (range_bin=%s, dist_bin=%s)", range_bin, dist_bin)
 
-    ds_nasc = os_compute_nasc(
-        ds_sv,
-        range_bin=range_bin,
-        dist_bin=dist_bin,
+def _valid_position(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    return (
+        np.isfinite(lat) & np.isfinite(lon)
+        & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        & ~((lat == 0) & (lon == 0))
     )
 
-    logger.info("NASC complete: %s", dict(ds_nasc.sizes))
+
+def _along_track(
+    ds: xr.Dataset, track: Optional[pd.DataFrame],
+) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """``(cumulative distance nmi, lat, lon)`` per ping, from the first ping.
+
+    Per-ping fixes are preferred; pings between fixes get interpolated
+    distance.  ``None`` without any position.
+    """
+    from exports.location import haversine_nmi
+
+    n = ds.sizes["ping_time"]
+    if "latitude" in ds and "longitude" in ds and ds["latitude"].dims == ("ping_time",):
+        lat = ds["latitude"].values.astype(np.float64)
+        lon = ds["longitude"].values.astype(np.float64)
+        fixes = np.flatnonzero(_valid_position(lat, lon))
+        if fixes.size:
+            cum = np.concatenate([[0.0], np.cumsum(
+                haversine_nmi(lat[fixes[:-1]], lon[fixes[:-1]], lat[fixes[1:]], lon[fixes[1:]])
+            )])
+            dist = np.interp(np.arange(n), fixes, cum)
+            return dist - dist[0], lat, lon
+
+    if track is not None:
+        track = track[_valid_position(track["lat"].to_numpy(), track["lon"].to_numpy())]
+    if track is not None and len(track) >= 2:
+        from process.track_store import interpolate_track
+
+        t_ping = ds["ping_time"].values.astype("datetime64[ns]")
+        t_vert = track["dt"].to_numpy().astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+        v_lat, v_lon = track["lat"].to_numpy(), track["lon"].to_numpy()
+        cum = np.concatenate([[0.0], np.cumsum(haversine_nmi(v_lat[:-1], v_lon[:-1], v_lat[1:], v_lon[1:]))])
+        dist = np.interp(t_ping.astype(np.int64).astype(np.float64), t_vert, cum)
+        lat, lon = interpolate_track(track, t_ping)
+        return dist - dist[0], lat, lon
+    return None
+
+
+def _native_nasc(
+    ds_sv: xr.Dataset,
+    range_bin: float,
+    dist_bin: float,
+    track: Optional[pd.DataFrame],
+    carry: Optional[NascCarry],
+) -> Optional[xr.Dataset]:
+    """Vectorized NASC (see module docstring); ``None`` without positions."""
+    located = _along_track(ds_sv, track)
+    if located is None:
+        return None
+    dist, lat, lon = located
+
+    if carry is None:
+        return _bin_nasc(ds_sv, dist, lat, lon, range_bin, dist_bin, None)[0]
+    with carry.lock:
+        ds_nasc, carry.open = _bin_nasc(ds_sv, dist, lat, lon, range_bin, dist_bin, carry)
+    return ds_nasc
+
+
+def _bin_nasc(
+    ds_sv: xr.Dataset,
+    dist: np.ndarray,
+    lat: np.ndarray,
+    lon: np.ndarray,
+    range_bin: float,
+    dist_bin: float,
+    carry: Optional[NascCarry],
+) -> Tuple[xr.Dataset, Optional[_OpenBin]]:
+    """Bin one batch, merging and returning the stream's open bin."""
+    from exports.location import haversine_nmi
+    from process.mvbs import _bin_index, _channel_sums
+
+    sv = ds_sv["Sv"].transpose("channel", "ping_time", ...)
+    range_var = "depth" if "depth" in ds_sv else "echo_range"
+    ranges = ds_sv[range_var].broadcast_like(sv).transpose(*sv.dims).values
+    times = ds_sv["ping_time"].values.astype("datetime64[ns]")
+    channels = tuple(sv["channel"].values.tolist())
+
+    # Continue the stream's distance, or start a new one
+    prev = carry.open if carry is not None else None
+    merge = False
+    if prev is not None:
+        if (prev.channels, prev.range_bin, prev.dist_bin) != (channels, range_bin, dist_bin):
+            logger.warning("NASC: channels or bins changed — dropping the open distance bin")
+            prev = None
+        elif times[0] <= prev.last_time:
+            # Out-of-order batch: bin it on its own, keep the stream's open bin
+            return _bin_nasc(ds_sv, dist, lat, lon, range_bin, dist_bin, None)[0], carry.open
+    if prev is not None:
+        pos = _valid_position(lat, lon)
+        jump = 0.0
+        if pos.any() and np.isfinite(prev.last_lat):
+            first = int(np.argmax(pos))
+            jump = float(haversine_nmi(prev.last_lat, prev.last_lon, lat[first], lon[first]))
+        dist = dist + prev.distance + jump
+        gap = (times[0] - prev.last_time) / np.timedelta64(1, "s")
+        merge = gap <= carry.max_gap
+        if not merge:
+            # The gap closes the open bin; the batch starts the next one
+            dist = dist + max(0.0, (prev.index + 1) * dist_bin - dist[0])
+
+    index = np.floor(dist / dist_bin + 1e-9).astype(np.int64)
+    b0 = int(index.min())
+    cols = index - b0
+    n_dist = int(cols.max()) + 1
+    n_range = len(np.arange(0, float(np.nanmax(ranges)) + range_bin, range_bin)) - 1
+    if prev is not None:
+        n_range = max(n_range, prev.sums.shape[1])
+    range_edges = np.arange(n_range + 1) * range_bin
+
+    n_ch = len(channels)
+    sums = np.zeros((n_ch, n_dist, n_range))
+    counts = np.zeros((n_ch, n_dist, n_range), dtype=np.int64)
+    thickness = np.zeros((n_ch, n_dist, n_range))
+    pings = np.bincount(cols, minlength=n_dist)
+    sv_values = sv.values
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        for c in range(n_ch):
+            linear = np.power(10.0, sv_values[c].astype(np.float64) / 10.0)
+            sums[c], counts[c] = _channel_sums(
+                linear, ranges[c], cols, n_dist, range_edges, range_bin, pings_sorted=True,
+            )
+            # Sample thickness: distance to the next sample
+            r = ranges[c]
+            if np.array_equal(r, r[:1].repeat(len(r), 0), equal_nan=True):
+                h = np.diff(r[0], append=np.nan)
+                idx = _bin_index(r[0], range_edges)
+                ok = np.isfinite(h) & (idx >= 0)
+                per_ping = np.bincount(idx[ok], weights=h[ok], minlength=n_range)
+                thickness[c] = pings[:, None] * per_ping[None, :]
+            else:
+                h = np.diff(r, axis=1, append=np.nan)
+                idx = _bin_index(r, range_edges)
+                ok = np.isfinite(h) & (idx >= 0)
+                cell = (cols[:, None] * n_range + idx)[ok]
+                thickness[c] = np.bincount(
+                    cell, weights=h[ok], minlength=n_dist * n_range,
+                ).reshape(n_dist, n_range)
+
+    pos = _valid_position(lat, lon)
+    lat_sum = np.bincount(cols[pos], weights=lat[pos], minlength=n_dist)
+    lon_sum = np.bincount(cols[pos], weights=lon[pos], minlength=n_dist)
+    n_pos = np.bincount(cols[pos], minlength=n_dist)
+    first_time = times[np.searchsorted(cols, np.arange(n_dist))].copy()
+    first_time[pings == 0] = np.datetime64("NaT")
+    bins = b0 + np.arange(n_dist)
+
+    if prev is not None:
+        pad = ((0, 0), (0, n_range - prev.sums.shape[1]))
+        p_sums, p_counts, p_thick = (np.pad(a, pad) for a in (prev.sums, prev.counts, prev.thickness))
+        if merge and prev.index == b0:
+            sums[:, 0] += p_sums
+            counts[:, 0] += p_counts
+            thickness[:, 0] += p_thick
+            pings[0] += prev.pings
+            lat_sum[0] += prev.lat_sum
+            lon_sum[0] += prev.lon_sum
+            n_pos[0] += prev.n_pos
+            first_time[0] = prev.first_time
+        else:
+            sums = np.concatenate([p_sums[:, None], sums], axis=1)
+            counts = np.concatenate([p_counts[:, None], counts], axis=1)
+            thickness = np.concatenate([p_thick[:, None], thickness], axis=1)
+            pings = np.concatenate([[prev.pings], pings])
+            lat_sum = np.concatenate([[prev.lat_sum], lat_sum])
+            lon_sum = np.concatenate([[prev.lon_sum], lon_sum])
+            n_pos = np.concatenate([[prev.n_pos], n_pos])
+            first_time = np.concatenate([[prev.first_time], first_time])
+            bins = np.concatenate([[prev.index], bins])
+
+    frequency = ds_sv["frequency_nominal"] if "frequency_nominal" in ds_sv else None
+    open_bin = None
+    if carry is not None:
+        last = np.flatnonzero(pos)
+        open_bin = _OpenBin(
+            channels=channels, range_bin=range_bin, dist_bin=dist_bin, index=int(bins[-1]),
+            sums=sums[:, -1], counts=counts[:, -1], thickness=thickness[:, -1],
+            pings=int(pings[-1]), first_time=first_time[-1],
+            lat_sum=float(lat_sum[-1]), lon_sum=float(lon_sum[-1]), n_pos=int(n_pos[-1]),
+            distance=float(dist[-1]), last_time=times[-1],
+            last_lat=float(lat[last[-1]]) if last.size else np.nan,
+            last_lon=float(lon[last[-1]]) if last.size else np.nan,
+            range_var=range_var, frequency_nominal=frequency,
+        )
+        keep = slice(0, -1)
+        sums, counts, thickness = sums[:, keep], counts[:, keep], thickness[:, keep]
+        pings, lat_sum, lon_sum, n_pos = pings[keep], lat_sum[keep], lon_sum[keep], n_pos[keep]
+        first_time, bins = first_time[keep], bins[keep]
+
+    ds_nasc = _nasc_dataset(
+        channels, sums, counts, thickness, pings, lat_sum, lon_sum, n_pos, first_time, bins,
+        range_edges, range_bin, dist_bin, range_var, frequency,
+    )
+    return ds_nasc, open_bin
+
+
+def _nasc_dataset(
+    channels: Tuple,
+    sums: np.ndarray,
+    counts: np.ndarray,
+    thickness: np.ndarray,
+    pings: np.ndarray,
+    lat_sum: np.ndarray,
+    lon_sum: np.ndarray,
+    n_pos: np.ndarray,
+    first_time: np.ndarray,
+    bins: np.ndarray,
+    range_edges: np.ndarray,
+    range_bin: float,
+    dist_bin: float,
+    range_var: str,
+    frequency: Optional[xr.DataArray],
+) -> xr.Dataset:
+    """NASC dataset from per-(channel, distance, depth) partial sums."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        nasc = np.where(
+            (counts > 0) & (pings[None, :, None] > 0),
+            _NASC_FACTOR * (sums / np.maximum(counts, 1)) * (thickness / np.maximum(pings, 1)[None, :, None]),
+            np.nan,
+        )
+        nasc_log = np.where(nasc > 0, 10.0 * np.log10(nasc), np.nan)
+        mean_lat = np.where(n_pos > 0, lat_sum / np.maximum(n_pos, 1), np.nan)
+        mean_lon = np.where(n_pos > 0, lon_sum / np.maximum(n_pos, 1), np.nan)
+
+    dims = ("channel", "distance", "depth")
+    ds_nasc = xr.Dataset(
+        {
+            "NASC": (dims, nasc, {
+                "long_name": "Nautical Areal Scattering Coefficient (NASC, m2 nmi-2)",
+                "units": "m2 nmi-2",
+                "range_meter_interval": f"{range_bin}m",
+                "dist_nmi_interval": f"{dist_bin}nmi",
+            }),
+            "NASC_log": (dims, nasc_log, {"long_name": "NASC in log scale", "units": "dB re 1 m2 nmi-2"}),
+            "ping_time": ("distance", first_time, {"long_name": "First ping time of the distance bin"}),
+            "latitude": ("distance", mean_lat, {"long_name": "Mean latitude", "units": "degrees_north"}),
+            "longitude": ("distance", mean_lon, {"long_name": "Mean longitude", "units": "degrees_east"}),
+        },
+        coords={
+            "channel": list(channels),
+            "distance": ("distance", bins * dist_bin, {"long_name": "Cumulative distance (bin start)", "units": "nmi"}),
+            "depth": ("depth", range_edges[:-1], {"long_name": f"{range_var} (bin start)", "units": "m"}),
+        },
+    )
+    ds_nasc.attrs["processing_function"] = "process.nasc.compute_nasc"
+    if frequency is not None:
+        ds_nasc["frequency_nominal"] = frequency
     return ds_nasc
@@ -20,7 +20,7 @@ import logging
 import time
 from datetime import date
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -30,10 +30,14 @@ if TYPE_CHECKING:
     from azure.iot.device import IoTHubModuleClient
     from config import EdgeConfig
     from echopype.echodata.echodata import EchoData
+    from process.manifest import ManifestEntry
     from process.segment_store import SegmentStore
 
 logger = logging.getLogger("oceanstream")
 
+# Track vertices carried in a segment's result/telemetry
+_MAX_TRACK_VERTICES = 100
+
 
 # ═══════════════════════════════════════════════════════════════════════
 # Core: process one batch of EchoData → segment
@@ -47,6 +51,9 @@ async def process_echodata(
     client: Optional["IoTHubModuleClient"] = None,
     *,
     file_stem: Optional[str] = None,
+    ds_sv: Optional[xr.Dataset] = None,
+    ds_denoised: Optional[xr.Dataset] = None,
+    on_stage: Optional[Callable[[str], None]] = None,
 ) -> Dict[str, Any]:
     """Process a single EchoData batch and save products.
 
@@ -65,32 +72,44 @@ async def process_echodata(
       1. Compute Sv (with GPU if available)
       2. Save Sv
       3. Denoise (if enabled)
-      4. Seabed detection (if enabled)
+      4. Seabed detection (if enabled; also saves the seabed_line product)
       5. Compute MVBS (if enabled)
-      6. Compute NASC (if enabled + GPS available)
-      7. Generate echograms (if enabled)
+      6. Compute NASC (if enabled + GPS or stored realtime track available)
+      6b. Encode the compact acoustic summary (if enabled)
+      7. Generate echograms (if enabled) and update the daily composite
       8. Write metadata.json
       9. Send telemetry
+
+    *ds_sv* / *ds_denoised* may be passed precomputed (e.g. slices of a
+    merged multi-file batch); the corresponding steps then only save.
+
+    *on_stage*, if given, is called with a stage name (``sv``,
+    ``denoise``, …, ``metadata``) once that stage's output is saved.
     """
     from process.compute_sv import compute_sv
     from process.config_adapter import to_denoise_config
     from process.denoise import denoise
     from process.mvbs import compute_mvbs
-    from process.nasc import compute_nasc
-    from process.seabed import apply_seabed
+    from process.nasc import compute_nasc, realtime_carry
+    from process.seabed import apply_seabed, seabed_line
 
     start_time = time.time()
     result: Dict[str, Any] = {"status": "ok"}
     storage = segment_store.storage
 
+    def _stage_done(stage: str) -> None:
+        if on_stage is not None:
+            on_stage(stage)
+
     # --- Step 1: Compute Sv ---
-    ds_sv = compute_sv(
-        echodata,
-        waveform_mode=config.waveform_mode,
-        encode_mode=config.encode_mode,
-        use_gpu=config.use_gpu,
-        depth_offset=config.depth_offset,
-    )
+    if ds_sv is None:
+        ds_sv = compute_sv(
+            echodata,
+            waveform_mode=config.waveform_mode,
+            encode_mode=config.encode_mode,
+            use_gpu=config.use_gpu,
+            depth_offset=config.depth_offset,
+        )
 
     n_pings = ds_sv.sizes.get("ping_time", 0)
     if n_pings == 0:
@@ -125,31 +144,56 @@ async def process_echodata(
     sv_path = f"{processed_prefix}/sv.zarr"
     storage.save_zarr(ds_sv, sv_path)
     result["sv_path"] = sv_path
+    _stage_done("sv")
     _release_memory()
 
+    # --- Step 3 (large files): denoise + seabed over ping-range shards ---
+    sharded = None
+    if ds_denoised is None and (config.denoise_enabled or config.seabed_enabled):
+        from process.sharding import plan_shards, run_sharded
+        shards = plan_shards(int(n_pings), config)
+        if len(shards) > 1:
+            try:
+                sharded = run_sharded(ds_sv, processed_prefix, shards, config, storage)
+            except Exception as e:
+                logger.error("Sharded processing failed (%s) — processing unsharded", e, exc_info=True)
+
     # --- Step 3: Denoise ---
-    ds_denoised = ds_sv
-    if config.denoise_enabled:
+    precomputed_denoised, ds_denoised = ds_denoised, ds_sv
+    if sharded is not None:
+        ds_denoised = sharded
+        for stage in ("denoise", "seabed"):
+            if getattr(config, f"{stage}_enabled"):
+                result[stage] = "ok"
+                _stage_done(stage)
+    elif config.denoise_enabled:
         try:
-            denoise_config = to_denoise_config(config)
-            ds_denoised = denoise(ds_sv, config=denoise_config)
+            if precomputed_denoised is not None:
+                ds_denoised = precomputed_denoised
+            else:
+                ds_denoised = denoise(ds_sv, config=to_denoise_config(config))
             storage.save_zarr(ds_denoised, f"{processed_prefix}/sv_denoised.zarr")
             result["denoise"] = "ok"
+            _stage_done("denoise")
         except Exception as e:
             logger.error("Denoising failed: %s", e, exc_info=True)
             result["denoise"] = f"error: {e}"
     _release_memory()
 
     # --- Step 3b: Seabed ---
-    if config.seabed_enabled:
+    if config.seabed_enabled and sharded is None:
         try:
             ds_denoised = apply_seabed(
                 ds_denoised,
                 method=config.seabed_method,
                 max_range=config.seabed_max_range,
+                engine=config.seabed_engine,
+                track_window=config.seabed_track_window,
             )
             storage.save_zarr(ds_denoised, f"{processed_prefix}/sv_seabed.zarr")
+            storage.save_zarr(seabed_line(ds_denoised), f"{processed_prefix}/seabed_line.zarr")
             result["seabed"] = "ok"
+            _stage_done("seabed")
         except Exception as e:
             logger.error("Seabed detection failed: %s", e, exc_info=True)
             result["seabed"] = f"error: {e}"
@@ -163,15 +207,24 @@ async def process_echodata(
                 ds_denoised,
                 range_bin=config.mvbs_range_bin + "m",
                 ping_time_bin=config.mvbs_ping_time_bin,
+                engine=config.mvbs_engine,
             )
             if ds_mvbs.sizes:
                 storage.save_zarr(ds_mvbs, f"{processed_prefix}/mvbs.zarr")
                 result["mvbs"] = "ok"
+            _stage_done("mvbs")
         except Exception as e:
             logger.error("MVBS failed: %s", e, exc_info=True)
             result["mvbs"] = f"error: {e}"
         _release_memory()
 
+    # --- Step 4b: Stored GPS track ---
+    from process.track_store import load_track
+
+    track = load_track(ds_sv, config)
+    times = ds_sv["ping_time"].values
+    result.update(_track_summary(track, times.min(), times.max()))
+
     # --- Step 5: NASC ---
     if config.nasc_enabled:
         try:
@@ -179,15 +232,38 @@ async def process_echodata(
                 ds_denoised,
                 range_bin=config.nasc_range_bin + "m",
                 dist_bin=config.nasc_dist_bin + "nmi",
+                engine=config.nasc_engine,
+                track=track,
+                # Realtime segments carry their open distance bin forward
+                carry=None if file_stem else realtime_carry(config),
             )
             if ds_nasc.sizes:
                 storage.save_zarr(ds_nasc, f"{processed_prefix}/nasc.zarr")
                 result["nasc"] = "ok"
+            # An empty result (no positions, or carried) is final too:
+            # a retry without GPS gives the same answer
+            _stage_done("nasc")
         except Exception as e:
-            logger.warning("NASC failed (may need GPS): %s", e)
-            result["nasc"] = f"skipped: {e}"
+            logger.error("NASC failed: %s", e, exc_info=True)
+            result["nasc"] = f"error: {e}"
         _release_memory()
 
+    # --- Step 5b: Compact acoustic summary (low-bandwidth uplink) ---
+    if config.acoustic_summary_enabled:
+        try:
+            from exports.acoustic_summary import encode_acoustic_summary
+            summary = encode_acoustic_summary(ds_denoised, config)
+            if summary:
+                summary_path = f"{processed_prefix}/acoustic_summary.osas"
+                storage.save_file(summary, summary_path)
+                result["acoustic_summary_path"] = summary_path
+                result["acoustic_summary_bytes"] = len(summary)
+                if client:
+                    _send_acoustic_summary(client, summary, label, result["day"])
+            _stage_done("acoustic_summary")
+        except Exception as e:
+            logger.error("Acoustic summary failed: %s", e, exc_info=True)
+
     # --- Step 6: Echograms ---
     if config.plot_echogram:
         try:
@@ -205,10 +281,21 @@ async def process_echodata(
                 storage.save_file(item["data"], path)
                 saved_paths.append(path)
             result["echogram_files"] = saved_paths
+            _stage_done("echograms")
         except Exception as e:
             logger.error("Echogram generation failed: %s", e, exc_info=True)
         _release_memory()
 
+        # --- Step 6b: Rolling daily composite (+ tile pyramid) ---
+        if config.daily_echogram_enabled:
+            try:
+                from exports.daily_echogram import update_daily_echogram
+                result["daily_echogram_files"] = update_daily_echogram(
+                    ds_denoised, config, storage,
+                )
+            except Exception as e:
+                logger.error("Daily echogram update failed: %s", e, exc_info=True)
+
     # --- Step 7: Metadata ---
     processing_time_ms = int((time.time() - start_time) * 1000)
     result["processing_time_ms"] = processing_time_ms
@@ -255,6 +342,12 @@ async def process_echodata(
                     result[f"{coord[:3]}_range"] = [float(valid.min()), float(valid.max())]
             except Exception:
                 pass
+    if "lat_range" not in result and result.get("track"):
+        # Realtime batches: positions come from the stored track
+        lats = [v[1] for v in result["track"]]
+        lons = [v[2] for v in result["track"]]
+        result["lat_range"] = [min(lats), max(lats)]
+        result["lon_range"] = [min(lons), max(lons)]
 
     try:
         sv_vals = ds_sv["Sv"].values
@@ -277,7 +370,8 @@ async def process_echodata(
         "frequencies_hz": frequencies,
         "channels": channels,
         "processing_time_ms": processing_time_ms,
-        "products": [k for k in ("sv", "sv_denoised", "sv_seabed", "mvbs", "nasc") if result.get(k) == "ok" or k == "sv"],
+        "products": [k for k in ("sv", "sv_denoised", "sv_seabed", "mvbs", "nasc") if result.get(k) == "ok" or k == "sv"]
+        + (["seabed_line"] if result.get("seabed") == "ok" else []),
         "echogram_files": result.get("echogram_files", []),
         "config": {
             "sonar_model": config.sonar_model,
@@ -302,6 +396,18 @@ async def process_echodata(
         metadata["lon_range"] = result["lon_range"]
     if result.get("sv_mean_db") is not None:
         metadata["sv_mean_db"] = result["sv_mean_db"]
+    if result.get("track"):
+        metadata["track_vertices"] = len(result["track"])
+        metadata["track_distance_nmi"] = result["track_distance_nmi"]
+    # Per-stage parameter fingerprints let process_day skip up-to-date segments
+    from process.reprocess import stage_fingerprints
+    fingerprints = stage_fingerprints(config)
+    completed = ["sv"] + [s for s in ("denoise", "seabed", "mvbs", "nasc") if result.get(s) == "ok"]
+    if result.get("acoustic_summary_path"):
+        completed.append("acoustic_summary")
+    if result.get("echogram_files"):
+        completed.append("echograms")
+    metadata["stage_fingerprints"] = {s: fingerprints[s] for s in completed}
 
     try:
         metadata_path = f"{processed_prefix}/metadata.json"
@@ -310,6 +416,7 @@ async def process_echodata(
         logger.info("Saved metadata → %s", metadata_path)
         # Also write to local filesystem for the edgeai RAG indexer
         _write_local_copy(metadata_path, data, config.output_base_path)
+        _stage_done("metadata")
     except Exception as e:
         logger.error("Failed to save metadata: %s", e)
 
@@ -327,11 +434,7 @@ async def process_echodata(
 
     # --- Step 8: Telemetry ---
     if client:
-        try:
-            from exports.telemetry import send_processing_telemetry
-            send_processing_telemetry(client, result, config)
-        except Exception as e:
-            logger.error("Telemetry send failed: %s", e)
+        _send_telemetry(client, result, config)
 
     logger.info(
         "%s complete: %d pings in %dms",
@@ -340,6 +443,27 @@ async def process_echodata(
     return result
 
 
+def flush_realtime_nasc(config: "EdgeConfig", segment_store: "SegmentStore") -> Optional[str]:
+    """Save the realtime stream's open NASC distance bin as a segment of its own.
+
+    Called when a realtime or tail-follow stream ends; the segment is
+    named after the bin's first and last ping.  Returns the saved path
+    (``None`` without an open bin).
+    """
+    from process.nasc import flush_carry, realtime_carry
+
+    ds_nasc = flush_carry(realtime_carry(config))
+    if not ds_nasc.sizes:
+        return None
+    last_time = pd.Timestamp(ds_nasc.attrs["last_ping_time"]).to_datetime64()
+    span = xr.Dataset(coords={"ping_time": [ds_nasc["ping_time"].values[0], last_time]})
+    path = segment_store.save_zarr(
+        ds_nasc, segment_store.segment_day(span), segment_store.segment_name(span), "nasc",
+    )
+    logger.info("NASC: saved the open distance bin to %s", path)
+    return path
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # File trigger: raw file → full pipeline
 # ═══════════════════════════════════════════════════════════════════════
@@ -350,6 +474,9 @@ async def process_raw_file_pipeline(
     config: "EdgeConfig",
     segment_store: "SegmentStore",
     client: Optional["IoTHubModuleClient"] = None,
+    progress: Optional[Callable[[float, str], None]] = None,
+    converted: Optional[Tuple["EchoData", str]] = None,
+    entry: Optional["ManifestEntry"] = None,
 ) -> Dict[str, Any]:
     """Full pipeline for a single raw file.
 
@@ -367,13 +494,358 @@ async def process_raw_file_pipeline(
         {campaign}/processed/{stem}/mvbs.zarr
         {campaign}/processed/{stem}/metadata.json
         {campaign}/echograms/{stem}/sv_38kHz.png
+
+    *progress*, if given, is called as ``progress(fraction, stage)`` at
+    stage boundaries; an exception it raises (e.g. job cancellation)
+    aborts the pipeline.
+
+    *converted* is the ``(echodata, echodata_path)`` of an earlier
+    ``_convert_and_store`` call (e.g. prefetched while the previous file
+    was processed); conversion is then skipped.
+
+    With ``execution_backend = "dask"`` the file's stages run as tasks
+    on a dask cluster (``process.dask_backend``) instead.
+
+    *entry* is the file's resume-manifest entry: a file whose stages are
+    all complete returns its stored result, one whose Sv was saved
+    re-runs only the missing stages from ``sv.zarr``, and otherwise the
+    stored EchoData is reused if conversion finished.  Completed stages
+    are recorded as they are saved.
     """
-    from process.convert import convert_raw_file, save_echodata_zarr
+    from process.manifest import COMPLETE, RESUME
+
+    def _progress(fraction: float, stage: str) -> None:
+        if progress is not None:
+            progress(fraction, stage)
 
     start = time.time()
     stem = Path(file_path).stem
+
+    if entry is not None and entry.plan == COMPLETE:
+        stored = entry.stored_result
+        if stored is not None:
+            logger.info("File pipeline: %s already complete — skipping", file_path)
+            stored["resumed"] = COMPLETE
+            return stored
+    if entry is not None and entry.plan == RESUME:
+        logger.info("File pipeline: %s resuming stages %s", file_path, ",".join(entry.pending))
+        _progress(0.0, "resume")
+        result = await _resume_from_sv(file_path, config, segment_store, entry)
+        result["total_time_ms"] = int((time.time() - start) * 1000)
+        entry.save_result(result)
+        _progress(0.95, "publish")
+        _publish_stored_result(client, result, config, segment_store.storage)
+        return result
+
+    if config.execution_backend == "dask":
+        from process.dask_backend import run_file_on_dask
+        from process.reprocess import STAGES
+        logger.info("File pipeline: %s  (stem=%s) → dask", file_path, stem)
+        result = await run_file_on_dask(file_path, config, segment_store.storage, progress=progress)
+        _publish_stored_result(client, result, config, segment_store.storage)
+        if entry is not None and result.get("status") == "ok":
+            stages = ["convert"] if result.get("echodata_path") else []
+            stages += ["sv"] + [s for s in STAGES if s in result] + ["metadata"]
+            for stage in stages:
+                entry.record(stage)
+            entry.save_result(result)
+        _send_ml_payload(client, file_path, result, config)
+        return result
+
     logger.info("File pipeline: %s  (stem=%s)", file_path, stem)
 
+    _progress(0.0, "convert")
+    if converted is None:
+        converted = _prepare_echodata(file_path, config, segment_store, entry)
+    echodata, echodata_storage_path = converted
+
+    _progress(0.4, "process")
+    result = await process_echodata(
+        echodata, config, segment_store, client, file_stem=stem,
+        on_stage=entry.record if entry is not None else None,
+    )
+    result["source_file"] = Path(file_path).name
+    result["echodata_path"] = echodata_storage_path
+    result["total_time_ms"] = int((time.time() - start) * 1000)
+    if entry is not None:
+        entry.save_result(result)
+    _progress(0.95, "publish")
+
+    _send_ml_payload(client, file_path, result, config)
+    return result
+
+
+async def _resume_from_sv(
+    file_path: str,
+    config: "EdgeConfig",
+    segment_store: "SegmentStore",
+    entry: "ManifestEntry",
+) -> Dict[str, Any]:
+    """Re-run a file's pending post-Sv stages from its stored ``sv.zarr``."""
+    from process.manifest import RESUME
+    from process.reprocess import STAGES, reprocess_products
+
+    storage = segment_store.storage
+    stem = Path(file_path).stem
+    campaign = config.campaign_container
+    prefix = f"{campaign}/{config.processed_container}/{stem}"
+
+    summary = _stored_sv_summary(storage, prefix, stem)
+    stages = [s for s in STAGES if s in entry.pending]
+    result = await reprocess_products(
+        prefix, f"{campaign}/{config.echogram_container}/{stem}", date.fromisoformat(summary["day"]),
+        stages, config, storage, force=True, on_stage=entry.record,
+    )
+    _complete_stored_result(storage, prefix, summary, result)
+    entry.record("metadata")
+    # Publish a summary saved before the interruption like a fresh one
+    summary_path = f"{prefix}/acoustic_summary.osas"
+    if config.acoustic_summary_enabled and "acoustic_summary_path" not in result and storage.exists(summary_path):
+        result["acoustic_summary_path"] = summary_path
+    result.update(
+        source_file=Path(file_path).name,
+        resumed=RESUME,
+        resumed_stages=result.pop("stages_run"),
+    )
+    return result
+
+
+def _track_summary(track: Optional[pd.DataFrame], start, end) -> Dict[str, Any]:
+    """``track`` / ``track_distance_nmi`` result entries for pings in ``[start, end]``."""
+    if track is None or not len(track):
+        return {}
+    from exports.location import select_location_points
+    from process.track_store import track_distance_nmi
+
+    inside = track[(track["dt"] >= start) & (track["dt"] <= end)]
+    if not len(inside):
+        return {}
+    return {
+        "track": [
+            [pd.Timestamp(row.dt).isoformat(), round(float(row.lat), 6), round(float(row.lon), 6)]
+            for row in select_location_points(inside, _MAX_TRACK_VERTICES).itertuples()
+        ],
+        "track_distance_nmi": round(track_distance_nmi(inside), 3),
+    }
+
+
+def _send_acoustic_summary(client: "IoTHubModuleClient", summary: bytes, label: str, day: str) -> None:
+    """Send an encoded acoustic summary on output1."""
+    from azure_handler.message_handler import send_to_hub
+    from exports.acoustic_summary import acoustic_summary_message
+
+    send_to_hub(client, acoustic_summary_message(summary, label, day), output_name="output1")
+
+
+def _send_telemetry(client: "IoTHubModuleClient", result: Dict[str, Any], config: "EdgeConfig") -> None:
+    try:
+        from exports.telemetry import send_processing_telemetry
+        send_processing_telemetry(client, result, config)
+    except Exception as e:
+        logger.error("Telemetry send failed: %s", e)
+
+
+def _publish_stored_result(
+    client: Optional["IoTHubModuleClient"],
+    result: Dict[str, Any],
+    config: "EdgeConfig",
+    storage,
+) -> None:
+    """Finish a file result whose stages ran through ``reprocess_products``.
+
+    Adds what ``process_echodata`` adds in-process — the stored-track
+    summary, the acoustic summary message and the processing telemetry —
+    for files run on dask or resumed from ``sv.zarr``.
+    """
+    if result.get("status") != "ok":
+        return
+    if "track" not in result and result.get("start_time") and result.get("end_time"):
+        from process.track_store import TrackStore
+
+        start, end = pd.Timestamp(result["start_time"]), pd.Timestamp(result["end_time"])
+        try:
+            track = TrackStore.from_config(config).load(start, end)
+        except Exception as e:
+            logger.debug("No stored track for %s: %s", result.get("segment"), e)
+            track = None
+        result.update(_track_summary(track, start.to_datetime64(), end.to_datetime64()))
+    if not client:
+        return
+    if result.get("acoustic_summary_path"):
+        try:
+            summary = storage.load_file(result["acoustic_summary_path"])
+            _send_acoustic_summary(client, summary, result["segment"], result["day"])
+        except Exception as e:
+            logger.error("Acoustic summary send failed: %s", e)
+    _send_telemetry(client, result, config)
+
+
+def _stored_sv_summary(storage, prefix: str, stem: str) -> Dict[str, Any]:
+    """Descriptive metadata of a stored ``sv.zarr`` (coordinates only, no data read)."""
+    ds_sv = storage.load_zarr(f"{prefix}/sv.zarr")
+    ping_times = ds_sv["ping_time"].values
+    summary: Dict[str, Any] = {
+        "file": stem,
+        "day": pd.Timestamp(ping_times[0]).date().isoformat(),
+        "segment": stem,
+        "start_time": pd.Timestamp(ping_times[0]).isoformat(),
+        "end_time": pd.Timestamp(ping_times[-1]).isoformat(),
+        "n_pings": int(len(ping_times)),
+        "n_channels": int(ds_sv.sizes.get("channel", 0)),
+        "channels": [str(ch) for ch in ds_sv.coords["channel"].values],
+    }
+    if "frequency_nominal" in ds_sv:
+        summary["frequencies_hz"] = [float(f) for f in ds_sv["frequency_nominal"].values]
+    return summary
+
+
+def _complete_stored_result(storage, prefix: str, summary: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """Fill a stage-wise *result* (and a bare ``metadata.json``) from *summary*."""
+    from process.reprocess import load_segment_metadata
+
+    # A crash before the first metadata.json leaves only what reprocess wrote
+    metadata = load_segment_metadata(storage, prefix)
+    if "start_time" not in metadata:
+        metadata = {**summary, **metadata}
+        storage.save_file(json.dumps(metadata, indent=2, default=str).encode("utf-8"), f"{prefix}/metadata.json")
+
+    for key in ("start_time", "end_time", "frequencies_hz", "channels", "depth_range_m",
+                "lat_range", "lon_range", "sv_mean_db", "echogram_files"):
+        if metadata.get(key) is not None:
+            result.setdefault(key, metadata[key])
+    result.setdefault("n_pings", summary["n_pings"])
+    result.update(status="ok", day=summary["day"], segment=summary["segment"], sv_path=f"{prefix}/sv.zarr")
+
+
+def _prepare_echodata(
+    file_path: str,
+    config: "EdgeConfig",
+    segment_store: "SegmentStore",
+    entry: Optional["ManifestEntry"] = None,
+) -> Tuple["EchoData", str]:
+    """EchoData of a raw file: re-opened from storage if the manifest says
+    conversion finished, converted (and recorded) otherwise."""
+    path = f"{config.campaign_container}/{config.converted_container}/{Path(file_path).stem}.zarr"
+    if entry is not None and "convert" in entry.done and segment_store.storage.exists(path):
+        try:
+            echodata = segment_store.storage.load_echodata(path)
+            logger.info("Reusing stored EchoData → %s", path)
+            return echodata, path
+        except Exception as e:
+            logger.warning("Could not open stored EchoData %s (%s) — converting again", path, e)
+    echodata, path = _convert_and_store(file_path, config, segment_store)
+    if entry is not None and path:
+        entry.record("convert")
+    return echodata, path
+
+
+async def process_raw_file_batch(
+    file_paths: List[str],
+    config: "EdgeConfig",
+    segment_store: "SegmentStore",
+    client: Optional["IoTHubModuleClient"] = None,
+    entries: Optional[Dict[str, "ManifestEntry"]] = None,
+) -> List[Dict[str, Any]]:
+    """Process several consecutive raw files as one merged batch.
+
+    Small EK80 files (a few hundred pings) each pay the full fixed cost
+    of Sv calibration and denoising.  Files with the same channel
+    configuration are combined into one EchoData, Sv and denoised Sv
+    are computed once over the run (which also gives the denoise
+    windows context across file boundaries), and each file's pings —
+    located by their offset in the combined data, so files with
+    overlapping or repeated ping times stay apart — are then handed to
+    ``process_echodata``; products keep the per-file layout of
+    ``process_raw_file_pipeline``.
+
+    Files whose configuration differs from their neighbours', or runs
+    that fail to combine, are processed individually.
+
+    *entries* maps file paths to resume-manifest entries; each file's
+    stages are recorded in its own entry.
+    """
+    from process.compute_sv import compute_sv
+    from process.config_adapter import to_denoise_config
+    from process.denoise import denoise
+
+    entries = entries or {}
+    start = time.time()
+    converted = []
+    for path in file_paths:
+        echodata, echodata_path = _prepare_echodata(path, config, segment_store, entries.get(path))
+        converted.append((path, echodata, echodata_path))
+    converted.sort(key=lambda item: _first_ping_time(item[1]))
+
+    # Runs of consecutive files with identical channel configuration
+    runs: List[List[tuple]] = []
+    for item in converted:
+        if runs and _channel_key(runs[-1][-1][1]) == _channel_key(item[1]):
+            runs[-1].append(item)
+        else:
+            runs.append([item])
+
+    results: List[Dict[str, Any]] = []
+    for run in runs:
+        ds_sv_all = ds_denoised_all = None
+        file_slices: List[slice] = []
+        if len(run) > 1:
+            try:
+                from echopype import combine_echodata
+                combined = combine_echodata([ed for _, ed, _ in run])
+                ds_sv_all = compute_sv(
+                    combined,
+                    waveform_mode=config.waveform_mode,
+                    encode_mode=config.encode_mode,
+                    use_gpu=config.use_gpu,
+                    depth_offset=config.depth_offset,
+                    drop_empty_pings=False,
+                )
+                del combined
+                ds_sv_all, file_slices = _split_by_file(ds_sv_all, [ed for _, ed, _ in run])
+                if config.denoise_enabled:
+                    ds_denoised_all = denoise(ds_sv_all, config=to_denoise_config(config))
+                logger.info("Merged batch: %d files, %d pings", len(run), ds_sv_all.sizes.get("ping_time", 0))
+            except Exception as e:
+                logger.warning("Could not merge %d files (%s) — processing individually", len(run), e)
+                ds_sv_all = ds_denoised_all = None
+            _release_memory()
+
+        for i, (path, echodata, echodata_path) in enumerate(run):
+            stem = Path(path).stem
+            entry = entries.get(path)
+            pings = file_slices[i] if ds_sv_all is not None else None
+            result = await process_echodata(
+                echodata, config, segment_store, client, file_stem=stem,
+                ds_sv=ds_sv_all.isel(ping_time=pings) if pings is not None else None,
+                ds_denoised=ds_denoised_all.isel(ping_time=pings)
+                if pings is not None and ds_denoised_all is not None else None,
+                on_stage=entry.record if entry is not None else None,
+            )
+            result["source_file"] = Path(path).name
+            result["echodata_path"] = echodata_path
+            result["merged_batch"] = len(run) if ds_sv_all is not None else 1
+            if entry is not None:
+                entry.save_result(result)
+            _send_ml_payload(client, path, result, config)
+            results.append(result)
+        del ds_sv_all, ds_denoised_all
+        _release_memory()
+
+    elapsed = int((time.time() - start) * 1000)
+    for result in results:
+        result["total_time_ms"] = elapsed
+    return results
+
+
+def _convert_and_store(
+    file_path: str,
+    config: "EdgeConfig",
+    segment_store: "SegmentStore",
+) -> Tuple["EchoData", str]:
+    """Convert a raw file and save its EchoData; returns ``(echodata, path)``."""
+    from process.convert import convert_raw_file
+
+    stem = Path(file_path).stem
     echodata = convert_raw_file(file_path, sonar_model=config.sonar_model)
 
     # Set platform metadata from config
@@ -398,31 +870,70 @@ async def process_raw_file_pipeline(
     except Exception as e:
         logger.warning("Failed to save EchoData to storage: %s", e)
         echodata_storage_path = ""
+    return echodata, echodata_storage_path
 
-    result = await process_echodata(
-        echodata, config, segment_store, client, file_stem=stem,
-    )
-    result["source_file"] = Path(file_path).name
-    result["echodata_path"] = echodata_storage_path
-    result["total_time_ms"] = int((time.time() - start) * 1000)
 
-    # Send ML payload (preserves existing outputml route)
-    if client and result.get("sv_path"):
-        try:
-            from azure_handler.message_handler import send_to_hub
-            ml_payload = {
-                "file_name": Path(file_path).name,
-                "sv_zarr_path": result["sv_path"],
-                "campaign_id": config.survey_id,
-                "dataset_id": stem,
-                "depth_offset": config.depth_offset,
-                "date": result.get("day", ""),
-            }
-            send_to_hub(client, ml_payload, output_name="outputml")
-        except Exception as e:
-            logger.error("ML payload send failed: %s", e)
+def _send_ml_payload(
+    client: Optional["IoTHubModuleClient"],
+    file_path: str,
+    result: Dict[str, Any],
+    config: "EdgeConfig",
+) -> None:
+    """Send the ML payload (preserves existing outputml route)."""
+    if not client or not result.get("sv_path"):
+        return
+    try:
+        from azure_handler.message_handler import send_to_hub
+        ml_payload = {
+            "file_name": Path(file_path).name,
+            "sv_zarr_path": result["sv_path"],
+            "campaign_id": config.survey_id,
+            "dataset_id": Path(file_path).stem,
+            "depth_offset": config.depth_offset,
+            "date": result.get("day", ""),
+        }
+        send_to_hub(client, ml_payload, output_name="outputml")
+    except Exception as e:
+        logger.error("ML payload send failed: %s", e)
 
-    return result
+
+def _split_by_file(ds_sv: xr.Dataset, echodatas: List["EchoData"]) -> Tuple[xr.Dataset, List[slice]]:
+    """Drop empty pings from the Sv of combined EchoData and locate each file's pings.
+
+    ``combine_echodata`` concatenates the files' pings in order, so file
+    *i* owns the pings between the cumulative ping counts of the files
+    before it.  Returns the Sv without all-NaN pings and each file's
+    slice of it; raises ``ValueError`` if the ping counts do not add up.
+    """
+    counts = [echodata["Sonar/Beam_group1"].sizes["ping_time"] for echodata in echodatas]
+    if sum(counts) != ds_sv.sizes["ping_time"]:
+        raise ValueError(f"{ds_sv.sizes['ping_time']} Sv pings for {sum(counts)} file pings")
+    other_dims = [d for d in ds_sv["Sv"].dims if d != "ping_time"]
+    valid = ds_sv["Sv"].notnull().any(dim=other_dims).values
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    kept = np.concatenate([[0], np.cumsum([valid[a:b].sum() for a, b in zip(offsets[:-1], offsets[1:])])])
+    slices = [slice(int(a), int(b)) for a, b in zip(kept[:-1], kept[1:])]
+    return ds_sv.isel(ping_time=np.flatnonzero(valid)), slices
+
+
+def _channel_key(echodata: "EchoData") -> tuple:
+    """Channel configuration of an EchoData (files must match to merge)."""
+    try:
+        beam = echodata["Sonar/Beam_group1"]
+        return (
+            tuple(str(c) for c in beam["channel"].values),
+            tuple(float(f) for f in beam["frequency_nominal"].values),
+            tuple(sorted(echodata.group_paths)),
+        )
+    except Exception:
+        return (id(echodata),)
+
+
+def _first_ping_time(echodata: "EchoData") -> np.datetime64:
+    try:
+        return echodata["Sonar/Beam_group1"]["ping_time"].values.min()
+    except Exception:
+        return np.datetime64("NaT")
 
 
 _LOCAL_BASE = Path("/app/processed")
@@ -0,0 +1,359 @@
+"""Fast ``.raw`` header index without ``open_raw``.
+
+Walks a Simrad EK60/EK80 raw file datagram by datagram over a memory
+map, decoding only what planning and reporting need:
+
+- configuration (``XML0`` Configuration / ``CON0``) → channel ids and
+  nominal frequencies,
+- sample datagram headers (``RAW3`` / ``RAW0``) → time range, pings per
+  channel, total samples and the on-disk sample format,
+- NMEA (``NME0``) → latitude/longitude bounding box.
+
+Sample payloads are skipped, so a scan touches a few KB per ping
+instead of parsing the whole file.  Results are cached per directory in
+``.rawindex.json`` and re-scanned when a file's size or mtime changes.
+
+Datagram framing::
+
+    int32 length | char[4] type | uint64 FILETIME | body | int32 length
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("oceanstream")
+
+INDEX_FILENAME = ".rawindex.json"
+_INDEX_VERSION = 1
+
+# FILETIME (100 ns since 1601-01-01) → Unix epoch
+_FILETIME_EPOCH = 116444736000000000
+
+_HEAD = struct.Struct("<l4sQ")
+_RAW3 = struct.Struct("<128shhll")                   # channel id, datatype, spare, offset, count
+_RAW0 = struct.Struct("<hh12fhh2fll")                # channel, mode, 12 floats, …, offset, count
+_CON0_COUNT_OFFSET = 128 * 3 + 30 + 98
+_CON0_TRANSCEIVER = 320
+
+_indexes: Dict[str, "RawIndex"] = {}
+_indexes_lock = threading.Lock()
+
+
+@dataclass
+class RawFileInfo:
+    """Header summary of one raw file."""
+
+    path: str
+    size: int
+    mtime: float
+    sonar_model: str = ""
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    channels: List[str] = field(default_factory=list)
+    frequencies_hz: List[float] = field(default_factory=list)
+    ping_counts: Dict[str, int] = field(default_factory=dict)
+    n_pings: int = 0
+    total_samples: int = 0
+    raw_bytes_per_sample: int = 0
+    mem_bytes_per_sample: int = 0
+    lat_range: Optional[List[float]] = None
+    lon_range: Optional[List[float]] = None
+    complete: bool = True            # ends on a datagram boundary
+    scanned_bytes: int = 0           # bytes of complete datagrams
+
+    @property
+    def channel_key(self) -> Tuple:
+        """Channel configuration (files must match to be merged)."""
+        return (self.sonar_model, tuple(self.channels), tuple(self.frequencies_hz))
+
+
+def _filetime_iso(ft: int) -> str:
+    ns = (ft - _FILETIME_EPOCH) * 100
+    return str(np.datetime64(ns, "ns"))
+
+
+def _sample_format(dgram: bytes, datatype: int) -> Tuple[int, int]:
+    """(bytes per sample on disk, at peak in memory) for a sample datagram."""
+    if dgram == b"RAW3":
+        n_complex = (datatype >> 8) & 0x7 or 1
+        if datatype & 0b1000:                  # complex float32
+            return 8 * n_complex, 16 * n_complex
+        if datatype & 0b0100:                  # complex float16
+            return 4 * n_complex, 16 * n_complex
+        return 2 * bool(datatype & 0b01) + 2 * bool(datatype & 0b10) or 4, 8
+    # RAW0 mode: 1 = power, 2 = angle, 3 = both
+    return 2 * bool(datatype & 1) + 2 * bool(datatype & 2) or 4, 8
+
+
+def _nmea_position(text: str) -> Optional[Tuple[float, float]]:
+    """Latitude/longitude from a GGA, RMC or GLL sentence."""
+    def coord(value: str, hemi: str, deg_digits: int) -> float:
+        v = float(value[:deg_digits]) + float(value[deg_digits:]) / 60.0
+        return -v if hemi in ("S", "W") else v
+
+    line = text.strip().split("*", 1)[0]
+    parts = line.split(",")
+    if not parts or len(parts[0]) < 6:
+        return None
+    kind = parts[0][-3:]
+    try:
+        if kind == "GGA" and len(parts) > 5:
+            return coord(parts[2], parts[3], 2), coord(parts[4], parts[5], 3)
+        if kind == "RMC" and len(parts) > 6 and parts[2] == "A":
+            return coord(parts[3], parts[4], 2), coord(parts[5], parts[6], 3)
+        if kind == "GLL" and len(parts) > 4:
+            return coord(parts[1], parts[2], 2), coord(parts[3], parts[4], 3)
+    except (ValueError, IndexError):
+        return None
+    return None
+
+
+def _xml_channels(text: str) -> List[Tuple[str, float]]:
+    """(channel id, nominal frequency) pairs from an EK80 Configuration XML."""
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError:
+        return []
+    if root.tag != "Configuration":
+        return []
+    out = []
+    for channel in root.iter("Channel"):
+        cid = channel.get("ChannelID")
+        if not cid:
+            continue
+        freq = 0.0
+        for transducer in channel.iter("Transducer"):
+            try:
+                freq = float(transducer.get("Frequency", 0) or 0)
+            except ValueError:
+                pass
+        out.append((cid, freq))
+    return out
+
+
+def iter_datagrams(buf, offset: int = 0) -> Iterator[Tuple[bytes, int, int, int]]:
+    """Complete datagrams in *buf* from *offset*.
+
+    Yields ``(type, filetime, body_start, end)`` where the body spans
+    ``buf[body_start:end - 4]`` and the next datagram starts at *end*.
+    Stops at the first incomplete datagram.
+    """
+    n = len(buf)
+    pos = offset
+    while pos + 4 <= n:
+        (length,) = struct.unpack_from("<l", buf, pos)
+        end = pos + 4 + length + 4
+        if length < _HEAD.size - 4 or end > n:
+            return
+        _, dgram, ft = _HEAD.unpack_from(buf, pos)
+        yield dgram, ft, pos + _HEAD.size, end
+        pos = end
+
+
+def scan_raw_file(path: str) -> RawFileInfo:
+    """Scan a raw file's datagram headers.
+
+    Stops at the first incomplete datagram (files still being written
+    report ``complete=False``).
+    """
+    st = os.stat(path)
+    info = RawFileInfo(path=str(path), size=st.st_size, mtime=st.st_mtime)
+    channel_freq: Dict[str, float] = {}
+    ping_counts: Dict[str, int] = {}
+    first_ft = last_ft = None
+    lats: List[float] = []
+    lons: List[float] = []
+    raw0_channels: Dict[int, str] = {}
+
+    if st.st_size == 0:
+        info.complete = False
+        return info
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = 0
+        for dgram, ft, body, end in iter_datagrams(mm):
+            try:
+                if dgram == b"RAW3":
+                    cid, datatype, _, _, count = _RAW3.unpack_from(mm, body)
+                    cid = cid.split(b"\0", 1)[0].decode("ascii", "replace").strip()
+                    ping_counts[cid] = ping_counts.get(cid, 0) + 1
+                    channel_freq.setdefault(cid, 0.0)
+                    info.total_samples += count
+                    if not info.raw_bytes_per_sample:
+                        info.sonar_model = "EK80"
+                        info.raw_bytes_per_sample, info.mem_bytes_per_sample = _sample_format(dgram, datatype)
+                    first_ft = ft if first_ft is None else first_ft
+                    last_ft = ft
+                elif dgram == b"RAW0":
+                    vals = _RAW0.unpack_from(mm, body)
+                    channel, mode, freq, count = vals[0], vals[1], vals[3], vals[-1]
+                    cid = raw0_channels.get(channel, f"channel{channel}")
+                    ping_counts[cid] = ping_counts.get(cid, 0) + 1
+                    channel_freq.setdefault(cid, float(freq))
+                    info.total_samples += count
+                    if not info.raw_bytes_per_sample:
+                        info.sonar_model = "EK60"
+                        info.raw_bytes_per_sample, info.mem_bytes_per_sample = _sample_format(dgram, mode)
+                    first_ft = ft if first_ft is None else first_ft
+                    last_ft = ft
+                elif dgram == b"NME0":
+                    text = mm[body:end - 4].split(b"\0", 1)[0].decode("ascii", "replace")
+                    fix = _nmea_position(text)
+                    if fix is not None and (fix[0] or fix[1]):
+                        lats.append(fix[0])
+                        lons.append(fix[1])
+                elif dgram == b"XML0" and not channel_freq:
+                    text = mm[body:end - 4].split(b"\0", 1)[0].decode("utf-8", "replace")
+                    for cid, freq in _xml_channels(text):
+                        channel_freq[cid] = freq
+                elif dgram == b"CON0":
+                    (count,) = struct.unpack_from("<l", mm, body + _CON0_COUNT_OFFSET)
+                    base = body + _CON0_COUNT_OFFSET + 4
+                    for i in range(max(count, 0)):
+                        rec = base + i * _CON0_TRANSCEIVER
+                        if rec + 136 > end - 4:
+                            break
+                        cid = bytes(mm[rec:rec + 128]).split(b"\0", 1)[0].decode("ascii", "replace").strip()
+                        (freq,) = struct.unpack_from("<f", mm, rec + 132)
+                        raw0_channels[i + 1] = cid
+                        channel_freq[cid] = float(freq)
+            except struct.error:
+                # Datagram shorter than its declared type: treat as truncated
+                break
+            pos = end
+        info.scanned_bytes = pos
+        info.complete = pos == len(mm)
+
+    info.channels = list(channel_freq)
+    info.frequencies_hz = [channel_freq[c] for c in info.channels]
+    info.ping_counts = ping_counts
+    info.n_pings = max(ping_counts.values()) if ping_counts else 0
+    if first_ft is not None:
+        info.start_time = _filetime_iso(first_ft)
+        info.end_time = _filetime_iso(last_ft)
+    if lats:
+        info.lat_range = [min(lats), max(lats)]
+        info.lon_range = [min(lons), max(lons)]
+    return info
+
+
+class RawIndex:
+    """Per-directory index of raw files, cached in ``.rawindex.json``.
+
+    Entries are re-scanned when a file's size or mtime changes.  If the
+    directory is not writable the index is kept in memory only.  Several
+    processes may index the same directory: ``save`` merges what the
+    others saved and replaces the file atomically.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path = self.directory / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._entries: Dict[str, RawFileInfo] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        self._entries.update(self._read())
+
+    def _read(self) -> Dict[str, RawFileInfo]:
+        """Entries of the index file (empty if missing, unreadable or stale)."""
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != _INDEX_VERSION:
+            return {}
+        entries = {}
+        for name, entry in data.get("files", {}).items():
+            try:
+                entries[name] = RawFileInfo(**entry)
+            except TypeError:
+                continue
+        return entries
+
+    def get(self, path: str) -> RawFileInfo:
+        """Index entry for *path*, scanning it if new or changed."""
+        p = Path(path)
+        st = p.stat()
+        with self._lock:
+            entry = self._entries.get(p.name)
+            if entry is not None and entry.size == st.st_size and entry.mtime == st.st_mtime:
+                return entry
+        entry = scan_raw_file(str(p))
+        # Growing files are not cached: they change on every call
+        if entry.complete:
+            with self._lock:
+                self._entries[p.name] = entry
+                self._dirty = True
+        return entry
+
+    def scan(self, pattern: str = "*.raw") -> List[RawFileInfo]:
+        """Index every matching file in the directory (sorted by name)."""
+        entries = [self.get(str(p)) for p in sorted(self.directory.glob(pattern))]
+        self.save()
+        return entries
+
+    def save(self) -> None:
+        """Write new entries, keeping those other processes saved meanwhile."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+        on_disk = self._read()
+        with self._lock:
+            for name, entry in on_disk.items():
+                self._entries.setdefault(name, entry)
+            payload = {
+                "version": _INDEX_VERSION,
+                "files": {name: asdict(e) for name, e in self._entries.items()},
+            }
+        tmp = None
+        try:
+            # A unique temporary name: concurrent writers never share one
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.directory, prefix=INDEX_FILENAME + ".", suffix=".tmp", delete=False,
+            ) as f:
+                tmp = f.name
+                json.dump(payload, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.debug("Raw index not saved (%s): %s", self.path, e)
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+
+def get_raw_index(directory: Path) -> RawIndex:
+    """Shared (per-process) index for *directory*."""
+    key = str(Path(directory).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = RawIndex(Path(key))
+    return index
+
+
+def raw_file_info(path: str, *, save: bool = True) -> RawFileInfo:
+    """Header summary of *path* through its directory's cached index."""
+    index = get_raw_index(Path(path).parent)
+    info = index.get(path)
+    if save:
+        index.save()
+    return info
@@ -1,24 +1,68 @@
 """Seabed detection and masking for edge Sv datasets.
 
-Uses ``oceanstream.echodata.seabed`` to detect the seabed line and mask
-samples below it.  Disabled by default (``seabed_enabled=False`` in config).
+Detects the seabed line and masks samples below it.  Disabled by default
+(``seabed_enabled=False`` in config).  Two engines:
+
+- ``oceanstream`` (default) — ``oceanstream.echodata.seabed``:
+  ``detect_seabed`` (``ariza``, ``maxSv``, … over the median-filtered
+  first channel) then ``mask_seabed``.
+- ``native`` — bottom tracking with the ``maxSv`` rule on the first
+  channel's (already denoised, not median-filtered) Sv.  Each ping's
+  peak is searched only within ``track_window`` metres of the previous
+  ping's bottom (the full ``[10 m, max_range]`` gate after a ping
+  without one, and every ``TRACK_RESTART_PINGS`` pings); the upward
+  search for the seabed edge runs vectorized over all pings.  Depth
+  grids (gate and window in samples) are cached per channel geometry
+  across batches, and the mask is one comparison of ``echo_range``
+  against the line instead of a deep-copied Dataset.
+
+The periodic restarts bound how far back a ping's bottom depends on
+earlier pings: restarts fall on multiples of ``TRACK_RESTART_PINGS``
+counted from ``ping_offset`` (the dataset's first ping within its file),
+so a ping-range shard whose halo covers one restart interval tracks its
+core exactly as the unsharded run does.
+
+Both engines attach the line as the ``seabed_depth`` coordinate
+(``ping_time``); ``seabed_line`` turns it into the compact
+``seabed_line.zarr`` product.
 """
 
 from __future__ import annotations
 
+import hashlib
 import logging
-from typing import Literal
+import threading
+from collections import OrderedDict
+from typing import Literal, Tuple
 
+import numpy as np
 import xarray as xr
 
 logger = logging.getLogger("oceanstream")
 
+# oceanstream detect_seabed_maxSv defaults
+_MIN_RANGE = 10.0                  # Start of the search gate (m)
+_PEAK_THRESHOLD = -40.0            # Minimum peak Sv (dB)
+_EDGE_THRESHOLD = -60.0            # Edge: 5-sample mean Sv above the sample below this (dB)
+_EDGE_SAMPLES = 5
+
+# Native tracker: full-gate search every this many pings (see module docstring)
+TRACK_RESTART_PINGS = 100
+
+# Depth grid per (channel geometry, max_range, track_window)
+_DEPTH_GRID_CACHE: "OrderedDict[tuple, _DepthGrid]" = OrderedDict()
+_DEPTH_GRID_CACHE_SIZE = 64
+_DEPTH_GRID_LOCK = threading.Lock()
+
 
 def apply_seabed(
     ds_sv: xr.Dataset,
     *,
     method: Literal["maxSv", "deltaSv", "ariza", "composite", "blackwell"] = "ariza",
     max_range: float = 1000.0,
+    engine: str = "oceanstream",
+    track_window: float = 20.0,
+    ping_offset: int = 0,
 ) -> xr.Dataset:
     """Detect the seabed and mask samples below it.
 
@@ -27,21 +71,191 @@ def apply_seabed(
     ds_sv
         Sv (or denoised Sv) dataset.
     method
-        Detection algorithm passed to ``detect_seabed()``.
+        Detection algorithm passed to ``detect_seabed()`` (oceanstream
+        engine; the native engine always tracks with ``maxSv``).
     max_range
         Maximum range (metres) to search for the seabed.
+    engine
+        ``"oceanstream"`` or ``"native"``.
+    track_window
+        Native engine: metres searched above and below the previous
+        ping's bottom.
+    ping_offset
+        Native engine: index of the first ping within its file, which
+        aligns the tracker's restarts (non-zero for ping-range shards).
 
     Returns
     -------
     xr.Dataset
-        Sv dataset with below-seabed samples set to NaN.
+        Sv dataset with below-seabed samples set to NaN and the seabed
+        line as the ``seabed_depth`` coordinate.
     """
-    from oceanstream.echodata.seabed import detect_seabed, mask_seabed
-
-    logger.info("Detecting seabed (method=%s, max_range=%.0fm)", method, max_range)
+    if engine == "native":
+        logger.info("Tracking seabed (max_range=%.0fm, track_window=%.0fm)", max_range, track_window)
+        ds_masked = _native_seabed(ds_sv, max_range, track_window, ping_offset)
+    else:
+        from oceanstream.echodata.seabed import detect_seabed, mask_seabed
 
-    seabed_result = detect_seabed(ds_sv, method=method, r1=max_range)
-    ds_masked = mask_seabed(ds_sv, seabed_result)
+        logger.info("Detecting seabed (method=%s, max_range=%.0fm)", method, max_range)
+        seabed_result = detect_seabed(ds_sv, method=method, r1=max_range)
+        ds_masked = mask_seabed(ds_sv, seabed_result)
+        ds_masked["seabed_depth"].attrs.update(method=seabed_result.method, channel=seabed_result.channel)
 
-    logger.info("Seabed masking complete")
+    detected = int(np.isfinite(ds_masked["seabed_depth"].values).sum())
+    logger.info("Seabed masking complete: detected in %d/%d pings", detected, ds_masked.sizes.get("ping_time", 0))
     return ds_masked
+
+
+def seabed_line(ds_seabed: xr.Dataset) -> xr.Dataset:
+    """Compact bottom-line product of a seabed-masked dataset.
+
+    ``seabed_depth`` per ping (NaN where none was detected), plus the
+    ping positions when present.
+    """
+    line = xr.Dataset(
+        {"seabed_depth": ds_seabed["seabed_depth"].reset_coords(drop=True)},
+        coords={"ping_time": ds_seabed["ping_time"].values},
+    )
+    for var in ("latitude", "longitude"):
+        if var in ds_seabed and ds_seabed[var].dims == ("ping_time",):
+            line[var] = ds_seabed[var].reset_coords(drop=True)
+    line.attrs["processing_function"] = "process.seabed.apply_seabed"
+    return line
+
+
+class _DepthGrid:
+    """Search geometry of one channel's range samples.
+
+    ``row`` is the range per sample, ``[i0, i1)`` the search gate and
+    ``window`` the track window in samples.
+    """
+
+    __slots__ = ("row", "i0", "i1", "window")
+
+    def __init__(self, row: np.ndarray, i0: int, i1: int, window: int):
+        self.row = row
+        self.i0 = i0
+        self.i1 = i1
+        self.window = window
+
+
+def _depth_grid(row: np.ndarray, max_range: float, track_window: float) -> _DepthGrid:
+    """Cached depth grid of one sample geometry (gate as in oceanstream)."""
+    key = (max_range, track_window, hashlib.sha1(np.ascontiguousarray(row).tobytes()).hexdigest())
+    with _DEPTH_GRID_LOCK:
+        if key in _DEPTH_GRID_CACHE:
+            _DEPTH_GRID_CACHE.move_to_end(key)
+            return _DEPTH_GRID_CACHE[key]
+
+    i0 = int(np.nanargmin(np.abs(row - _MIN_RANGE)))
+    i1 = min(int(np.nanargmin(np.abs(row - max_range))) + 1, len(row))
+    step = np.diff(row)
+    step = float(np.nanmedian(step[step > 0])) if np.any(step > 0) else 1.0
+    grid = _DepthGrid(row, i0, i1, max(1, int(round(track_window / step))))
+
+    with _DEPTH_GRID_LOCK:
+        _DEPTH_GRID_CACHE[key] = grid
+        while len(_DEPTH_GRID_CACHE) > _DEPTH_GRID_CACHE_SIZE:
+            _DEPTH_GRID_CACHE.popitem(last=False)
+    return grid
+
+
+def _range_array(ds: xr.Dataset) -> xr.DataArray:
+    """Range per sample, looked up as in oceanstream's seabed module."""
+    for name, kind in (("echo_range", "data"), ("echo_range", "coord"), ("range", "coord"), ("depth", "coord")):
+        if name in (ds.data_vars if kind == "data" else ds.coords):
+            return ds[name]
+    raise ValueError("No range coordinate found (echo_range, range, or depth)")
+
+
+def _track_peaks(sv: np.ndarray, grid: _DepthGrid, ping_offset: int = 0) -> np.ndarray:
+    """Peak sample per ping (``-1`` = none), each searched near the previous bottom."""
+    peaks = np.full(sv.shape[0], -1, dtype=np.int64)
+    prev = -1
+    for p in range(sv.shape[0]):
+        if prev >= 0 and (ping_offset + p) % TRACK_RESTART_PINGS:
+            lo, hi = max(grid.i0, prev - grid.window), min(grid.i1, prev + grid.window + 1)
+        else:
+            lo, hi = grid.i0, grid.i1
+        seg = sv[p, lo:hi]
+        k = int(np.argmax(np.where(np.isnan(seg), -np.inf, seg))) if hi > lo else 0
+        if hi > lo and seg[k] >= _PEAK_THRESHOLD:
+            prev = peaks[p] = lo + k
+        else:
+            prev = -1
+    return peaks
+
+
+def _edges(sv: np.ndarray, peaks: np.ndarray, span: int) -> np.ndarray:
+    """Seabed edge above each peak (``-1`` where no peak).
+
+    As ``maxSv``: the deepest sample at or above the peak whose
+    preceding ``_EDGE_SAMPLES`` have a mean Sv below ``_EDGE_THRESHOLD``
+    (or are all NaN), searched up to *span* samples above the peak.
+    """
+    edges = np.full(peaks.shape, -1, dtype=np.int64)
+    pings = np.flatnonzero(peaks >= 0)
+    if not pings.size:
+        return edges
+    top = peaks[pings] - span
+
+    # Samples top-5 .. peak-1 of each ping; candidate i uses columns i-top .. i-top+4
+    cols = top[:, None] + np.arange(-_EDGE_SAMPLES, span)
+    values = sv[pings[:, None], np.clip(cols, 0, sv.shape[1] - 1)]
+    values[cols < 0] = np.nan
+    ok = np.isfinite(values)
+    with np.errstate(over="ignore"):
+        linear = np.where(ok, np.power(10.0, values / 10.0), 0.0)
+    total = np.concatenate([np.zeros((len(pings), 1)), np.cumsum(linear, axis=1)], axis=1)
+    count = np.concatenate([np.zeros((len(pings), 1), dtype=np.int64), np.cumsum(ok, axis=1)], axis=1)
+    window_sum = total[:, _EDGE_SAMPLES:] - total[:, :-_EDGE_SAMPLES]
+    window_n = count[:, _EDGE_SAMPLES:] - count[:, :-_EDGE_SAMPLES]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        quiet = 10.0 * np.log10(window_sum / np.maximum(window_n, 1)) < _EDGE_THRESHOLD
+    candidates = top[:, None] + np.arange(span + 1)
+    stop = (window_n == 0) | quiet | (candidates < _EDGE_SAMPLES)
+
+    # Deepest stop at or above the peak; the span top when there is none
+    last = stop[:, ::-1].argmax(axis=1)
+    edges[pings] = np.where(stop.any(axis=1), candidates[:, -1] - last, np.maximum(top, 0))
+    return edges
+
+
+def _native_seabed(ds_sv: xr.Dataset, max_range: float, track_window: float, ping_offset: int) -> xr.Dataset:
+    """Bottom tracking on the first channel and masking (see module docstring)."""
+    sv = ds_sv["Sv"]
+    range_arr = _range_array(ds_sv)
+    ch_sv = sv.isel(channel=0) if "channel" in sv.dims else sv
+    ch_range = range_arr.isel(channel=0) if "channel" in range_arr.dims else range_arr
+    if "ping_time" in ch_range.dims:
+        ch_range = ch_range.isel(ping_time=0)
+    values = np.asarray(ch_sv.transpose("ping_time", ...).values, dtype=np.float64)
+    if values.ndim != 2:
+        raise ValueError("Sv must be 2D per channel (ping_time x range)")
+
+    grid = _depth_grid(np.asarray(ch_range.values, dtype=np.float64), max_range, track_window)
+    bottom = _edges(values, _track_peaks(values, grid, ping_offset), grid.window)
+    depth = np.where(bottom >= 0, grid.row[np.clip(bottom, 0, len(grid.row) - 1)], np.nan)
+
+    depth_da = xr.DataArray(
+        depth, dims=["ping_time"], coords={"ping_time": ds_sv["ping_time"].values}, name="seabed_depth",
+        attrs={"units": "m", "long_name": "Seabed depth", "method": "maxSv (tracked)",
+               "channel": str(ch_sv["channel"].values) if "channel" in ch_sv.coords else "single_channel"},
+    )
+    ds_masked = ds_sv.copy()
+    ds_masked["Sv"] = (sv.dims, _mask_below(sv, range_arr, depth), sv.attrs)
+    return ds_masked.assign_coords(seabed_depth=depth_da)
+
+
+def _mask_below(sv: xr.DataArray, range_arr: xr.DataArray, depth: np.ndarray) -> np.ndarray:
+    """Sv values with samples at or below *depth* (per ping) set to NaN.
+
+    As ``mask_seabed``: pings without a line keep every sample with a
+    range, samples without a range are masked.
+    """
+    values = sv.values
+    rng = range_arr.broadcast_like(sv).transpose(*sv.dims).values
+    shape: Tuple[int, ...] = tuple(-1 if d == "ping_time" else 1 for d in sv.dims)
+    line = np.where(np.isnan(depth), np.inf, depth).reshape(shape)
+    with np.errstate(invalid="ignore"):
+        return np.where(rng < line, values, values.dtype.type(np.nan))
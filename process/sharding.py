@@ -0,0 +1,218 @@
+"""Intra-file parallelism: denoise and seabed over ping-range shards.
+
+A very large raw file otherwise runs its windowed stages on one core.
+Once its Sv is saved, the ping axis is split into ``shard_workers``
+contiguous *cores*; each worker process reads its core plus a *halo* of
+neighbouring pings from ``sv.zarr``, runs denoise and seabed detection,
+and writes only the core back as a region of the shared
+``sv_denoised.zarr`` / ``sv_seabed.zarr`` stores.  Cores are chunk
+aligned, so writers never touch the same chunk.
+
+The halo is the sum of the enabled stages' ping windows: seabed runs on
+denoised pings, whose own edge pings are only exact ``denoise`` halo
+pings inside the read range.  With it, every core ping sees the same
+neighbourhood as in an unsharded run.  The native seabed tracker carries
+state from ping to ping; its window is one restart interval
+(``process.seabed.TRACK_RESTART_PINGS``), with restarts aligned to the
+file's ping index.
+
+The seabed line is not written through the shard regions (its
+coordinate would be one chunk shared by all writers): each shard
+returns its core's line and the parent assembles ``seabed_line.zarr``.
+
+Sv itself is computed once from the EchoData (it is per-ping and already
+vectorized) and MVBS runs on the assembled result, since its time bins
+do not follow shard boundaries.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import xarray as xr
+
+if TYPE_CHECKING:
+    from azure_handler.storage import StorageBackend
+    from config import EdgeConfig
+
+logger = logging.getLogger("oceanstream")
+
+# Ping extent of the oceanstream seabed detectors' smoothing / morphology windows
+_SEABED_HALO_PINGS = 10
+
+# Shared shard pool — reused across files like the echogram render pool
+_SHARD_POOL: Optional[ProcessPoolExecutor] = None
+_SHARD_POOL_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PingShard:
+    """One shard: pings ``[start, stop)`` are written, ``[read_start, read_stop)`` read."""
+
+    index: int
+    start: int
+    stop: int
+    read_start: int
+    read_stop: int
+
+
+def shard_halo(config: "EdgeConfig") -> int:
+    """Pings each shard reads beyond its core on either side."""
+    if config.shard_halo_pings > 0:
+        return config.shard_halo_pings
+    halo = 0
+    if config.denoise_enabled:
+        methods = {m.strip() for m in config.denoise_methods.split(",") if m.strip()}
+        windows = [0]
+        if "background" in methods:
+            windows += [config.background_num_side_pings, config.background_ping_window]
+        if "transient" in methods:
+            windows.append(config.transient_n_pings)
+        if "impulse" in methods:
+            lags = [abs(int(x)) for x in config.impulse_ping_lags.split(",") if x.strip()] or [1]
+            windows.append(max(lags) * max(1, config.impulse_num_lags))
+        if "attenuation" in methods:
+            windows.append(config.attenuation_side_pings)
+        halo += max(windows)
+    if config.seabed_enabled:
+        if config.seabed_engine == "native":
+            from process.seabed import TRACK_RESTART_PINGS
+            halo += TRACK_RESTART_PINGS
+        else:
+            halo += _SEABED_HALO_PINGS
+    return halo
+
+
+def shard_workers(config: "EdgeConfig") -> int:
+    """Configured shard processes (``0`` = one per CPU core)."""
+    return config.shard_workers if config.shard_workers > 0 else (os.cpu_count() or 1)
+
+
+def plan_shards(n_pings: int, config: "EdgeConfig") -> List[PingShard]:
+    """Split *n_pings* into shards (a single shard when sharding does not pay).
+
+    Cores are equal-sized (the last one shorter) and at least twice the
+    halo, so no shard spends most of its time on overlap.
+    """
+    workers = shard_workers(config)
+    halo = shard_halo(config)
+    if workers <= 1 or n_pings < max(config.shard_min_pings, 1):
+        n_shards = 1
+    else:
+        n_shards = max(1, min(workers, n_pings // max(2 * halo, 1)))
+    size = math.ceil(n_pings / n_shards)
+    shards = []
+    for index, start in enumerate(range(0, n_pings, size)):
+        stop = min(start + size, n_pings)
+        shards.append(PingShard(index, start, stop, max(0, start - halo), min(n_pings, stop + halo)))
+    return shards
+
+
+def _shard_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared shard pool, creating it with *workers* processes.
+
+    Sized once from the configuration and shared by concurrent files,
+    never replaced.  Spawned, not forked: the pipeline runs in threads.
+    """
+    global _SHARD_POOL
+
+    with _SHARD_POOL_LOCK:
+        if _SHARD_POOL is None:
+            _SHARD_POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _SHARD_POOL
+
+
+def process_shard(
+    shard: PingShard,
+    prefix: str,
+    config: "EdgeConfig",
+    storage: "StorageBackend",
+) -> Tuple[int, Optional[xr.DataArray]]:
+    """Worker entry point: denoise / seabed one shard and write its core.
+
+    Returns the number of pings written and, with seabed, the core's
+    seabed line.
+    """
+    from process.seabed import apply_seabed
+
+    ds = storage.load_zarr(f"{prefix}/sv.zarr").isel(ping_time=slice(shard.read_start, shard.read_stop)).load()
+    core = slice(shard.start - shard.read_start, shard.stop - shard.read_start)
+    region = {"ping_time": slice(shard.start, shard.stop)}
+
+    if config.denoise_enabled:
+        # Only denoising needs oceanstream's configuration types
+        from process.config_adapter import to_denoise_config
+        from process.denoise import denoise
+
+        # oceanstream's masks come back dask-chunked per channel; regions need whole chunks
+        ds = denoise(ds, config=to_denoise_config(config)).load()
+        storage.write_zarr_region(ds.isel(ping_time=core), f"{prefix}/sv_denoised.zarr", region)
+    line = None
+    if config.seabed_enabled:
+        ds = apply_seabed(
+            ds, method=config.seabed_method, max_range=config.seabed_max_range,
+            engine=config.seabed_engine, track_window=config.seabed_track_window,
+            ping_offset=shard.read_start,
+        )
+        core_ds = ds.isel(ping_time=core)
+        line = core_ds["seabed_depth"].reset_coords(drop=True)
+        storage.write_zarr_region(core_ds.drop_vars("seabed_depth"), f"{prefix}/sv_seabed.zarr", region)
+    return shard.stop - shard.start, line
+
+
+def run_sharded(
+    ds_sv: xr.Dataset,
+    prefix: str,
+    shards: List[PingShard],
+    config: "EdgeConfig",
+    storage: "StorageBackend",
+) -> xr.Dataset:
+    """Denoise / seabed *ds_sv* (already saved as ``{prefix}/sv.zarr``) over *shards*.
+
+    Returns the last enabled stage's output, read back from its store
+    (with seabed, the shards' lines are attached as ``seabed_depth`` and
+    saved as ``seabed_line.zarr``).
+    Raises if any shard fails (its store is then incomplete).
+    """
+    start = time.time()
+    chunks = {"ping_time": shards[0].stop - shards[0].start}
+    template = ds_sv
+    outputs = []
+    if config.denoise_enabled:
+        outputs.append(f"{prefix}/sv_denoised.zarr")
+        # Denoise adds its combined mask; seabed passes it through
+        template = ds_sv.assign(noise_mask=xr.zeros_like(ds_sv["Sv"], dtype=bool))
+    if config.seabed_enabled:
+        outputs.append(f"{prefix}/sv_seabed.zarr")
+    for path in outputs:
+        storage.create_zarr(template, path, chunks)
+
+    pool = _shard_pool(shard_workers(config))
+    futures = [pool.submit(process_shard, shard, prefix, config, storage) for shard in shards]
+    # No writer may still be running when a failure hands over to the unsharded path
+    wait(futures)
+    results = [f.result() for f in futures]
+    written = sum(n for n, _ in results)
+
+    logger.info(
+        "Sharded denoise/seabed: %d pings over %d shards (halo %d) in %.1fs",
+        written, len(shards), shard_halo(config), time.time() - start,
+    )
+    ds_out = storage.load_zarr(outputs[-1]).load()
+    if config.seabed_enabled:
+        from process.seabed import seabed_line
+        line = xr.concat([line for _, line in results], dim="ping_time")
+        ds_out = ds_out.assign_coords(seabed_depth=("ping_time", line.values, line.attrs))
+        storage.save_zarr(seabed_line(ds_out), f"{prefix}/seabed_line.zarr")
+    return ds_out
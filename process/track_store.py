@@ -0,0 +1,284 @@
+"""Streaming GPS track simplification and per-day track files.
+
+In realtime mode, position comes from ``/navigation`` fixes polled every
+few seconds.  ``StreamingTrackSimplifier`` turns that stream into a
+simplified track online: fixes are buffered (bounded), and whenever the
+buffer fills, Ramer-Douglas-Peucker (great-circle distance) runs over it
+and every vertex that can no longer change is emitted.
+
+Emitted vertices are appended to one compact binary file per UTC day by
+``TrackStore``, so telemetry, reports and NASC distance binning can read
+the track instead of recomputing it from the data.
+
+Layout::
+
+    {output_base_path}/{campaign}/track/
+      2026-04-03.track      # little-endian records: int64 ns, float64 lat, float64 lon
+      2026-04-04.track
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from exports.location import haversine_nmi, rdp_mask
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+    from config import EdgeConfig
+
+logger = logging.getLogger("oceanstream")
+
+# One track vertex on disk (24 bytes)
+TRACK_RECORD = np.dtype([("t", "<i8"), ("lat", "<f8"), ("lon", "<f8")])
+
+Vertex = Tuple[np.datetime64, float, float]
+
+
+def _to_datetime64(timestamp) -> np.datetime64:
+    """Naive UTC ``datetime64[ns]`` from a datetime/Timestamp/string."""
+    ts = pd.Timestamp(timestamp)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return np.datetime64(ts, "ns")
+
+
+class StreamingTrackSimplifier:
+    """Online RDP track simplifier with a bounded buffer.
+
+    Parameters
+    ----------
+    epsilon_nmi : float
+        Maximum cross-track deviation (nautical miles) of dropped fixes
+        from the simplified track.
+    max_buffer : int
+        Fixes held before vertices are finalized.  Bounds both memory
+        and the latency between a fix and its vertex being emitted.
+    """
+
+    def __init__(self, epsilon_nmi: float = 0.005, max_buffer: int = 256):
+        self.epsilon_nmi = float(epsilon_nmi)
+        self.max_buffer = max(3, int(max_buffer))
+        self._t: List[np.datetime64] = []
+        self._lat: List[float] = []
+        self._lon: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._t)
+
+    def add(self, timestamp, latitude: float, longitude: float) -> List[Vertex]:
+        """Add a fix; return any vertices that became final.
+
+        Invalid positions (NaN, out of range, or the ``0, 0`` placeholder
+        the service reports without a GPS fix) and non-increasing
+        timestamps are ignored.
+        """
+        if not (np.isfinite(latitude) and np.isfinite(longitude)):
+            return []
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return []
+        if latitude == 0 and longitude == 0:
+            return []
+        t = _to_datetime64(timestamp)
+        if self._t and t <= self._t[-1]:
+            return []
+
+        first = not self._t
+        self._t.append(t)
+        self._lat.append(float(latitude))
+        self._lon.append(float(longitude))
+        if first:
+            return [(t, float(latitude), float(longitude))]
+        if len(self._t) >= self.max_buffer:
+            return self._finalize(final=False)
+        return []
+
+    def flush(self) -> List[Vertex]:
+        """Finalize everything buffered (e.g. at a batch boundary or shutdown).
+
+        The last fix stays buffered as the anchor for subsequent fixes.
+        """
+        if len(self._t) < 2:
+            return []
+        return self._finalize(final=True)
+
+    def pending(self) -> List[Vertex]:
+        """Provisional vertices of the buffered tail (not yet final)."""
+        if len(self._t) < 2:
+            return []
+        keep = np.flatnonzero(self._mask())
+        return [self._vertex(i) for i in keep[1:]]
+
+    def _mask(self) -> np.ndarray:
+        points = np.column_stack([self._lat, self._lon])
+        return rdp_mask(points, self.epsilon_nmi, distance="great_circle")
+
+    def _vertex(self, i: int) -> Vertex:
+        return self._t[i], self._lat[i], self._lon[i]
+
+    def _finalize(self, final: bool) -> List[Vertex]:
+        keep = np.flatnonzero(self._mask())
+        if final or len(keep) <= 2:
+            # Whole buffer is settled (or a straight run) — close it at the
+            # latest fix so the buffer stays bounded.
+            emit, anchor = keep[1:], keep[-1]
+        else:
+            # The last interior vertex may still move as fixes arrive;
+            # everything before it is final.
+            emit, anchor = keep[1:-1], keep[-2]
+        vertices = [self._vertex(i) for i in emit]
+        self._t = self._t[anchor:]
+        self._lat = self._lat[anchor:]
+        self._lon = self._lon[anchor:]
+        return vertices
+
+
+class TrackStore:
+    """Append-only per-day track files.
+
+    Parameters
+    ----------
+    root : Path
+        Local directory holding the ``{day}.track`` files.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: "EdgeConfig") -> "TrackStore":
+        """Track store for the configured campaign."""
+        return cls(Path(config.output_base_path) / config.campaign_container / "track")
+
+    def _path(self, day: date) -> Path:
+        return self.root / f"{day.isoformat()}.track"
+
+    def append(self, vertices: List[Vertex]) -> int:
+        """Append vertices, split by UTC day.  Returns the number written."""
+        if not vertices:
+            return 0
+        records = np.array(
+            [(np.datetime64(t, "ns").astype(np.int64), lat, lon) for t, lat, lon in vertices],
+            dtype=TRACK_RECORD,
+        )
+        days = records["t"].astype("datetime64[ns]").astype("datetime64[D]")
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            for day in np.unique(days):
+                chunk = records[days == day]
+                with open(self._path(pd.Timestamp(day).date()), "ab") as f:
+                    f.write(chunk.tobytes())
+        return len(records)
+
+    def load_day(self, day: date) -> np.ndarray:
+        """Read a day's vertices as a structured ``TRACK_RECORD`` array."""
+        path = self._path(day)
+        if not path.exists():
+            return np.zeros(0, dtype=TRACK_RECORD)
+        data = path.read_bytes()
+        # Ignore a partially written trailing record
+        n = len(data) // TRACK_RECORD.itemsize
+        return np.frombuffer(data[: n * TRACK_RECORD.itemsize], dtype=TRACK_RECORD)
+
+    def load(self, start, end, *, margin: bool = True) -> pd.DataFrame:
+        """Vertices between *start* and *end* as a ``lat, lon, dt`` DataFrame.
+
+        With *margin*, the nearest vertex on either side of the window is
+        included so positions can be interpolated right up to its edges.
+        """
+        t0 = _to_datetime64(start).astype(np.int64)
+        t1 = _to_datetime64(end).astype(np.int64)
+        first_day = pd.Timestamp(start).date() - timedelta(days=1 if margin else 0)
+        last_day = pd.Timestamp(end).date() + timedelta(days=1 if margin else 0)
+
+        parts = []
+        day = first_day
+        while day <= last_day:
+            parts.append(self.load_day(day))
+            day += timedelta(days=1)
+        records = np.concatenate(parts) if parts else np.zeros(0, dtype=TRACK_RECORD)
+
+        lo = int(np.searchsorted(records["t"], t0, side="left"))
+        hi = int(np.searchsorted(records["t"], t1, side="right"))
+        if margin:
+            lo, hi = max(lo - 1, 0), min(hi + 1, len(records))
+        records = records[lo:hi]
+        return pd.DataFrame({
+            "lat": records["lat"],
+            "lon": records["lon"],
+            "dt": records["t"].astype("datetime64[ns]"),
+        })
+
+    def interpolate(self, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Interpolate ``(lat, lon)`` at *times* from the stored track."""
+        times = np.asarray(times, dtype="datetime64[ns]")
+        if len(times) == 0:
+            return np.zeros(0), np.zeros(0)
+        return interpolate_track(self.load(times.min(), times.max()), times)
+
+
+def interpolate_track(track: pd.DataFrame, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Linearly interpolate ``(lat, lon)`` at *times* along a vertex DataFrame.
+
+    Times outside the track get NaN.
+    """
+    times = np.asarray(times, dtype="datetime64[ns]")
+    if len(track) < 2:
+        nan = np.full(len(times), np.nan)
+        return nan, nan.copy()
+    x = times.astype(np.int64).astype(np.float64)
+    xp = track["dt"].to_numpy().astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    lat = np.interp(x, xp, track["lat"].to_numpy(), left=np.nan, right=np.nan)
+    lon = np.interp(x, xp, track["lon"].to_numpy(), left=np.nan, right=np.nan)
+    return lat, lon
+
+
+def track_distance_nmi(track: pd.DataFrame) -> float:
+    """Along-track length of a vertex DataFrame in nautical miles."""
+    if len(track) < 2:
+        return 0.0
+    lat, lon = track["lat"].to_numpy(), track["lon"].to_numpy()
+    return float(haversine_nmi(lat[:-1], lon[:-1], lat[1:], lon[1:]).sum())
+
+
+def load_track(ds: "xr.Dataset", config: "EdgeConfig") -> Optional[pd.DataFrame]:
+    """Stored (simplified) GPS track covering the batch's ping times."""
+    try:
+        times = ds["ping_time"].values
+        return TrackStore.from_config(config).load(times.min(), times.max())
+    except Exception as e:
+        logger.debug("No stored track for batch: %s", e)
+        return None
+
+
+def with_track_position(ds: "xr.Dataset", track: Optional[pd.DataFrame]) -> "xr.Dataset":
+    """Fill per-ping latitude/longitude from the stored track when missing.
+
+    Realtime batches carry at most one position per navigation poll and
+    often none at all; NASC distance binning then uses the stored track.
+    Datasets that already have valid positions are returned unchanged.
+    """
+    if track is None or len(track) < 2:
+        return ds
+    for coord in ("latitude", "longitude"):
+        if coord in ds:
+            vals = ds[coord].values
+            if np.any(np.isfinite(vals) & (vals != 0)):
+                return ds
+
+    lat, lon = interpolate_track(track, ds["ping_time"].values)
+    if not np.isfinite(lat).any():
+        return ds
+    return ds.assign(
+        latitude=("ping_time", lat),
+        longitude=("ping_time", lon),
+    )
@@ -23,6 +23,20 @@ Usage::
         --output-dir ./output \\
         --sonar-model EK80 \\
         --survey-id HB2302
+
+Add ``--workers N`` to process files in N worker processes (each
+prefetching its next file's conversion when it fits the worker's memory
+cap); the report keeps input order.
+
+Reruns skip files already processed with the same parameters and resume
+interrupted ones from their last saved stage (``process.manifest``);
+``--force denoise,mvbs`` re-runs the named stages and everything
+downstream of them, ``--force`` alone re-runs everything, and
+``--no-resume`` ignores the manifest.
+
+``--dask`` runs each file's stages as tasks on a dask LocalCluster, or
+with ``--dask tcp://host:8786`` on an existing (multi-node) cluster whose
+workers see the input and output directories at the same paths.
 """
 
 from __future__ import annotations
@@ -30,6 +44,7 @@ from __future__ import annotations
 import argparse
 import asyncio
 import logging
+import os
 import sys
 import time
 from pathlib import Path
@@ -116,18 +131,48 @@ def parse_args() -> argparse.Namespace:
         "--max-files", default=None, type=int,
         help="Process at most N files (useful for testing).",
     )
+    parser.add_argument(
+        "--workers", default=1, type=int,
+        help="Worker processes for files in parallel (default: 1).",
+    )
+    parser.add_argument(
+        "--worker-memory-mb", default=0, type=int,
+        help="Memory cap per worker process in MB (default: 60%% of RAM / workers).",
+    )
+    parser.add_argument(
+        "--force", nargs="?", const=["all"], default=[], type=_stage_list, metavar="STAGES",
+        help="Re-run these comma-separated stages (and downstream ones) even if complete; "
+             "without a value, re-run all stages.",
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true", default=False,
+        help="Ignore the resume manifest and process every file from scratch.",
+    )
+    parser.add_argument(
+        "--dask", nargs="?", const="", default=None, metavar="SCHEDULER",
+        help="Run stages as tasks on a dask cluster: a LocalCluster, or the given scheduler address.",
+    )
     return parser.parse_args()
 
 
-async def run_pipeline(args: argparse.Namespace) -> None:
-    from azure_handler.storage import LocalStorage
+def _stage_list(value: str) -> list:
+    from process.manifest import expand_force
+
+    stages = [s.strip() for s in value.split(",") if s.strip()]
+    try:
+        expand_force(stages)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return stages
+
+
+def _build_config(args: argparse.Namespace):
     from config import EdgeConfig
-    from exports.report_md import generate_md_report
-    from process.pipeline import process_raw_file_pipeline
-    from process.segment_store import SegmentStore
 
-    # --- Build config ---
-    config = EdgeConfig.from_standalone(
+    overrides = {"manifest_enabled": False} if args.no_resume else {}
+    if args.dask is not None:
+        overrides.update(execution_backend="dask", dask_scheduler_address=args.dask)
+    return EdgeConfig.from_standalone(
         sonar_model=args.sonar_model,
         waveform_mode=args.waveform_mode,
         encode_mode=args.encode_mode,
@@ -141,28 +186,44 @@ async def run_pipeline(args: argparse.Namespace) -> None:
         nasc_enabled=args.enable_nasc,
         seabed_enabled=args.enable_seabed,
         plot_echogram=not args.no_echograms,
-    )
-    logging.getLogger("oceanstream").setLevel(
-        getattr(logging, config.log_level.upper(), logging.INFO)
+        **overrides,
     )
 
-    logger.info(
-        "Standalone mode: sonar=%s, survey=%s, gpu=%s",
-        config.sonar_model, config.survey_id, config.use_gpu,
-    )
 
-    # --- Storage ---
+def _open_segment_store(args: argparse.Namespace, config):
+    from azure_handler.storage import LocalStorage
+    from process.segment_store import SegmentStore
+
     # Pipeline paths are "{campaign_container}/processed/{stem}/..." etc.
     # With LocalStorage, base_path is the root output dir and the campaign
     # container becomes a subdirectory, yielding:
     #   output/{campaign_container}/processed/{stem}/sv.zarr
     storage = LocalStorage(base_path=str(args.output_dir))
-    segment_store = SegmentStore(
+    return SegmentStore(
         storage,
         container=config.campaign_container,
         processed_subfolder=config.processed_container,
     )
 
+
+async def run_pipeline(args: argparse.Namespace) -> None:
+    from exports.report_md import generate_md_report
+
+    # --- Build config ---
+    config = _build_config(args)
+    logging.getLogger("oceanstream").setLevel(
+        getattr(logging, config.log_level.upper(), logging.INFO)
+    )
+
+    logger.info(
+        "Standalone mode: sonar=%s, survey=%s, gpu=%s",
+        config.sonar_model, config.survey_id, config.use_gpu,
+    )
+
+    # --- Storage ---
+    segment_store = _open_segment_store(args, config)
+    storage = segment_store.storage
+
     # --- Discover raw files ---
     input_dir = args.input_dir.resolve()
     raw_files = sorted(input_dir.glob("*.raw"))
@@ -175,39 +236,48 @@ async def run_pipeline(args: argparse.Namespace) -> None:
 
     logger.info("Found %d raw files in %s", len(raw_files), input_dir)
 
-    # --- Process each file ---
-    all_results = []
+    # Header index (time range, channels, pings, GPS) — cached in the
+    # input directory and reused by the report
+    try:
+        from process.raw_index import get_raw_index
+        raw_index = get_raw_index(input_dir)
+        index_start = time.time()
+        infos = [raw_index.get(str(f)) for f in raw_files]
+        raw_index.save()
+        logger.info(
+            "Indexed %d files in %.2fs: %d pings, %s → %s",
+            len(infos), time.time() - index_start, sum(i.n_pings for i in infos),
+            min((i.start_time for i in infos if i.start_time), default="?"),
+            max((i.end_time for i in infos if i.end_time), default="?"),
+        )
+    except Exception as e:
+        logger.warning("Raw file index failed: %s", e)
+
+    # --- Process files (in order, or over worker processes) ---
     total_start = time.time()
-
-    for i, raw_file in enumerate(raw_files, 1):
-        logger.info("━━━ File %d/%d: %s ━━━", i, len(raw_files), raw_file.name)
-        file_start = time.time()
-
-        try:
-            # Full pipeline: convert → save echodata → Sv → denoise → MVBS → echograms
-            # All persistence goes through the storage backend.
-            result = await process_raw_file_pipeline(
-                str(raw_file), config, segment_store, client=None,
-            )
-
-            # Extract additional metadata from echodata for the report
-            # (re-open the converted file briefly)
+    progress = _Progress(len(raw_files), total_start)
+    if config.execution_backend == "dask":
+        results = await _run_dask(config, segment_store, raw_files, progress, args.force)
+    elif args.workers > 1 and len(raw_files) > 1:
+        results = await _run_parallel(args, config, raw_files, progress)
+    else:
+        results = {}
+        pending = iter(enumerate(raw_files))
+
+        def _record(index: int, result: dict) -> None:
+            results[index] = result
+            progress.done(raw_files[index].name, result)
+
+        await _process_files(lambda: next(pending, None), config, segment_store, _record, force=args.force)
+
+    # Results in input order for the report; instrument metadata from
+    # the header index
+    all_results = []
+    for i, raw_file in enumerate(raw_files):
+        result = results[i]
+        if result.get("status") != "error":
             _enrich_result_metadata(result, raw_file, config)
-
-            all_results.append(result)
-            logger.info(
-                "✓ %s — %d pings, %dms",
-                raw_file.name, result.get("n_pings", 0), result.get("total_time_ms", 0),
-            )
-
-        except Exception as e:
-            logger.error("✗ %s — FAILED: %s", raw_file.name, e, exc_info=True)
-            all_results.append({
-                "source_file": raw_file.name,
-                "status": "error",
-                "error": str(e),
-                "total_time_ms": int((time.time() - file_start) * 1000),
-            })
+        all_results.append(result)
 
     total_time = time.time() - total_start
 
@@ -227,50 +297,317 @@ async def run_pipeline(args: argparse.Namespace) -> None:
     ok = sum(1 for r in all_results if r.get("status") == "ok")
     failed = sum(1 for r in all_results if r.get("status") == "error")
     skipped = sum(1 for r in all_results if r.get("status") == "skipped")
+    resumed = sum(1 for r in all_results if r.get("resumed"))
     logger.info(
-        "━━━ Done: %d ok, %d failed, %d skipped in %.1fs ━━━",
-        ok, failed, skipped, total_time,
+        "━━━ Done: %d ok (%d from earlier runs), %d failed, %d skipped in %.1fs ━━━",
+        ok, resumed, failed, skipped, total_time,
     )
 
 
-def _enrich_result_metadata(result: dict, raw_file: Path, config) -> None:
-    """Add channel/frequency/location metadata to a pipeline result.
+class _Progress:
+    """Completed-file counter with throughput-based ETA logging."""
+
+    def __init__(self, total: int, start: float):
+        self.total = total
+        self.start = start
+        self.completed = 0
 
-    Re-opens the converted EchoData (stored through the storage backend)
-    to read instrument metadata that isn't carried through to Sv.
+    def done(self, name: str, result: dict) -> None:
+        self.completed += 1
+        elapsed = time.time() - self.start
+        eta = elapsed / self.completed * (self.total - self.completed)
+        if result.get("status") == "error":
+            logger.error("✗ [%d/%d] %s — FAILED: %s", self.completed, self.total, name, result.get("error"))
+        else:
+            logger.info(
+                "✓ [%d/%d] %s — %d pings, %dms · elapsed %s, ETA %s",
+                self.completed, self.total, name, result.get("n_pings", 0), result.get("total_time_ms", 0),
+                _hms(elapsed), _hms(eta),
+            )
+
+
+def _hms(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _error_result(raw_file: Path, error: str, started: float) -> dict:
+    return {
+        "source_file": raw_file.name,
+        "status": "error",
+        "error": error,
+        "total_time_ms": int((time.time() - started) * 1000),
+    }
+
+
+async def _process_files(next_file, config, segment_store, on_result, force=(), prefetch_fits=None) -> None:
+    """Run the file pipeline on files handed out by ``next_file()``.
+
+    ``next_file()`` returns ``(index, path)`` or ``None`` when there is
+    no more work.  The following file is planned against the resume
+    manifest and, if it needs processing from the raw data, converted
+    in a background thread while the current one runs through Sv,
+    denoise and products; ``on_result(index, result)`` is called as
+    each file finishes.  *force* lists stages to re-run regardless of
+    the manifest.  ``prefetch_fits(current, following)``, if given,
+    decides whether the following file's conversion may be held while
+    the current file runs; otherwise it starts once the current file
+    is done.
     """
-    try:
-        from echopype.convert.api import open_raw
-        ed = open_raw(str(raw_file), sonar_model=config.sonar_model)
+    from concurrent.futures import ThreadPoolExecutor
+
+    from process.manifest import PROCESS, RunManifest
+    from process.pipeline import _prepare_echodata, process_raw_file_pipeline
+
+    manifest = RunManifest.from_config(config) if config.manifest_enabled else None
+    loop = asyncio.get_running_loop()
+
+    def _prepare(path: str):
+        entry = manifest.entry(path, config, force) if manifest is not None else None
+        if entry is not None and entry.plan != PROCESS:
+            return entry, None
+        return entry, _prepare_echodata(path, config, segment_store, entry)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") as prefetch:
+
+        def _convert(item):
+            if item is None:
+                return None
+            return loop.run_in_executor(prefetch, _prepare, str(item[1]))
+
+        item = next_file()
+        converting = _convert(item)
+        while item is not None:
+            index, raw_file = item
+            raw_file = Path(raw_file)
+            logger.info("━━━ File %d: %s ━━━", index + 1, raw_file.name)
+            file_start = time.time()
+            following = next_file()
+            current = converting
+            ahead = prefetch_fits is None or following is None or prefetch_fits(raw_file, following[1])
+            converting = _convert(following) if ahead else None
+            try:
+                # Full pipeline: convert → save echodata → Sv → denoise → MVBS → echograms
+                # All persistence goes through the storage backend.
+                entry, converted = await current
+                result = await process_raw_file_pipeline(
+                    str(raw_file), config, segment_store, client=None, converted=converted, entry=entry,
+                )
+            except Exception as e:
+                logger.error("✗ %s — FAILED: %s", raw_file.name, e, exc_info=True)
+                result = _error_result(raw_file, str(e), file_start)
+            on_result(index, result)
+            if not ahead:
+                converting = _convert(following)
+            item = following
+    if manifest is not None:
+        manifest.close()
+
+
+async def _run_dask(config, segment_store, raw_files: list, progress: _Progress, force=()) -> dict:
+    """Submit every file to the dask cluster at once; returns results by input index."""
+    from process.dask_backend import close_dask_client
+    from process.manifest import RunManifest
+    from process.pipeline import process_raw_file_pipeline
 
-        try:
-            result["channels"] = [
-                str(ch)
-                for ch in ed["Sonar/Beam_group1"]["beam_type"].coords["channel"].values
-            ]
-        except Exception:
-            result.setdefault("channels", [])
+    manifest = RunManifest.from_config(config) if config.manifest_enabled else None
+    results: dict = {}
 
+    async def _one(index: int, raw_file: Path) -> None:
+        started = time.time()
         try:
-            freqs = ed["Sonar/Beam_group1"]["frequency_nominal"].values
-            result["frequencies_hz"] = [float(f) for f in freqs]
-        except Exception:
-            result.setdefault("frequencies_hz", [])
+            entry = manifest.entry(str(raw_file), config, force) if manifest is not None else None
+            result = await process_raw_file_pipeline(str(raw_file), config, segment_store, entry=entry)
+        except Exception as e:
+            logger.error("✗ %s — FAILED: %s", raw_file.name, e, exc_info=True)
+            result = _error_result(raw_file, str(e), started)
+        results[index] = result
+        progress.done(raw_file.name, result)
 
-        try:
-            plat = ed["Platform"]
-            lats = plat["latitude"].values
-            lons = plat["longitude"].values
-            import numpy as np
-            valid_lats = lats[~(lats == 0)]
-            valid_lons = lons[~(lons == 0)]
-            if len(valid_lats) > 0:
-                result["lat_range"] = [float(valid_lats.min()), float(valid_lats.max())]
-                result["lon_range"] = [float(valid_lons.min()), float(valid_lons.max())]
-        except Exception:
-            pass
-    except Exception:
-        pass
+    try:
+        await asyncio.gather(*(_one(i, f) for i, f in enumerate(raw_files)))
+    finally:
+        close_dask_client()
+        if manifest is not None:
+            manifest.close()
+    return results
+
+
+def _limit_memory(limit_mb: int) -> None:
+    """Cap this process's data segment (heap and anonymous mappings)."""
+    if limit_mb <= 0:
+        return
+    try:
+        import resource
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning("Could not cap worker memory at %d MB: %s", limit_mb, e)
+
+
+def _file_memory_mb(raw_file, config) -> tuple:
+    """Estimated ``(peak, converted)`` memory of processing *raw_file*, in MB.
+
+    *converted* is what a prefetched conversion holds until its turn:
+    the EchoData, one of the ``job_memory_factor`` Sv-sized arrays.
+    """
+    from ingest.worker_pool import estimate_job_memory
+
+    peak = estimate_job_memory({"type": "process_raw", "payload": {"file_path": str(raw_file)}}, config)
+    converted = (peak - config.job_memory_overhead_mb * 1024 * 1024) / max(config.job_memory_factor, 1.0)
+    return peak // (1024 * 1024), int(converted) // (1024 * 1024)
+
+
+def _worker_main(args: argparse.Namespace, tasks, events, limit_mb: int) -> None:
+    """Worker process: pull ``(index, path)`` tasks until ``None``.
+
+    Reports ``("take", index, pid)`` when a file is claimed (including
+    the prefetched one) and ``("done", index, result)`` when it
+    finishes, so the parent can attribute files lost with a crashed
+    worker.  A file is only prefetched while its conversion fits
+    under *limit_mb* next to the current file's peak.
+    """
+    _limit_memory(limit_mb)
+    config = _build_config(args)
+    logging.getLogger("oceanstream").setLevel(getattr(logging, config.log_level.upper(), logging.INFO))
+    segment_store = _open_segment_store(args, config)
+    pid = os.getpid()
+
+    def next_file():
+        item = tasks.get()
+        if item is not None:
+            events.put(("take", item[0], pid))
+        return item
+
+    def on_result(index: int, result: dict) -> None:
+        events.put(("done", index, result))
+
+    def prefetch_fits(current, following) -> bool:
+        if limit_mb <= 0:
+            return True
+        need_mb = _file_memory_mb(current, config)[0] + _file_memory_mb(following, config)[1]
+        if need_mb > limit_mb:
+            logger.info(
+                "Not prefetching %s: %d MB with %s exceeds the %d MB worker cap",
+                Path(following).name, need_mb, Path(current).name, limit_mb,
+            )
+            return False
+        return True
+
+    asyncio.run(_process_files(
+        next_file, config, segment_store, on_result, force=args.force, prefetch_fits=prefetch_fits,
+    ))
+
+
+async def _run_parallel(args: argparse.Namespace, config, raw_files: list, progress: _Progress) -> dict:
+    """Process *raw_files* over ``args.workers`` spawned processes.
+
+    Each worker is capped at ``--worker-memory-mb`` (default: the job
+    memory budget, 60 % of RAM, split across workers) and pulls the
+    next file when it starts one, so the queue stays balanced while
+    every worker prefetches one conversion ahead — when the prefetched
+    EchoData fits under the cap next to the running file.  Returns
+    results by input index.
+    """
+    import multiprocessing
+    import queue
+
+    from ingest.worker_pool import memory_budget
+
+    workers = min(args.workers, len(raw_files))
+    limit_mb = args.worker_memory_mb or memory_budget(config) // workers // (1024 * 1024)
+    logger.info("Processing over %d worker processes (memory cap %d MB each)", workers, limit_mb)
+    for raw_file in raw_files:
+        need_mb = _file_memory_mb(raw_file, config)[0]
+        if need_mb > limit_mb:
+            logger.warning("%s: estimated %d MB exceeds the %d MB worker cap", raw_file.name, need_mb, limit_mb)
+
+    # Split BLAS/OpenMP threads between workers (inherited by children)
+    threads = str(max(1, (os.cpu_count() or 1) // workers))
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, threads)
+
+    # Spawned (not forked) workers, as for the echogram render pool
+    ctx = multiprocessing.get_context("spawn")
+    tasks, events = ctx.Queue(), ctx.Queue()
+    for item in enumerate(map(str, raw_files)):
+        tasks.put(item)
+    for _ in range(workers):
+        tasks.put(None)
+    procs = [
+        ctx.Process(target=_worker_main, args=(args, tasks, events, limit_mb), name=f"worker-{i}")
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+
+    results: dict = {}
+    taken: dict = {}
+    started = time.time()
+    try:
+        while len(results) < len(raw_files):
+            try:
+                kind, index, value = await asyncio.to_thread(events.get, True, 1.0)
+            except queue.Empty:
+                if all(not proc.is_alive() for proc in procs):
+                    break
+                for proc in procs:
+                    if proc.exitcode not in (None, 0):
+                        _fail_worker_files(proc, taken, results, raw_files, started, progress)
+                continue
+            if kind == "take":
+                taken[index] = value
+            else:
+                results[index] = value
+                progress.done(raw_files[index].name, value)
+    finally:
+        for proc in procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+
+    for proc in procs:
+        _fail_worker_files(proc, taken, results, raw_files, started, progress)
+    for index, raw_file in enumerate(raw_files):
+        if index not in results:
+            results[index] = _error_result(raw_file, "not processed (workers exited)", started)
+    return results
+
+
+def _fail_worker_files(proc, taken: dict, results: dict, raw_files: list, started: float, progress: _Progress) -> None:
+    """Mark files claimed by a crashed worker as failed."""
+    if proc.exitcode in (None, 0):
+        return
+    for index, pid in list(taken.items()):
+        if pid == proc.pid and index not in results:
+            error = f"worker {proc.name} exited with code {proc.exitcode}"
+            results[index] = _error_result(raw_files[index], error, started)
+            progress.done(raw_files[index].name, results[index])
+
+
+def _enrich_result_metadata(result: dict, raw_file: Path, config) -> None:
+    """Add channel/frequency/location metadata to a pipeline result.
+
+    Read from the raw file's datagram headers through the directory's
+    cached index (``process.raw_index``) rather than re-opening it.
+    """
+    try:
+        from process.raw_index import raw_file_info
+        info = raw_file_info(str(raw_file))
+    except Exception as e:
+        logger.debug("Raw index unavailable for %s: %s", raw_file.name, e)
+        result.setdefault("channels", [])
+        result.setdefault("frequencies_hz", [])
+        return
+
+    result["channels"] = list(info.channels)
+    result["frequencies_hz"] = list(info.frequencies_hz)
+    if info.lat_range is not None:
+        result["lat_range"] = list(info.lat_range)
+        result["lon_range"] = list(info.lon_range)
+    if info.start_time:
+        result.setdefault("start_time", info.start_time)
+        result.setdefault("end_time", info.end_time)
 
 
 def main():
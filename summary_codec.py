@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Binary codec for the compact acoustic summary product.
+
+Shared by the edge module (``exports.acoustic_summary`` encodes) and the
+shore side (this file decodes).  Depends on NumPy only — copy it next to
+shore tooling as-is; ``xarray`` is used only if you ask for a Dataset.
+
+A summary covers one processing segment: per channel, a time × depth
+grid of mean volume backscattering strength (MVBS, dB) and a per-column
+depth-integrated NASC.
+
+Layout (little-endian)::
+
+    header   "OSAS" | u8 version | u8 bits | u16 n_channels | u16 n_time
+             | u16 n_depth | i64 start_ns | f32 time_bin_s | f32 depth_bin_m
+             | f32 sv_min_db | f32 sv_max_db
+    freqs    f32[n_channels]                              (Hz)
+    body     zlib( per channel: mvbs  u{bits}[n_time, n_depth]  time-delta coded
+                                nasc  u16[n_time]                log-quantized )
+
+MVBS values are quantized to ``1 .. 2**bits - 1`` over
+``[sv_min_db, sv_max_db]`` (``0`` = no data) and stored as the
+difference from the previous time column, modulo ``2**bits``.
+NASC is stored as ``round(1000 * log10(1 + NASC))`` (``65535`` = no data).
+
+Usage::
+
+    python summary_codec.py segment.osas [--netcdf out.nc]
+"""
+
+from __future__ import annotations
+
+import base64
+import struct
+import sys
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Union
+
+import numpy as np
+
+MAGIC = b"OSAS"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sBBHHHqffff")
+
+_NASC_SCALE = 1000.0
+_NASC_MISSING = 65535
+
+
+@dataclass
+class AcousticSummary:
+    """Decoded (or to-be-encoded) summary grid.
+
+    ``mvbs`` is ``(n_channels, n_time, n_depth)`` in dB with NaN for no
+    data; ``nasc`` is ``(n_channels, n_time)`` in m² nmi⁻².
+    """
+
+    start: np.datetime64
+    time_bin_s: float
+    depth_bin_m: float
+    frequencies_hz: List[float]
+    mvbs: np.ndarray
+    nasc: np.ndarray
+    sv_min_db: float = -100.0
+    sv_max_db: float = -20.0
+
+    @property
+    def times(self) -> np.ndarray:
+        step = np.timedelta64(int(round(self.time_bin_s * 1e9)), "ns")
+        return np.datetime64(self.start, "ns") + np.arange(self.mvbs.shape[1]) * step
+
+    @property
+    def depths(self) -> np.ndarray:
+        """Depth at the top of each bin (metres)."""
+        return np.arange(self.mvbs.shape[2]) * self.depth_bin_m
+
+    def to_xarray(self):
+        import xarray as xr
+
+        coords = {
+            "frequency_nominal": ("channel", np.asarray(self.frequencies_hz, dtype=np.float64)),
+            "ping_time": self.times,
+            "depth": self.depths + self.depth_bin_m / 2,
+        }
+        return xr.Dataset(
+            {
+                "Sv": (("channel", "ping_time", "depth"), self.mvbs),
+                "NASC": (("channel", "ping_time"), self.nasc),
+            },
+            coords=coords,
+            attrs={"time_bin_s": self.time_bin_s, "depth_bin_m": self.depth_bin_m},
+        )
+
+
+def encode(summary: AcousticSummary, bits: int = 8, level: int = 9) -> bytes:
+    """Encode a summary to the compact binary form."""
+    if bits not in (8, 16):
+        raise ValueError(f"bits must be 8 or 16, got {bits}")
+    n_ch, n_time, n_depth = summary.mvbs.shape
+    levels = (1 << bits) - 1
+    dtype = np.uint8 if bits == 8 else np.uint16
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, bits, n_ch, n_time, n_depth,
+        int(np.datetime64(summary.start, "ns").astype(np.int64)),
+        summary.time_bin_s, summary.depth_bin_m, summary.sv_min_db, summary.sv_max_db,
+    )
+    freqs = np.asarray(summary.frequencies_hz, dtype="<f4").tobytes()
+
+    span = summary.sv_max_db - summary.sv_min_db
+    parts = []
+    for c in range(n_ch):
+        sv = summary.mvbs[c]
+        scaled = (np.clip(sv, summary.sv_min_db, summary.sv_max_db) - summary.sv_min_db) / span
+        with np.errstate(invalid="ignore"):
+            q = np.where(np.isfinite(sv), 1 + np.rint(scaled * (levels - 1)), 0).astype(np.int64)
+        delta = np.diff(q, axis=0, prepend=0) % (levels + 1)
+        parts.append(delta.astype(dtype).astype(f"<u{bits // 8}").tobytes())
+
+        nasc = summary.nasc[c]
+        with np.errstate(invalid="ignore"):
+            nq = np.rint(_NASC_SCALE * np.log10(1.0 + np.clip(nasc, 0, None)))
+        nq = np.where(np.isfinite(nasc), np.minimum(nq, _NASC_MISSING - 1), _NASC_MISSING)
+        parts.append(nq.astype("<u2").tobytes())
+
+    return header + freqs + zlib.compress(b"".join(parts), level)
+
+
+def decode(data: Union[bytes, str]) -> AcousticSummary:
+    """Decode bytes (or a base64 string, as carried in telemetry)."""
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    magic, version, bits, n_ch, n_time, n_depth, start_ns, time_bin, depth_bin, sv_min, sv_max = (
+        _HEADER.unpack_from(data, 0)
+    )
+    if magic != MAGIC:
+        raise ValueError("not an acoustic summary (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"unsupported acoustic summary version {version}")
+
+    offset = _HEADER.size
+    freqs = np.frombuffer(data, dtype="<f4", count=n_ch, offset=offset).astype(float).tolist()
+    body = zlib.decompress(data[offset + 4 * n_ch:])
+
+    levels = (1 << bits) - 1
+    mvbs = np.full((n_ch, n_time, n_depth), np.nan)
+    nasc = np.full((n_ch, n_time), np.nan)
+    pos = 0
+    grid_bytes = n_time * n_depth * (bits // 8)
+    for c in range(n_ch):
+        delta = np.frombuffer(body, dtype=f"<u{bits // 8}", count=n_time * n_depth, offset=pos)
+        pos += grid_bytes
+        q = np.cumsum(delta.reshape(n_time, n_depth).astype(np.int64), axis=0) % (levels + 1)
+        mvbs[c] = np.where(q > 0, sv_min + (q - 1) / (levels - 1) * (sv_max - sv_min), np.nan)
+
+        nq = np.frombuffer(body, dtype="<u2", count=n_time, offset=pos).astype(np.float64)
+        pos += 2 * n_time
+        nasc[c] = np.where(nq != _NASC_MISSING, 10.0 ** (nq / _NASC_SCALE) - 1.0, np.nan)
+
+    return AcousticSummary(
+        start=np.datetime64(int(start_ns), "ns"),
+        time_bin_s=float(time_bin),
+        depth_bin_m=float(depth_bin),
+        frequencies_hz=freqs,
+        mvbs=mvbs,
+        nasc=nasc,
+        sv_min_db=float(sv_min),
+        sv_max_db=float(sv_max),
+    )
+
+
+def describe(summary: AcousticSummary) -> Dict[str, object]:
+    """Short human-readable description of a decoded summary."""
+    return {
+        "start": str(summary.start),
+        "time_bins": summary.mvbs.shape[1],
+        "time_bin_s": summary.time_bin_s,
+        "depth_bins": summary.mvbs.shape[2],
+        "depth_bin_m": summary.depth_bin_m,
+        "frequencies_hz": summary.frequencies_hz,
+        "mean_sv_db": [
+            None if not np.isfinite(summary.mvbs[c]).any() else round(float(np.nanmean(summary.mvbs[c])), 1)
+            for c in range(summary.mvbs.shape[0])
+        ],
+    }
+
+
+def main(argv: List[str]) -> None:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Decode an acoustic summary (.osas) file.")
+    parser.add_argument("path", help="Binary summary file, or JSON telemetry message with a 'data' field.")
+    parser.add_argument("--netcdf", default=None, help="Write the decoded grid to this NetCDF file.")
+    args = parser.parse_args(argv)
+
+    with open(args.path, "rb") as f:
+        raw = f.read()
+    if raw[:4] != MAGIC:
+        raw = json.loads(raw)["data"]
+    summary = decode(raw)
+    print(json.dumps(describe(summary), indent=2))
+    if args.netcdf:
+        summary.to_xarray().to_netcdf(args.netcdf)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
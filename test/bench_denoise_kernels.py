@@ -0,0 +1,54 @@
+"""Time the Numba denoise kernels against oceanstream's masks.
+
+    python test/bench_denoise_kernels.py [n_pings] [n_samples]
+
+Per method on one channel (kernels warmed up first, so JIT compilation
+is not timed), then ``denoise`` over all three channels.
+"""
+
+import logging
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+warnings.filterwarnings("ignore")
+logging.disable(logging.INFO)
+
+from oceanstream.echodata.config import DenoiseConfig  # noqa: E402
+from oceanstream.echodata.denoise import apply_denoising  # noqa: E402
+
+import process.denoise_kernels as kernels  # noqa: E402
+from process.denoise import denoise  # noqa: E402
+from test_denoise_kernels import CONFIGS, METHODS, _sv  # noqa: E402
+
+
+def main(n_pings: int = 3000, n_samples: int = 3000) -> None:
+    ds = _sv(n_pings=n_pings, n_samples=n_samples, seed=1)
+    config = DenoiseConfig(**CONFIGS["global"])
+    ch_ds = ds.isel(channel=0)
+    print(f"Denoise masks, 1 channel, {n_pings} pings x {n_samples} samples")
+    for method, reference in METHODS.items():
+        params = config.get_params_for_frequency(float(ch_ds["frequency_nominal"]), method)
+        kernels.KERNELS[method](ch_ds.isel(ping_time=slice(0, 200)), params)
+        start = time.perf_counter()
+        reference(ch_ds, params)
+        t_ref = time.perf_counter() - start
+        start = time.perf_counter()
+        kernels.KERNELS[method](ch_ds, params)
+        t_kernel = time.perf_counter() - start
+        print(f"  {method:12s} oceanstream {t_ref:7.2f} s  kernel {t_kernel:6.2f} s  x{t_ref / t_kernel:5.1f}")
+
+    start = time.perf_counter()
+    apply_denoising(ds, methods=config.methods, config=config)
+    t_ref = time.perf_counter() - start
+    config.cpu_kernels = tuple(METHODS)
+    start = time.perf_counter()
+    denoise(ds, config=config)
+    t_kernel = time.perf_counter() - start
+    print(f"denoise, 3 channels: oceanstream {t_ref:.2f} s  kernels {t_kernel:.2f} s  x{t_ref / t_kernel:.1f}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
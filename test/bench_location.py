@@ -0,0 +1,49 @@
+"""Time the GPS track thinning on a synthetic ship track.
+
+    python test/bench_location.py [n_pings] [n_reference]
+
+Prints seconds for ``extract_location_data`` on *n_pings* pings and for
+the iterative ``ramer_douglas_peucker`` against the original recursive
+one on the first *n_reference* points (the recursive one is slow).
+"""
+
+import logging
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+warnings.filterwarnings("ignore")
+logging.disable(logging.INFO)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import xarray as xr  # noqa: E402
+
+from exports.location import extract_location_data, ramer_douglas_peucker  # noqa: E402
+from test_location import _recursive_rdp, _track  # noqa: E402
+
+
+def main(n_pings: int = 200000, n_reference: int = 20000) -> None:
+    points = _track(n_pings)
+    times = pd.Timestamp("2026-05-01") + pd.to_timedelta(np.arange(n_pings), "s")
+    ds = xr.Dataset(
+        {"latitude": ("ping_time", points[:, 0]), "longitude": ("ping_time", points[:, 1])},
+        coords={"ping_time": times.values},
+    )
+    print(f"Track thinning, {n_pings} pings, epsilon 1e-5 deg")
+    start = time.perf_counter()
+    kept = extract_location_data(ds)
+    print(f"  {'extract':14s} {time.perf_counter() - start:7.3f} s  ({len(kept)} points kept)")
+
+    reference = points[:n_reference]
+    print(f"RDP on {n_reference} points")
+    for label, rdp in [("recursive", _recursive_rdp), ("iterative", ramer_douglas_peucker)]:
+        start = time.perf_counter()
+        rdp(reference, 1e-5)
+        print(f"  {label:14s} {time.perf_counter() - start:7.3f} s")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
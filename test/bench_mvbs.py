@@ -0,0 +1,37 @@
+"""Time the MVBS engines on synthetic Sv.
+
+    python test/bench_mvbs.py [n_pings] [n_samples]
+
+Prints seconds per engine; the native engine's first call fills its
+range-bin cache, so it is timed twice.
+"""
+
+import logging
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+warnings.filterwarnings("ignore")
+logging.disable(logging.INFO)
+
+from process.mvbs import compute_mvbs  # noqa: E402
+from test_mvbs import _sv  # noqa: E402
+
+
+def main(n_pings: int = 3000, n_samples: int = 2000) -> None:
+    ds = _sv(n_pings=n_pings, n_samples=n_samples)
+    print(f"MVBS, 3 channels, {n_pings} pings x {n_samples} samples, 0.5 m x 10 s bins")
+    for label, engine, range_bin in [
+        ("oceanstream", "oceanstream", "0.5m"),
+        ("native (cold)", "native", "0.5"),
+        ("native (warm)", "native", "0.5"),
+    ]:
+        start = time.perf_counter()
+        compute_mvbs(ds, range_bin=range_bin, ping_time_bin="10s", engine=engine)
+        print(f"  {label:14s} {time.perf_counter() - start:7.3f} s")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
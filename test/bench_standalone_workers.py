@@ -0,0 +1,49 @@
+"""Time standalone processing of a raw-file directory over 1/2/4/8 workers.
+
+    python test/bench_standalone_workers.py RAW_DIR [workers ...] [-- standalone options]
+
+Runs ``standalone.py --workers N`` once per worker count, each into a
+fresh output directory (so nothing is resumed), and prints wall time and
+speedup over the first count.  Meant for a multi-core host with real
+raw files, e.g.::
+
+    python test/bench_standalone_workers.py /data/HB2302 1 2 4 8 -- --sonar-model EK80 --max-files 64
+"""
+
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+STANDALONE = Path(__file__).resolve().parents[1] / "standalone.py"
+
+
+def main(raw_dir: str, workers=(1, 2, 4, 8), options=()) -> None:
+    print(f"Standalone on {raw_dir}, {os.cpu_count()} CPUs, options: {' '.join(options) or '(defaults)'}")
+    baseline = None
+    for n in workers:
+        with tempfile.TemporaryDirectory(prefix="bench-workers-") as out:
+            cmd = [
+                sys.executable, str(STANDALONE),
+                "--input-dir", raw_dir, "--output-dir", out,
+                "--workers", str(n), "--no-resume", *options,
+            ]
+            start = time.perf_counter()
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            elapsed = time.perf_counter() - start
+        done = re.findall(r"Done: (\d+) ok.*?, (\d+) failed", proc.stdout)
+        ok, failed = done[-1] if done else ("?", "?")
+        baseline = baseline or elapsed
+        print(f"  {n:2d} workers {elapsed:8.1f} s  x{baseline / elapsed:4.2f}  ({ok} ok, {failed} failed)")
+        if proc.returncode != 0:
+            print(proc.stdout[-2000:] + proc.stderr[-2000:], file=sys.stderr)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = args[args.index("--") + 1:] if "--" in args else []
+    args = args[:args.index("--")] if "--" in args else args
+    main(args[0], tuple(int(a) for a in args[1:]) or (1, 2, 4, 8), options)
@@ -0,0 +1,75 @@
+"""Time draining a mixed backlog through the memory-aware job worker pool.
+
+    python test/bench_worker_pool.py [n_small] [n_large]
+
+Small (150-400 MB) and large (5-7 GB) jobs are interleaved in one
+``JobStore`` and drained with 1 worker (the old one-at-a-time
+``job_worker``) and with pools of 2, 4 and 8 workers under a 16 GB
+device's default budget.  Jobs sleep in proportion to their size, so
+the timings measure admission and scheduling, not the pipeline.
+"""
+
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+warnings.filterwarnings("ignore")
+logging.disable(logging.INFO)
+
+import numpy as np  # noqa: E402
+
+from ingest.job_store import DONE, JobStore  # noqa: E402
+from ingest.worker_pool import JobWorkerPool  # noqa: E402
+
+_MB = 1024 * 1024
+BUDGET_MB = int(16 * 1024 * 0.6)
+SECONDS_PER_GB = 0.5
+
+
+def _backlog(n_small, n_large, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = list(rng.integers(150, 400, n_small))
+    for i, size in enumerate(rng.integers(5000, 7000, n_large)):
+        sizes.insert((i + 1) * len(sizes) // (n_large + 1), size)
+    return [int(s) for s in sizes]
+
+
+def _drain(sizes, workers):
+    with tempfile.TemporaryDirectory(prefix="bench-pool-") as tmp:
+        store = JobStore(Path(tmp) / "jobs.db")
+        for i, mb in enumerate(sizes):
+            store.submit("process_raw", {"mb": mb}, group_id=f"g{i}")
+
+        def run_job(job):
+            time.sleep(job["payload"]["mb"] / 1024 * SECONDS_PER_GB)
+            store.finish(job["id"], DONE)
+
+        pool = JobWorkerPool(
+            store, run_job, max_workers=workers, budget_bytes=BUDGET_MB * _MB,
+            estimate=lambda job: job["payload"]["mb"] * _MB, poll_seconds=0.05,
+            available=lambda: None,
+        )
+        start = time.perf_counter()
+        asyncio.run(pool.run(until_idle=True))
+        elapsed = time.perf_counter() - start
+        store.close()
+    return elapsed, pool.peak_concurrency
+
+
+def main(n_small: int = 40, n_large: int = 4) -> None:
+    sizes = _backlog(n_small, n_large)
+    serial = sum(sizes) / 1024 * SECONDS_PER_GB
+    print(f"Backlog: {n_small} small + {n_large} large jobs, {sum(sizes) / 1024:.1f} GB, "
+          f"{serial:.1f} s of work, {BUDGET_MB} MB budget")
+    for workers in (1, 2, 4, 8):
+        elapsed, peak = _drain(sizes, workers)
+        print(f"  {workers} workers {elapsed:7.2f} s  x{serial / elapsed:4.2f}  (peak {peak} running)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
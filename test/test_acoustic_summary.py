@@ -0,0 +1,100 @@
+"""summary_codec round trips and the summary grid built from Sv."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from exports.acoustic_summary import _NASC_FACTOR, build_acoustic_summary
+from summary_codec import AcousticSummary, decode, encode
+
+
+def _summary(seed=0):
+    rng = np.random.default_rng(seed)
+    mvbs = rng.uniform(-100, -20, (3, 40, 25))
+    mvbs[0, 5:9, :] = np.nan
+    mvbs[2, :, 20:] = np.nan
+    mvbs[1, 0, 0], mvbs[1, 0, 1] = -130.0, 5.0      # clipped to the range
+    nasc = rng.uniform(0, 5000, (3, 40))
+    nasc[0, 5:9] = np.nan
+    nasc[1, 3] = 0.0
+    return AcousticSummary(
+        start=np.datetime64("2026-05-01T10:00:00", "ns"), time_bin_s=60.0, depth_bin_m=5.0,
+        frequencies_hz=[38e3, 70e3, 120e3], mvbs=mvbs, nasc=nasc,
+    )
+
+
+@pytest.mark.parametrize("bits, max_error_db", [(8, 0.16), (16, 0.001)])
+def test_round_trip(bits, max_error_db):
+    summary = _summary()
+    decoded = decode(encode(summary, bits=bits))
+
+    assert decoded.start == summary.start
+    assert (decoded.time_bin_s, decoded.depth_bin_m) == (60.0, 5.0)
+    assert decoded.frequencies_hz == summary.frequencies_hz
+    np.testing.assert_array_equal(np.isnan(decoded.mvbs), np.isnan(summary.mvbs))
+    expected = np.clip(summary.mvbs, summary.sv_min_db, summary.sv_max_db)
+    assert np.nanmax(np.abs(decoded.mvbs - expected)) <= max_error_db
+
+    np.testing.assert_array_equal(np.isnan(decoded.nasc), np.isnan(summary.nasc))
+    np.testing.assert_allclose(decoded.nasc, summary.nasc, rtol=1.2e-3, atol=1e-9)
+    assert decoded.nasc[1, 3] == 0.0
+
+
+def test_base64_and_bad_input():
+    import base64
+
+    data = encode(_summary())
+    assert decode(base64.b64encode(data).decode()).mvbs.shape == (3, 40, 25)
+    with pytest.raises(ValueError):
+        encode(_summary(), bits=12)
+    with pytest.raises(ValueError):
+        decode(b"NOPE" + data[4:])
+
+
+def _sv(sv_db=-60.0, n_pings=150, n_samples=200):
+    sv = np.full((2, n_pings, n_samples), sv_db)
+    sv[1, 30:60] = np.nan
+    echo_range = np.broadcast_to(np.arange(n_samples) * 0.5, (2, n_pings, n_samples)).copy()
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), sv),
+            "echo_range": (("channel", "ping_time", "range_sample"), echo_range),
+        },
+        coords={
+            "channel": ["a", "b"],
+            "ping_time": pd.date_range("2026-05-01T10:00:30", periods=n_pings, freq="1s").values,
+            "range_sample": np.arange(n_samples),
+            "frequency_nominal": ("channel", [38e3, 120e3]),
+        },
+    )
+
+
+@pytest.mark.parametrize("bits", [8, 16])
+def test_build_and_round_trip(bits):
+    summary = build_acoustic_summary(_sv(), time_bin=60.0, depth_bin=5.0, max_depth=150.0)
+
+    # Columns align to whole minutes: 10:00:30 … 10:02:59 spans three
+    assert summary.start == np.datetime64("2026-05-01T10:00:00", "ns")
+    assert summary.mvbs.shape == (2, 3, 30)
+    assert summary.frequencies_hz == [38e3, 120e3]
+    # 100 m of data fills 20 of the 30 depth rows
+    np.testing.assert_allclose(summary.mvbs[:, :, :20], -60.0)
+    assert np.isnan(summary.mvbs[:, :, 20:]).all()
+    np.testing.assert_allclose(summary.nasc, _NASC_FACTOR * 1e-6 * 100.0)
+
+    decoded = decode(encode(summary, bits=bits))
+    np.testing.assert_array_equal(np.isnan(decoded.mvbs), np.isnan(summary.mvbs))
+    assert np.nanmax(np.abs(decoded.mvbs - summary.mvbs)) <= (0.16 if bits == 8 else 0.001)
+    np.testing.assert_allclose(decoded.nasc, summary.nasc, rtol=1.2e-3)
+
+
+def test_build_with_empty_column():
+    ds = _sv()
+    ds["Sv"][:, 30:90] = np.nan
+    summary = build_acoustic_summary(ds, time_bin=60.0, depth_bin=5.0, max_depth=150.0)
+
+    assert np.isnan(summary.mvbs[:, 1]).all()
+    assert np.isnan(summary.nasc[:, 1]).all()
+    decoded = decode(encode(summary))
+    assert np.isnan(decoded.nasc[:, 1]).all() and np.isfinite(decoded.nasc[:, [0, 2]]).all()
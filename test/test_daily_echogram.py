@@ -0,0 +1,68 @@
+"""Daily composite updates: overwrite semantics, midnight split, process safety."""
+
+import multiprocessing
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from azure_handler.storage import LocalStorage
+from config import EdgeConfig
+from exports.daily_echogram import DailyEchogram, daily_raster_root, update_daily_echogram
+
+
+def _batch(start, n_pings, sv_db, n_samples=50):
+    times = (pd.Timestamp(start) + pd.to_timedelta(np.arange(n_pings), "s")).values
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), np.full((1, n_pings, n_samples), sv_db)),
+            "echo_range": (("channel", "ping_time", "range_sample"),
+                           np.broadcast_to(np.arange(n_samples) * 1.0, (1, n_pings, n_samples)).copy()),
+        },
+        coords={"channel": ["ch38"], "ping_time": times, "frequency_nominal": ("channel", [38e3])},
+    )
+
+
+def _config(tmp_path):
+    return EdgeConfig(output_base_path=str(tmp_path), echogram_tiles_enabled=False)
+
+
+def test_reprocessed_batch_replaces_values(tmp_path):
+    composite = DailyEchogram(tmp_path, date(2026, 5, 1), column_seconds=10.0, depth_bin=1.0, max_depth=100.0)
+    composite.update(_batch("2026-05-01T12:00:00", 60, -40.0))
+    raster = np.load(tmp_path / "38kHz.npy")
+    loud = raster[:10, 4321]
+
+    (label, (c0, c1)), = composite.update(_batch("2026-05-01T12:00:00", 60, -70.0)).items()
+    raster = np.load(tmp_path / "38kHz.npy")
+    assert (c0, c1) == (4320, 4326)
+    assert (raster[:10, 4321] < loud).all()
+    assert (raster[:10, c0:c1] == raster[0, 4321]).all()
+
+
+def test_batch_across_midnight_updates_both_days(tmp_path):
+    config = _config(tmp_path)
+    saved = update_daily_echogram(_batch("2026-05-01T23:59:00", 120, -50.0), config, LocalStorage(str(tmp_path / "out")))
+
+    for day, cols in ((date(2026, 5, 1), slice(8634, 8640)), (date(2026, 5, 2), slice(0, 6))):
+        raster = np.load(daily_raster_root(config, day) / "38kHz.npy")
+        assert raster[:10, cols].all()
+        assert any(f"/{day.isoformat()}/daily/index.json" in path for path in saved)
+
+
+def _update_minute(args):
+    root, minute = args
+    composite = DailyEchogram(root, date(2026, 5, 1), column_seconds=10.0, depth_bin=1.0, max_depth=100.0)
+    composite.update(_batch(f"2026-05-01T06:{minute:02d}:00", 60, -45.0))
+
+
+def test_concurrent_processes_keep_every_batch(tmp_path):
+    minutes = list(range(0, 40, 2))
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        pool.map(_update_minute, [(str(tmp_path), m) for m in minutes])
+
+    raster = np.load(tmp_path / "38kHz.npy")
+    for minute in minutes:
+        c0 = (6 * 3600 + minute * 60) // 10
+        assert raster[:10, c0:c0 + 6].all(), minute
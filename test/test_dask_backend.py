@@ -0,0 +1,135 @@
+"""The dask backend on an in-process LocalCluster against LocalStorage."""
+
+import asyncio
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+pytest.importorskip("distributed")
+
+from azure_handler.storage import LocalStorage, storage_spec
+from config import EdgeConfig
+from process import dask_backend
+
+_DAY = "2026-05-01"
+
+
+def _sv(n_pings=240, n_samples=80):
+    rng = np.random.default_rng(0)
+    times = (pd.Timestamp(f"{_DAY}T10:00") + pd.to_timedelta(np.arange(n_pings), "s")).values
+    echo_range = np.broadcast_to(np.arange(n_samples) * 0.5, (2, n_pings, n_samples)).copy()
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), rng.normal(-70, 6, (2, n_pings, n_samples))),
+            "echo_range": (("channel", "ping_time", "range_sample"), echo_range),
+            "depth": (("channel", "ping_time", "range_sample"), echo_range + 1.0),
+            "latitude": ("ping_time", 40 + np.arange(n_pings) * 0.0001),
+            "longitude": ("ping_time", -70 + np.arange(n_pings) * 0.0001),
+            "frequency_nominal": ("channel", [38e3, 120e3]),
+        },
+        coords={"channel": ["a", "b"], "ping_time": times, "range_sample": np.arange(n_samples)},
+    )
+
+
+class _FakeHub:
+    """Records output messages and reported properties."""
+
+    def __init__(self):
+        self.sent = []
+        self.reported = []
+
+    def send_message_to_output(self, message, output_name):
+        self.sent.append((output_name, json.loads(message.data)))
+
+    def patch_twin_reported_properties(self, patch):
+        self.reported.append(patch)
+
+
+@pytest.fixture(scope="module")
+def dask_client():
+    from distributed import Client, LocalCluster
+
+    dask_backend._CLIENT = Client(LocalCluster(processes=False, n_workers=1, threads_per_worker=2))
+    yield dask_backend._CLIENT
+    dask_backend.close_dask_client()
+
+
+@pytest.fixture
+def fake_convert(monkeypatch):
+    import process.pipeline
+
+    # ``process.compute_sv`` is shadowed by the function the package re-exports
+    compute_sv_module = sys.modules["process.compute_sv"]
+    monkeypatch.setattr(process.pipeline, "_convert_and_store", lambda path, config, store: (object(), "c/echodata/D1.zarr"))
+    monkeypatch.setattr(compute_sv_module, "compute_sv", lambda echodata, **kwargs: _sv())
+
+
+def _config(tmp_path, **overrides):
+    return EdgeConfig(
+        survey_id="c", output_base_path=str(tmp_path), execution_backend="dask",
+        denoise_enabled=False, mvbs_engine="native", nasc_enabled=True, nasc_engine="native",
+        acoustic_summary_enabled=True, echogram_tiles_enabled=False, **overrides,
+    )
+
+
+def test_storage_spec_round_trip(tmp_path):
+    from azure_handler.storage import storage_from_spec
+
+    spec = storage_spec(LocalStorage(str(tmp_path)))
+    assert spec == {"backend": "local", "base_path": str(tmp_path)}
+    assert storage_from_spec(spec) is storage_from_spec(dict(spec))
+
+
+def test_file_stages_run_as_tasks(tmp_path, dask_client, fake_convert):
+    config = _config(tmp_path)
+    storage = LocalStorage(str(tmp_path))
+    seen = []
+
+    result = asyncio.run(dask_backend.run_file_on_dask(
+        "/data/D1.raw", config, storage, progress=lambda fraction, stage: seen.append((round(fraction, 3), stage)),
+    ))
+
+    assert result["status"] == "ok"
+    assert result["stages_run"] == ["mvbs", "nasc", "acoustic_summary", "echograms"]
+    assert [stage for _, stage in seen] == ["sv", "mvbs", "nasc", "acoustic_summary", "echograms", "finish"]
+    assert [f for f, _ in seen] == sorted(f for f, _ in seen)
+    prefix = f"{config.campaign_container}/{config.processed_container}/D1"
+    for product in ("sv.zarr", "mvbs.zarr", "nasc.zarr", "acoustic_summary.osas", "metadata.json"):
+        assert storage.exists(f"{prefix}/{product}")
+    assert result["acoustic_summary_path"] == f"{prefix}/acoustic_summary.osas"
+    assert result["daily_echogram_files"]
+    assert result["n_pings"] == 240
+
+
+def test_progress_exception_cancels_the_file(tmp_path, dask_client, fake_convert):
+    class Cancelled(Exception):
+        pass
+
+    def progress(fraction, stage):
+        if stage == "nasc":
+            raise Cancelled
+
+    with pytest.raises(Cancelled):
+        asyncio.run(dask_backend.run_file_on_dask("/data/D1.raw", _config(tmp_path), LocalStorage(str(tmp_path)), progress))
+
+
+def test_pipeline_publishes_dask_result(tmp_path, dask_client, fake_convert):
+    from process.pipeline import process_raw_file_pipeline
+    from process.segment_store import SegmentStore
+
+    config = _config(tmp_path)
+    hub = _FakeHub()
+    store = SegmentStore(LocalStorage(str(tmp_path)), container=config.campaign_container,
+                         processed_subfolder=config.processed_container)
+
+    result = asyncio.run(process_raw_file_pipeline("/data/D1.raw", config, store, client=hub))
+
+    output1 = [body for name, body in hub.sent if name == "output1"]
+    assert [body.get("type") for body in output1] == ["acoustic_summary", None]
+    assert output1[0]["segment"] == "D1"
+    assert output1[1]["segment"] == "D1" and output1[1]["stages_run"] == result["stages_run"]
+    assert any(name == "outputml" for name, _ in hub.sent)
@@ -0,0 +1,93 @@
+"""The Numba denoise kernels must flag exactly the samples oceanstream flags."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+pytest.importorskip("numba")
+pytest.importorskip("oceanstream")
+
+from oceanstream.echodata import denoise as os_denoise  # noqa: E402
+from oceanstream.echodata.config import DenoiseConfig  # noqa: E402
+from oceanstream.echodata.denoise import apply_denoising  # noqa: E402
+
+import process.denoise_kernels as kernels  # noqa: E402
+from process.denoise import denoise  # noqa: E402
+
+METHODS = {
+    "background": os_denoise.background_noise_mask,
+    "transient": os_denoise.transient_noise_mask,
+    "impulse": os_denoise.impulse_noise_mask,
+    "attenuation": os_denoise.attenuation_mask,
+}
+
+CONFIGS = {
+    "global": dict(background_noise_max=-100.0, attenuation_threshold=5.0, transient_exclude_above=100.0),
+    "lags": dict(impulse_ping_lags=[1, 2, 3], impulse_threshold_db=6.0, transient_exclude_above=50.0),
+    "frequency": dict(use_frequency_specific=True),
+    "short": dict(background_ping_window=7, background_range_window=3, transient_n_pings=5, attenuation_side_pings=2),
+}
+
+
+def _sv(n_pings=400, n_samples=600, depth_coord=False, float32=False, seed=0):
+    """Three channels with impulses, an attenuated patch, NaN pings and a NaN range tail."""
+    rng = np.random.default_rng(seed)
+    times = (pd.Timestamp("2026-05-01") + pd.to_timedelta(np.arange(n_pings), "s")).values
+    echo_range = np.broadcast_to(np.arange(n_samples) * 0.5, (3, n_pings, n_samples)).copy()
+    echo_range[2] *= 0.4
+    sv = -90 + 6 * np.log10(np.maximum(echo_range, 1)) + rng.normal(0, 4, (3, n_pings, n_samples))
+    sv[:, rng.integers(0, n_pings, 15), :] += 15
+    sv[:, 100:104, 300:] -= 12
+    sv[:, :, -40:] = np.nan
+    sv[1, 50:60] = np.nan
+    ds = xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), sv.astype(np.float32) if float32 else sv),
+            "echo_range": (("channel", "ping_time", "range_sample"), echo_range),
+        },
+        coords={
+            "channel": ["38k", "120k", "200k"],
+            "ping_time": times,
+            "range_sample": np.arange(n_samples),
+            "frequency_nominal": ("channel", [38e3, 120e3, 200e3]),
+        },
+    )
+    ds["depth"] = ds["echo_range"] + 5.0
+    return ds.set_coords("depth") if depth_coord else ds
+
+
+@pytest.mark.parametrize("layout", [{}, {"depth_coord": True}, {"float32": True}], ids=["vars", "depth_coord", "float32"])
+@pytest.mark.parametrize("config_name", sorted(CONFIGS))
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_kernel_mask_matches_oceanstream(layout, config_name, method):
+    ds = _sv(**layout)
+    config = DenoiseConfig(**CONFIGS[config_name])
+    for ch in range(ds.sizes["channel"]):
+        ch_ds = ds.isel(channel=ch)
+        params = config.get_params_for_frequency(float(ch_ds["frequency_nominal"]), method)
+        got = kernels.KERNELS[method](ch_ds, params)
+        try:
+            reference = METHODS[method](ch_ds, params)
+        except Exception:
+            # Layouts oceanstream rejects are left to it (the kernel declines)
+            assert got is None
+            continue
+        reference = reference.broadcast_like(ch_ds["Sv"]).transpose(*ch_ds["Sv"].dims).values.astype(bool)
+        valid = ~np.isnan(ch_ds["Sv"].values)
+        assert got is not None
+        np.testing.assert_array_equal(got & valid, reference & valid)
+
+
+@pytest.mark.parametrize("config_name", sorted(CONFIGS))
+def test_denoise_with_kernels_matches_oceanstream(config_name):
+    ds = _sv(n_pings=600, n_samples=800, seed=3)
+    config = DenoiseConfig(**CONFIGS[config_name])
+    reference = apply_denoising(ds, methods=config.methods, config=config)
+    config.cpu_kernels = tuple(METHODS)
+    got = denoise(ds, config=config)
+
+    assert set(got.data_vars) == set(reference.data_vars)
+    assert got["noise_mask"].dims == reference["noise_mask"].dims
+    np.testing.assert_array_equal(got["noise_mask"].values, reference["noise_mask"].values)
+    np.testing.assert_array_equal(got["Sv"].values, reference["Sv"].values)
@@ -0,0 +1,66 @@
+"""Echograms rendered through the process pool match in-process rendering."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import exports.echograms as echograms
+
+pytest.importorskip("matplotlib")
+
+
+def _sv(n_pings=300, n_samples=200):
+    rng = np.random.default_rng(1)
+    echo_range = np.broadcast_to(np.arange(n_samples) * 0.2, (2, n_pings, n_samples)).copy()
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), rng.normal(-65, 8, (2, n_pings, n_samples)).astype(np.float32)),
+            "echo_range": (("channel", "ping_time", "range_sample"), echo_range),
+        },
+        coords={
+            "channel": ["a", "b"],
+            "ping_time": pd.date_range("2026-05-01T10:00", periods=n_pings, freq="1s").values,
+            "range_sample": np.arange(n_samples),
+            "frequency_nominal": ("channel", [38e3, 120e3]),
+        },
+    )
+
+
+@pytest.fixture
+def render_pool():
+    yield
+    with echograms._RENDER_POOL_LOCK:
+        if echograms._RENDER_POOL is not None:
+            echograms._RENDER_POOL.shutdown()
+            echograms._RENDER_POOL = None
+
+
+def test_pool_matches_in_process(render_pool):
+    jobs = echograms._sv_echogram_jobs(_sv(), prefix="sv", reducer="mean")
+    assert len(jobs) == 2
+
+    in_process = echograms._render_jobs(jobs, workers=1)
+    pooled = echograms._render_jobs(jobs, workers=2)
+
+    assert echograms._RENDER_POOL is not None
+    assert [f["filename"] for f in pooled] == [f["filename"] for f in in_process]
+    for a, b in zip(pooled, in_process):
+        assert a["data"][:8] == b"\x89PNG\r\n\x1a\n"
+        assert a["data"] == b["data"]
+
+
+def test_render_from_shared_reads_the_segment():
+    from multiprocessing import shared_memory
+
+    job, data = echograms._sv_echogram_jobs(_sv(), prefix="sv", reducer="max")[0]
+    arr = np.ascontiguousarray(data, dtype=np.float32)
+    shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    try:
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        png = echograms._render_from_shared(job, shm.name, arr.shape, arr.dtype.str)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    assert png == echograms._render_echogram(job, arr)
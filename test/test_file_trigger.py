@@ -0,0 +1,154 @@
+"""FileTriggerScheduler filtering, debounce, dedup and batching."""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from config import EdgeConfig
+from ingest.file_trigger import FileTriggerScheduler
+
+
+def test_only_raw_files_are_queued(tmp_path):
+    scheduler = FileTriggerScheduler(EdgeConfig(manifest_enabled=False), None, None)
+    for name in ("D001.raw", "D002.RAW", ".rawindex.json", ".rawindex.tmp", "D001.idx"):
+        (tmp_path / name).write_bytes(b"x")
+
+    status = {
+        name: scheduler.submit({"event": "fileadd", "file_added_path": str(tmp_path / name)})["status"]
+        for name in ("D001.raw", "D002.RAW", ".rawindex.json", ".rawindex.tmp", "D001.idx")
+    }
+
+    assert status == {
+        "D001.raw": "queued", "D002.RAW": "queued",
+        ".rawindex.json": "skipped", ".rawindex.tmp": "skipped", "D001.idx": "skipped",
+    }
+    assert sorted(scheduler._pending) == [str(tmp_path / "D001.raw"), str(tmp_path / "D002.RAW")]
+
+
+def _scheduler(**overrides):
+    settings = dict(manifest_enabled=False, file_trigger_debounce_seconds=5.0, file_trigger_max_wait_seconds=60.0)
+    settings.update(overrides)
+    return FileTriggerScheduler(EdgeConfig(**settings), None, None)
+
+
+def _submit(scheduler, path):
+    return scheduler.submit({"event": "fileadd", "file_added_path": str(path)})["status"]
+
+
+def test_files_wait_for_quiet_events(tmp_path):
+    scheduler = _scheduler()
+    raw = tmp_path / "D001.raw"
+    raw.write_bytes(b"x" * 10)
+    _submit(scheduler, raw)
+
+    assert scheduler._ready_files() == []
+    scheduler._last_event -= 10
+    assert scheduler._ready_files() == [str(raw)]
+
+
+def test_max_wait_dispatches_during_steady_events(tmp_path):
+    scheduler = _scheduler()
+    raw = tmp_path / "D001.raw"
+    raw.write_bytes(b"x" * 10)
+    _submit(scheduler, raw)
+    first, size = scheduler._pending[str(raw)]
+    scheduler._pending[str(raw)] = (first - 61, size)
+
+    assert scheduler._ready_files() == [str(raw)]
+
+
+def test_growing_files_wait_for_a_stable_size(tmp_path):
+    scheduler = _scheduler()
+    raw = tmp_path / "D001.raw"
+    raw.write_bytes(b"x" * 10)
+    _submit(scheduler, raw)
+    raw.write_bytes(b"x" * 20)
+    scheduler._last_event -= 10
+
+    assert scheduler._ready_files() == []
+    assert scheduler._pending[str(raw)][1] == 20
+    assert scheduler._ready_files() == [str(raw)]
+
+
+def test_duplicate_events_are_dropped(tmp_path):
+    scheduler = _scheduler()
+    running, done = tmp_path / "D001.raw", tmp_path / "D002.raw"
+    for raw in (running, done):
+        raw.write_bytes(b"x" * 10)
+    scheduler._in_flight.add(str(running))
+    stat = done.stat()
+    scheduler._recent[str(done)] = (stat.st_size, stat.st_mtime)
+
+    assert _submit(scheduler, running) == "duplicate"
+    assert _submit(scheduler, done) == "duplicate"
+    assert scheduler.duplicates == 2
+
+    # A changed file is processed again; a repeated pending event keeps its first time
+    done.write_bytes(b"x" * 30)
+    assert _submit(scheduler, done) == "queued"
+    first = scheduler._pending[str(done)][0]
+    assert _submit(scheduler, done) == "queued"
+    assert scheduler._pending[str(done)] == (first, 30)
+
+
+def _batches(scheduler, sizes, keys, monkeypatch, tmp_path):
+    import ingest.file_trigger as file_trigger
+
+    paths = []
+    for name, size in sizes.items():
+        path = str(tmp_path / name)
+        scheduler._pending[path] = (0.0, size)
+        paths.append(path)
+    monkeypatch.setattr(file_trigger, "_channel_key", lambda path: keys[path.rsplit("/", 1)[-1]])
+    batches = asyncio.run(scheduler._batches(sorted(paths)))
+    return [[p.rsplit("/", 1)[-1] for p in batch] for batch in batches]
+
+
+def test_batches_group_small_files_with_the_same_channels(tmp_path, monkeypatch):
+    scheduler = _scheduler(file_trigger_merge_enabled=True, file_trigger_merge_max_mb=1.0,
+                           file_trigger_merge_max_files=3)
+    mb = 1024 * 1024
+    sizes = {f"D{i:03d}.raw": mb // 2 for i in range(1, 9)}
+    sizes["D004.raw"] = 2 * mb
+    keys = {name: "a" for name in sizes}
+    keys["D006.raw"] = keys["D007.raw"] = keys["D008.raw"] = "b"
+
+    assert _batches(scheduler, sizes, keys, monkeypatch, tmp_path) == [
+        ["D001.raw", "D002.raw", "D003.raw"],
+        ["D004.raw"],
+        ["D005.raw"],
+        ["D006.raw", "D007.raw", "D008.raw"],
+    ]
+
+
+def test_batches_are_single_files_without_merging(tmp_path, monkeypatch):
+    scheduler = _scheduler()
+    assert not scheduler.config.file_trigger_merge_enabled
+    sizes = {f"D{i:03d}.raw": 10 for i in range(1, 4)}
+    keys = {name: "a" for name in sizes}
+
+    assert _batches(scheduler, sizes, keys, monkeypatch, tmp_path) == [["D001.raw"], ["D002.raw"], ["D003.raw"]]
+
+
+def test_merged_sv_is_split_by_ping_offsets():
+    from process.pipeline import _split_by_file
+
+    # Two files whose ping times overlap; the second file's second ping is empty
+    times = pd.to_datetime(["2026-05-01T10:00:00", "2026-05-01T10:00:02", "2026-05-01T10:00:01",
+                            "2026-05-01T10:00:02", "2026-05-01T10:00:03"]).values
+    sv = np.arange(10.0).reshape(5, 2)
+    sv[3] = np.nan
+    ds_sv = xr.Dataset({"Sv": (("ping_time", "range_sample"), sv)}, coords={"ping_time": times})
+    files = [{"Sonar/Beam_group1": xr.Dataset(coords={"ping_time": times[:2]})},
+             {"Sonar/Beam_group1": xr.Dataset(coords={"ping_time": times[2:]})}]
+
+    kept, slices = _split_by_file(ds_sv, files)
+
+    assert kept.sizes["ping_time"] == 4
+    assert kept["Sv"].isel(ping_time=slices[0]).values[:, 0].tolist() == [0.0, 2.0]
+    assert kept["Sv"].isel(ping_time=slices[1]).values[:, 0].tolist() == [4.0, 8.0]
+    with pytest.raises(ValueError):
+        _split_by_file(ds_sv, files[:1])
@@ -0,0 +1,129 @@
+"""JobStore dedup, ordering, resume and cancellation; manifest-aware raw jobs."""
+
+import asyncio
+import json
+
+import pytest
+
+from ingest.job_store import CANCELLED, DONE, QUEUED, RUNNING, JobCancelled, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = JobStore(tmp_path / "jobs.sqlite")
+    yield s
+    s.close()
+
+
+def test_dedup_blocks_queued_running_and_done(store):
+    first = store.submit("process_raw", {"file_path": "a.raw"}, group_id="g1", dedup_key="raw:a")
+    assert first is not None
+    assert store.submit("process_raw", {"file_path": "a.raw"}, group_id="g2", dedup_key="raw:a") is None
+
+    store.claim()
+    assert store.submit("process_raw", {"file_path": "a.raw"}, group_id="g2", dedup_key="raw:a") is None
+    assert store.submit("process_raw", {"file_path": "a.raw"}, group_id="g2", dedup_key="raw:a", force=True) is None
+
+    store.finish(first, DONE)
+    assert store.submit("process_raw", {"file_path": "a.raw"}, group_id="g2", dedup_key="raw:a") is None
+    assert store.submit("process_raw", {"file_path": "a.raw"}, group_id="g2", dedup_key="raw:a", force=True)
+    # Jobs without a key never collide
+    assert store.submit("process_day", {}, group_id="g3") and store.submit("process_day", {}, group_id="g3")
+
+
+def test_claim_by_priority_then_fifo(store):
+    ids = {}
+    for name, priority in [("low1", "low"), ("normal1", "normal"), ("high1", "high"),
+                           ("normal2", "normal"), ("high2", "high")]:
+        ids[store.submit("job", {"name": name}, group_id="g", priority=priority)] = name
+
+    order = []
+    while (job := store.claim()) is not None:
+        assert job["status"] == RUNNING and job["attempts"] == 1
+        order.append(ids[job["id"]])
+    assert order == ["high1", "high2", "normal1", "normal2", "low1"]
+
+
+def test_running_jobs_are_requeued_on_reopen(tmp_path):
+    path = tmp_path / "jobs.sqlite"
+    store = JobStore(path)
+    running = store.submit("job", {}, group_id="g")
+    done = store.submit("job", {}, group_id="g")
+    store.claim()
+    store.claim()
+    store.finish(done, DONE)
+    store.close()
+
+    store = JobStore(path)
+    assert store.get(running)["status"] == QUEUED
+    assert store.get(running)["stage"] == "resumed"
+    assert store.get(done)["status"] == DONE
+    job = store.claim()
+    assert job["id"] == running and job["attempts"] == 2
+    store.close()
+
+
+def test_cancel_queued_and_group(store):
+    a = store.submit("job", {}, group_id="g1")
+    b = store.submit("job", {}, group_id="g1")
+    other = store.submit("job", {}, group_id="g2")
+
+    assert store.cancel(a) == 1
+    assert store.get(a)["status"] == CANCELLED
+    assert store.cancel("g1") == 1
+    assert store.get(b)["status"] == CANCELLED
+    assert store.get(other)["status"] == QUEUED
+    assert store.get("g1")["counts"] == {CANCELLED: 2}
+    assert store.claim()["id"] == other
+
+
+def test_cancel_running_raises_at_checkpoint(store):
+    job_id = store.submit("job", {}, group_id="g")
+    store.claim()
+    store.checkpoint(job_id, 0.25, "sv")
+    assert store.get(job_id)["progress"] == 0.25
+
+    assert store.cancel("g") == 1
+    assert store.get(job_id)["status"] == RUNNING
+    assert store.cancel_requested(job_id)
+    with pytest.raises(JobCancelled):
+        store.checkpoint(job_id, 0.5, "mvbs")
+    assert store.get(job_id)["stage"] == "mvbs"
+
+
+class _FakeHub:
+    def __init__(self):
+        self.sent = []
+
+    def send_message_to_output(self, message, output_name):
+        self.sent.append((output_name, json.loads(message.data)))
+
+
+@pytest.mark.parametrize("force", [False, True])
+def test_raw_jobs_use_the_run_manifest(tmp_path, store, monkeypatch, force):
+    import process.pipeline
+    from config import EdgeConfig
+    from ingest.on_demand import _run_job
+    from process.manifest import PROCESS, RESUME, RunManifest
+
+    config = EdgeConfig(survey_id="c", output_base_path=str(tmp_path))
+    raw = tmp_path / "D1.raw"
+    raw.write_bytes(b"\0" * 64)
+    manifest = RunManifest(tmp_path / "manifest.sqlite")
+    entry = manifest.entry(str(raw), config)
+    entry.record("convert")
+    entry.record("sv")
+
+    seen = {}
+
+    async def pipeline(file_path, config, segment_store, client, progress=None, entry=None):
+        seen["entry"] = entry
+        return {"status": "ok"}
+
+    monkeypatch.setattr(process.pipeline, "process_raw_file_pipeline", pipeline)
+    job_id = store.submit("process_raw", {"file_path": str(raw), "options": {"force": force}}, group_id="g")
+    asyncio.run(_run_job(store.claim(), config, None, _FakeHub(), store, manifest))
+
+    assert store.get(job_id)["status"] == DONE
+    assert seen["entry"].plan == (PROCESS if force else RESUME)
+    manifest.close()
@@ -0,0 +1,62 @@
+"""MessageJournal: ordering, acknowledgement and corrupt records."""
+
+import json
+
+from azure_handler.journal import PRIORITY_NORMAL, PRIORITY_SUMMARY, MessageJournal
+
+
+def _flip_byte(path, offset):
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+
+def test_summaries_are_read_first(tmp_path):
+    journal = MessageJournal(tmp_path)
+    journal.append("output1", b"normal", PRIORITY_NORMAL)
+    journal.append("output1", b"summary", PRIORITY_SUMMARY)
+
+    assert [e.body for e in journal.read()] == [b"summary", b"normal"]
+
+
+def test_corrupt_record_is_discarded_and_skipped(tmp_path):
+    journal = MessageJournal(tmp_path)
+    for n in range(3):
+        journal.append("output1", json.dumps({"n": n}).encode())
+    journal.close()
+    # Damage the body of the middle record
+    segment = next((tmp_path / "p1").glob("*.log"))
+    record = len(segment.read_bytes()) // 3
+    _flip_byte(segment, record + record - 2)
+
+    journal = MessageJournal(tmp_path)
+    assert journal.pending()["p1"] == 3
+    entries = journal.read()
+    assert [json.loads(e.body)["n"] for e in entries] == [0, 2]
+    assert journal.discarded == 1
+
+    journal.ack(entries)
+    assert journal.pending()["p1"] == 0
+    assert journal.read() == []
+
+    # The cursor moved past the damaged record for good
+    journal.close()
+    assert MessageJournal(tmp_path).pending()["p1"] == 0
+
+
+def test_trailing_corrupt_record_does_not_hold_the_cursor(tmp_path):
+    journal = MessageJournal(tmp_path)
+    journal.append("output1", b"a")
+    journal.append("output1", b"b")
+    journal.close()
+    segment = next((tmp_path / "p1").glob("*.log"))
+    _flip_byte(segment, len(segment.read_bytes()) - 1)
+
+    journal = MessageJournal(tmp_path)
+    entries = journal.read()
+    assert [e.body for e in entries] == [b"a"]
+    journal.ack(entries)
+    assert journal.pending()["p1"] == 0
+
+    journal.append("output1", b"c")
+    assert [e.body for e in journal.read()] == [b"c"]
@@ -0,0 +1,177 @@
+"""Track thinning: the iterative RDP against the recursive one, and great-circle pruning."""
+
+import numpy as np
+import pytest
+
+from exports.location import (
+    _EARTH_RADIUS_NMI,
+    _min_distance_indices,
+    haversine_nmi,
+    ramer_douglas_peucker,
+    rdp_mask,
+)
+
+
+def _recursive_rdp(points, epsilon):
+    """The original recursive ``ramer_douglas_peucker``, kept as reference."""
+    if len(points) < 3:
+        return points
+
+    def get_perpendicular_distance(point, line_start, line_end):
+        if np.allclose(line_start, line_end):
+            return np.linalg.norm(point - line_start)
+        line_vec = line_end - line_start
+        point_vec = point - line_start
+        line_len = np.linalg.norm(line_vec)
+        line_unitvec = line_vec / line_len
+        point_vec_scaled = point_vec / line_len
+        t = np.dot(line_unitvec, point_vec_scaled)
+        t = np.clip(t, 0, 1)
+        nearest = line_start + t * line_vec
+        return np.linalg.norm(point - nearest)
+
+    max_distance = 0
+    index = 0
+    for i in range(1, len(points) - 1):
+        distance = get_perpendicular_distance(points[i], points[0], points[-1])
+        if distance > max_distance:
+            index = i
+            max_distance = distance
+    if max_distance > epsilon:
+        left_points = _recursive_rdp(points[:index + 1], epsilon)
+        right_points = _recursive_rdp(points[index:], epsilon)
+        return np.vstack((left_points[:-1], right_points))
+    return np.vstack((points[0], points[-1]))
+
+
+def _track(n, seed=0, kind="walk"):
+    """A ship-like (lat, lon) track in decimal degrees."""
+    rng = np.random.default_rng(seed)
+    if kind == "walk":
+        heading = np.cumsum(rng.normal(0, 0.2, n))
+        step = rng.uniform(0.5e-4, 2e-4, n)
+        return np.column_stack([
+            43.0 + np.cumsum(step * np.cos(heading)),
+            5.0 + np.cumsum(step * np.sin(heading)),
+        ])
+    if kind == "zigzag":
+        x = np.linspace(0, 0.5, n)
+        y = 0.01 * np.abs((np.arange(n) % 40) - 20) + rng.normal(0, 1e-5, n)
+        return np.column_stack([43.0 + y, 5.0 + x])
+    raise ValueError(kind)
+
+
+@pytest.mark.parametrize("kind", ["walk", "zigzag"])
+@pytest.mark.parametrize("epsilon", [1e-5, 1e-4, 1e-3, 1e-2])
+def test_matches_recursive_rdp(kind, epsilon):
+    points = _track(2000, seed=3, kind=kind)
+    expected = _recursive_rdp(points, epsilon)
+    np.testing.assert_array_equal(ramer_douglas_peucker(points, epsilon), expected)
+    assert 2 <= len(expected) < len(points)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_mask_selects_recursive_points_in_order(seed):
+    points = _track(500, seed=seed)
+    keep = rdp_mask(points, 2e-4)
+    assert keep[0] and keep[-1]
+    np.testing.assert_array_equal(points[keep], _recursive_rdp(points, 2e-4))
+
+
+def test_short_and_straight_tracks():
+    assert rdp_mask(np.zeros((0, 2)), 1.0).tolist() == []
+    assert rdp_mask(np.ones((1, 2)), 1.0).tolist() == [True]
+    assert rdp_mask(np.ones((2, 2)), 1.0).tolist() == [True, True]
+    line = np.column_stack([np.linspace(0, 1, 50), np.linspace(0, 2, 50)])
+    np.testing.assert_array_equal(ramer_douglas_peucker(line, 1e-9), _recursive_rdp(line, 1e-9))
+
+
+def test_zero_epsilon_keeps_every_point_of_a_convex_track():
+    angle = np.linspace(0, np.pi, 5000)
+    keep = rdp_mask(np.column_stack([np.cos(angle), np.sin(angle)]), 0.0)
+    assert keep.all()
+
+
+def _polar_track(n, seed=0):
+    """An eastbound (lat, lon) track near 79°N crossing the antimeridian, ~0.05 nmi per point."""
+    rng = np.random.default_rng(seed)
+    heading = np.pi / 2 + np.cumsum(rng.normal(0, 0.05, n))
+    step = rng.uniform(0.02, 0.08, n)
+    lat = 79.0 + np.cumsum(step * np.cos(heading)) / 60
+    lon = 179.0 + np.cumsum(step * np.sin(heading) / (60 * np.cos(np.radians(lat))))
+    return np.column_stack([lat, (lon + 180) % 360 - 180])
+
+
+def _reference_arc_distance(p, a, b):
+    """Distance (nmi) from *p* to the arc a → b with the cross-track / along-track formulas."""
+    def _bearing(x, y):
+        lat1, lon1, lat2, lon2 = np.radians([x[0], x[1], y[0], y[1]])
+        return np.arctan2(
+            np.sin(lon2 - lon1) * np.cos(lat2),
+            np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1),
+        )
+
+    d_ap = float(haversine_nmi(a[0], a[1], p[0], p[1])) / _EARTH_RADIUS_NMI
+    d_ab = float(haversine_nmi(a[0], a[1], b[0], b[1])) / _EARTH_RADIUS_NMI
+    if d_ab == 0.0:
+        return d_ap * _EARTH_RADIUS_NMI
+    delta = _bearing(a, p) - _bearing(a, b)
+    cross = np.arcsin(np.sin(d_ap) * np.sin(delta))
+    along = np.arccos(np.clip(np.cos(d_ap) / np.cos(cross), -1, 1)) * np.sign(np.cos(delta))
+    if 0 <= along <= d_ab:
+        return abs(cross) * _EARTH_RADIUS_NMI
+    d_bp = float(haversine_nmi(b[0], b[1], p[0], p[1])) / _EARTH_RADIUS_NMI
+    return min(d_ap, d_bp) * _EARTH_RADIUS_NMI
+
+
+def _reference_great_circle_rdp(points, epsilon):
+    """Point-by-point great-circle RDP, the recursive algorithm above; returns kept indices."""
+    def _rdp(first, last):
+        if last - first < 2:
+            return [first, last]
+        distances = [_reference_arc_distance(points[i], points[first], points[last]) for i in range(first + 1, last)]
+        index = int(np.argmax(distances))
+        if distances[index] > epsilon:
+            split = first + 1 + index
+            return _rdp(first, split)[:-1] + _rdp(split, last)
+        return [first, last]
+
+    return np.asarray(_rdp(0, len(points) - 1))
+
+
+def _reference_min_distance(lat, lon, min_distance):
+    """Greedy minimum-distance thinning checking every point."""
+    selected = [0]
+    for i in range(1, len(lat)):
+        if haversine_nmi(lat[selected[-1]], lon[selected[-1]], lat[i], lon[i]) >= min_distance:
+            selected.append(i)
+    return np.asarray(selected)
+
+
+@pytest.mark.parametrize("epsilon", [0.005, 0.05, 0.5])
+def test_great_circle_rdp_across_antimeridian(epsilon):
+    points = _polar_track(1500, seed=1)
+    assert points[:, 1].max() > 179.5 and points[:, 1].min() < -179.5
+    keep = rdp_mask(points, epsilon, distance="great_circle")
+    np.testing.assert_array_equal(np.flatnonzero(keep), _reference_great_circle_rdp(points, epsilon))
+    # Kept points stay close together: no shortcut around the globe at the antimeridian
+    kept = points[keep]
+    assert haversine_nmi(kept[:-1, 0], kept[:-1, 1], kept[1:, 0], kept[1:, 1]).max() < 50
+
+
+@pytest.mark.parametrize("min_distance", [0.03, 0.1, 1.0, 10.0])
+def test_min_distance_pruning_matches_full_scan(min_distance):
+    points = _polar_track(3000, seed=2)
+    lat, lon = points[:, 0], points[:, 1]
+    np.testing.assert_array_equal(
+        _min_distance_indices(lat, lon, min_distance), _reference_min_distance(lat, lon, min_distance),
+    )
+
+
+def test_min_distance_pruning_on_a_looping_track():
+    # Turning back on itself: along-track distance overestimates the chord
+    angle = np.linspace(0, 6 * np.pi, 2000)
+    lat = 80.0 + 0.05 * np.sin(angle)
+    lon = 180.0 + 0.3 * np.cos(angle)
+    lon = (lon + 180) % 360 - 180
+    np.testing.assert_array_equal(_min_distance_indices(lat, lon, 0.5), _reference_min_distance(lat, lon, 0.5))
@@ -0,0 +1,153 @@
+"""Resume manifest plans, force cascading and the RESUME publish path."""
+
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from azure_handler.storage import LocalStorage
+from config import EdgeConfig
+from process.manifest import COMPLETE, MANIFEST_STAGES, PROCESS, RESUME, RunManifest, expand_force, required_stages
+
+
+def _config(tmp_path, **overrides):
+    settings = dict(
+        survey_id="c", output_base_path=str(tmp_path), denoise_enabled=False, mvbs_engine="native",
+        nasc_enabled=True, nasc_engine="native", acoustic_summary_enabled=True, echogram_tiles_enabled=False,
+    )
+    settings.update(overrides)
+    return EdgeConfig(**settings)
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    m = RunManifest(tmp_path / "manifest.sqlite")
+    yield m
+    m.close()
+
+
+def _record(manifest, config, stages, key="c/D1", file_fp="fp1"):
+    for stage in stages:
+        manifest.record(key, file_fp, stage, config)
+
+
+def test_plans(tmp_path, manifest):
+    config = _config(tmp_path)
+    required = required_stages(config)
+    assert required == ["sv", "mvbs", "nasc", "acoustic_summary", "echograms", "metadata"]
+
+    assert manifest.plan("c/D1", "fp1", config)[0] == PROCESS
+    _record(manifest, config, ["convert"])
+    assert manifest.plan("c/D1", "fp1", config)[0] == PROCESS
+
+    _record(manifest, config, ["sv", "mvbs"])
+    plan, pending, done = manifest.plan("c/D1", "fp1", config)
+    assert plan == RESUME
+    assert pending == ["nasc", "acoustic_summary", "echograms", "metadata"]
+    assert done == {"convert", "sv", "mvbs"}
+
+    _record(manifest, config, required)
+    assert manifest.plan("c/D1", "fp1", config) == (COMPLETE, [], set(required) | {"convert"})
+
+
+def test_expand_force_cascades_downstream():
+    assert expand_force(["mvbs"]) == {"mvbs", "echograms", "metadata"}
+    assert expand_force(["seabed"]) == {"seabed", "mvbs", "nasc", "acoustic_summary", "echograms", "metadata"}
+    assert expand_force(["sv"]) == set(MANIFEST_STAGES) - {"convert"}
+    assert expand_force(["all"]) == set(MANIFEST_STAGES)
+    with pytest.raises(ValueError):
+        expand_force(["bogus"])
+
+
+def test_force_reruns_stage_and_downstream(tmp_path, manifest):
+    config = _config(tmp_path)
+    _record(manifest, config, ["convert"] + required_stages(config))
+
+    plan, pending, _ = manifest.plan("c/D1", "fp1", config, force=["mvbs"])
+    assert plan == RESUME
+    assert pending == ["mvbs", "echograms", "metadata"]
+
+
+def test_changed_parameters_invalidate_downstream(tmp_path, manifest):
+    config = _config(tmp_path)
+    _record(manifest, config, ["convert"] + required_stages(config))
+
+    plan, pending, _ = manifest.plan("c/D1", "fp1", _config(tmp_path, nasc_range_bin="5"))
+    assert plan == RESUME
+    assert pending == ["nasc", "metadata"]
+
+
+def test_changed_file_resets_entry(tmp_path, manifest):
+    config = _config(tmp_path)
+    _record(manifest, config, ["convert"] + required_stages(config))
+    manifest.save_result("c/D1", {"status": "ok"})
+    assert manifest.result("c/D1", "fp1") == {"status": "ok"}
+
+    assert manifest.plan("c/D1", "fp2", config)[0] == PROCESS
+    _record(manifest, config, ["convert"], file_fp="fp2")
+    assert manifest.completed("c/D1", "fp2", config) == {"convert"}
+    assert manifest.completed("c/D1", "fp1", config) == set()
+    assert manifest.result("c/D1") is None
+
+
+def _sv(n_pings=120, n_samples=60):
+    rng = np.random.default_rng(0)
+    echo_range = np.broadcast_to(np.arange(n_samples) * 0.5, (2, n_pings, n_samples)).copy()
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), rng.normal(-70, 6, (2, n_pings, n_samples))),
+            "echo_range": (("channel", "ping_time", "range_sample"), echo_range),
+            "latitude": ("ping_time", 40 + np.arange(n_pings) * 0.0001),
+            "longitude": ("ping_time", -70 + np.arange(n_pings) * 0.0001),
+        },
+        coords={
+            "channel": ["a", "b"],
+            "ping_time": pd.date_range("2026-05-01T10:00", periods=n_pings, freq="1s").values,
+            "range_sample": np.arange(n_samples),
+            "frequency_nominal": ("channel", [38e3, 120e3]),
+        },
+    )
+
+
+class _FakeHub:
+    def __init__(self):
+        self.sent = []
+
+    def send_message_to_output(self, message, output_name):
+        self.sent.append((output_name, json.loads(message.data)))
+
+    def patch_twin_reported_properties(self, patch):
+        pass
+
+
+def test_resume_publishes_like_a_full_run(tmp_path):
+    from process.pipeline import process_raw_file_pipeline
+    from process.segment_store import SegmentStore
+
+    config = _config(tmp_path / "out")
+    storage = LocalStorage(config.output_base_path)
+    raw = tmp_path / "D1.raw"
+    raw.write_bytes(b"\0" * 64)
+    storage.save_zarr(_sv(), f"{config.campaign_container}/{config.processed_container}/D1/sv.zarr")
+
+    manifest = RunManifest(tmp_path / "manifest.sqlite")
+    entry = manifest.entry(str(raw), config)
+    entry.record("convert")
+    entry.record("sv")
+    entry = manifest.entry(str(raw), config)
+    assert entry.plan == RESUME
+
+    hub = _FakeHub()
+    store = SegmentStore(storage, container=config.campaign_container, processed_subfolder=config.processed_container)
+    result = asyncio.run(process_raw_file_pipeline(str(raw), config, store, client=hub, entry=entry))
+
+    assert result["resumed"] == RESUME
+    assert result["resumed_stages"] == ["mvbs", "nasc", "acoustic_summary", "echograms"]
+    output1 = [body for name, body in hub.sent if name == "output1"]
+    assert [body.get("type") for body in output1] == ["acoustic_summary", None]
+    assert output1[1]["segment"] == "D1"
+    assert manifest.entry(str(raw), config).plan == COMPLETE
+    manifest.close()
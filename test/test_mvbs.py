@@ -0,0 +1,77 @@
+"""The native MVBS engine must reproduce oceanstream's ``compute_mvbs``."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from process.mvbs import compute_mvbs
+
+pytest.importorskip("oceanstream")
+pytest.importorskip("echopype")
+
+
+def _sv(n_pings=400, n_samples=300, vary=False, shuffle=False, seed=0):
+    """Three channels with different sample geometry, NaN pings and a NaN range tail.
+
+    Pings are 0.7 s apart and start just before midnight, so time bins
+    are aligned to the first day and not to the first ping.
+    """
+    rng = np.random.default_rng(seed)
+    times = (pd.Timestamp("2026-05-01T23:59:31") + pd.to_timedelta(np.arange(n_pings) * 0.7, "s")).values
+    sv = rng.normal(-80, 10, (3, n_pings, n_samples))
+    sv[:, :, -50:] = np.nan
+    sv[0, 5:9] = np.nan
+    echo_range = np.tile(np.arange(n_samples) * 0.19 + 0.03, (3, n_pings, 1))
+    echo_range[1] *= 1.3
+    if vary:
+        echo_range[2] += rng.uniform(0, 0.3, (n_pings, 1))
+    echo_range[2, :, -20:] = np.nan
+    lat = np.linspace(40, 41, n_pings)
+    lat[30:40] = np.nan
+    if shuffle:
+        order = rng.permutation(n_pings)
+        times, sv, echo_range, lat = times[order], sv[:, order], echo_range[:, order], lat[order]
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), sv),
+            "echo_range": (("channel", "ping_time", "range_sample"), echo_range),
+            "latitude": ("ping_time", lat, {"units": "degrees_north"}),
+            "longitude": ("ping_time", np.linspace(5, 6, n_pings), {"units": "degrees_east"}),
+            "frequency_nominal": ("channel", [38e3, 120e3, 200e3]),
+        },
+        coords={"channel": ["a", "b", "c"], "ping_time": times, "range_sample": np.arange(n_samples)},
+        attrs={"processing_level": "Level 2A"},
+    )
+
+
+@pytest.mark.parametrize("geometry", [{}, {"vary": True}, {"shuffle": True}])
+@pytest.mark.parametrize("range_bin, ping_time_bin", [("0.5", "10s"), ("1", "20s"), ("2.5", "1min")])
+def test_native_matches_oceanstream(geometry, range_bin, ping_time_bin):
+    ds = _sv(**geometry)
+    native = compute_mvbs(ds, range_bin=range_bin, ping_time_bin=ping_time_bin, engine="native")
+    # echopype resamples, so it needs sorted pings; the native engine bins them as they come
+    reference = compute_mvbs(
+        ds.sortby("ping_time"), range_bin=f"{range_bin}m", ping_time_bin=ping_time_bin, engine="oceanstream",
+    )
+
+    # Schema: variables, dimension order, coordinates (bin left edges) and attributes
+    assert set(native.data_vars) == set(reference.data_vars)
+    assert native["Sv"].dims == reference["Sv"].dims
+    for name in ("channel", "ping_time", "echo_range"):
+        np.testing.assert_array_equal(native[name].values, reference[name].values)
+        assert native[name].attrs == reference[name].attrs
+    assert native["Sv"].attrs == reference["Sv"].attrs
+
+    # Values, including which cells are empty
+    np.testing.assert_allclose(native["Sv"].values, reference["Sv"].values, rtol=1e-10, atol=1e-9, equal_nan=True)
+    for name in ("latitude", "longitude", "frequency_nominal"):
+        np.testing.assert_allclose(native[name].values, reference[name].values, rtol=1e-12, equal_nan=True)
+        assert native[name].attrs == reference[name].attrs
+
+
+def test_native_without_longitude_has_no_positions():
+    ds = _sv().drop_vars("longitude")
+    native = compute_mvbs(ds, engine="native")
+    reference = compute_mvbs(ds, range_bin="0.5m", engine="oceanstream")
+    assert "latitude" not in native and "latitude" not in reference
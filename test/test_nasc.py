@@ -0,0 +1,148 @@
+"""The native NASC engine against echopype's ``compute_NASC``.
+
+echopype integrates each (distance, depth) cell as
+``4π · 1852² · nanmean(sv) · summed thickness / pings``, which the
+native engine reproduces exactly for the same ping distances.  The
+distances themselves differ by design: echopype sums geodesic steps to
+the *next* fix and loses the distance across pings without one, while
+the native engine interpolates between fixes on a sphere.  The
+comparisons below use the same distances for the integration and a
+tolerance for the distance model.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from process.nasc import NascCarry, _along_track, compute_nasc, flush_carry
+from process.track_store import interpolate_track
+
+pytest.importorskip("echopype")
+
+
+def _sv(n_pings=600, n_samples=120, vary=False, seed=0):
+    """Two channels, one knot-ish track (~0.005 nmi per ping) and a NaN range tail."""
+    rng = np.random.default_rng(seed)
+    times = (pd.Timestamp("2026-05-01T10:00") + pd.to_timedelta(np.arange(n_pings), "s")).values
+    sv = rng.normal(-75, 8, (2, n_pings, n_samples))
+    sv[:, :, -30:] = np.nan
+    sv[1, 40:45] = np.nan
+    depth = np.tile(np.arange(n_samples) * 0.2 + 1.0, (2, n_pings, 1))
+    depth[1] *= 1.5
+    if vary:
+        depth[0] += rng.uniform(0, 0.5, (n_pings, 1))
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), sv),
+            "depth": (("channel", "ping_time", "range_sample"), depth),
+            "latitude": ("ping_time", 40 + np.arange(n_pings) * 0.00008),
+            "longitude": ("ping_time", -70 + np.arange(n_pings) * 0.00003),
+            "frequency_nominal": ("channel", [38e3, 120e3]),
+        },
+        coords={"channel": ["a", "b"], "ping_time": times, "range_sample": np.arange(n_samples)},
+        attrs={"processing_level": "Level 2A"},
+    )
+
+
+@pytest.mark.parametrize("vary", [False, True])
+@pytest.mark.parametrize("range_bin, dist_bin", [(10.0, 0.5), (5.0, 0.25)])
+def test_integration_matches_echopype(vary, range_bin, dist_bin):
+    from echopype.commongrid.utils import _convert_bins_to_interval_index, compute_raw_NASC
+
+    ds = _sv(vary=vary)
+    native = compute_nasc(ds, range_bin=f"{range_bin}m", dist_bin=f"{dist_bin}nmi", engine="native")
+
+    dist = _along_track(ds, None)[0]
+    binned = ds.assign_coords(distance_nmi=("ping_time", dist)).swap_dims({"ping_time": "distance_nmi"})
+    reference = compute_raw_NASC(
+        binned,
+        _convert_bins_to_interval_index(np.arange(native.sizes["depth"] + 1) * range_bin),
+        _convert_bins_to_interval_index(np.arange(native.sizes["distance"] + 1) * dist_bin),
+    )["sv"].transpose("channel", "distance_nmi_bins", "depth_bins")
+
+    np.testing.assert_allclose(native["NASC"].values, reference.values, rtol=1e-9, equal_nan=True)
+
+
+def test_distance_close_to_echopype():
+    from echopype.commongrid.utils import get_distance_from_latlon
+
+    ds = _sv()
+    native = _along_track(ds, None)[0]
+    # echopype's ping i carries the step to ping i + 1
+    reference = get_distance_from_latlon(ds)
+    reference = np.concatenate([[0.0], reference[:-1]])
+    # Sphere vs WGS84 ellipsoid
+    np.testing.assert_allclose(native, reference, rtol=5e-3, atol=1e-9)
+
+
+def test_stored_track_matches_per_ping_fixes():
+    ds = _sv()
+    # Simplified track: every 50th fix plus the last one
+    keep = np.r_[np.arange(0, ds.sizes["ping_time"], 50), ds.sizes["ping_time"] - 1]
+    track = pd.DataFrame({
+        "lat": ds["latitude"].values[keep],
+        "lon": ds["longitude"].values[keep],
+        "dt": ds["ping_time"].values[keep],
+    })
+    lat, lon = interpolate_track(track, ds["ping_time"].values)
+    with_fixes = ds.assign(latitude=("ping_time", lat), longitude=("ping_time", lon))
+    from_track = compute_nasc(ds.drop_vars(["latitude", "longitude"]), engine="native", track=track)
+    from_fixes = compute_nasc(with_fixes, engine="native")
+
+    xr.testing.assert_allclose(from_track, from_fixes, rtol=1e-6)
+
+
+def test_without_positions_is_empty():
+    ds = _sv().drop_vars(["latitude", "longitude"])
+    assert compute_nasc(ds, engine="native").sizes == {}
+    pytest.importorskip("oceanstream")
+    assert compute_nasc(ds, engine="oceanstream").sizes == {}
+
+
+def test_invalid_positions_are_empty():
+    ds = _sv()
+    ds["latitude"][:] = np.nan
+    ds["longitude"][:] = np.nan
+    assert compute_nasc(ds, engine="native").sizes == {}
+    pytest.importorskip("oceanstream")
+    assert compute_nasc(ds, engine="oceanstream").sizes == {}
+
+
+def test_carried_batches_and_flush_match_one_batch():
+    ds = _sv()
+    whole = compute_nasc(ds, range_bin="10m", dist_bin="0.5nmi", engine="native")
+    carry = NascCarry(max_gap=60)
+    parts = [
+        compute_nasc(ds.isel(ping_time=pings), range_bin="10m", dist_bin="0.5nmi", engine="native", carry=carry)
+        for pings in (slice(0, 250), slice(250, 600))
+    ]
+    parts.append(flush_carry(carry))
+
+    assert carry.open is None
+    assert parts[-1].sizes["distance"] == 1
+    assert parts[-1].attrs["last_ping_time"] == pd.Timestamp(ds["ping_time"].values[-1]).isoformat()
+    streamed = xr.concat([p for p in parts if p.sizes], dim="distance", data_vars="minimal", coords="minimal")
+    xr.testing.assert_allclose(streamed.drop_attrs(), whole.drop_attrs())
+    assert flush_carry(carry).sizes == {}
+
+
+def test_realtime_flush_saves_the_open_bin(tmp_path):
+    from azure_handler.storage import LocalStorage
+    from config import EdgeConfig
+    from process.nasc import realtime_carry
+    from process.pipeline import flush_realtime_nasc
+    from process.segment_store import SegmentStore
+
+    config = EdgeConfig(survey_id="flush", output_base_path=str(tmp_path))
+    store = SegmentStore(LocalStorage(str(tmp_path)), container=config.campaign_container,
+                         processed_subfolder=config.processed_container)
+    ds = _sv()
+    compute_nasc(ds, engine="native", carry=realtime_carry(config))
+    last_bin = pd.Timestamp(compute_nasc(ds, engine="native")["ping_time"].values[-1])
+
+    path = flush_realtime_nasc(config, store)
+
+    assert path.endswith(f"/2026-05-01/segments/{last_bin:%H-%M-%S}__10-09-59/nasc.zarr")
+    assert store.storage.load_zarr(path).sizes["distance"] == 1
+    assert flush_realtime_nasc(config, store) is None
@@ -0,0 +1,113 @@
+"""Raw header index on synthetic EK80 / EK60 datagram files."""
+
+import struct
+
+import numpy as np
+
+from process.raw_index import _FILETIME_EPOCH, INDEX_FILENAME, RawIndex, scan_raw_file
+
+_T0 = np.datetime64("2026-05-01T10:00:00", "ns")
+
+
+def _filetime(seconds: float) -> int:
+    return int((_T0 + np.timedelta64(int(seconds * 1e9), "ns")).astype(np.int64) // 100) + _FILETIME_EPOCH
+
+
+def _dgram(kind: bytes, seconds: float, body: bytes) -> bytes:
+    length = 12 + len(body)
+    return struct.pack("<l4sQ", length, kind, _filetime(seconds)) + body + struct.pack("<l", length)
+
+
+def _nmea(seconds: float, lat: float, lon: float) -> bytes:
+    lat_s = f"{int(abs(lat)):02d}{(abs(lat) % 1) * 60:07.4f},{'N' if lat >= 0 else 'S'}"
+    lon_s = f"{int(abs(lon)):03d}{(abs(lon) % 1) * 60:07.4f},{'E' if lon >= 0 else 'W'}"
+    return _dgram(b"NME0", seconds, f"$GPGGA,100000,{lat_s},{lon_s},1,8,0.9,0,M,0,M,,*00".encode())
+
+
+def _ek80(path, n_pings=5, truncate=False):
+    xml = (
+        '<Configuration><Transceivers><Transceiver><Channels>'
+        '<Channel ChannelID="WBT 1-1 ES38"><Transducer Frequency="38000"/></Channel>'
+        '<Channel ChannelID="WBT 2-1 ES120"><Transducer Frequency="120000"/></Channel>'
+        '</Channels></Transceiver></Transceivers></Configuration>'
+    ).encode()
+    data = _dgram(b"XML0", 0, xml)
+    for p in range(n_pings):
+        data += _nmea(p, 40.5 + p * 0.01, -70.25 - p * 0.01)
+        for cid, count in ((b"WBT 1-1 ES38", 100), (b"WBT 2-1 ES120", 150)):
+            # datatype 0b11: power + angle, 4 bytes per sample
+            body = struct.pack("<128shhll", cid, 0b11, 0, 0, count) + bytes(4 * count)
+            data += _dgram(b"RAW3", p + 0.5, body)
+    if truncate:
+        data += _dgram(b"RAW3", n_pings, struct.pack("<128shhll", b"WBT 1-1 ES38", 0b11, 0, 0, 10) + bytes(40))[:-20]
+    path.write_bytes(data)
+    return path
+
+
+def _ek60(path, n_pings=3):
+    con0 = bytearray(516 + 2 * 320)
+    struct.pack_into("<l", con0, 512, 2)
+    for i, (cid, freq) in enumerate(((b"GPT 38 kHz", 38000.0), (b"GPT 200 kHz", 200000.0))):
+        struct.pack_into("<128s", con0, 516 + i * 320, cid)
+        struct.pack_into("<f", con0, 516 + i * 320 + 132, freq)
+    data = _dgram(b"CON0", 0, bytes(con0))
+    for p in range(n_pings):
+        for channel, freq in ((1, 38000.0), (2, 200000.0)):
+            floats = [0.0, freq] + [0.0] * 10
+            body = struct.pack("<hh12fhh2fll", channel, 3, *floats, 0, 0, 0.0, 0.0, 0, 50) + bytes(4 * 50)
+            data += _dgram(b"RAW0", p, body)
+    path.write_bytes(data)
+    return path
+
+
+def test_ek80_scan(tmp_path):
+    info = scan_raw_file(str(_ek80(tmp_path / "D1.raw")))
+
+    assert info.sonar_model == "EK80"
+    assert info.channels == ["WBT 1-1 ES38", "WBT 2-1 ES120"]
+    assert info.frequencies_hz == [38000.0, 120000.0]
+    assert info.ping_counts == {"WBT 1-1 ES38": 5, "WBT 2-1 ES120": 5}
+    assert info.n_pings == 5
+    assert info.total_samples == 5 * 250
+    assert (info.raw_bytes_per_sample, info.mem_bytes_per_sample) == (4, 8)
+    assert info.start_time == str(_T0 + np.timedelta64(500, "ms"))
+    assert info.end_time == str(_T0 + np.timedelta64(4500, "ms"))
+    np.testing.assert_allclose(info.lat_range, [40.5, 40.54], atol=1e-6)
+    np.testing.assert_allclose(info.lon_range, [-70.29, -70.25], atol=1e-6)
+    assert info.complete and info.scanned_bytes == info.size
+
+
+def test_truncated_tail_is_incomplete(tmp_path):
+    whole = scan_raw_file(str(_ek80(tmp_path / "D1.raw")))
+    info = scan_raw_file(str(_ek80(tmp_path / "D2.raw", truncate=True)))
+
+    assert not info.complete
+    assert info.scanned_bytes == whole.size < info.size
+    assert info.ping_counts == whole.ping_counts
+
+
+def test_ek60_scan(tmp_path):
+    info = scan_raw_file(str(_ek60(tmp_path / "D1.raw")))
+
+    assert info.sonar_model == "EK60"
+    assert info.channels == ["GPT 38 kHz", "GPT 200 kHz"]
+    assert info.frequencies_hz == [38000.0, 200000.0]
+    assert info.ping_counts == {"GPT 38 kHz": 3, "GPT 200 kHz": 3}
+    assert info.total_samples == 3 * 2 * 50
+    assert info.complete
+
+
+def test_index_save_merges_concurrent_writers(tmp_path):
+    _ek80(tmp_path / "D1.raw")
+    _ek60(tmp_path / "D2.raw")
+    _ek80(tmp_path / "D3.raw", truncate=True)
+    first, second = RawIndex(tmp_path), RawIndex(tmp_path)
+
+    first.get(str(tmp_path / "D1.raw"))
+    second.get(str(tmp_path / "D2.raw"))
+    second.get(str(tmp_path / "D3.raw"))
+    first.save()
+    second.save()
+
+    assert sorted(RawIndex(tmp_path)._entries) == ["D1.raw", "D2.raw"]
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name.startswith(INDEX_FILENAME)) == [INDEX_FILENAME]
@@ -0,0 +1,153 @@
+"""The twin reporter coalesces patches and only writes early on material changes."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from azure_handler.reported_properties import (
+    ReportedPropertiesAggregator,
+    _is_material,
+    _merge,
+    report_properties,
+    start_reported_properties,
+    stop_reported_properties,
+)
+
+
+class _FakeClient:
+    def __init__(self, fail=0):
+        self.patches = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def patch_twin_reported_properties(self, patch):
+        with self.lock:
+            if self.fail:
+                self.fail -= 1
+                raise ConnectionError("throttled")
+            self.patches.append((time.monotonic(), patch))
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_merge_is_deep():
+    target = {"a": 1, "nested": {"x": 1, "y": 2}}
+    patch = {"nested": {"y": 3, "z": [1]}, "b": "s"}
+    _merge(target, patch)
+    assert target == {"a": 1, "nested": {"x": 1, "y": 3, "z": [1]}, "b": "s"}
+    patch["nested"]["z"].append(2)
+    assert target["nested"]["z"] == [1]
+
+
+@pytest.mark.parametrize("old, new, material", [
+    ({"a": 100}, {"a": 100}, False),
+    ({"a": 100}, {"a": 140}, False),
+    ({"a": 100}, {"a": 250}, True),
+    ({"a": 250}, {"a": 100}, True),
+    ({"a": 100.0}, {"a": 0}, True),
+    ({"a": 0}, {"a": 0.0}, False),
+    ({"a": 100}, {"b": 100}, True),
+    ({"a": True}, {"a": False}, True),
+    ({"a": "idle"}, {"a": "busy"}, True),
+    ({"n": {"x": 10}}, {"n": {"x": 12}}, False),
+    ({"n": {"x": 10}}, {"n": {"x": 10, "y": 1}}, True),
+    ({"n": 1}, {"n": {"x": 1}}, True),
+])
+def test_is_material(old, new, material):
+    assert _is_material(old, new, 0.5) is material
+
+
+def test_update_merges_and_flush_writes_once():
+    client = _FakeClient()
+    aggregator = ReportedPropertiesAggregator(client)
+    aggregator.update({"stats": {"files": 1, "pings": 10}})
+    aggregator.update({"stats": {"files": 2}, "state": "busy"})
+    aggregator.update({})
+    assert client.patches == []
+    assert aggregator.flush()
+    assert [p for _, p in client.patches] == [{"stats": {"files": 2, "pings": 10}, "state": "busy"}]
+    assert aggregator.flush()
+    assert len(client.patches) == 1
+    assert (aggregator.patches, aggregator.writes) == (2, 1)
+
+
+def test_failed_write_keeps_newer_values():
+    client = _FakeClient(fail=1)
+    aggregator = ReportedPropertiesAggregator(client)
+    aggregator.update({"a": 1, "b": 1})
+    assert not aggregator.flush()
+    aggregator.update({"b": 2})
+    assert aggregator.flush()
+    assert [p for _, p in client.patches] == [{"a": 1, "b": 2}]
+
+
+def test_material_change_is_written_after_debounce_and_routine_change_waits_for_interval():
+    client = _FakeClient()
+    aggregator = ReportedPropertiesAggregator(client, interval=1.0, debounce=0.1, threshold=0.5).start()
+    try:
+        # A new key is material: written after the debounce, not the interval
+        start = time.monotonic()
+        aggregator.update({"files": 100, "state": "idle"})
+        aggregator.update({"files": 101})
+        assert _wait_for(lambda: len(client.patches) == 1)
+        assert client.patches[0][0] - start < 0.8
+        assert client.patches[0][1] == {"files": 101, "state": "idle"}
+
+        # A small numeric change is held until the interval elapses
+        start = time.monotonic()
+        aggregator.update({"files": 120})
+        time.sleep(0.4)
+        assert len(client.patches) == 1
+        assert _wait_for(lambda: len(client.patches) == 2)
+        assert client.patches[1][0] - start >= 0.5
+        assert client.patches[1][1] == {"files": 120}
+
+        # A large numeric change is material again
+        start = time.monotonic()
+        aggregator.update({"files": 1000})
+        assert _wait_for(lambda: len(client.patches) == 3)
+        assert client.patches[2][0] - start < 0.8
+    finally:
+        aggregator.stop()
+
+
+def test_stop_flushes_pending():
+    client = _FakeClient()
+    aggregator = ReportedPropertiesAggregator(client, interval=60.0, debounce=0.0).start()
+    aggregator.update({"files": 1})
+    assert _wait_for(lambda: len(client.patches) == 1)
+    aggregator.update({"files": 2})
+    aggregator.stop()
+    assert [p for _, p in client.patches] == [{"files": 1}, {"files": 2}]
+
+
+def test_report_properties_uses_the_registered_aggregator():
+    client = _FakeClient()
+    config = SimpleNamespace(
+        twin_report_interval_seconds=60.0,
+        twin_report_debounce_seconds=60.0,
+        twin_report_change_threshold=0.5,
+    )
+    report_properties(client, {"direct": 1})
+    assert [p for _, p in client.patches] == [{"direct": 1}]
+
+    aggregator = start_reported_properties(client, config)
+    try:
+        assert start_reported_properties(client, config) is aggregator
+        report_properties(client, {"queued": 1})
+        assert len(client.patches) == 1
+    finally:
+        stop_reported_properties(client)
+    assert [p for _, p in client.patches] == [{"direct": 1}, {"queued": 1}]
+
+    report_properties(client, {"direct": 2})
+    assert client.patches[-1][1] == {"direct": 2}
@@ -0,0 +1,54 @@
+"""Stage fingerprints: a parameter change invalidates its stage and everything downstream."""
+
+import pytest
+
+from config import EdgeConfig
+from process.reprocess import STAGES, downstream_stages, stage_fingerprints, stale_stages
+
+
+def _config(**overrides):
+    settings = dict(denoise_enabled=True, seabed_enabled=True, mvbs_enabled=True, nasc_enabled=True,
+                    acoustic_summary_enabled=True, plot_echogram=True)
+    settings.update(overrides)
+    return EdgeConfig(**settings)
+
+
+@pytest.mark.parametrize("change, invalidated", [
+    ({"denoise_cpu_kernels": "background"}, ["denoise", "seabed", "mvbs", "nasc", "acoustic_summary", "echograms"]),
+    ({"seabed_engine": "native"}, ["seabed", "mvbs", "nasc", "acoustic_summary", "echograms"]),
+    ({"mvbs_engine": "native"}, ["mvbs", "echograms"]),
+    ({"mvbs_range_bin": "1.0"}, ["mvbs", "echograms"]),
+    ({"nasc_engine": "native"}, ["nasc"]),
+    ({"nasc_dist_bin": "1.0"}, ["nasc"]),
+    ({"acoustic_summary_bits": 16}, ["acoustic_summary"]),
+    ({"echogram_reducer": "max"}, ["echograms"]),
+])
+def test_change_invalidates_stage_and_downstream(change, invalidated):
+    before, after = stage_fingerprints(_config()), stage_fingerprints(_config(**change))
+
+    assert [s for s in STAGES if before[s] != after[s]] == invalidated
+    assert before["sv"] == after["sv"]
+    assert stale_stages({"stage_fingerprints": before}, _config(**change), STAGES) == invalidated
+
+
+def test_unrelated_change_keeps_fingerprints():
+    assert stage_fingerprints(_config()) == stage_fingerprints(_config(log_level="DEBUG"))
+
+
+def test_stale_stages_skip_disabled_and_unrecorded():
+    config = _config(nasc_enabled=False)
+    stored = dict(stage_fingerprints(config))
+    del stored["mvbs"]
+
+    assert stale_stages({"stage_fingerprints": stored}, config, STAGES) == ["mvbs"]
+    assert stale_stages({}, config, ["nasc", "echograms"]) == ["echograms"]
+
+
+def test_downstream_stages():
+    config = _config()
+    assert downstream_stages(["seabed"], config) == ["seabed", "mvbs", "nasc", "acoustic_summary", "echograms"]
+    assert downstream_stages(["mvbs"], config) == ["mvbs", "echograms"]
+    assert downstream_stages(["nasc"], config) == ["nasc"]
+    assert downstream_stages(["denoise"], _config(mvbs_enabled=False, plot_echogram=False)) == [
+        "denoise", "seabed", "nasc", "acoustic_summary",
+    ]
@@ -0,0 +1,99 @@
+"""The native seabed tracker must find oceanstream's ``maxSv`` bottom."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from process.seabed import TRACK_RESTART_PINGS, apply_seabed
+
+pytest.importorskip("oceanstream")
+
+DZ = 0.19
+
+
+def _sv(n_pings=400, n_samples=1500, seed=5):
+    """One channel over a sloping bottom, with a bottomless stretch (pings 220-239)."""
+    rng = np.random.default_rng(seed)
+    sv = rng.normal(-85, 3, (1, n_pings, n_samples))
+    bottom = 150 + 25 * np.sin(np.arange(n_pings) / 60)
+    for p in range(n_pings):
+        b = int(bottom[p] / DZ)
+        sv[0, p, b - 4:b] = np.linspace(-70, -45, 4)
+        sv[0, p, b:b + 6] = -22 + rng.normal(0, 0.5, 6)
+        sv[0, p, b + 6:] = -40 - np.arange(n_samples - b - 6) * 0.05
+    sv[0, 220:240] = rng.normal(-85, 3, (len(sv[0, 220:240]), n_samples))
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), sv),
+            "echo_range": (("channel", "ping_time", "range_sample"),
+                           np.broadcast_to(np.arange(n_samples) * DZ, (1, n_pings, n_samples)).copy()),
+        },
+        coords={
+            "channel": ["ch38"],
+            "ping_time": pd.date_range("2024-05-01", periods=n_pings, freq="1s").values,
+            "range_sample": np.arange(n_samples),
+        },
+    )
+
+
+def _oceanstream_depth(ds, **kwargs):
+    from oceanstream.echodata.seabed import detect_seabed
+
+    return detect_seabed(ds, method="maxSv", r1=250.0, **kwargs).seabed_depth.values
+
+
+def test_native_matches_unfiltered_max_sv_exactly():
+    ds = _sv()
+    native = apply_seabed(ds, engine="native", max_range=250.0)["seabed_depth"].values
+    expected = _oceanstream_depth(ds, median_kernel=(1, 1))
+    np.testing.assert_array_equal(np.isnan(native), np.isnan(expected))
+    np.testing.assert_array_equal(native, expected)
+    assert np.isnan(native[220:240]).all()
+    assert np.isfinite(native).sum() == 400 - 20
+
+
+def test_native_within_one_sample_of_median_filtered_max_sv():
+    ds = _sv()
+    native = apply_seabed(ds, engine="native", max_range=250.0)["seabed_depth"].values
+    expected = _oceanstream_depth(ds)
+    np.testing.assert_array_equal(np.isnan(native), np.isnan(expected))
+    # Within one sample, except where the 3x3 median filter blends in the bottom-free stretch
+    offset = np.abs(native - expected)[np.isfinite(native)]
+    assert offset.max() <= 2 * DZ * 1.001
+    assert (offset > DZ * 1.001).sum() <= 2
+
+
+def test_tracker_restarts_on_a_jump_in_depth():
+    ds = _sv(n_pings=2 * TRACK_RESTART_PINGS)
+    # A layer well above the bottom and stronger than it from ping 50 on:
+    # the tracker keeps to the bottom until its next full-gate restart
+    layer = int(90 / DZ)
+    ds["Sv"][0, 50:, layer:layer + 6] = -10.0
+    native = apply_seabed(ds, engine="native", max_range=250.0)["seabed_depth"].values
+    expected = _oceanstream_depth(ds, median_kernel=(1, 1))
+    np.testing.assert_array_equal(native[:50], expected[:50])
+    assert (native[50:TRACK_RESTART_PINGS] > 120).all()
+    assert (native[TRACK_RESTART_PINGS:] < 100).all()
+    np.testing.assert_array_equal(native[TRACK_RESTART_PINGS:], expected[TRACK_RESTART_PINGS:])
+
+
+def test_missing_pings_have_no_bottom():
+    # oceanstream's maxSv raises on all-NaN pings; the tracker skips them
+    ds = _sv()
+    ds["Sv"][0, 300:305] = np.nan
+    native = apply_seabed(ds, engine="native", max_range=250.0)["seabed_depth"].values
+    assert np.isnan(native[300:305]).all()
+    np.testing.assert_array_equal(native[305:], apply_seabed(_sv(), engine="native", max_range=250.0)[
+        "seabed_depth"].values[305:])
+
+
+def test_mask_removes_samples_at_and_below_the_line():
+    ds = _sv(n_pings=50)
+    masked = apply_seabed(ds, engine="native", max_range=250.0)
+    depth = masked["seabed_depth"].values
+    rng = ds["echo_range"].values[0]
+    sv = masked["Sv"].values[0]
+    below = rng >= depth[:, None]
+    assert np.isnan(sv[below]).all()
+    np.testing.assert_array_equal(sv[~below], ds["Sv"].values[0][~below])
@@ -0,0 +1,104 @@
+"""Sharded denoise / seabed must match the unsharded run ping for ping."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import process.sharding as sharding
+from azure_handler.storage import LocalStorage
+from config import EdgeConfig
+from process.seabed import apply_seabed, seabed_line
+
+
+def _sv(n_pings=600, n_samples=2000, seed=3):
+    """Three-channel Sv with a sloping bottom, a school and a gap of missing pings."""
+    rng = np.random.default_rng(seed)
+    dz = 0.19
+    echo_range = np.broadcast_to(np.arange(n_samples) * dz, (3, n_pings, n_samples)).copy()
+    sv = rng.normal(-80, 4, (3, n_pings, n_samples))
+    bottom = 250 + 40 * np.sin(np.arange(n_pings) / 300) + rng.normal(0, 0.3, n_pings)
+    for p in range(n_pings):
+        b = int(bottom[p] / dz)
+        sv[:, p, b:b + 3] = -20 + rng.normal(0, 1, 3)
+        sv[:, p, b + 3:] = -35 - np.arange(n_samples - b - 3) * 0.05
+    # A strong layer the tracker locks onto, straddling a shard boundary
+    sv[:, 150:260, int(230 / dz):int(232 / dz)] = -15
+    sv[:, 400:420, :] = np.nan
+    return xr.Dataset(
+        {
+            "Sv": (("channel", "ping_time", "range_sample"), sv),
+            "echo_range": (("channel", "ping_time", "range_sample"), echo_range),
+        },
+        coords={
+            "channel": ["ch38", "ch70", "ch120"],
+            "ping_time": pd.date_range("2024-05-01", periods=n_pings, freq="1s").values,
+            "range_sample": np.arange(n_samples),
+            "frequency_nominal": ("channel", [38e3, 70e3, 120e3]),
+        },
+    )
+
+
+@pytest.fixture
+def shard_pool():
+    """A real spawn pool, shut down after the test."""
+    yield sharding._shard_pool
+    with sharding._SHARD_POOL_LOCK:
+        if sharding._SHARD_POOL is not None:
+            sharding._SHARD_POOL.shutdown()
+            sharding._SHARD_POOL = None
+
+
+def _run(tmp_path, ds, config):
+    storage = LocalStorage(str(tmp_path))
+    storage.save_zarr(ds, "c/p/sv.zarr")
+    shards = sharding.plan_shards(ds.sizes["ping_time"], config)
+    assert len(shards) == config.shard_workers
+    return sharding.run_sharded(ds, "c/p", shards, config, storage), storage
+
+
+def test_native_seabed_sharded_matches_unsharded(tmp_path, shard_pool):
+    config = EdgeConfig(
+        denoise_enabled=False, seabed_enabled=True, seabed_engine="native",
+        shard_workers=3, shard_min_pings=1,
+    )
+    ds = _sv()
+    out, storage = _run(tmp_path, ds, config)
+    full = apply_seabed(
+        ds, method=config.seabed_method, max_range=config.seabed_max_range,
+        engine="native", track_window=config.seabed_track_window,
+    )
+
+    np.testing.assert_array_equal(out["Sv"].values, full["Sv"].values)
+    np.testing.assert_array_equal(out["seabed_depth"].values, full["seabed_depth"].values)
+    stored = storage.load_zarr("c/p/seabed_line.zarr").load()
+    xr.testing.assert_equal(stored, seabed_line(full))
+
+
+def test_denoise_and_seabed_sharded_matches_unsharded(tmp_path, shard_pool):
+    pytest.importorskip("oceanstream")
+    from process.config_adapter import to_denoise_config
+    from process.denoise import denoise
+
+    config = EdgeConfig(
+        denoise_enabled=True, denoise_methods="background,impulse",
+        seabed_enabled=True, seabed_engine="native",
+        shard_workers=2, shard_min_pings=1,
+    )
+    ds = _sv()
+    out, _ = _run(tmp_path, ds, config)
+    full = apply_seabed(
+        denoise(ds, config=to_denoise_config(config)),
+        method=config.seabed_method, max_range=config.seabed_max_range,
+        engine="native", track_window=config.seabed_track_window,
+    )
+
+    np.testing.assert_allclose(out["Sv"].values, full["Sv"].values, equal_nan=True)
+    np.testing.assert_array_equal(out["seabed_depth"].values, full["seabed_depth"].values)
+
+
+def test_shard_pool_is_created_once(shard_pool):
+    pool = shard_pool(2)
+    # A later call (any size) shares the pool instead of replacing it
+    assert shard_pool(4) is pool
+    assert pool._max_workers == 2
@@ -0,0 +1,84 @@
+"""Tail-follow: absorption from the Environment datagram, file ownership."""
+
+import os
+import struct
+import time
+
+import numpy as np
+import pytest
+
+from config import EdgeConfig
+from ingest.tail_follow import RawTailIngestion
+
+_CID = "WBT 1-1 ES38-7"
+_ENVIRONMENT = (
+    b'<Environment Depth="80" Acidity="8" Salinity="34.5" SoundSpeed="1490" Temperature="6.5"/>'
+)
+
+
+class _Accumulator:
+    """Records ``add_ping`` calls."""
+
+    def __init__(self):
+        self.pings = []
+
+    def add_ping(self, **kwargs):
+        self.pings.append(kwargs)
+
+
+def _raw3(cid=_CID, n=10):
+    return cid.encode().ljust(128, b"\0") + struct.pack("<hhll", 3, 0, 0, n) + np.zeros(n, np.int16).tobytes()
+
+
+@pytest.fixture
+def tail(tmp_path):
+    config = EdgeConfig(output_base_path=str(tmp_path), tail_follow_dir=str(tmp_path / "raw"))
+    (tmp_path / "raw").mkdir()
+    ingestion = RawTailIngestion(config, on_batch=None)
+    ingestion._accumulator = _Accumulator()
+    ingestion._registered = {_CID}
+    return ingestion
+
+
+def test_absorption_from_environment(tail):
+    uwa = pytest.importorskip("echopype.utils.uwa")
+    tail._on_xml(_ENVIRONMENT)
+    tail._on_xml(f'<Parameter><Channel ChannelID="{_CID}" Frequency="38000"/></Parameter>'.encode())
+    assert tail._on_raw3(0, _raw3())
+
+    expected = uwa.calc_absorption(
+        38000.0, temperature=6.5, salinity=34.5, pressure=80.0, pH=8.0, sound_speed=1490.0, formula_source="FG",
+    )
+    (ping,) = tail._accumulator.pings
+    assert ping["sound_speed"] == 1490.0
+    assert ping["absorption"] == pytest.approx(float(expected))
+    assert 0.005 < ping["absorption"] < 0.02
+
+
+def _touch(path):
+    path.write_bytes(b"")
+    os.utime(path, (time.time(), time.time()))
+
+
+def test_claimed_file_is_never_followed(tail, tmp_path):
+    raw = tmp_path / "raw"
+    for name in ("D1.raw", "D2.raw", "D3.raw"):
+        _touch(raw / name)
+    tail._open(raw / "D1.raw")
+    assert tail._on_raw3(0, _raw3())
+    tail._close_tail()
+
+    # D1 has pings here: the trigger skips it; D2 was closed before the follower got to it
+    assert tail.claim(str(raw / "D1.raw"))
+    assert not tail.claim(str(raw / "D2.raw"))
+    assert tail._next_file() == raw / "D3.raw"
+
+
+def test_file_claimed_while_open_gets_no_pings(tail, tmp_path):
+    raw = tmp_path / "raw"
+    _touch(raw / "D1.raw")
+    tail._open(raw / "D1.raw")
+    assert not tail.claim(str(raw / "D1.raw"))
+    assert not tail._on_raw3(0, _raw3())
+    assert tail._accumulator.pings == []
+    tail._close_tail()
@@ -0,0 +1,139 @@
+"""TelemetrySender against a local fake IoT Hub module client."""
+
+import gzip
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("azure.iot.device")
+
+from azure_handler.journal import MessageJournal
+from azure_handler.telemetry_sender import TelemetrySender
+
+
+class FakeModuleClient:
+    """Records ``send_message_to_output`` calls; fails the first *fail* sends."""
+
+    def __init__(self, fail: int = 0):
+        self.fail = fail
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message_to_output(self, message, output_name):
+        with self.lock:
+            if self.fail > 0:
+                self.fail -= 1
+                raise ConnectionError("link down")
+            self.sent.append((output_name, message))
+
+    def payloads(self, route=None):
+        out = []
+        for name, message in self.sent:
+            if route is not None and name != route:
+                continue
+            data = message.data
+            if message.content_encoding == "gzip":
+                data = gzip.decompress(data)
+            body = json.loads(data)
+            out.extend(body if message.custom_properties.get("batch") == "true" else [body])
+        return out
+
+
+def _wait(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+def test_single_payloads_are_sent_unwrapped_by_default():
+    client = FakeModuleClient()
+    sender = TelemetrySender(client).start()
+    sender.submit({"sv_zarr_path": "c/processed/f/sv.zarr"}, "outputml")
+    sender.submit({"n": 1})
+    sender.stop()
+
+    routes = {name: message for name, message in client.sent}
+    assert json.loads(routes["outputml"].data) == {"sv_zarr_path": "c/processed/f/sv.zarr"}
+    assert routes["outputml"].content_type == "application/json"
+    assert routes["outputml"].content_encoding == "utf-8"
+    assert "batch" not in routes["outputml"].custom_properties
+    assert json.loads(routes["output1"].data) == {"n": 1}
+
+
+def test_batches_fit_the_size_limit_and_keep_order():
+    client = FakeModuleClient()
+    sender = TelemetrySender(client, batch=True, compress=True, flush_seconds=0.5, max_message_bytes=4096).start()
+    payloads = [{"i": i, "pad": "x" * (i % 50)} for i in range(300)]
+    for p in payloads:
+        assert sender.submit(p)
+    sender.stop()
+
+    assert client.payloads("output1") == payloads
+    assert len(client.sent) < len(payloads)
+    for _, message in client.sent:
+        assert len(message.data) <= 4096
+        assert message.content_encoding == "gzip"
+        assert int(message.custom_properties["batch_size"]) >= 1
+
+
+def test_retries_with_backoff_then_delivers():
+    client = FakeModuleClient(fail=2)
+    sender = TelemetrySender(client, backoff_seconds=0.01, max_retries=5).start()
+    sender.submit({"n": 1})
+    sender.stop()
+
+    assert client.payloads() == [{"n": 1}]
+    metrics = sender.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["sent_payloads"] == 1
+    assert metrics["failed_payloads"] == 0
+
+
+def test_metrics_report_queue_depth_and_latency():
+    client = FakeModuleClient()
+    sender = TelemetrySender(client, queue_size=2)
+    assert sender.submit({"n": 1}) and sender.submit({"n": 2})
+    assert not sender.submit({"n": 3})          # queue full, not started yet
+    assert sender.metrics()["queue_depth"] == 2
+    sender.start()
+    sender.stop()
+
+    metrics = sender.metrics()
+    assert metrics["queue_depth"] == 0
+    assert metrics["dropped"] == 1
+    assert metrics["sent_payloads"] == 2
+    assert metrics["latency_ms_max"] >= metrics["latency_ms_mean"] >= 0
+
+
+def test_journal_keeps_messages_while_the_link_is_down(tmp_path):
+    client = FakeModuleClient(fail=10**6)
+    sender = TelemetrySender(
+        client, journal=MessageJournal(tmp_path), backoff_seconds=0.05, max_retries=1,
+    ).start()
+    for i in range(5):
+        sender.submit({"n": i})
+    time.sleep(0.3)
+    assert client.sent == []
+    assert sum(sender.metrics()["journal_pending"].values()) == 5
+
+    client.fail = 0
+    _wait(lambda: len(client.sent) == 5)
+    sender.stop()
+    assert client.payloads() == [{"n": i} for i in range(5)]
+
+
+def test_payloads_queued_after_a_journal_error_are_sent_before_stop(tmp_path):
+    client = FakeModuleClient()
+    journal = MessageJournal(tmp_path)
+    sender = TelemetrySender(client, journal=journal).start()
+    append = journal.append
+    journal.append = lambda *a, **k: (_ for _ in ()).throw(OSError("disk full"))
+    sender.submit({"n": 1})
+    journal.append = append
+
+    _wait(lambda: client.payloads() == [{"n": 1}])
+    sender.stop()
@@ -0,0 +1,137 @@
+"""Echogram tiles: only tiles over changed columns are re-encoded, zoomed out by block max."""
+
+import io
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from config import EdgeConfig
+from exports.daily_echogram import DailyEchogram, _colour_lut, daily_raster_root
+from exports.tiles import TILE_SIZE, _EPOCH, update_echogram_tiles
+
+pytest.importorskip("matplotlib")
+
+DAY = date(2026, 5, 1)
+ZOOM_LEVELS = 3
+
+
+class _RecordingStorage:
+    def __init__(self):
+        self.files = {}
+
+    def save_file(self, data, path):
+        self.files[path] = data
+        return path
+
+
+def _config(tmp_path):
+    return EdgeConfig(output_base_path=str(tmp_path), echogram_tile_zoom_levels=ZOOM_LEVELS)
+
+
+def _composite(config, day=DAY):
+    return DailyEchogram(
+        daily_raster_root(config, day), day,
+        column_seconds=config.daily_echogram_column_seconds,
+        depth_bin=config.daily_echogram_depth_bin,
+        max_depth=config.daily_echogram_max_depth,
+    )
+
+
+def _write_raster(config, day, cols, seed=0):
+    """Random quantized values in raster columns *cols*, rows 0-399."""
+    composite = _composite(config, day)
+    raster = np.zeros((composite.n_rows, composite.n_cols), dtype=np.uint8)
+    rng = np.random.default_rng(seed)
+    raster[:400, cols] = rng.integers(1, 256, (400, cols.stop - cols.start), dtype=np.uint8)
+    root = daily_raster_root(config, day)
+    root.mkdir(parents=True, exist_ok=True)
+    np.save(root / "38kHz.npy", raster)
+    return raster
+
+
+def _decode(png):
+    import matplotlib.image as mimage
+
+    return np.round(mimage.imread(io.BytesIO(png), format="png") * 255).astype(np.uint8)
+
+
+def _tiles(files):
+    """``(z, x, y)`` of the tile paths written."""
+    out = set()
+    for path in files:
+        if path.endswith(".png"):
+            z, x, y = path[:-4].split("/")[-3:]
+            out.add((int(z), int(x), int(y)))
+    return out
+
+
+def test_only_tiles_over_changed_columns_are_rewritten(tmp_path):
+    config = _config(tmp_path)
+    _write_raster(config, DAY, slice(1000, 3000))
+    composite = _composite(config)
+    storage = _RecordingStorage()
+
+    saved = update_echogram_tiles(composite, {"38kHz": (1500, 1600)}, config, storage)
+
+    offset = (DAY - _EPOCH).days * composite.n_cols
+    expected = set()
+    for z in range(ZOOM_LEVELS):
+        span = TILE_SIZE * 2 ** (ZOOM_LEVELS - 1 - z)
+        rows_with_data = range(-(-400 // span))
+        for x in range((offset + 1500) // span, (offset + 1599) // span + 1):
+            expected.update((z, x, y) for y in rows_with_data)
+    assert _tiles(saved) == expected
+    # 100 columns touch one or two tiles per row band and zoom; the data spans ~8 tiles wide natively
+    assert len(expected) <= 2 * (2 + 1 + 1)
+    assert set(storage.files) == set(saved) | {f"{config.campaign_container}/{config.echogram_container}/tiles/tiles.json"}
+
+
+def test_zoomed_out_tiles_keep_block_max(tmp_path):
+    config = _config(tmp_path)
+    raster = _write_raster(config, DAY, slice(0, 8640), seed=1)
+    composite = _composite(config)
+    storage = _RecordingStorage()
+    offset = (DAY - _EPOCH).days * composite.n_cols
+    saved = update_echogram_tiles(composite, {"38kHz": (4000, 4001)}, config, storage)
+
+    lut = _colour_lut()
+    for z in range(ZOOM_LEVELS):
+        factor = 2 ** (ZOOM_LEVELS - 1 - z)
+        span = TILE_SIZE * factor
+        x = (offset + 4000) // span
+        path = next(p for p in saved if p.endswith(f"/38kHz/{z}/{x}/0.png"))
+        c0 = x * span - offset
+        block = np.zeros((span, span), dtype=np.uint8)
+        rows = min(span, composite.n_rows)
+        block[:rows] = raster[:rows, c0:c0 + span]
+        expected = block.reshape(TILE_SIZE, factor, TILE_SIZE, factor).max(axis=(1, 3))
+        np.testing.assert_array_equal(_decode(storage.files[path]), lut[expected])
+
+
+def test_tiles_straddling_midnight_read_both_days(tmp_path):
+    config = _config(tmp_path)
+    previous = DAY - timedelta(days=1)
+    yesterday = _write_raster(config, previous, slice(8000, 8640), seed=2)
+    _write_raster(config, DAY, slice(0, 50), seed=3)
+    composite = _composite(config)
+    storage = _RecordingStorage()
+    offset = (DAY - _EPOCH).days * composite.n_cols
+    assert offset % TILE_SIZE != 0
+
+    update_echogram_tiles(composite, {"38kHz": (0, 50)}, config, storage)
+    x = offset // TILE_SIZE
+    tile = _decode(storage.files[f"{config.campaign_container}/{config.echogram_container}/tiles/38kHz/{ZOOM_LEVELS - 1}/{x}/0.png"])
+    before_midnight = offset - x * TILE_SIZE
+    np.testing.assert_array_equal(
+        tile[:, :before_midnight], _colour_lut()[yesterday[:TILE_SIZE, 8640 - before_midnight:]],
+    )
+    assert tile[:400, before_midnight:before_midnight + 50, 3].all()
+    assert not tile[:, before_midnight + 50:, 3].any()
+
+
+def test_no_data_writes_nothing(tmp_path):
+    config = _config(tmp_path)
+    storage = _RecordingStorage()
+    assert update_echogram_tiles(_composite(config), {"38kHz": (0, 10)}, config, storage) == []
+    assert storage.files == {}
@@ -0,0 +1,198 @@
+"""Streaming track simplification and the per-day binary track files."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from exports.location import _arc_distances, _unit_vectors, rdp_mask
+from process.track_store import (
+    TRACK_RECORD,
+    StreamingTrackSimplifier,
+    TrackStore,
+    interpolate_track,
+    track_distance_nmi,
+    with_track_position,
+)
+
+EPSILON = 0.005
+
+
+def _fixes(n=2000, seed=0, start="2026-05-01T22:00:00"):
+    """A wandering ship track: one fix every 2 s at ~10 kn."""
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.08, n))
+    step = 10 / 1800  # nmi per 2 s
+    lat = 43.0 + np.cumsum(step * np.cos(heading)) / 60
+    lon = 5.0 + np.cumsum(step * np.sin(heading) / (60 * np.cos(np.radians(lat))))
+    times = pd.Timestamp(start) + pd.to_timedelta(np.arange(n) * 2, "s")
+    return times, lat, lon
+
+
+def _stream(times, lat, lon, **kwargs):
+    simplifier = StreamingTrackSimplifier(epsilon_nmi=EPSILON, **kwargs)
+    vertices = []
+    for t, la, lo in zip(times, lat, lon):
+        vertices += simplifier.add(t, la, lo)
+        assert len(simplifier) < simplifier.max_buffer
+    vertices += simplifier.flush()
+    return vertices
+
+
+def _vertex_indices(vertices, times):
+    return np.searchsorted(times.values, np.array([v[0] for v in vertices]))
+
+
+def test_streaming_with_unbounded_buffer_equals_batch_rdp():
+    times, lat, lon = _fixes(500)
+    vertices = _stream(times, lat, lon, max_buffer=10_000)
+    batch = np.flatnonzero(rdp_mask(np.column_stack([lat, lon]), EPSILON, distance="great_circle"))
+    np.testing.assert_array_equal(_vertex_indices(vertices, times), batch)
+
+
+@pytest.mark.parametrize("max_buffer, ratio", [(8, 3.0), (64, 1.1), (256, 1.1)])
+def test_streaming_track_stays_within_epsilon(max_buffer, ratio):
+    times, lat, lon = _fixes()
+    vertices = _stream(times, lat, lon, max_buffer=max_buffer)
+    kept = _vertex_indices(vertices, times)
+    assert kept[0] == 0 and kept[-1] == len(times) - 1
+    assert np.all(np.diff(kept) > 0)
+
+    # Every dropped fix is within epsilon of the emitted segment spanning it
+    points = _unit_vectors(lat, lon)
+    for first, last in zip(kept[:-1], kept[1:]):
+        if last - first > 1:
+            distances = _arc_distances(points[first + 1:last], points[first], points[last])
+            assert distances.max() <= EPSILON
+
+    # Close to simplifying the whole track at once, unless the buffer is tiny
+    batch = rdp_mask(np.column_stack([lat, lon]), EPSILON, distance="great_circle").sum()
+    assert len(kept) <= ratio * batch
+
+
+def test_streaming_ignores_invalid_fixes():
+    simplifier = StreamingTrackSimplifier()
+    t = pd.Timestamp("2026-05-01T00:00:00")
+    assert simplifier.add(t, np.nan, 5.0) == []
+    assert simplifier.add(t, 0.0, 0.0) == []
+    assert simplifier.add(t, 91.0, 5.0) == []
+    assert simplifier.add(t, 43.0, 181.0) == []
+    assert len(simplifier) == 0
+    assert simplifier.add(t, 43.0, 5.0) == [(np.datetime64(t, "ns"), 43.0, 5.0)]
+    assert simplifier.add(t, 43.1, 5.1) == []
+    assert simplifier.add(t - pd.Timedelta("1s"), 43.1, 5.1) == []
+    assert len(simplifier) == 1
+
+
+def test_flush_keeps_the_last_fix_as_anchor():
+    times, lat, lon = _fixes(50)
+    simplifier = StreamingTrackSimplifier(epsilon_nmi=EPSILON)
+    for t, la, lo in zip(times, lat, lon):
+        simplifier.add(t, la, lo)
+    pending = simplifier.pending()
+    flushed = simplifier.flush()
+    assert flushed == pending
+    assert flushed[-1][0] == np.datetime64(times[-1], "ns")
+    assert len(simplifier) == 1
+    assert simplifier.flush() == []
+
+
+def test_track_store_round_trip_across_midnight(tmp_path):
+    times, lat, lon = _fixes(5000)  # 22:00 to ~00:47
+    vertices = [(np.datetime64(t, "ns"), la, lo) for t, la, lo in zip(times, lat, lon)]
+    store = TrackStore(tmp_path)
+    assert store.append(vertices[:3000]) == 3000
+    assert store.append(vertices[3000:]) == 2000
+    assert store.append([]) == 0
+
+    first, second = times[0].date(), times[-1].date()
+    n_first = int((times.date == first).sum())
+    assert (tmp_path / f"{first}.track").stat().st_size == n_first * TRACK_RECORD.itemsize == n_first * 24
+    assert (tmp_path / f"{second}.track").stat().st_size == (5000 - n_first) * 24
+
+    records = np.concatenate([store.load_day(first), store.load_day(second)])
+    np.testing.assert_array_equal(records["t"], times.values.astype("datetime64[ns]").astype(np.int64))
+    np.testing.assert_array_equal(records["lat"], lat)
+    np.testing.assert_array_equal(records["lon"], lon)
+
+    window = store.load(times[100], times[200], margin=False)
+    assert len(window) == 101
+    assert window["dt"].iloc[0] == times[100]
+    with_margin = store.load(times[100] + pd.Timedelta("1s"), times[200] - pd.Timedelta("1s"))
+    assert with_margin["dt"].iloc[0] == times[100] and with_margin["dt"].iloc[-1] == times[200]
+
+
+def test_track_store_ignores_partial_trailing_record(tmp_path):
+    times, lat, lon = _fixes(10, start="2026-05-01T12:00:00")
+    store = TrackStore(tmp_path)
+    store.append([(np.datetime64(t, "ns"), la, lo) for t, la, lo in zip(times, lat, lon)])
+    with open(tmp_path / "2026-05-01.track", "ab") as f:
+        f.write(b"\x01" * 10)
+    assert len(store.load_day(times[0].date())) == 10
+    assert len(store.load_day(pd.Timestamp("2026-05-02").date())) == 0
+
+
+def test_interpolate_track():
+    track = pd.DataFrame({
+        "lat": [43.0, 43.1, 43.3],
+        "lon": [5.0, 5.2, 5.2],
+        "dt": pd.to_datetime(["2026-05-01T00:00:00", "2026-05-01T00:01:00", "2026-05-01T00:03:00"]),
+    })
+    times = pd.to_datetime([
+        "2026-04-30T23:59:59", "2026-05-01T00:00:00", "2026-05-01T00:00:30",
+        "2026-05-01T00:02:00", "2026-05-01T00:03:00", "2026-05-01T00:03:01",
+    ]).values
+    lat, lon = interpolate_track(track, times)
+    np.testing.assert_allclose(lat, [np.nan, 43.0, 43.05, 43.2, 43.3, np.nan])
+    np.testing.assert_allclose(lon, [np.nan, 5.0, 5.1, 5.2, 5.2, np.nan])
+
+    lat, lon = interpolate_track(track.iloc[:1], times)
+    assert np.isnan(lat).all() and np.isnan(lon).all()
+    assert track_distance_nmi(track) == pytest.approx(track_distance_nmi(track.iloc[:2]) + 12.0, rel=1e-3)
+
+
+def test_store_interpolate_matches_fixes(tmp_path):
+    times, lat, lon = _fixes(600)
+    store = TrackStore(tmp_path)
+    store.append(_stream(times, lat, lon, max_buffer=64))
+    got_lat, got_lon = store.interpolate(times.values)
+    # Linear between vertices at most epsilon (~9 m) from the fixes
+    np.testing.assert_allclose(got_lat, lat, atol=2 * EPSILON / 60)
+    np.testing.assert_allclose(got_lon, lon, atol=2 * EPSILON / 60 / np.cos(np.radians(43.1)))
+
+
+def _ds(times, lat=None):
+    ds = xr.Dataset(
+        {"Sv": (("ping_time",), np.zeros(len(times)))},
+        coords={"ping_time": times},
+    )
+    if lat is not None:
+        ds = ds.assign(latitude=("ping_time", lat), longitude=("ping_time", np.full(len(times), 5.0)))
+    return ds
+
+
+def test_with_track_position():
+    track = pd.DataFrame({
+        "lat": [43.0, 43.2],
+        "lon": [5.0, 5.4],
+        "dt": pd.to_datetime(["2026-05-01T00:00:00", "2026-05-01T00:02:00"]),
+    })
+    times = pd.to_datetime(["2026-05-01T00:00:30", "2026-05-01T00:01:00"]).values
+
+    filled = with_track_position(_ds(times), track)
+    np.testing.assert_allclose(filled["latitude"].values, [43.05, 43.1])
+    np.testing.assert_allclose(filled["longitude"].values, [5.1, 5.2])
+
+    # Placeholder zeros and NaNs count as missing
+    filled = with_track_position(_ds(times, lat=np.array([0.0, np.nan])).assign(
+        longitude=("ping_time", np.zeros(2))), track)
+    np.testing.assert_allclose(filled["latitude"].values, [43.05, 43.1])
+
+    # Valid positions, no track, or no overlap: unchanged
+    valid = _ds(times, lat=np.array([44.0, 44.1]))
+    assert with_track_position(valid, track) is valid
+    bare = _ds(times)
+    assert with_track_position(bare, None) is bare
+    assert with_track_position(bare, track.iloc[:1]) is bare
+    late = _ds(pd.to_datetime(["2026-05-02T00:00:00"]).values)
+    assert with_track_position(late, track) is late
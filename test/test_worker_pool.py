@@ -0,0 +1,70 @@
+"""JobWorkerPool admission: a held job re-checks cancellation and memory."""
+
+import asyncio
+import threading
+
+from ingest.job_store import CANCELLED, DONE, JobStore
+from ingest.worker_pool import JobWorkerPool
+
+_MB = 1024 * 1024
+
+
+def _pool(store, release, available):
+    def run_job(job):
+        release.wait(10)
+        store.finish(job["id"], DONE)
+
+    return JobWorkerPool(
+        store, run_job, max_workers=2, budget_bytes=1000 * _MB,
+        estimate=lambda job: job["payload"]["mb"] * _MB, poll_seconds=0.05,
+        available=lambda: available[0],
+    )
+
+
+async def _until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def test_held_job_is_cancelled_while_waiting(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    release = threading.Event()
+    pool = _pool(store, release, [None])
+    running = store.submit("t", {"mb": 600}, group_id="a")
+    held = store.submit("t", {"mb": 600}, group_id="b")
+
+    async def scenario():
+        task = asyncio.ensure_future(pool.run())
+        await _until(lambda: pool.metrics()["waiting_for_memory"] == held)
+        store.cancel("b")
+        await _until(lambda: store.get(held)["status"] == CANCELLED)
+        # The running job is unaffected
+        assert store.get(running)["status"] != CANCELLED
+        release.set()
+        await _until(lambda: store.get(running)["status"] == DONE)
+        task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_held_job_starts_when_memory_frees_up(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    release = threading.Event()
+    available = [300 * _MB]
+    pool = _pool(store, release, available)
+    store.submit("t", {"mb": 100}, group_id="a")
+    held = store.submit("t", {"mb": 100}, group_id="b")
+
+    async def scenario():
+        task = asyncio.ensure_future(pool.run())
+        await _until(lambda: pool.metrics()["waiting_for_memory"] == held)
+        # Memory freed elsewhere on the system: admitted without a job finishing
+        available[0] = 4096 * _MB
+        await _until(lambda: pool.metrics()["running"] == 2)
+        release.set()
+        await _until(lambda: store.get(held)["status"] == DONE)
+        task.cancel()
+
+    asyncio.run(scenario())